@@ -4,64 +4,112 @@ Uproszczona wersja aplikacji do wyszukiwania maili Epsteina.
 Stabilna, bez duplikacji kodu, z lepszym error handling.
 """
 
-import re
+import json
+import os
 
 import pandas as pd
 import streamlit as st
-from datasets import load_dataset
 
+import instrumentation
+from search_engine import DEFAULT_DATASET, DEFAULT_SPLIT, extract_metadata, get_docs, search
+from search_engine.autocomplete import complete
+from search_engine.cooccurrence import get_cooccurrence_graph
+from search_engine.dates import get_date_index
+from search_engine.dedup import get_duplicate_index
+from search_engine.entities import get_entity_index, parse_entity_query
+from search_engine.facets import get_facet_index
+from search_engine.federation import CorpusRegistry, corpus_name
+from search_engine.formatting import format_email_text
+from search_engine.fuzzy import get_deletion_index
+from search_engine.pretranslate import attach_translations, get_translations, translated_corpus
+from search_engine.regex import compile_pattern
+from search_engine.semantic import similar_documents
+from search_engine.threads import get_thread_index
+from search_engine.updates import source_revision
 from translation_utils import (
     classify_content_type,
     double_validate_translation,
     extract_email_metadata,
     get_cache_key,
+    get_circuit_breaker,
     translate_query_to_english,
-    translate_text,
-    translate_with_fallback,
+    translate_text_stream,
+    translate_texts,
+    translation_pause_message,
 )
 
 # Konfiguracja strony
 st.set_page_config(page_title="Akta Epsteina - Wyszukiwarka Maili", page_icon="📧", layout="wide")
 
 
-# Funkcja pomocnicza do formatowania tekstu
-def format_email_text(text, highlight_pattern=None, case_sensitive=False):
-    """Formatuje tekst maila z podziałem na akapity i podświetleniem."""
-    if not text or not text.strip():
-        return ""
+def highlight_for(text, search_query_final, highlight_terms=None):
+    """Wzorzec podświetlenia: termy z wyszukiwania przybliżonego albo fraza, jeśli występuje w tekście."""
+    if highlight_terms:
+        return highlight_terms
+    return search_query_final if search_query_final.lower() in text.lower() else None
 
-    # Podziel na akapity
-    paragraphs = text.split("\n\n")
-    if len(paragraphs) == 1:
-        paragraphs = [p for p in text.split("\n") if p.strip()]
 
-    formatted_paragraphs = []
-    for para in paragraphs:
-        if not para.strip():
-            continue
+# Funkcja do wyświetlania pojedynczego wyniku
+# Ile wiadomości wątku pokazać w karcie wyniku i ile znaków każdej z nich
+THREAD_DISPLAY_LIMIT = 50
+THREAD_PREVIEW_CHARS = 1500
 
-        para = " ".join(para.split())
 
-        # Podświetl jeśli jest wzorzec
-        if highlight_pattern:
-            try:
-                pattern = re.compile(re.escape(highlight_pattern), re.IGNORECASE if not case_sensitive else 0)
-                para = pattern.sub(
-                    lambda m: f"<mark style='background-color: #ffeb3b; padding: 2px 4px; border-radius: 3px; font-weight: bold;'>{m.group()}</mark>",
-                    para,
-                )
-            except (re.error, Exception):
-                pass
+def toggle_state(key):
+    st.session_state[key] = not st.session_state.get(key, False)
 
-        formatted_paragraphs.append(
-            f"<p style='margin-bottom: 1em; line-height: 1.6; text-align: left; word-wrap: break-word;'>{para}</p>"
-        )
 
-    return "\n".join(formatted_paragraphs)
+def render_thread(corpus, doc_id, members, search_query_final, case_sensitive, highlight_terms=None):
+    """Wyświetla wątek dokumentu - członkowie pochodzą z indeksu wątków, bez ponownego wyszukiwania."""
+    st.markdown(f"**🧵 Wątek ({len(members)} wiadomości, od najstarszej):**")
+    shown = members[:THREAD_DISPLAY_LIMIT]
+    for position, (doc, metadata) in enumerate(zip(get_docs(corpus, shown), extract_metadata(corpus, shown)), start=1):
+        parts = [f"{'➡️ ' if doc['doc_id'] == doc_id else ''}**{position}.** `{doc['filename']}`"]
+        if metadata["from"] != "N/A":
+            parts.append(f"Od: {metadata['from']}")
+        if metadata["date"] != "N/A":
+            parts.append(f"Data: {metadata['date']}")
+        st.markdown(" | ".join(parts))
+        if doc["doc_id"] == doc_id:
+            continue
+        preview = doc["text"][:THREAD_PREVIEW_CHARS]
+        formatted = format_email_text(
+            preview,
+            highlight_pattern=highlight_for(preview, search_query_final, highlight_terms),
+            case_sensitive=case_sensitive,
+        )
+        st.markdown(
+            f"<div style='background-color: #f3f0fa; padding: 10px; border-radius: 5px; border-left: 4px solid #7e57c2; max-height: 250px; overflow-y: auto;'>{formatted}</div>",
+            unsafe_allow_html=True,
+        )
+    if len(members) > THREAD_DISPLAY_LIMIT:
+        st.caption(f"⚠️ Wyświetlono pierwsze {THREAD_DISPLAY_LIMIT} wiadomości wątku.")
+
+
+SIMILAR_DISPLAY_LIMIT = 10
+SIMILAR_PREVIEW_CHARS = 800
+
+
+def render_similar(corpus, doc_id):
+    """Dokumenty najbardziej podobne treścią ("więcej takich") - najbliżsi sąsiedzi w indeksie semantycznym."""
+    with st.spinner("🔎 Szukanie podobnych dokumentów..."):
+        similar = similar_documents(corpus, doc_id, limit=SIMILAR_DISPLAY_LIMIT)
+    if not similar:
+        st.caption("Brak dokumentów o podobnej treści.")
+        return
+    st.markdown(f"**🔗 Podobne dokumenty ({len(similar)}):**")
+    for position, (doc, (_, score)) in enumerate(zip(get_docs(corpus, [doc for doc, _ in similar]), similar), start=1):
+        st.markdown(f"**{position}.** `{doc['filename']}` | podobieństwo: {score:.0%}")
+        preview = format_email_text(doc["text"][:SIMILAR_PREVIEW_CHARS])
+        st.markdown(
+            f"<div style='background-color: #eef6fb; padding: 10px; border-radius: 5px; border-left: 4px solid #0288d1; max-height: 200px; overflow-y: auto;'>{preview}</div>",
+            unsafe_allow_html=True,
+        )
 
 
-# Funkcja do wyświetlania pojedynczego wyniku
-def display_email_result(row, idx, search_query_final, case_sensitive, translation_key_prefix=""):
+def display_email_result(
+    row, idx, search_query_final, case_sensitive, translation_key_prefix="", highlight_terms=None, corpus=None
+):
     """Wyświetla pojedynczy wynik maila."""
     try:
         row_text = str(row.get("text", ""))
@@ -89,14 +137,33 @@ def display_email_result(row, idx, search_query_final, case_sensitive, translati
             metadata_parts.append(f"Data: {metadata['date']}")
 
         metadata_str = " | ".join(metadata_parts) if metadata_parts else ""
-        occurrences = row_text.lower().count(search_query_final.lower())
+        occurrences = row.get("occurrences")
+        if occurrences is None or pd.isna(occurrences):
+            occurrences = row_text.lower().count(search_query_final.lower())
 
         expander_title = f"{type_badge} {row_filename}"
+        # Źródło wyniku wyszukiwania w kilku korpusach
+        row_corpus = row.get("corpus")
+        if isinstance(row_corpus, str) and row_corpus:
+            expander_title = f"{type_badge} [{row_corpus}] {row_filename}"
         if content_type != "email":
             expander_title += f" [{content_label}]"
         if metadata_str:
             expander_title += f" | {metadata_str}"
         expander_title += f" ({occurrences} wystąpień)"
+        duplicates = row.get("duplicates")
+        if duplicates is not None and not pd.isna(duplicates) and duplicates > 0:
+            expander_title += f" | 🗐 +{int(duplicates)} podobnych"
+
+        # Wątek dokumentu - odczyt z indeksu budowanego przy ładowaniu
+        doc_id = row.get("doc_id")
+        thread_members = None
+        if corpus is not None and doc_id is not None and not pd.isna(doc_id):
+            doc_id = int(doc_id)
+            members = get_thread_index(corpus).members(doc_id)
+            if len(members) > 1:
+                thread_members = members
+                expander_title += f" | 🧵 {len(members)}"
 
         with st.expander(expander_title, expanded=False):
             # Metadane
@@ -129,7 +196,7 @@ def display_email_result(row, idx, search_query_final, case_sensitive, translati
 
             formatted_text = format_email_text(
                 display_text,
-                highlight_pattern=search_query_final if search_query_final.lower() in row_text.lower() else None,
+                highlight_pattern=highlight_for(row_text, search_query_final, highlight_terms),
                 case_sensitive=case_sensitive,
             )
 
@@ -143,137 +210,523 @@ def display_email_result(row, idx, search_query_final, case_sensitive, translati
 
             st.caption(f"📊 Długość: {len(row_text):,} znaków")
 
+            if thread_members is not None:
+                # Stan otwarcia po id dokumentu - przetrwa przejście do widoku zapisanych wyników
+                thread_key = f"thread_open_{doc_id}"
+                st.button(
+                    f"🧵 Pokaż wątek ({len(thread_members)} wiadomości)",
+                    key=f"thread_btn_{translation_key_prefix}{idx}",
+                    on_click=toggle_state,
+                    args=(thread_key,),
+                )
+                if st.session_state.get(thread_key):
+                    st.divider()
+                    render_thread(corpus, doc_id, thread_members, search_query_final, case_sensitive, highlight_terms)
+
+            if corpus is not None and doc_id is not None and not pd.isna(doc_id):
+                similar_key = f"similar_open_{doc_id}"
+                st.button(
+                    "🔗 Podobne dokumenty",
+                    key=f"similar_btn_{translation_key_prefix}{idx}",
+                    on_click=toggle_state,
+                    args=(similar_key,),
+                    help="Dokumenty o najbardziej zbliżonej treści (indeks semantyczny)",
+                )
+                if st.session_state.get(similar_key):
+                    st.divider()
+                    render_similar(corpus, doc_id)
+
             # Tłumaczenie
-            translation_key = f"trans_{translation_key_prefix}{idx}_{get_cache_key(row_text)}"
+            translation_key = translation_state_key(translation_key_prefix, idx, row_text)
             translate_button_key = f"translate_btn_{translation_key_prefix}{idx}"
 
-            if translation_key in st.session_state:
-                # Wyświetl istniejące tłumaczenie
+            # Tłumaczenie z zadania wsadowego albo wcześniej wykonane na żądanie
+            translated_text = stored_translation(corpus, row) or st.session_state.get(translation_key)
+            if translated_text:
                 st.divider()
-                st.markdown("**🇵🇱 Tłumaczenie (polski):**")
-                translated_text = st.session_state[translation_key]
-
-                display_trans = translated_text[:5000] if len(translated_text) > 5000 else translated_text
-                formatted_trans = format_email_text(
-                    display_trans,
-                    highlight_pattern=(
-                        search_query_final if search_query_final.lower() in translated_text.lower() else None
-                    ),
-                    case_sensitive=case_sensitive,
-                )
-
-                st.markdown(
-                    f"<div style='background-color: #e8f5e9; padding: 15px; border-radius: 5px; border-left: 4px solid #4caf50; max-height: 500px; overflow-y: auto;'>{formatted_trans}</div>",
-                    unsafe_allow_html=True,
-                )
-
-                if len(translated_text) > 5000:
-                    st.caption("⚠️ Wyświetlono pierwsze 5000 znaków tłumaczenia.")
+                render_translation(translated_text, search_query_final, case_sensitive, highlight_terms)
             else:
                 # Przycisk do tłumaczenia
                 if st.button("🔄 Przetłumacz na polski", key=translate_button_key):
-                    _handle_translation(row_text, translation_key, search_query_final, case_sensitive)
+                    _handle_translation(row_text, translation_key, search_query_final, case_sensitive, highlight_terms)
 
     except Exception as e:
         st.warning(f"⚠️ Błąd podczas przetwarzania maila: {e}")
 
 
-def _handle_translation(row_text, translation_key, search_query_final, case_sensitive):
-    """Obsługuje proces tłumaczenia."""
-    progress_container = st.empty()
+def translation_state_key(translation_key_prefix, idx, row_text):
+    """Klucz session_state z tłumaczeniem wyniku wykonanym na żądanie."""
+    return f"trans_{translation_key_prefix}{idx}_{get_cache_key(row_text)}"
+
+
+def render_page_translation(results_to_show, corpus, translation_key_prefix=""):
+    """Przycisk tłumaczenia wszystkich wyników strony naraz - krótkie maile idą do usługi jednym żądaniem."""
+    pending = {}
+    for idx, row in results_to_show.iterrows():
+        row_text = str(row.get("text", ""))
+        key = translation_state_key(translation_key_prefix, idx, row_text)
+        row_corpus = corpus_for_row(row, corpus)
+        if row_text.strip() and key not in st.session_state and not stored_translation(row_corpus, row):
+            pending[key] = row_text
+    if not pending:
+        return
+    if st.button(f"🌐 Przetłumacz wyniki na stronie ({len(pending)})", key=f"translate_page_{translation_key_prefix}"):
+        with st.spinner("🔄 Tłumaczenie wyników na polski..."):
+            translated = translate_texts(list(pending.values()))
+        for (key, original), text in zip(pending.items(), translated):
+            if double_validate_translation(original, text)[0]:
+                st.session_state[key] = text
+        warn_if_translation_paused()
+
+
+def warn_if_translation_paused():
+    """Komunikat, gdy bezpiecznik wstrzymał usługę tłumaczenia (żądania kończą się bez wysyłania)."""
+    message = translation_pause_message()
+    if message:
+        st.warning(message)
+
+
+def stored_translation(corpus, row):
+    """Tłumaczenie dokumentu z magazynu tłumaczeń korpusu (pusty tekst - brak tłumaczenia)."""
+    translations = get_translations(corpus) if corpus is not None else None
+    doc_id = row.get("doc_id")
+    if translations is None or doc_id is None or pd.isna(doc_id):
+        return ""
+    return translations.iat[int(doc_id)]
+
+
+def render_translation(translated_text, search_query_final, case_sensitive, highlight_terms=None):
+    """Tłumaczenie dokumentu w ramce z paskiem przewijania (cały tekst)."""
+    st.markdown("**🇵🇱 Tłumaczenie (polski):**")
+    formatted_trans = format_email_text(
+        translated_text,
+        highlight_pattern=highlight_for(translated_text, search_query_final, highlight_terms),
+        case_sensitive=case_sensitive,
+    )
+    st.markdown(
+        f"<div style='background-color: #e8f5e9; padding: 15px; border-radius: 5px; border-left: 4px solid #4caf50; max-height: 500px; overflow-y: auto;'>{formatted_trans}</div>",
+        unsafe_allow_html=True,
+    )
+
 
-    with progress_container.container():
-        st.info("🔄 Tłumaczenie na polski... To może zająć kilka sekund.")
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+def _handle_translation(row_text, translation_key, search_query_final, case_sensitive, highlight_terms=None):
+    """Tłumaczy cały dokument fragmentami - każdy przetłumaczony fragment jest dopisywany, gdy tylko jest gotowy."""
+    progress_bar = st.progress(0.0, text="🌐 Tłumaczenie na polski...")
+    st.divider()
+    translation_box = st.empty()
 
+    parts = []
+    failed = 0
     try:
-        # Ograniczenie długości
-        text_to_translate = row_text[:3000] if len(row_text) > 3000 else row_text
-
-        status_text.text("📝 Przygotowywanie tekstu...")
-        progress_bar.progress(0.1)
-
-        if len(text_to_translate) > 500:
-            status_text.text("📄 Dzielenie tekstu na fragmenty...")
-            progress_bar.progress(0.3)
-
-        status_text.text("🌐 Tłumaczenie tekstu...")
-        progress_bar.progress(0.5)
-        translated = translate_text(text_to_translate, None)
-
-        status_text.text("✅ Walidacja tłumaczenia...")
-        progress_bar.progress(0.8)
-
-        is_valid, reason = double_validate_translation(text_to_translate, translated)
-
-        progress_bar.progress(1.0)
-        progress_container.empty()
-
-        if is_valid:
-            st.session_state[translation_key] = translated
-            st.success("✅ Tłumaczenie zakończone pomyślnie!")
-            # Wyświetl tłumaczenie bezpośrednio
-            st.divider()
-            st.markdown("**🇵🇱 Tłumaczenie (polski):**")
-            display_trans = translated[:5000] if len(translated) > 5000 else translated
-            formatted_trans = format_email_text(
-                display_trans,
-                highlight_pattern=search_query_final if search_query_final.lower() in translated.lower() else None,
-                case_sensitive=case_sensitive,
+        for chunk in translate_text_stream(row_text):
+            parts.append(chunk.text)
+            failed += not chunk.translated
+            progress_bar.progress(
+                (chunk.index + 1) / chunk.count,
+                text=f"🌐 Przetłumaczono fragment {chunk.index + 1} z {chunk.count}",
             )
-            st.markdown(
-                f"<div style='background-color: #e8f5e9; padding: 15px; border-radius: 5px; border-left: 4px solid #4caf50; max-height: 500px; overflow-y: auto;'>{formatted_trans}</div>",
-                unsafe_allow_html=True,
+            with translation_box.container():
+                render_translation("".join(parts), search_query_final, case_sensitive, highlight_terms)
+    except Exception as e:
+        progress_bar.empty()
+        st.error(f"❌ Błąd podczas tłumaczenia: {e}")
+        return
+    progress_bar.empty()
+
+    translated = "".join(parts)
+    is_valid, reason = double_validate_translation(row_text, translated)
+    if is_valid and not failed:
+        st.session_state[translation_key] = translated
+        st.success("✅ Tłumaczenie zakończone pomyślnie!")
+        return
+
+    # Bez ponownej próby: translate_with_fallback to ta sama usługa, a po limicie żądań
+    # kolejne żądanie tylko wydłuża czekanie - ponowienia wyznacza bezpiecznik usługi
+    partial = 0 < failed < len(parts)
+    if not partial:
+        translation_box.empty()
+    pause = translation_pause_message()
+    if pause:
+        st.warning(pause)
+    elif partial:
+        st.warning(f"⚠️ Nie udało się przetłumaczyć {failed} z {len(parts)} fragmentów - pozostały w oryginale.")
+    else:
+        st.error(f"❌ Nie udało się przetłumaczyć: {reason}")
+        st.info("💡 Wyświetlany jest oryginalny tekst po angielsku")
+
+
+FACET_LABELS = {
+    "content_type": "Typ zawartości",
+    "sender": "Nadawca",
+    "recipient": "Odbiorca",
+    "domain": "Domena",
+}
+CONTENT_TYPE_LABELS = {"email": "📧 Maile", "metadata": "📋 Metadane", "json": "🧾 JSON", "other": "📄 Inne"}
+SORT_LABELS = {
+    "type": "Typ zawartości (maile najpierw)",
+    "date_desc": "Data: najnowsze",
+    "date_asc": "Data: najstarsze",
+}
+
+
+def selected_facet_filters():
+    """Filtry fasetowe wybrane w widżetach (pole -> lista wartości)."""
+    filters = {}
+    for field in FACET_LABELS:
+        values = st.session_state.get(f"facet_{field}") or []
+        if values:
+            filters[field] = list(values)
+    return filters
+
+
+def selected_result_options():
+    """Bieżące filtry i kolejność wyników (zmiana którejkolwiek wymaga przeliczenia wyniku, ale nie skanu)."""
+    date_range = st.session_state.get("date_range") or ()
+    return {
+        "filters": selected_facet_filters(),
+        "date_from": date_range[0] if len(date_range) > 0 else None,
+        "date_to": date_range[1] if len(date_range) > 1 else None,
+        "sort": st.session_state.get("result_sort", "type"),
+        "collapse_duplicates": st.session_state.get("collapse_duplicates", False),
+    }
+
+
+def has_active_filters():
+    options = selected_result_options()
+    return bool(options["filters"] or options["date_from"] or options["date_to"])
+
+
+def regex_pattern_error(query, case_sensitive):
+    """Komunikat błędu wzorca regex (niepoprawna składnia, zagnieżdżone powtórzenia) albo None."""
+    if not query or not query.strip():
+        return None
+    try:
+        compile_pattern(query.strip(), case_sensitive)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def selected_corpora():
+    """Przeszukiwane korpusy (załadowane), domyślnie tylko główny."""
+    loaded = registry.names()
+    selected = [name for name in st.session_state.get("search_corpora", []) if name in loaded]
+    return selected or [PRIMARY_CORPUS]
+
+
+def corpus_for_row(row, default):
+    """Korpus, z którego pochodzi wynik (None, gdy został w międzyczasie zwolniony)."""
+    name = row.get("corpus")
+    if not isinstance(name, str) or not name:
+        return default
+    try:
+        return registry.get(name)
+    except KeyError:
+        return None
+
+
+def run_search(corpus, query, case_sensitive, mode, max_edits):
+    """Wyszukuje z bieżącymi filtrami i kolejnością, zapisuje wynik w session_state."""
+    options = selected_result_options()
+    names = selected_corpora()
+    search_options = dict(
+        case_sensitive=case_sensitive,
+        limit=100,
+        mode=mode,
+        max_edits=max_edits,
+        facets=True,
+        timeline=True,
+        suggest=True,
+        **options,
+    )
+
+    if names == [PRIMARY_CORPUS]:
+        # W polskim korpusie dopasowanie jest w tłumaczeniach; id dokumentów są te same co w oryginale
+        polish = translated_corpus(corpus) if st.session_state.get("search_polish") else None
+        result = search(polish or corpus, query, **search_options)
+        # Wyniki są już ograniczone, sklasyfikowane i posortowane
+        results_df = pd.DataFrame(
+            get_docs(corpus, [hit.doc_id for hit in result.hits]), columns=["doc_id", "filename", "text"]
+        )
+    else:
+        # Kilka korpusów przeszukiwanych równolegle; wyniki scalone, z nazwą korpusu źródłowego
+        result = registry.search(query, names, **search_options)
+        results_df = pd.DataFrame(
+            [get_docs(registry.get(hit.corpus), [hit.doc_id])[0] for hit in result.hits],
+            columns=["doc_id", "filename", "text"],
+        )
+        results_df["corpus"] = [hit.corpus for hit in result.hits]
+        for name, error in result.errors.items():
+            st.warning(f"⚠️ Nie udało się przeszukać korpusu {name}: {error}")
+    results_df["content_type"] = [hit.content_type for hit in result.hits]
+    results_df["content_label"] = [hit.content_label for hit in result.hits]
+    results_df["occurrences"] = [hit.occurrences for hit in result.hits]
+    results_df["duplicates"] = [hit.duplicates for hit in result.hits]
+
+    if query != st.session_state.get("last_search_query"):
+        # Nowe zapytanie - panel powiązanych osób wraca do szukanej encji albo najczęstszej osoby w wynikach
+        st.session_state.pop("related_subject", None)
+    st.session_state["search_results"] = results_df
+    st.session_state["last_search_query"] = query
+    st.session_state["last_highlight_terms"] = result.terms
+    st.session_state["last_case_sensitive"] = case_sensitive
+    st.session_state["last_mode"] = mode
+    st.session_state["last_max_edits"] = max_edits
+    st.session_state["last_total"] = result.total
+    st.session_state["last_collapsed"] = result.collapsed
+    st.session_state["last_result_options"] = options
+    st.session_state["last_facet_counts"] = result.facets
+    st.session_state["last_timeline"] = result.timeline
+    st.session_state["last_corpora"] = names
+    return result
+
+
+def primary_doc_ids(results_df):
+    """Id dokumentów wyników z głównego korpusu (panel powiązanych osób korzysta z jego grafu)."""
+    if "corpus" not in results_df:
+        return results_df["doc_id"]
+    return results_df.loc[results_df["corpus"] == PRIMARY_CORPUS, "doc_id"]
+
+
+def render_facet_filters(corpus, facet_counts):
+    """Filtry fasetowe z licznikami dla bieżących wyników (zmiana filtra nie skanuje ponownie tekstów)."""
+    facet_index = get_facet_index(corpus)
+
+    def option_label(field, value, counts):
+        label = CONTENT_TYPE_LABELS.get(value, value) if field == "content_type" else facet_index.label(field, value)
+        return f"{label} ({counts.get(value, 0)})"
+
+    date_index = get_date_index(corpus)
+    first_date, last_date = date_index.bounds()
+
+    with st.expander("🎛️ Filtry wyników", expanded=has_active_filters()):
+        if first_date is not None:
+            st.date_input(
+                "📅 Zakres dat",
+                value=(),
+                min_value=first_date.astype(object).date(),
+                max_value=last_date.astype(object).date(),
+                key="date_range",
+                help="Daty z nagłówków maili; dokumenty bez daty są pomijane, gdy zakres jest ustawiony",
+                format="YYYY-MM-DD",
             )
-            if len(translated) > 5000:
-                st.caption("⚠️ Wyświetlono pierwsze 5000 znaków tłumaczenia.")
-        else:
-            # Fallback
-            progress_container.empty()
-            st.warning(f"⚠️ Tłumaczenie nie przeszło walidacji: {reason}")
-
-            with progress_container.container():
-                st.info("🔄 Próbuję alternatywnej metody tłumaczenia...")
-                fallback_progress = st.progress(0)
-                fallback_status = st.empty()
-
-            fallback_status.text("🌐 Tłumaczenie metodą alternatywną...")
-            fallback_progress.progress(0.5)
-            fallback_translated = translate_with_fallback(text_to_translate)
-            fallback_progress.progress(1.0)
-            progress_container.empty()
-
-            is_valid_fallback, reason_fallback = double_validate_translation(text_to_translate, fallback_translated)
-
-            if is_valid_fallback:
-                st.session_state[translation_key] = fallback_translated
-                st.success("✅ Tłumaczenie zakończone pomyślnie (metoda alternatywna)!")
-                # Wyświetl tłumaczenie bezpośrednio
-                st.divider()
-                st.markdown("**🇵🇱 Tłumaczenie (polski):**")
-                display_trans = fallback_translated[:5000] if len(fallback_translated) > 5000 else fallback_translated
-                formatted_trans = format_email_text(
-                    display_trans,
-                    highlight_pattern=(
-                        search_query_final if search_query_final.lower() in fallback_translated.lower() else None
-                    ),
-                    case_sensitive=case_sensitive,
+        columns = st.columns(len(FACET_LABELS))
+        for column, (field, label) in zip(columns, FACET_LABELS.items()):
+            counts = facet_counts.get(field, {})
+            with column:
+                st.multiselect(
+                    label,
+                    options=list(counts),
+                    key=f"facet_{field}",
+                    format_func=lambda value, field=field, counts=counts: option_label(field, value, counts),
+                    placeholder="Wszystkie",
                 )
-                st.markdown(
-                    f"<div style='background-color: #e8f5e9; padding: 15px; border-radius: 5px; border-left: 4px solid #4caf50; max-height: 500px; overflow-y: auto;'>{formatted_trans}</div>",
-                    unsafe_allow_html=True,
+
+
+def collapsed_note(collapsed):
+    """Dopisek do liczby wyników o ukrytych duplikatach."""
+    return f" (ukryto {collapsed} duplikatów)" if collapsed else ""
+
+
+def render_timeline(corpus, timeline):
+    """Histogram trafień w miesiącach."""
+    if not timeline:
+        return
+    with st.expander("📈 Oś czasu wyników", expanded=False):
+        chart = pd.DataFrame(
+            {"Liczba wyników": list(timeline.values())}, index=pd.Index(list(timeline), name="Miesiąc")
+        )
+        st.bar_chart(chart)
+        failures = get_date_index(corpus).failure_count
+        if failures:
+            st.caption(f"⚠️ Nieodczytane daty w korpusie: {failures:,} dokumentów (pominięte na osi czasu)")
+
+
+ENTITY_LABELS = {"person": "👤 Osoby", "email": "📧 Adresy e-mail", "phone": "📞 Telefony", "url": "🔗 Strony WWW"}
+ENTITY_BROWSER_TOP = 24
+
+
+def run_entity_search(corpus, entity_type, value):
+    """Wyszukiwanie po kliknięciu encji - odczyt listy dokumentów z indeksu encji, bez skanu tekstów."""
+    run_search(corpus, f"{entity_type}:{value}", False, "entity", 1)
+    st.session_state["last_search_in_text"] = True
+    st.session_state["last_original_query"] = value
+    st.session_state["results_page"] = 1
+
+
+def run_suggested_search(corpus, query, case_sensitive, mode, max_edits):
+    """Wyszukiwanie po kliknięciu podpowiedzi "Czy chodziło o..." - poprawione zapytanie trafia też do pola."""
+    st.session_state["search_query"] = query
+    run_search(corpus, query, case_sensitive, mode, max_edits)
+    st.session_state["last_search_in_text"] = True
+    st.session_state["last_original_query"] = query
+    st.session_state["results_page"] = 1
+
+
+def render_suggestions(corpus, suggestions, case_sensitive, mode, max_edits):
+    """Poprawki pisowni zapytania bez wyników, z liczbą dokumentów po poprawce."""
+    if not suggestions:
+        return
+    st.markdown("💡 **Czy chodziło o:**")
+    columns = st.columns(len(suggestions))
+    for position, suggestion in enumerate(suggestions):
+        with columns[position]:
+            st.button(
+                f"{suggestion['query']} ({suggestion['hits']})",
+                key=f"suggestion_{position}",
+                on_click=run_suggested_search,
+                args=(corpus, suggestion["query"], case_sensitive, mode, max_edits),
+            )
+
+
+COMPLETION_DISPLAY_LIMIT = 6
+COMPLETION_ICONS = {"term": "🔎", "person": "👤", "email": "📧", "phone": "📞", "url": "🔗"}
+
+
+def apply_completion(text):
+    st.session_state["search_query"] = text
+
+
+def render_completions(corpus, query):
+    """Podpowiedzi pod polem wyszukiwania: termy i encje ze zbioru zaczynające się od wpisanego tekstu."""
+    if not query or not query.strip():
+        return
+    completions = complete(corpus, query, limit=COMPLETION_DISPLAY_LIMIT)
+    if not completions:
+        return
+    columns = st.columns(len(completions))
+    for position, completion in enumerate(completions):
+        with columns[position]:
+            st.button(
+                f"{COMPLETION_ICONS.get(completion['type'], '')} {completion['text']}",
+                key=f"completion_{position}",
+                on_click=apply_completion,
+                args=(completion["text"],),
+                help=f"Występuje w {completion['documents']} dokumentach",
+            )
+
+
+def render_entity_browser(corpus):
+    """Najczęstsze encje korpusu; kliknięcie pokazuje dokumenty, które o nich wspominają."""
+    entity_index = get_entity_index(corpus)
+    with st.expander("👥 Osoby, adresy i telefony w zbiorze", expanded=False):
+        entity_type = st.radio(
+            "Typ encji", options=list(ENTITY_LABELS), format_func=ENTITY_LABELS.get, horizontal=True, key="entity_type"
+        )
+        entities = entity_index.top(entity_type, limit=ENTITY_BROWSER_TOP)
+        if not entities:
+            st.caption("Brak encji tego typu w zbiorze.")
+            return
+        columns = st.columns(4)
+        for position, entity in enumerate(entities):
+            with columns[position % len(columns)]:
+                st.button(
+                    f"{entity['value']} ({entity['documents']})",
+                    key=f"entity_{entity_type}_{position}",
+                    on_click=run_entity_search,
+                    args=(corpus, entity["type"], entity["value"]),
+                    help=f"Wzmianek: {entity['mentions']} w {entity['documents']} dokumentach",
                 )
-                if len(fallback_translated) > 5000:
-                    st.caption("⚠️ Wyświetlono pierwsze 5000 znaków tłumaczenia.")
-            else:
-                st.error(f"❌ Nie udało się przetłumaczyć: {reason_fallback}")
-                st.info("💡 Wyświetlany jest oryginalny tekst po angielsku")
 
-    except Exception as e:
-        progress_container.empty()
-        st.error(f"❌ Błąd podczas tłumaczenia: {e}")
 
+RELATED_SUBJECTS = 10
+RELATED_PEOPLE_LIMIT = 15
+
+
+def render_related_people(corpus, doc_ids):
+    """Panel boczny: osoby współwystępujące z szukaną encją albo z osobą z wyników (graf współwystępowania)."""
+    subjects = []
+    if st.session_state.get("last_mode") == "entity":
+        try:
+            subjects.append(parse_entity_query(st.session_state.get("last_search_query", "")))
+        except ValueError:
+            pass
+    for entity in get_entity_index(corpus).top("person", limit=RELATED_SUBJECTS, doc_ids=list(doc_ids)):
+        if (entity["type"], entity["value"]) not in subjects:
+            subjects.append((entity["type"], entity["value"]))
+    if not subjects:
+        return
+
+    graph = get_cooccurrence_graph(corpus)
+    with st.sidebar:
+        st.subheader("🤝 Powiązane osoby")
+        subject = st.selectbox(
+            "Występują razem z",
+            options=subjects,
+            format_func=lambda entity: entity[1],
+            key="related_subject",
+            help="Osoby wymieniane w tych samych dokumentach co wybrana encja (w całym zbiorze)",
+        )
+        related = graph.related(subject[0], subject[1], limit=RELATED_PEOPLE_LIMIT)
+        if not related:
+            st.caption("Brak osób wymienianych razem z tą encją.")
+            return
+        for position, entity in enumerate(related):
+            st.button(
+                f"{entity['value']} ({entity['documents']})",
+                key=f"related_{position}",
+                on_click=run_entity_search,
+                args=(corpus, entity["type"], entity["value"]),
+                help=f"Wspólnych dokumentów: {entity['documents']}",
+            )
+
+
+def render_debug_panel():
+    """Wyświetla w pasku bocznym pomiary etapów i liczniki zdarzeń."""
+    metrics = instrumentation.snapshot()
+
+    with st.sidebar:
+        st.subheader("⏱️ Wydajność")
+        if not metrics["timers"] and not metrics["counters"]:
+            st.caption("Brak pomiarów - wykonaj wyszukiwanie.")
+            return
+
+        if metrics["timers"]:
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "Etap": stage,
+                            "Ostatnio [ms]": round(values["last_s"] * 1000, 1),
+                            "Średnio [ms]": round(values["total_s"] / values["count"] * 1000, 1),
+                            "Maks. [ms]": round(values["max_s"] * 1000, 1),
+                            "Liczba": values["count"],
+                        }
+                        for stage, values in sorted(metrics["timers"].items())
+                    ]
+                ),
+                hide_index=True,
+            )
+
+        if metrics["counters"]:
+            st.dataframe(
+                pd.DataFrame(
+                    [{"Licznik": name, "Wartość": value} for name, value in sorted(metrics["counters"].items())]
+                ),
+                hide_index=True,
+            )
+
+        st.download_button("📥 Prometheus", instrumentation.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+        st.download_button(
+            "📥 Logi JSON",
+            "\n".join(json.dumps(entry) for entry in instrumentation.to_log_records()),
+            file_name="metrics.jsonl",
+            mime="application/json",
+        )
+        if st.button("🧹 Wyczyść pomiary", key="reset_metrics"):
+            instrumentation.reset()
+
+
+# Panel wydajności (opcjonalny) - musi być włączony przed wyszukiwaniem, żeby zebrać pomiary
+debug_panel_enabled = st.sidebar.checkbox(
+    "🛠️ Panel wydajności",
+    value=instrumentation.is_enabled(),
+    help="Pokazuje czas poszczególnych etapów wyszukiwania i tłumaczenia",
+)
+if debug_panel_enabled:
+    instrumentation.enable()
+else:
+    instrumentation.disable()
 
 # Nagłówek
 st.title("📧 Akta Epsteina - Wyszukiwarka Maili")
@@ -314,81 +767,228 @@ with st.expander("ℹ️ O aplikacji", expanded=False):
     )
 
 
+def prepare_corpus(loaded):
+    """Indeksy budowane przy ładowaniu korpusu, zanim trafi do wyszukiwania."""
+    # Indeksy nagłówków (fasety, daty, wątki, encje), klastry duplikatów i graf współwystępowania budowane
+    # przy ładowaniu - filtry, zwijanie, widok wątku, encje i powiązane osoby nie wymagają później skanu tekstów
+    get_facet_index(loaded)
+    get_duplicate_index(loaded)
+    get_cooccurrence_graph(loaded)
+    # Indeks usunięć słownika - podpowiedzi "Czy chodziło o..." bez skanu tekstów
+    get_deletion_index(loaded)
+    # Tłumaczenia z zadania wsadowego (python -m search_engine.pretranslate) - bez czekania na usługę tłumaczenia
+    if os.path.isdir(TRANSLATIONS_DIR):
+        attach_translations(loaded, TRANSLATIONS_DIR)
+
+
 # Cache'owane funkcje dla ciężkich operacji
-@st.cache_data(ttl=3600, show_spinner=False)
-def load_dataset_cached(dataset_name, split_name):
-    """Cache'owane ładowanie datasetu - nie blokuje UI przy cache hit."""
-    return load_dataset(dataset_name, split=split_name)
+@st.cache_resource(show_spinner=False)
+def get_corpus_registry():
+    """Rejestr korpusów - jeden egzemplarz współdzielony przez wszystkie sesje (korpusy żyją do zwolnienia)."""
+    return CorpusRegistry(prepare=prepare_corpus)
+
+
+def render_translation_status():
+    """Panel boczny: stan bezpiecznika usługi tłumaczenia i liczniki jego żądań."""
+    breaker = get_circuit_breaker()
+    status = breaker.snapshot()
+    labels = {
+        breaker.CLOSED: "🟢 Działa",
+        breaker.HALF_OPEN: "🟡 Próba po wstrzymaniu",
+        breaker.OPEN: "🔴 Wstrzymana",
+    }
+    with st.sidebar.expander("🌐 Usługa tłumaczenia", expanded=status["state"] != breaker.CLOSED):
+        st.markdown(f"**Stan:** {labels[status['state']]}")
+        if status["state"] == breaker.OPEN:
+            st.caption(f"Ponowna próba za {status['retry_after_s']:.0f} s")
+        st.caption(
+            f"Żądania: {status['calls']:,} | błędy: {status['failures']:,} | odrzucone bez wysyłania:"
+            f" {status['rejected']:,} | wstrzymania: {status['opened']:,}"
+        )
+        if status["last_error"]:
+            st.caption(f"Ostatni błąd: {status['last_error']}")
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def convert_to_pandas_cached(_dataset):
-    """Cache'owana konwersja do pandas - nie blokuje UI przy cache hit."""
-    return _dataset.to_pandas()
+def render_corpus_manager():
+    """Panel boczny: załadowane korpusy, ich przeładowanie i zwalnianie, wybór korpusów do wyszukiwania."""
+    with st.sidebar.expander("🗂️ Korpusy", expanded=len(registry) > 1):
+        full_reload = st.checkbox(
+            "Pełna przebudowa indeksów",
+            key="full_corpus_reload",
+            help="Domyślnie przeładowanie przelicza indeksy tylko dla dodanych i zmienionych dokumentów",
+        )
 
+        for entry in registry.entries():
+            info = entry.to_dict()
+            st.markdown(f"**{entry.name}** - {info['documents']:,} dokumentów")
+            st.caption(f"{info['source'] or 'bez źródła'} | załadowano {info['loaded_at']}")
+            if info["revision"]:
+                st.caption(f"Rewizja: `{info['revision']}`")
+            if info["changes"]:
+                changes = info["changes"]
+                st.caption(
+                    f"Ostatnia aktualizacja: +{changes['added']:,} / ~{changes['changed']:,} / -{changes['removed']:,}"
+                    f" dokumentów w {changes['seconds']:.1f} s"
+                )
+            col_refresh, col_unload = st.columns(2)
+            with col_refresh:
+                if st.button("🔄 Przeładuj", key=f"refresh_corpus_{entry.name}", disabled=entry.source is None):
+                    try:
+                        with st.spinner(f"Przeładowanie {entry.name}..."):
+                            registry.refresh(entry.name, incremental=not full_reload)
+                        st.rerun()
+                    except (ValueError, OSError) as e:
+                        st.error(f"❌ Nie udało się przeładować korpusu: {e}")
+            with col_unload:
+                # Główny korpus obsługuje widoki encji, faset i osi czasu - nie jest zwalniany
+                if entry.name != PRIMARY_CORPUS and st.button("🗑️ Zwolnij", key=f"unload_corpus_{entry.name}"):
+                    registry.unload(entry.name)
+                    st.rerun()
+
+        st.divider()
+        source = st.text_input(
+            "Źródło", placeholder="zbiór Hugging Face albo plik .parquet/.jsonl", key="new_corpus_source"
+        )
+        name = st.text_input("Nazwa (opcjonalnie)", key="new_corpus_name")
+        if st.button("➕ Załaduj korpus", key="load_corpus", disabled=not source):
+            name = name.strip() or corpus_name(source.strip())
+            if name in registry:
+                st.warning(f"⚠️ Korpus {name} jest już załadowany - użyj przeładowania")
+            else:
+                try:
+                    with st.spinner(f"Ładowanie {name}..."):
+                        registry.load(name, source.strip(), split=SPLIT_NAME, compression=TEXT_COMPRESSION)
+                    st.rerun()
+                except (ValueError, OSError) as e:
+                    st.error(f"❌ Nie udało się załadować korpusu: {e}")
+
+        st.multiselect(
+            "Przeszukiwane korpusy",
+            options=registry.names(),
+            default=[PRIMARY_CORPUS],
+            key="search_corpora",
+            help="Zapytanie jest wykonywane równolegle we wszystkich wybranych korpusach, wyniki są scalane",
+        )
 
-# Ładowanie datasetu
-DATASET_NAME = "tensonaut/EPSTEIN_FILES_20K"
-SPLIT_NAME = "train"
 
-if "dataset" not in st.session_state:
-    with st.spinner("🔄 Ładowanie zbioru danych..."):
-        try:
-            dataset = load_dataset_cached(DATASET_NAME, SPLIT_NAME)
-            st.session_state["dataset"] = dataset
+# Ładowanie datasetu
+DATASET_NAME = DEFAULT_DATASET
+SPLIT_NAME = DEFAULT_SPLIT
+# Kompresja tekstów blokami ("zstd", "zlib", "lzma") dla zbiorów, których pełne teksty nie mieszczą się w pamięci
+TEXT_COMPRESSION = os.environ.get("TEXT_COMPRESSION") or None
+# Katalog tłumaczeń korpusu przygotowanych zadaniem wsadowym
+TRANSLATIONS_DIR = os.environ.get("TRANSLATIONS_DIR", "translations")
+PRIMARY_CORPUS = corpus_name(DATASET_NAME)
+# Co ile sekund sprawdzać, czy źródło głównego korpusu ma nową rewizję
+REVISION_CHECK_INTERVAL = 3600
+
+
+@st.cache_data(ttl=REVISION_CHECK_INTERVAL, show_spinner=False)
+def get_source_revision(source):
+    """Rewizja źródła korpusu sprawdzana najwyżej raz na `REVISION_CHECK_INTERVAL` sekund."""
+    return source_revision(source)
+
+
+registry = get_corpus_registry()
+corpus = None
+with st.spinner("🔄 Ładowanie zbioru danych..."):
+    try:
+        corpus = registry.get_or_load(PRIMARY_CORPUS, DATASET_NAME, SPLIT_NAME, TEXT_COMPRESSION)
+        # Nowa rewizja zbioru: indeksy aktualizowane tylko o zmienione dokumenty
+        refreshed = registry.refresh_if_changed(PRIMARY_CORPUS, get_source_revision(DATASET_NAME))
+        if refreshed is not None:
+            corpus = refreshed.corpus
+            st.info(f"🔄 Zbiór danych zaktualizowany do rewizji {refreshed.revision}")
+        if "corpus_loaded" not in st.session_state:
+            st.session_state["corpus_loaded"] = True
             st.success("✅ Zbiór danych załadowany!")
-        except Exception as e:
-            st.error(f"❌ Błąd podczas ładowania: {str(e)}")
-            st.stop()
+    except ValueError as e:
+        st.error(f"❌ Błąd: {e}")
+        st.stop()
+    except Exception as e:
+        st.error(f"❌ Błąd podczas ładowania: {str(e)}")
+        st.stop()
 
 # Główna zawartość
 st.header("🔍 Wyszukiwanie w mailach")
 
-if "dataset" in st.session_state:
-    dataset = st.session_state["dataset"]
-
-    # Cache DataFrame
-    if "dataframe" not in st.session_state:
-        with st.spinner("🔄 Konwersja danych do formatu pandas..."):
-            try:
-                df = convert_to_pandas_cached(dataset)
-                st.session_state["dataframe"] = df
-            except Exception as e:
-                st.error(f"❌ Błąd podczas konwersji do pandas: {e}")
-                st.stop()
-    else:
-        df = st.session_state["dataframe"]
-
-    # Sprawdź kolumny
-    if "text" not in df.columns or "filename" not in df.columns:
-        st.error("❌ Błąd: Brak wymaganych kolumn w zbiorze danych")
-        st.stop()
+if corpus is not None:
+    render_corpus_manager()
+    render_translation_status()
 
+if corpus is not None:
     # Wyszukiwarka
     search_query = st.text_input(
         "🔎 Szukaj w mailach",
         placeholder="np. 'Epstein', 'Clinton', 'court', 'travel'...",
         help="Wpisz słowo kluczowe, nazwisko lub frazę (możesz pisać po polsku - zostanie przetłumaczone)",
+        key="search_query",
     )
+    render_completions(corpus, search_query)
 
-    col1, col2 = st.columns(2)
+    col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
         search_in_text = st.checkbox("Szukaj w treści", value=True)
     with col2:
         case_sensitive = st.checkbox("Rozróżniaj wielkość liter", value=False)
+    with col3:
+        fuzzy_search = st.checkbox(
+            "Wyszukiwanie przybliżone",
+            value=False,
+            help="Toleruje literówki i błędy OCR (np. 'Epstien', 'Maxwel1'). Szuka pojedynczych słów, nie frazy.",
+        )
+    with col4:
+        semantic_search = st.checkbox(
+            "Wyszukiwanie semantyczne",
+            value=False,
+            help="Dokumenty o podobnej tematyce, także bez dokładnych słów zapytania (np. 'flight plane travel'). "
+            "Wyniki w kolejności podobieństwa.",
+        )
+    with col5:
+        regex_search = st.checkbox(
+            "Wyrażenie regularne",
+            value=False,
+            help="Zapytanie jako wyrażenie regularne (np. '\\b\\d{3}-\\d{4}\\b', 'Jeff(rey)?\\s+E'). "
+            "Zapytanie nie jest tłumaczone.",
+        )
+    max_edits = 1
+    if fuzzy_search:
+        max_edits = st.slider("Maksymalna liczba błędów w słowie", min_value=1, max_value=2, value=1)
+    if get_translations(corpus) is not None:
+        st.checkbox(
+            "Szukaj w polskim tłumaczeniu",
+            key="search_polish",
+            help="Zapytanie po polsku jest dopasowywane do przetłumaczonych z góry tekstów, bez tłumaczenia zapytania",
+        )
+    col_sort, col_collapse = st.columns(2)
+    with col_sort:
+        st.selectbox("Sortowanie", options=list(SORT_LABELS), format_func=SORT_LABELS.get, key="result_sort")
+    with col_collapse:
+        st.checkbox(
+            "Zwiń duplikaty",
+            key="collapse_duplicates",
+            help="Pokazuje jeden dokument z każdej grupy prawie identycznych (przekazania, cytowane wątki, kopie OCR)",
+        )
 
     search_button_clicked = st.button("🔍 Szukaj", type="primary", key="search_button")
+    render_entity_browser(corpus)
 
     # Wyszukiwanie
     if search_button_clicked:
+        pattern_error = regex_pattern_error(search_query, case_sensitive) if regex_search else None
         if not search_query or not search_query.strip():
             st.warning("⚠️ Wpisz zapytanie wyszukiwania")
+        elif pattern_error:
+            st.warning(f"⚠️ {pattern_error}")
         else:
             with st.spinner("🔍 Przeszukiwanie maili..."):
                 try:
                     # Tłumaczenie zapytania
                     original_query = search_query.strip()
-                    translated_query = translate_query_to_english(original_query)
+                    # Wzorzec regex nie jest tłumaczony - tłumaczenie zniszczyłoby jego składnię;
+                    # zapytanie do polskich tłumaczeń korpusu zostaje po polsku
+                    keep_query = regex_search or st.session_state.get("search_polish")
+                    translated_query = original_query if keep_query else translate_query_to_english(original_query)
 
                     if translated_query != original_query:
                         st.info(f"🔤 Zapytanie przetłumaczone: '{original_query}' → '{translated_query}'")
@@ -396,42 +996,32 @@ if "dataset" in st.session_state:
                     else:
                         search_query_final = original_query
 
-                    # Wyszukiwanie
+                    # Wyszukiwanie (wynik zapisywany w session_state)
                     if search_in_text:
-                        text_mask = (
-                            df["text"]
-                            .astype(str)
-                            .str.contains(search_query_final, case=case_sensitive, na=False, regex=False)
-                        )
-                        filtered_df = df[text_mask].copy()
+                        if regex_search:
+                            mode = "regex"
+                        elif semantic_search:
+                            mode = "semantic"
+                        else:
+                            mode = "fuzzy" if fuzzy_search else "exact"
+                        result = run_search(corpus, search_query_final, case_sensitive, mode, max_edits)
+                        st.session_state["last_search_in_text"] = search_in_text
+                        st.session_state["last_original_query"] = original_query
                     else:
-                        filtered_df = pd.DataFrame()
-
-                    if len(filtered_df) > 0:
-                        # Ograniczenie i klasyfikacja
-                        filtered_df_limited = filtered_df.head(100).copy()
+                        result = None
 
-                        # Klasyfikuj i sortuj
-                        filtered_df_limited["content_type"] = filtered_df_limited["text"].apply(
-                            lambda x: classify_content_type(str(x))[0] if pd.notna(x) else "other"
+                    if result is not None and result.truncated:
+                        st.warning(
+                            "⏱️ Przekroczono limit czasu wyrażenia regularnego - wyniki są niepełne. "
+                            "Doprecyzuj wzorzec (np. dodaj stały fragment tekstu)."
                         )
-                        filtered_df_limited["content_label"] = filtered_df_limited["text"].apply(
-                            lambda x: classify_content_type(str(x))[1] if pd.notna(x) else "Inny dokument"
-                        )
-
-                        type_order = {"email": 0, "metadata": 1, "json": 2, "other": 3}
-                        filtered_df_limited["sort_order"] = filtered_df_limited["content_type"].map(type_order)
-                        filtered_df_limited = filtered_df_limited.sort_values("sort_order").reset_index(drop=True)
-                        filtered_df_limited = filtered_df_limited.drop(columns=["sort_order"])
-
-                        # Zapisz w session_state
-                        st.session_state["search_results"] = filtered_df_limited
-                        st.session_state["last_search_query"] = search_query_final
-                        st.session_state["last_case_sensitive"] = case_sensitive
-                        st.session_state["last_search_in_text"] = search_in_text
-                        st.session_state["last_original_query"] = original_query
+                    if result is not None and result.total > 0:
+                        filtered_df_limited = st.session_state["search_results"]
 
-                        st.success(f"✅ Znaleziono {len(filtered_df)} wyników")
+                        st.success(f"✅ Znaleziono {result.total} wyników" + collapsed_note(result.collapsed))
+                        render_facet_filters(corpus, result.facets)
+                        render_timeline(corpus, result.timeline)
+                        render_related_people(corpus, primary_doc_ids(filtered_df_limited))
 
                         # Statystyki
                         type_counts = filtered_df_limited["content_type"].value_counts()
@@ -480,10 +1070,24 @@ if "dataset" in st.session_state:
                             results_to_show = filtered_df_limited
 
                         # Wyświetl wyniki
-                        for idx, row in results_to_show.iterrows():
-                            display_email_result(row, idx, search_query_final, case_sensitive)
+                        render_page_translation(results_to_show, corpus)
+                        with instrumentation.timed("app.render"):
+                            for idx, row in results_to_show.iterrows():
+                                display_email_result(
+                                    row,
+                                    idx,
+                                    search_query_final,
+                                    case_sensitive,
+                                    highlight_terms=result.terms,
+                                    corpus=corpus_for_row(row, corpus),
+                                )
+                    elif result is not None and has_active_filters():
+                        render_facet_filters(corpus, result.facets)
+                        st.info("❌ Brak wyników dla wybranych filtrów")
                     else:
                         st.info("❌ Nie znaleziono maili pasujących do zapytania")
+                        if result is not None:
+                            render_suggestions(corpus, result.suggestions, case_sensitive, mode, max_edits)
                         if "search_results" in st.session_state:
                             del st.session_state["search_results"]
                 except Exception as e:
@@ -491,17 +1095,35 @@ if "dataset" in st.session_state:
                     st.exception(e)
 
     # Wyświetl zapisane wyniki jeśli są dostępne
-    if (
-        "search_results" in st.session_state
-        and len(st.session_state["search_results"]) > 0
-        and not search_button_clicked
-    ):
+    if "search_results" in st.session_state and not search_button_clicked:
+        if selected_result_options() != st.session_state.get("last_result_options"):
+            # Zmiana filtrów lub kolejności: dopasowanie zapytania jest zapamiętane w korpusie,
+            # więc liczą się tylko operacje na indeksach (mapy bitowe, kolumna dat)
+            run_search(
+                corpus,
+                st.session_state.get("last_search_query", ""),
+                st.session_state.get("last_case_sensitive", False),
+                st.session_state.get("last_mode", "exact"),
+                st.session_state.get("last_max_edits", 1),
+            )
+            st.session_state["results_page"] = 1
+
         filtered_df = st.session_state["search_results"]
         search_query_final = st.session_state.get("last_search_query", "")
+        highlight_terms = st.session_state.get("last_highlight_terms")
         case_sensitive = st.session_state.get("last_case_sensitive", False)
 
-        if len(filtered_df) > 0:
-            st.success(f"✅ Znaleziono {len(filtered_df)} wyników")
+        if len(filtered_df) == 0:
+            render_facet_filters(corpus, st.session_state.get("last_facet_counts", {}))
+            st.info("❌ Brak wyników dla wybranych filtrów")
+        else:
+            st.success(
+                f"✅ Znaleziono {st.session_state.get('last_total', len(filtered_df))} wyników"
+                + collapsed_note(st.session_state.get("last_collapsed", 0))
+            )
+            render_facet_filters(corpus, st.session_state.get("last_facet_counts", {}))
+            render_timeline(corpus, st.session_state.get("last_timeline", {}))
+            render_related_people(corpus, primary_doc_ids(filtered_df))
 
             # Paginacja
             RESULTS_PER_PAGE = 10
@@ -538,16 +1160,31 @@ if "dataset" in st.session_state:
                 results_to_show = filtered_df
 
             # Wyświetl wyniki
-            for idx, row in results_to_show.iterrows():
-                display_email_result(row, idx, search_query_final, case_sensitive, translation_key_prefix="saved_")
+            render_page_translation(results_to_show, corpus, translation_key_prefix="saved_")
+            with instrumentation.timed("app.render"):
+                for idx, row in results_to_show.iterrows():
+                    display_email_result(
+                        row,
+                        idx,
+                        search_query_final,
+                        case_sensitive,
+                        translation_key_prefix="saved_",
+                        highlight_terms=highlight_terms,
+                        corpus=corpus_for_row(row, corpus),
+                    )
 
     # Informacja o zbiorze
     st.divider()
-    st.caption(f"📋 Zbiór danych: {DATASET_NAME} | Liczba dokumentów: {len(df):,}")
+    st.caption(f"📋 Zbiór danych: {DATASET_NAME} | Liczba dokumentów: {len(corpus):,}")
+    if selected_corpora() != [PRIMARY_CORPUS]:
+        st.caption(f"🗂️ Przeszukiwane korpusy: {', '.join(selected_corpora())}")
 
 else:
     st.warning("⚠️ Zbiór danych nie został załadowany. Odśwież stronę.")
 
+if debug_panel_enabled:
+    render_debug_panel()
+
 # Footer
 st.divider()
 st.caption("📧 Akta Epsteina - Wyszukiwarka Maili | Autor: **PT** | Zbudowane z ❤️ używając Streamlit i Hugging Face 🤗")
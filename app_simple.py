@@ -3,62 +3,25 @@ Uproszczona wersja aplikacji do wyszukiwania maili Epsteina.
 
 Stabilna, bez duplikacji kodu, z lepszym error handling.
 """
-import re
-
 import pandas as pd
 import streamlit as st
-from datasets import load_dataset
 
+from search_engine import DEFAULT_DATASET, DEFAULT_SPLIT, get_docs, load_corpus, search
+from search_engine.formatting import format_email_text
 from translation_utils import (
     classify_content_type,
     double_validate_translation,
     extract_email_metadata,
     get_cache_key,
     translate_query_to_english,
-    translate_text,
-    translate_with_fallback,
+    translate_text_stream,
+    translation_pause_message,
 )
 
 # Konfiguracja strony
 st.set_page_config(page_title="Akta Epsteina - Wyszukiwarka Maili", page_icon="📧", layout="wide")
 
 
-# Funkcja pomocnicza do formatowania tekstu
-def format_email_text(text, highlight_pattern=None, case_sensitive=False):
-    """Formatuje tekst maila z podziałem na akapity i podświetleniem."""
-    if not text or not text.strip():
-        return ""
-
-    # Podziel na akapity
-    paragraphs = text.split("\n\n")
-    if len(paragraphs) == 1:
-        paragraphs = [p for p in text.split("\n") if p.strip()]
-
-    formatted_paragraphs = []
-    for para in paragraphs:
-        if not para.strip():
-            continue
-
-        para = " ".join(para.split())
-
-        # Podświetl jeśli jest wzorzec
-        if highlight_pattern:
-            try:
-                pattern = re.compile(re.escape(highlight_pattern), re.IGNORECASE if not case_sensitive else 0)
-                para = pattern.sub(
-                    lambda m: f"<mark style='background-color: #ffeb3b; padding: 2px 4px; border-radius: 3px; font-weight: bold;'>{m.group()}</mark>",
-                    para,
-                )
-            except (re.error, Exception):
-                pass
-
-        formatted_paragraphs.append(
-            f"<p style='margin-bottom: 1em; line-height: 1.6; text-align: left; word-wrap: break-word;'>{para}</p>"
-        )
-
-    return "\n".join(formatted_paragraphs)
-
-
 # Funkcja do wyświetlania pojedynczego wyniku
 def display_email_result(row, idx, search_query_final, case_sensitive, translation_key_prefix=""):
     """Wyświetla pojedynczy wynik maila."""
@@ -149,25 +112,7 @@ def display_email_result(row, idx, search_query_final, case_sensitive, translati
             if translation_key in st.session_state:
                 # Wyświetl istniejące tłumaczenie
                 st.divider()
-                st.markdown("**🇵🇱 Tłumaczenie (polski):**")
-                translated_text = st.session_state[translation_key]
-
-                display_trans = translated_text[:5000] if len(translated_text) > 5000 else translated_text
-                formatted_trans = format_email_text(
-                    display_trans,
-                    highlight_pattern=search_query_final
-                    if search_query_final.lower() in translated_text.lower()
-                    else None,
-                    case_sensitive=case_sensitive,
-                )
-
-                st.markdown(
-                    f"<div style='background-color: #e8f5e9; padding: 15px; border-radius: 5px; border-left: 4px solid #4caf50; max-height: 500px; overflow-y: auto;'>{formatted_trans}</div>",
-                    unsafe_allow_html=True,
-                )
-
-                if len(translated_text) > 5000:
-                    st.caption("⚠️ Wyświetlono pierwsze 5000 znaków tłumaczenia.")
+                render_translation(st.session_state[translation_key], search_query_final, case_sensitive)
             else:
                 # Przycisk do tłumaczenia
                 if st.button("🔄 Przetłumacz na polski", key=translate_button_key):
@@ -177,71 +122,64 @@ def display_email_result(row, idx, search_query_final, case_sensitive, translati
         st.warning(f"⚠️ Błąd podczas przetwarzania maila: {e}")
 
 
-def _handle_translation(row_text, translation_key, search_query_final, case_sensitive):
-    """Obsługuje proces tłumaczenia."""
-    progress_container = st.empty()
-
-    with progress_container.container():
-        st.info("🔄 Tłumaczenie na polski... To może zająć kilka sekund.")
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-
-    try:
-        # Ograniczenie długości
-        text_to_translate = row_text[:3000] if len(row_text) > 3000 else row_text
-
-        status_text.text("📝 Przygotowywanie tekstu...")
-        progress_bar.progress(0.1)
-
-        if len(text_to_translate) > 500:
-            status_text.text("📄 Dzielenie tekstu na fragmenty...")
-            progress_bar.progress(0.3)
-
-        status_text.text("🌐 Tłumaczenie tekstu...")
-        progress_bar.progress(0.5)
-        translated = translate_text(text_to_translate, None)
-
-        status_text.text("✅ Walidacja tłumaczenia...")
-        progress_bar.progress(0.8)
-
-        is_valid, reason = double_validate_translation(text_to_translate, translated)
+def render_translation(translated_text, search_query_final, case_sensitive):
+    """Tłumaczenie dokumentu w ramce z paskiem przewijania (cały tekst)."""
+    st.markdown("**🇵🇱 Tłumaczenie (polski):**")
+    formatted_trans = format_email_text(
+        translated_text,
+        highlight_pattern=search_query_final if search_query_final.lower() in translated_text.lower() else None,
+        case_sensitive=case_sensitive,
+    )
+    st.markdown(
+        f"<div style='background-color: #e8f5e9; padding: 15px; border-radius: 5px; border-left: 4px solid #4caf50; max-height: 500px; overflow-y: auto;'>{formatted_trans}</div>",
+        unsafe_allow_html=True,
+    )
 
-        progress_bar.progress(1.0)
-        progress_container.empty()
 
-        if is_valid:
-            st.session_state[translation_key] = translated
-            st.success("✅ Tłumaczenie zakończone pomyślnie!")
-            st.rerun()
-        else:
-            # Fallback
-            progress_container.empty()
-            st.warning(f"⚠️ Tłumaczenie nie przeszło walidacji: {reason}")
-
-            with progress_container.container():
-                st.info("🔄 Próbuję alternatywnej metody tłumaczenia...")
-                fallback_progress = st.progress(0)
-                fallback_status = st.empty()
-
-            fallback_status.text("🌐 Tłumaczenie metodą alternatywną...")
-            fallback_progress.progress(0.5)
-            fallback_translated = translate_with_fallback(text_to_translate)
-            fallback_progress.progress(1.0)
-            progress_container.empty()
-
-            is_valid_fallback, reason_fallback = double_validate_translation(text_to_translate, fallback_translated)
-
-            if is_valid_fallback:
-                st.session_state[translation_key] = fallback_translated
-                st.success("✅ Tłumaczenie zakończone pomyślnie (metoda alternatywna)!")
-                st.rerun()
-            else:
-                st.error(f"❌ Nie udało się przetłumaczyć: {reason_fallback}")
-                st.info("💡 Wyświetlany jest oryginalny tekst po angielsku")
+def _handle_translation(row_text, translation_key, search_query_final, case_sensitive):
+    """Tłumaczy cały dokument fragmentami - każdy przetłumaczony fragment jest dopisywany, gdy tylko jest gotowy."""
+    progress_bar = st.progress(0.0, text="🌐 Tłumaczenie na polski...")
+    st.divider()
+    translation_box = st.empty()
 
+    parts = []
+    failed = 0
+    try:
+        for chunk in translate_text_stream(row_text):
+            parts.append(chunk.text)
+            failed += not chunk.translated
+            progress_bar.progress(
+                (chunk.index + 1) / chunk.count,
+                text=f"🌐 Przetłumaczono fragment {chunk.index + 1} z {chunk.count}",
+            )
+            with translation_box.container():
+                render_translation("".join(parts), search_query_final, case_sensitive)
     except Exception as e:
-        progress_container.empty()
+        progress_bar.empty()
         st.error(f"❌ Błąd podczas tłumaczenia: {e}")
+        return
+    progress_bar.empty()
+
+    translated = "".join(parts)
+    is_valid, reason = double_validate_translation(row_text, translated)
+    if is_valid and not failed:
+        st.session_state[translation_key] = translated
+        st.success("✅ Tłumaczenie zakończone pomyślnie!")
+        return
+
+    # Bez ponownej próby: translate_with_fallback to ta sama usługa, a po limicie żądań
+    # kolejne żądanie tylko wydłuża czekanie - ponowienia wyznacza bezpiecznik usługi
+    partial = 0 < failed < len(parts)
+    if not partial:
+        translation_box.empty()
+    pause = translation_pause_message()
+    if pause:
+        st.warning(pause)
+    elif partial:
+        st.warning(f"⚠️ Nie udało się przetłumaczyć {failed} z {len(parts)} fragmentów - pozostały w oryginale.")
+    else:
+        st.error(f"❌ Nie udało się przetłumaczyć: {reason}")
+        st.info("💡 Wyświetlany jest oryginalny tekst po angielsku")
 
 
 # Nagłówek
@@ -283,15 +221,17 @@ with st.expander("ℹ️ O aplikacji", expanded=False):
     )
 
 # Ładowanie datasetu
-DATASET_NAME = "tensonaut/EPSTEIN_FILES_20K"
-SPLIT_NAME = "train"
+DATASET_NAME = DEFAULT_DATASET
+SPLIT_NAME = DEFAULT_SPLIT
 
-if "dataset" not in st.session_state:
+if "corpus" not in st.session_state:
     with st.spinner("🔄 Ładowanie zbioru danych..."):
         try:
-            dataset = load_dataset(DATASET_NAME, split=SPLIT_NAME)
-            st.session_state["dataset"] = dataset
+            st.session_state["corpus"] = load_corpus(DATASET_NAME, split=SPLIT_NAME)
             st.success("✅ Zbiór danych załadowany!")
+        except ValueError as e:
+            st.error(f"❌ Błąd: {e}")
+            st.stop()
         except Exception as e:
             st.error(f"❌ Błąd podczas ładowania: {str(e)}")
             st.stop()
@@ -299,25 +239,8 @@ if "dataset" not in st.session_state:
 # Główna zawartość
 st.header("🔍 Wyszukiwanie w mailach")
 
-if "dataset" in st.session_state:
-    dataset = st.session_state["dataset"]
-
-    # Cache DataFrame
-    if "dataframe" not in st.session_state:
-        with st.spinner("🔄 Konwersja danych do formatu pandas..."):
-            try:
-                df = dataset.to_pandas()
-                st.session_state["dataframe"] = df
-            except Exception as e:
-                st.error(f"❌ Błąd podczas konwersji do pandas: {e}")
-                st.stop()
-    else:
-        df = st.session_state["dataframe"]
-
-    # Sprawdź kolumny
-    if "text" not in df.columns or "filename" not in df.columns:
-        st.error("❌ Błąd: Brak wymaganych kolumn w zbiorze danych")
-        st.stop()
+if "corpus" in st.session_state:
+    corpus = st.session_state["corpus"]
 
     # Wyszukiwarka
     search_query = st.text_input(
@@ -353,31 +276,15 @@ if "dataset" in st.session_state:
 
                     # Wyszukiwanie
                     if search_in_text:
-                        text_mask = (
-                            df["text"]
-                            .astype(str)
-                            .str.contains(search_query_final, case=case_sensitive, na=False, regex=False)
-                        )
-                        filtered_df = df[text_mask].copy()
+                        result = search(corpus, search_query_final, case_sensitive=case_sensitive, limit=100)
                     else:
-                        filtered_df = pd.DataFrame()
-
-                    if len(filtered_df) > 0:
-                        # Ograniczenie i klasyfikacja
-                        filtered_df_limited = filtered_df.head(100).copy()
-
-                        # Klasyfikuj i sortuj
-                        filtered_df_limited["content_type"] = filtered_df_limited["text"].apply(
-                            lambda x: classify_content_type(str(x))[0] if pd.notna(x) else "other"
-                        )
-                        filtered_df_limited["content_label"] = filtered_df_limited["text"].apply(
-                            lambda x: classify_content_type(str(x))[1] if pd.notna(x) else "Inny dokument"
-                        )
+                        result = None
 
-                        type_order = {"email": 0, "metadata": 1, "json": 2, "other": 3}
-                        filtered_df_limited["sort_order"] = filtered_df_limited["content_type"].map(type_order)
-                        filtered_df_limited = filtered_df_limited.sort_values("sort_order").reset_index(drop=True)
-                        filtered_df_limited = filtered_df_limited.drop(columns=["sort_order"])
+                    if result is not None and result.total > 0:
+                        # Wyniki są już ograniczone, sklasyfikowane i posortowane po typie
+                        filtered_df_limited = pd.DataFrame(get_docs(corpus, [hit.doc_id for hit in result.hits]))
+                        filtered_df_limited["content_type"] = [hit.content_type for hit in result.hits]
+                        filtered_df_limited["content_label"] = [hit.content_label for hit in result.hits]
 
                         # Zapisz w session_state
                         st.session_state["search_results"] = filtered_df_limited
@@ -386,7 +293,7 @@ if "dataset" in st.session_state:
                         st.session_state["last_search_in_text"] = search_in_text
                         st.session_state["last_original_query"] = original_query
 
-                        st.success(f"✅ Znaleziono {len(filtered_df)} wyników")
+                        st.success(f"✅ Znaleziono {result.total} wyników")
 
                         # Statystyki
                         type_counts = filtered_df_limited["content_type"].value_counts()
@@ -498,7 +405,7 @@ if "dataset" in st.session_state:
 
     # Informacja o zbiorze
     st.divider()
-    st.caption(f"📋 Zbiór danych: {DATASET_NAME} | Liczba dokumentów: {len(df):,}")
+    st.caption(f"📋 Zbiór danych: {DATASET_NAME} | Liczba dokumentów: {len(corpus):,}")
 
 else:
     st.warning("⚠️ Zbiór danych nie został załadowany. Odśwież stronę.")
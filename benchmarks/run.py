@@ -0,0 +1,544 @@
+"""
+Benchmarki gorących ścieżek: wyszukiwanie, klasyfikacja, metadane, formatowanie, dzielenie tekstu.
+
+Każdy benchmark mierzy czas (mediana i minimum z kilku powtórzeń) oraz szczytowe
+zużycie pamięci (tracemalloc) na syntetycznym korpusie o zadanym rozmiarze.
+Wyniki można zapisać jako baseline (JSON) i porównać z budżetami - przekroczenie
+budżetu czasu lub pamięci kończy program kodem 1.
+
+Przykład:
+    python -m benchmarks.run --size 20k
+    python -m benchmarks.run --size 200k --only search --save-baseline
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic_corpus import DEFAULT_SEED, generate_records, parse_size  # noqa: E402
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.formatting import format_email_text  # noqa: E402
+
+BENCHMARKS_DIR = Path(__file__).parent
+BASELINE_PATH = BENCHMARKS_DIR / "baseline.json"
+BUDGETS_PATH = BENCHMARKS_DIR / "budgets.json"
+
+SAMPLE_SIZE = 1000
+
+
+@dataclass
+class BenchContext:
+    """Dane wejściowe współdzielone przez benchmarki."""
+
+    records: list[dict[str, str]]
+    corpus: Corpus
+    samples: list[str] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, count: int, seed: int = DEFAULT_SEED) -> "BenchContext":
+        records = list(generate_records(count, seed))
+        corpus = Corpus.from_records(records, name=f"synthetic-{count}")
+        step = max(1, len(records) // SAMPLE_SIZE)
+        samples = [record["text"] for record in records[::step][:SAMPLE_SIZE]]
+        return cls(records=records, corpus=corpus, samples=samples)
+
+
+# Rejestr benchmarków: nazwa -> funkcja przygotowująca, zwracająca mierzone wywołanie
+BENCHMARKS: dict[str, Callable[[BenchContext], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+    """Rejestruje benchmark; dekorowana funkcja dostaje kontekst i zwraca funkcję do zmierzenia."""
+
+    def decorator(setup: Callable[[BenchContext], Callable[[], Any]]):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+@benchmark("corpus.build")
+def _bench_corpus_build(ctx: BenchContext):
+    return lambda: Corpus.from_records(ctx.records)
+
+
+def _arrow_table(ctx: BenchContext):
+    import pyarrow as pa
+
+    return pa.Table.from_pylist(ctx.records)
+
+
+@benchmark("corpus.load_objects")
+def _bench_corpus_load_objects(ctx: BenchContext):
+    import pandas as pd
+
+    # Dawny układ: kolumna object - osobny obiekt `str` na każdy tekst (porównanie pamięci z magazynem)
+    table = _arrow_table(ctx)
+    return lambda: pd.Series(table.column("text").to_pylist(), dtype=object)
+
+
+@benchmark("corpus.load_store")
+def _bench_corpus_load_store(ctx: BenchContext):
+    table = _arrow_table(ctx)
+    return lambda: Corpus.from_arrow(table)
+
+
+# Rozmiary bloków porównywane w benchmarkach kompresji (pamięć kontra opóźnienie odczytu)
+BLOCK_SIZES = {"4k": 4 * 1024, "16k": 16 * 1024, "64k": 64 * 1024}
+PAGE_SIZE = 100
+
+
+def _register_compression_benchmarks(label: str, block_size: int) -> None:
+    @benchmark(f"corpus.compress_{label}")
+    def _bench_compress(ctx: BenchContext):
+        from search_engine.blockstore import CompressedDocumentStore
+
+        # zlib z biblioteki standardowej - wyniki porównywalne niezależnie od dostępności zstd
+        return lambda: CompressedDocumentStore.from_store(ctx.corpus.texts, block_size=block_size, codec="zlib")
+
+    @benchmark(f"docstore.page_{label}")
+    def _bench_page(ctx: BenchContext):
+        import random
+
+        from search_engine.blockstore import CompressedDocumentStore
+
+        store = CompressedDocumentStore.from_store(ctx.corpus.texts, block_size=block_size, codec="zlib")
+        doc_ids = sorted(random.Random(0).sample(range(len(store)), min(PAGE_SIZE, len(store))))
+
+        def run():
+            # Zimny odczyt strony wyników: każdy potrzebny blok rozpakowany od nowa
+            store.clear_cache()
+            return store.take(doc_ids)
+
+        return run
+
+
+for _label, _block_size in BLOCK_SIZES.items():
+    _register_compression_benchmarks(_label, _block_size)
+
+
+@benchmark("search.compressed_scan")
+def _bench_search_compressed_scan(ctx: BenchContext):
+    compressed = ctx.corpus.compressed("zlib")
+
+    def run():
+        compressed.clear_match_cache()
+        return search(compressed, "Epstein")
+
+    return run
+
+
+def _uncached_search(ctx: BenchContext, query: str, **options) -> Callable[[], Any]:
+    """Wyszukiwanie z pominięciem cache dopasowań - mierzymy pełne zapytanie, nie trafienie w cache."""
+
+    def run():
+        ctx.corpus.clear_match_cache()
+        return search(ctx.corpus, query, **options)
+
+    return run
+
+
+FEDERATED_PARTS = 4
+
+
+@benchmark("search.federated")
+def _bench_search_federated(ctx: BenchContext):
+    from search_engine.federation import CorpusRegistry
+
+    # Korpus podzielony na 4 części przeszukiwane równolegle i scalane - narzut względem search.name
+    registry = CorpusRegistry()
+    bounds = [len(ctx.corpus) * part // FEDERATED_PARTS for part in range(FEDERATED_PARTS + 1)]
+    for part, (start, stop) in enumerate(zip(bounds, bounds[1:])):
+        registry.add(f"part{part}", Corpus.from_stores(ctx.corpus.texts[start:stop], ctx.corpus.filenames[start:stop]))
+    parts = [registry.get(name) for name in registry.names()]
+
+    def run():
+        for corpus in parts:
+            corpus.clear_match_cache()
+        return registry.search("Epstein")
+
+    return run
+
+
+@benchmark("search.common_term")
+def _bench_search_common(ctx: BenchContext):
+    return _uncached_search(ctx, "meeting")
+
+
+@benchmark("search.name")
+def _bench_search_name(ctx: BenchContext):
+    return _uncached_search(ctx, "Epstein")
+
+
+@benchmark("search.no_match")
+def _bench_search_no_match(ctx: BenchContext):
+    return _uncached_search(ctx, "qzxjv")
+
+
+@benchmark("search.case_sensitive")
+def _bench_search_case_sensitive(ctx: BenchContext):
+    return _uncached_search(ctx, "Maxwell", case_sensitive=True)
+
+
+@benchmark("search.fuzzy")
+def _bench_search_fuzzy(ctx: BenchContext):
+    from search_engine.fuzzy import get_deletion_index
+
+    # Indeks budowany jednorazowo - mierzymy samo zapytanie
+    get_deletion_index(ctx.corpus)
+    return _uncached_search(ctx, "Epstien Maxwel1", mode="fuzzy", max_edits=2)
+
+
+@benchmark("index.fuzzy_build")
+def _bench_fuzzy_build(ctx: BenchContext):
+    from search_engine.fuzzy import get_deletion_index
+
+    return lambda: get_deletion_index(Corpus.from_stores(ctx.corpus.texts, ctx.corpus.filenames, name="bench"))
+
+
+@benchmark("search.facet_filter")
+def _bench_search_facet_filter(ctx: BenchContext):
+    from search_engine.facets import get_facet_index
+
+    # Indeks faset i dopasowanie zapytania są gotowe - mierzymy samą zmianę filtrów
+    get_facet_index(ctx.corpus)
+    search(ctx.corpus, "meeting")
+    filters = {"content_type": ["email"], "domain": ["gmail.com", "aol.com"]}
+    return lambda: search(ctx.corpus, "meeting", filters=filters, facets=True)
+
+
+@benchmark("search.date_range")
+def _bench_search_date_range(ctx: BenchContext):
+    from search_engine.dates import get_date_index
+
+    # Kolumna dat i dopasowanie zapytania są gotowe - mierzymy zakres, sortowanie i oś czasu
+    get_date_index(ctx.corpus)
+    search(ctx.corpus, "meeting")
+    return lambda: search(
+        ctx.corpus, "meeting", date_from="2005-01-01", date_to="2010-12-31", sort="date_desc", timeline=True
+    )
+
+
+@benchmark("search.entity")
+def _bench_search_entity(ctx: BenchContext):
+    from search_engine.entities import get_entity_index
+
+    # Najczęstsza osoba w korpusie - mierzymy odczyt listy dokumentów i budowę wyników
+    person = get_entity_index(ctx.corpus).top("person", limit=1)[0]["value"]
+    return _uncached_search(ctx, f"person:{person}", mode="entity")
+
+
+@benchmark("search.cooccurrence")
+def _bench_search_cooccurrence(ctx: BenchContext):
+    from search_engine.cooccurrence import get_cooccurrence_graph
+    from search_engine.entities import get_entity_index
+
+    # Najczęstsza osoba - najwięcej dokumentów do przejścia w iloczynie macierz-wektor
+    person = get_entity_index(ctx.corpus).top("person", limit=1)[0]["value"]
+    graph = get_cooccurrence_graph(ctx.corpus)
+    return lambda: graph.related("person", person)
+
+
+@benchmark("index.cooccurrence_build")
+def _bench_cooccurrence_build(ctx: BenchContext):
+    from search_engine.cooccurrence import CooccurrenceGraph
+    from search_engine.entities import get_entity_index
+
+    entities = get_entity_index(ctx.corpus)
+    return lambda: CooccurrenceGraph(entities)
+
+
+@benchmark("index.cooccurrence_append")
+def _bench_cooccurrence_append(ctx: BenchContext):
+    from search_engine.cooccurrence import CooccurrenceGraph
+    from search_engine.entities import get_entity_index
+
+    # Dopisanie 1000 dokumentów do gotowego grafu - bez przebudowy macierzy bazowej
+    entities = get_entity_index(ctx.corpus)
+    texts = ctx.corpus.texts[:1000].tolist()
+    return lambda: CooccurrenceGraph(entities).add_documents(texts)
+
+
+@benchmark("search.semantic")
+def _bench_search_semantic(ctx: BenchContext):
+    from search_engine.semantic import get_semantic_index
+
+    # Indeks gotowy - mierzymy wektor zapytania, przeszukanie list IVF i budowę wyników
+    get_semantic_index(ctx.corpus)
+    return _uncached_search(ctx, "wire transfer bank account", mode="semantic")
+
+
+@benchmark("search.similar")
+def _bench_search_similar(ctx: BenchContext):
+    from search_engine.semantic import get_semantic_index, similar_documents
+
+    get_semantic_index(ctx.corpus)
+    return lambda: similar_documents(ctx.corpus, len(ctx.corpus) // 2, limit=10)
+
+
+@benchmark("index.semantic_build")
+def _bench_semantic_build(ctx: BenchContext):
+    from search_engine.semantic import SemanticIndex
+    from search_engine.vocabulary import get_vocabulary
+
+    # Słownik jest współdzielony z wyszukiwaniem przybliżonym - mierzymy TF-IDF, SVD i IVF
+    vocabulary = get_vocabulary(ctx.corpus)
+    return lambda: SemanticIndex.build(vocabulary, len(ctx.corpus))
+
+
+@benchmark("search.regex")
+def _bench_search_regex(ctx: BenchContext):
+    from search_engine.regex import get_trigram_index
+
+    # Indeks gotowy - mierzymy analizę wzorca, iloczyn list trigramów i weryfikację kandydatów
+    get_trigram_index(ctx.corpus)
+    return _uncached_search(ctx, r"Jeff(rey)?\s+Epstein", mode="regex")
+
+
+@benchmark("search.regex_unfiltered")
+def _bench_search_regex_unfiltered(ctx: BenchContext):
+    from search_engine.regex import get_trigram_index
+
+    # Wzorzec bez stałych fragmentów - filtr niczego nie wyklucza, skan `re` wszystkich dokumentów
+    get_trigram_index(ctx.corpus)
+    return _uncached_search(ctx, r"\b\d{3}-\d{3}-\d{4}\b", mode="regex")
+
+
+@benchmark("index.trigrams_build")
+def _bench_trigrams_build(ctx: BenchContext):
+    from search_engine.regex import TrigramIndex
+
+    return lambda: TrigramIndex.build(ctx.corpus.texts)
+
+
+@benchmark("search.autocomplete")
+def _bench_search_autocomplete(ctx: BenchContext):
+    from search_engine.autocomplete import complete, get_completion_index
+
+    # Indeks gotowy - jedno naciśnięcie klawisza (prefiks poza policzonymi z góry)
+    get_completion_index(ctx.corpus)
+    return lambda: complete(ctx.corpus, "con")
+
+
+@benchmark("index.autocomplete_build")
+def _bench_autocomplete_build(ctx: BenchContext):
+    from search_engine.autocomplete import CompletionIndex
+    from search_engine.entities import get_entity_index
+    from search_engine.vocabulary import get_vocabulary
+
+    vocabulary, entities = get_vocabulary(ctx.corpus), get_entity_index(ctx.corpus)
+    return lambda: CompletionIndex.build(vocabulary, entities)
+
+
+@benchmark("search.spelling")
+def _bench_search_spelling(ctx: BenchContext):
+    from search_engine.fuzzy import get_deletion_index
+    from search_engine.spelling import suggest_corrections
+
+    # Indeks usunięć gotowy - podpowiedź dla dwóch błędnych słów (kombinacje kandydatów)
+    get_deletion_index(ctx.corpus)
+    return lambda: suggest_corrections(ctx.corpus, "Epstien Maxwel1 flihgt")
+
+
+@benchmark("index.headers_build")
+def _bench_headers_build(ctx: BenchContext):
+    from search_engine.headers import get_header_indexes
+
+    return lambda: get_header_indexes(Corpus.from_stores(ctx.corpus.texts, ctx.corpus.filenames, name="bench"))
+
+
+@benchmark("search.collapse")
+def _bench_search_collapse(ctx: BenchContext):
+    from search_engine.dedup import get_duplicate_index
+
+    # Klastry i dopasowanie zapytania są gotowe - mierzymy samo zwijanie duplikatów
+    get_duplicate_index(ctx.corpus)
+    search(ctx.corpus, "meeting")
+    return lambda: search(ctx.corpus, "meeting", collapse_duplicates=True)
+
+
+@benchmark("index.duplicates_build")
+def _bench_duplicates_build(ctx: BenchContext):
+    from search_engine.dedup import get_duplicate_index
+
+    return lambda: get_duplicate_index(Corpus.from_stores(ctx.corpus.texts, ctx.corpus.filenames, name="bench"))
+
+
+@benchmark("translation_utils.classify_content_type")
+def _bench_classify(ctx: BenchContext):
+    from translation_utils import classify_content_type
+
+    return lambda: [classify_content_type(text) for text in ctx.samples]
+
+
+@benchmark("translation_utils.extract_email_metadata")
+def _bench_metadata(ctx: BenchContext):
+    from translation_utils import extract_email_metadata
+
+    return lambda: [extract_email_metadata(text) for text in ctx.samples]
+
+
+@benchmark("translation_utils.split_text_into_chunks")
+def _bench_chunks(ctx: BenchContext):
+    from translation_utils import split_text_into_chunks
+
+    long_text = "\n\n".join(ctx.samples)
+    return lambda: split_text_into_chunks(long_text, max_length=4500)
+
+
+@benchmark("translation_utils.get_cache_key")
+def _bench_cache_key(ctx: BenchContext):
+    from translation_utils import get_cache_key
+
+    return lambda: [get_cache_key(text) for text in ctx.samples]
+
+
+@benchmark("translation_utils.double_validate_translation")
+def _bench_validate(ctx: BenchContext):
+    from translation_utils import double_validate_translation
+
+    pairs = list(zip(ctx.samples, ctx.samples[1:] + ctx.samples[:1]))
+    return lambda: [double_validate_translation(original, translated) for original, translated in pairs]
+
+
+@benchmark("translation_utils.translate_query_to_english")
+def _bench_query_translation(ctx: BenchContext):
+    from translation_utils import translate_query_to_english
+
+    # Ścieżka bez sieci: zapytania po angielsku są zwracane bez tłumaczenia
+    queries = [text[:40] for text in ctx.samples]
+    return lambda: [translate_query_to_english(query) for query in queries]
+
+
+@benchmark("formatting.format_email_text")
+def _bench_format(ctx: BenchContext):
+    samples = ctx.samples[:100]
+    return lambda: [format_email_text(text[:5000], highlight_pattern="the") for text in samples]
+
+
+def measure(func: Callable[[], Any], repeat: int = 5) -> dict[str, float]:
+    """
+    Mierzy czas i pamięć wywołania.
+
+    Returns:
+        {'median_ms': ..., 'min_ms': ..., 'peak_mb': ...}
+    """
+    func()  # rozgrzewka (cache, leniwie budowane struktury)
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        func()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "min_ms": round(min(times), 3),
+        "peak_mb": round(peak / 1024 / 1024, 3),
+    }
+
+
+def run_benchmarks(ctx: BenchContext, only: Optional[list[str]] = None, repeat: int = 5) -> dict[str, dict]:
+    """Uruchamia zarejestrowane benchmarki (opcjonalnie tylko te z podanymi prefiksami nazw)."""
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = measure(setup(ctx), repeat=repeat)
+    return results
+
+
+def check_budgets(results: dict[str, dict], budgets: dict[str, dict]) -> list[str]:
+    """
+    Porównuje wyniki z budżetami.
+
+    Args:
+        results: Wyniki benchmarków
+        budgets: {'nazwa': {'time_ms': ..., 'peak_mb': ...}} dla danego rozmiaru korpusu
+
+    Returns:
+        Lista opisów przekroczeń (pusta, jeśli wszystko mieści się w budżecie)
+    """
+    violations = []
+    for name, budget in budgets.items():
+        result = results.get(name)
+        if result is None:
+            continue
+        if "time_ms" in budget and result["median_ms"] > budget["time_ms"]:
+            violations.append(f"{name}: czas {result['median_ms']:.1f} ms > budżet {budget['time_ms']} ms")
+        if "peak_mb" in budget and result["peak_mb"] > budget["peak_mb"]:
+            violations.append(f"{name}: pamięć {result['peak_mb']:.1f} MB > budżet {budget['peak_mb']} MB")
+    return violations
+
+
+def _load_json(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.run", description="Benchmarki wyszukiwarki maili.")
+    parser.add_argument("--size", default="20k", help="Rozmiar korpusu: 20k, 200k, 1m, 2m lub liczba dokumentów")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Ziarno generatora korpusu")
+    parser.add_argument("--repeat", type=int, default=5, help="Liczba powtórzeń pomiaru")
+    parser.add_argument("--only", action="append", help="Uruchom tylko benchmarki o tym prefiksie (wielokrotnie)")
+    parser.add_argument("--output", help="Zapisz wyniki do pliku JSON")
+    parser.add_argument("--budgets", default=str(BUDGETS_PATH), help="Plik z budżetami czasu i pamięci")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Plik z wynikami bazowymi")
+    parser.add_argument("--save-baseline", action="store_true", help="Zapisz wyniki jako nowy baseline")
+    args = parser.parse_args(argv)
+
+    size_label = args.size.lower()
+    count = parse_size(size_label)
+
+    print(f"Generowanie korpusu: {count:,} dokumentów (seed={args.seed})...", file=sys.stderr)
+    ctx = BenchContext.build(count, args.seed)
+    results = run_benchmarks(ctx, only=args.only, repeat=args.repeat)
+
+    baseline = _load_json(Path(args.baseline))
+    previous = baseline.get(size_label, {}).get("results", {})
+    for name, result in results.items():
+        line = f"{name:<50} {result['median_ms']:>10.2f} ms  {result['peak_mb']:>8.2f} MB"
+        if name in previous and previous[name]["median_ms"] > 0:
+            line += f"  ({result['median_ms'] / previous[name]['median_ms']:.2f}x baseline)"
+        print(line)
+
+    report = {
+        "size": size_label,
+        "documents": count,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    if args.save_baseline:
+        baseline[size_label] = report
+        Path(args.baseline).write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    violations = check_budgets(results, _load_json(Path(args.budgets)).get(size_label, {}))
+    for violation in violations:
+        print(f"PRZEKROCZONY BUDŻET: {violation}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
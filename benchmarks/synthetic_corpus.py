@@ -0,0 +1,231 @@
+"""
+Deterministyczny generator syntetycznego korpusu podobnego do akt (maile, notatki, metadane).
+
+Ten sam `seed` i ta sama liczba dokumentów zawsze dają identyczny korpus, więc wyniki
+benchmarków są porównywalne między uruchomieniami. Korpus zawiera to, co spotykamy
+w prawdziwych danych: różne formaty nagłówków i dat, wątki z cytowaniem (Re:/Fw:),
+duplikaty, błędy OCR, adresy email, numery telefonów i adresy URL.
+
+Przykład:
+    python -m benchmarks.synthetic_corpus --size 200k -o corpus_200k.jsonl
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+SIZES = {"20k": 20_000, "200k": 200_000, "1m": 1_000_000, "2m": 2_000_000}
+DEFAULT_SEED = 20240101
+
+FIRST_NAMES = [
+    "Jeffrey", "Ghislaine", "Sarah", "Michael", "Lesley", "Nadia", "Adriana", "David", "Richard", "Alan",
+    "Jean", "Leon", "Bill", "Larry", "Peter", "Emma", "Laura", "Mark", "Thomas", "Anna",
+]  # fmt: skip
+LAST_NAMES = [
+    "Epstein", "Maxwell", "Kellen", "Groff", "Marcinkova", "Mucinska", "Brunel", "Black", "Dershowitz",
+    "Wexner", "Summers", "Mandel", "Nowak", "Hoffman", "Staley", "Brock", "Visoski", "Rodgers", "Alessi", "Perry",
+]  # fmt: skip
+DOMAINS = ["gmail.com", "yahoo.com", "jeevacation.com", "aol.com", "mindspring.com", "law-firm.com", "court.gov"]
+PLACES = ["New York", "Palm Beach", "Paris", "London", "Santa Fe", "St. Thomas", "Little St. James", "Teterboro"]
+SUBJECTS = [
+    "schedule", "flight tomorrow", "dinner on Friday", "meeting notes", "documents", "call me", "invoice",
+    "travel plans", "deposition", "the island", "update", "contract draft", "press inquiry", "payment",
+]  # fmt: skip
+WORDS = (
+    "the of and to in a is that for it as was with be by on not he this are or his from at which but have an they "
+    "you were her she there been one all we their has would when if so no what up out about who them my can more "
+    "will time only could new some these two may first then do any like now my such made over did down only way "
+    "meeting flight schedule call documents court lawyer payment account travel island house plane dinner office "
+    "tomorrow friday monday weekend contract agreement please confirm arrange car hotel guests list phone number "
+    "message urgent private confidential attorney deposition statement investigation records transfer bank wire"
+).split()
+SIGNOFFS = ["Best regards,", "Thanks,", "Sincerely,", "Sent from my iPhone", "Regards,", "-"]
+DATE_FORMATS = [
+    "%A, %B %d, %Y %I:%M %p",  # Tuesday, March 03, 2009 04:12 PM
+    "%a, %d %b %Y %H:%M:%S -0500",  # Tue, 03 Mar 2009 16:12:00 -0500
+    "%m/%d/%Y %I:%M %p",  # 03/03/2009 04:12 PM
+    "%Y-%m-%d %H:%M",  # 2009-03-03 16:12
+    "%B %d, %Y",  # March 03, 2009
+]
+OCR_CONFUSIONS = {"e": "c", "l": "1", "o": "0", "i": "l", "s": "5", "m": "rn", "a": "o"}
+
+START_DATE = datetime(2001, 1, 1)
+DATE_SPAN_DAYS = 19 * 365
+
+
+class _Generator:
+    """Stan generatora: RNG i pula ostatnich dokumentów do cytowania i duplikowania."""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.recent: list[str] = []
+        self.threads: list[dict] = []
+
+    def person(self) -> tuple[str, str]:
+        first = self.rng.choice(FIRST_NAMES)
+        last = self.rng.choice(LAST_NAMES)
+        email = f"{first[0].lower()}{last.lower()}@{self.rng.choice(DOMAINS)}"
+        return f"{first} {last}", email
+
+    def date(self) -> datetime:
+        return START_DATE + timedelta(minutes=self.rng.randrange(DATE_SPAN_DAYS * 24 * 60))
+
+    def sentence(self) -> str:
+        words = self.rng.choices(WORDS, k=self.rng.randint(6, 18))
+        roll = self.rng.random()
+        if roll < 0.15:
+            words.insert(self.rng.randrange(len(words)), self.person()[0])
+        elif roll < 0.22:
+            words.insert(self.rng.randrange(len(words)), self.rng.choice(PLACES))
+        elif roll < 0.27:
+            words.append(f"{self.rng.randint(200, 999)}-{self.rng.randint(200, 999)}-{self.rng.randint(1000, 9999)}")
+        elif roll < 0.30:
+            words.append(f"http://www.{self.rng.choice(LAST_NAMES).lower()}.com/{self.rng.randint(1, 999)}")
+        text = " ".join(words)
+        return text[0].upper() + text[1:] + "."
+
+    def paragraph(self) -> str:
+        return " ".join(self.sentence() for _ in range(self.rng.randint(1, 5)))
+
+    def ocr_noise(self, text: str, rate: float = 0.02) -> str:
+        chars = list(text)
+        for i, char in enumerate(chars):
+            if char in OCR_CONFUSIONS and self.rng.random() < rate:
+                chars[i] = OCR_CONFUSIONS[char]
+        return "".join(chars)
+
+    def email(self) -> str:
+        rng = self.rng
+        thread = None
+        if self.threads and rng.random() < 0.4:
+            thread = rng.choice(self.threads)
+        if thread is None:
+            thread = {"subject": rng.choice(SUBJECTS), "people": [self.person(), self.person()], "last": None}
+            self.threads.append(thread)
+            if len(self.threads) > 500:
+                self.threads.pop(0)
+
+        sender, recipient = rng.sample(thread["people"], 2)
+        prefix = rng.choice(["Re: ", "RE: ", "Fw: ", "FW: ", "Re: Re: "]) if thread["last"] else ""
+        sent = self.date().strftime(rng.choice(DATE_FORMATS))
+        date_label = rng.choice(["Sent", "Date"])
+
+        lines = [
+            f"From: {sender[0]} <{sender[1]}>",
+            f"{date_label}: {sent}",
+            f"To: {recipient[0]} <{recipient[1]}>",
+            f"Subject: {prefix}{thread['subject']}",
+            "",
+        ]
+        if rng.random() < 0.3:
+            lines.append(f"Dear {recipient[0].split()[0]},")
+        lines.extend(self.paragraph() for _ in range(rng.randint(1, 4)))
+        lines.extend(["", rng.choice(SIGNOFFS), sender[0]])
+
+        if thread["last"]:
+            lines.extend(["", "-----Original Message-----", thread["last"]])
+        text = "\n".join(lines)
+        thread["last"] = text[:3000]
+        return text
+
+    def note(self) -> str:
+        person, email = self.person()
+        return (
+            f"Message for {person}\n{self.date().strftime('%m/%d/%Y')}\n"
+            f"Please call {self.rng.randint(200, 999)}-555-{self.rng.randint(1000, 9999)} or write to {email}.\n"
+            + self.paragraph()
+        )
+
+    def court_page(self) -> str:
+        header = "UNITED STATES DISTRICT COURT\nSOUTHERN DISTRICT OF NEW YORK\n\n"
+        body = "\n\n".join(self.paragraph() for _ in range(self.rng.randint(3, 8)))
+        return header + body
+
+    def metadata(self) -> str:
+        record = {
+            "component": self.rng.choice(["header", "page", "attachment"]),
+            "identifier": f"DOC-{self.rng.randint(0, 10**8):08d}",
+            "layout": self.rng.choice(["portrait", "landscape"]),
+            "pages": self.rng.randint(1, 40),
+        }
+        return json.dumps(record)
+
+    def document(self) -> str:
+        rng = self.rng
+        if self.recent and rng.random() < 0.06:
+            # Duplikat (np. ta sama strona zeskanowana ponownie)
+            original = rng.choice(self.recent)
+            return self.ocr_noise(original, rate=0.01) if rng.random() < 0.5 else original
+
+        roll = rng.random()
+        if roll < 0.60:
+            text = self.email()
+        elif roll < 0.75:
+            text = self.note()
+        elif roll < 0.92:
+            text = self.court_page()
+        else:
+            text = self.metadata()
+
+        if roll < 0.92 and rng.random() < 0.25:
+            text = self.ocr_noise(text)
+
+        self.recent.append(text)
+        if len(self.recent) > 1000:
+            self.recent.pop(0)
+        return text
+
+
+def generate_records(count: int, seed: int = DEFAULT_SEED) -> Iterator[dict[str, str]]:
+    """
+    Generuje deterministyczne rekordy korpusu.
+
+    Args:
+        count: Liczba dokumentów
+        seed: Ziarno generatora (ten sam seed = ten sam korpus)
+
+    Yields:
+        Słowniki {'filename': ..., 'text': ...}
+    """
+    generator = _Generator(seed)
+    for i in range(count):
+        yield {"filename": f"SYNTH-{i:07d}.txt", "text": generator.document()}
+
+
+def generate_corpus(count: int, seed: int = DEFAULT_SEED, name: Optional[str] = None):
+    """Generuje korpus gotowy do przeszukiwania przez `search_engine`."""
+    from search_engine import Corpus
+
+    return Corpus.from_records(generate_records(count, seed), name=name or f"synthetic-{count}")
+
+
+def parse_size(size: str) -> int:
+    """Zamienia etykietę rozmiaru ('20k', '200k', '1m', '2m') lub liczbę na liczbę dokumentów."""
+    if size.lower() in SIZES:
+        return SIZES[size.lower()]
+    return int(size)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.synthetic_corpus", description="Generator korpusu testowego.")
+    parser.add_argument("--size", default="20k", help="Rozmiar: 20k, 200k, 1m, 2m lub liczba dokumentów")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Ziarno generatora")
+    parser.add_argument("-o", "--output", required=True, help="Plik wynikowy .jsonl lub .parquet")
+    args = parser.parse_args(argv)
+
+    records = generate_records(parse_size(args.size), args.seed)
+    if args.output.endswith(".parquet"):
+        import pandas as pd
+
+        pd.DataFrame(list(records)).to_parquet(args.output, index=False)
+    else:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            for record in records:
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+"""
+Lekkie pomiary wydajności: timery etapów i liczniki zdarzeń.
+
+Domyślnie wyłączone (włącz zmienną środowiskową SEARCH_METRICS=1 albo `enable()`).
+Gdy pomiary są wyłączone, `timed()` zwraca współdzielony pusty context manager,
+a `increment()` kończy się po jednym sprawdzeniu flagi - narzut jest pomijalny.
+
+Przykład:
+    with timed("search.scan"):
+        ...
+    increment("translation.cache_hit")
+
+Zebrane dane można wyeksportować jako ustrukturyzowane logi (`log_metrics`)
+albo w formacie tekstowym Prometheusa (`to_prometheus`).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+_enabled = os.environ.get("SEARCH_METRICS", "").lower() in ("1", "true", "yes", "on")
+_lock = threading.Lock()
+
+# nazwa etapu -> [liczba, suma sekund, maksimum sekund, ostatni pomiar]
+_timers: dict[str, list[float]] = {}
+_counters: dict[str, int] = {}
+
+
+def enable() -> None:
+    """Włącza zbieranie pomiarów."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Wyłącza zbieranie pomiarów (już zebrane dane zostają)."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Czyści wszystkie zebrane pomiary."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def record(stage: str, seconds: float) -> None:
+    """Zapisuje pojedynczy pomiar czasu etapu."""
+    with _lock:
+        timer = _timers.get(stage)
+        if timer is None:
+            _timers[stage] = [1, seconds, seconds, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+            timer[3] = seconds
+
+
+class _Timer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        record(self.stage, time.perf_counter() - self.started)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopTimer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NOOP = _NoopTimer()
+
+
+def timed(stage: str):
+    """Context manager mierzący czas etapu (pusty, gdy pomiary są wyłączone)."""
+    if not _enabled:
+        return _NOOP
+    return _Timer(stage)
+
+
+def increment(name: str, value: int = 1) -> None:
+    """Zwiększa licznik zdarzeń."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def snapshot() -> dict:
+    """Zwraca kopię zebranych pomiarów: {'timers': {...}, 'counters': {...}}."""
+    with _lock:
+        timers = {
+            stage: {"count": int(count), "total_s": total, "max_s": maximum, "last_s": last}
+            for stage, (count, total, maximum, last) in _timers.items()
+        }
+        counters = dict(_counters)
+    return {"timers": timers, "counters": counters}
+
+
+def to_log_records() -> list[dict]:
+    """Zamienia pomiary na listę rekordów do ustrukturyzowanych logów."""
+    data = snapshot()
+    records = [{"type": "timer", "stage": stage, **values} for stage, values in sorted(data["timers"].items())]
+    records.extend(
+        {"type": "counter", "name": name, "value": value} for name, value in sorted(data["counters"].items())
+    )
+    return records
+
+
+def log_metrics(logger: Optional[logging.Logger] = None) -> None:
+    """Zapisuje pomiary do logów, jeden rekord JSON na linię."""
+    logger = logger or logging.getLogger("metrics")
+    for entry in to_log_records():
+        logger.info(json.dumps(entry, sort_keys=True))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(prefix: str = "epstein_search") -> str:
+    """Eksportuje pomiary w formacie tekstowym Prometheusa."""
+    data = snapshot()
+    lines = [
+        f"# HELP {prefix}_stage_seconds Czas wykonania etapów.",
+        f"# TYPE {prefix}_stage_seconds summary",
+    ]
+    for stage, values in sorted(data["timers"].items()):
+        label = f'stage="{_escape_label(stage)}"'
+        lines.append(f"{prefix}_stage_seconds_count{{{label}}} {values['count']}")
+        lines.append(f"{prefix}_stage_seconds_sum{{{label}}} {values['total_s']:.6f}")
+    lines.append(f"# HELP {prefix}_stage_seconds_max Najdłuższy pomiar etapu.")
+    lines.append(f"# TYPE {prefix}_stage_seconds_max gauge")
+    for stage, values in sorted(data["timers"].items()):
+        lines.append(f'{prefix}_stage_seconds_max{{stage="{_escape_label(stage)}"}} {values["max_s"]:.6f}')
+    lines.append(f"# HELP {prefix}_events_total Liczniki zdarzeń.")
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f'{prefix}_events_total{{name="{_escape_label(name)}"}} {value}')
+    return "\n".join(lines) + "\n"
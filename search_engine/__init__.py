@@ -0,0 +1,24 @@
+"""
+Silnik wyszukiwania w aktach Epsteina, niezależny od Streamlit.
+
+Udostępnia czyste API w Pythonie (ładowanie korpusu, wyszukiwanie, pobieranie
+dokumentów i metadanych) używane przez aplikację i przez wsadowe CLI.
+"""
+
+from search_engine.corpus import DEFAULT_DATASET, DEFAULT_SPLIT, Corpus, load_corpus
+from search_engine.docstore import DocumentStore
+from search_engine.search import SearchHit, SearchResult, extract_metadata, get_docs, match_doc_ids, search
+
+__all__ = [
+    "DEFAULT_DATASET",
+    "DEFAULT_SPLIT",
+    "Corpus",
+    "DocumentStore",
+    "SearchHit",
+    "SearchResult",
+    "extract_metadata",
+    "get_docs",
+    "load_corpus",
+    "match_doc_ids",
+    "search",
+]
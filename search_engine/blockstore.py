@@ -0,0 +1,318 @@
+"""
+Teksty skompresowane blokami z dostępem swobodnym do pojedynczych dokumentów.
+
+Kolejne dokumenty są grupowane w bloki o rozmiarze około `block_size` bajtów (przed
+kompresją) i każdy blok jest kompresowany osobno. Nieskompresowany indeks bloków - pierwszy
+dokument i położenie każdego bloku oraz offsety dokumentów - pozwala odczytać dokument,
+rozpakowując tylko jego blok. Ostatnio używane bloki są trzymane rozpakowane (LRU), więc
+strona wyników (kolejne id dokumentów) zwykle rozpakowuje kilka bloków.
+
+Rozmiar bloku to kompromis pamięć/opóźnienie: większe bloki kompresują się lepiej, ale
+odczyt jednego dokumentu rozpakowuje więcej danych. Skan całego korpusu (wyszukiwanie
+dosłowne bez cache) rozpakowuje wszystkie bloki - ścieżki z indeksem (fuzzy, encje, regex
+z filtrem trigramów) czytają tylko dokumenty kandydatów.
+
+Kodeki: "zlib" i "lzma" z biblioteki standardowej oraz "zstd" (moduł `compression.zstd`
+z Pythona 3.14 albo pakiet `zstandard`), domyślny gdy jest dostępny.
+"""
+
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+import numpy as np
+
+from search_engine.docstore import DocumentStore
+
+CODECS = ("zstd", "zlib", "lzma")
+DEFAULT_BLOCK_SIZE = 16 * 1024
+# Liczba rozpakowanych bloków trzymanych w pamięci (LRU)
+DEFAULT_CACHED_BLOCKS = 32
+
+ZLIB_LEVEL = 6
+LZMA_PRESET = 6
+ZSTD_LEVEL = 3
+
+
+def _zstd_codec() -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    try:
+        from compression import zstd  # Python 3.14+
+
+        return (lambda data: zstd.compress(data, level=ZSTD_LEVEL)), zstd.decompress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ValueError("Kodek 'zstd' wymaga Pythona 3.14 albo pakietu zstandard (pip install zstandard)") from e
+
+    def compress(data: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+    def decompress(data: bytes) -> bytes:
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    return compress, decompress
+
+
+def get_codec(name: str) -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """
+    Funkcje (kompresja, dekompresja) kodeka.
+
+    Raises:
+        ValueError: Nieznany kodek albo brak biblioteki zstd
+    """
+    if name == "zlib":
+        import zlib
+
+        return (lambda data: zlib.compress(data, ZLIB_LEVEL)), zlib.decompress
+    if name == "lzma":
+        import lzma
+
+        return (lambda data: lzma.compress(data, preset=LZMA_PRESET)), lzma.decompress
+    if name == "zstd":
+        return _zstd_codec()
+    raise ValueError(f"Nieznany kodek kompresji: {name!r} (dostępne: {', '.join(CODECS)})")
+
+
+def available_codecs() -> list[str]:
+    """Kodeki możliwe do użycia w tym środowisku."""
+    available = []
+    for name in CODECS:
+        try:
+            get_codec(name)
+        except ValueError:
+            continue
+        available.append(name)
+    return available
+
+
+def default_codec() -> str:
+    """ "zstd", gdy jest dostępny (szybka dekompresja), w przeciwnym razie "zlib"."""
+    return "zstd" if "zstd" in available_codecs() else "zlib"
+
+
+class CompressedDocumentStore:
+    """
+    Teksty dokumentów w skompresowanych blokach; interfejs jak `DocumentStore`.
+
+    Atrybuty:
+        codec: Nazwa kodeka bloków
+        blocks: Skompresowane bloki, jeden za drugim
+        block_offsets: Położenie bloków w `blocks` (int64, liczba bloków + 1)
+        block_starts: Pierwszy dokument każdego bloku (int64, liczba bloków + 1; ostatni = liczba dokumentów)
+        offsets: Położenie dokumentów w rozpakowanym strumieniu tekstów (int64, liczba dokumentów + 1)
+    """
+
+    __slots__ = (
+        "codec",
+        "blocks",
+        "block_offsets",
+        "block_starts",
+        "offsets",
+        "_decompress",
+        "_starts",
+        "_cache",
+        "_cache_size",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        codec: str,
+        blocks: Union[bytes, bytearray],
+        block_offsets: np.ndarray,
+        block_starts: np.ndarray,
+        offsets: np.ndarray,
+        cached_blocks: int = DEFAULT_CACHED_BLOCKS,
+    ):
+        self.codec = codec
+        self.blocks = blocks
+        self.block_offsets = np.asarray(block_offsets, dtype=np.int64)
+        self.block_starts = np.asarray(block_starts, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        _compress, self._decompress = get_codec(codec)
+        self._starts = memoryview(self.block_starts)
+        self._cache: OrderedDict[int, DocumentStore] = OrderedDict()
+        self._cache_size = cached_blocks
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_stores(
+        cls, parts: Iterable[DocumentStore], block_size: int = DEFAULT_BLOCK_SIZE, codec: Optional[str] = None
+    ) -> "CompressedDocumentStore":
+        """
+        Kompresuje kolejne fragmenty korpusu (np. partie Arrow) - nieskompresowany jest tylko bieżący fragment.
+
+        Args:
+            parts: Kolejne fragmenty tekstów; dokumenty są numerowane w kolejności fragmentów
+            block_size: Docelowy rozmiar bloku przed kompresją (w bajtach); dokument nie jest dzielony
+            codec: Kodek bloków (domyślnie `default_codec()`)
+        """
+        if block_size <= 0:
+            raise ValueError("Rozmiar bloku musi być dodatni")
+        codec = codec or default_codec()
+        compress, _decompress = get_codec(codec)
+
+        # Bloki dopisywane do jednego bufora - bez listy fragmentów i kopii przy łączeniu
+        blocks = bytearray()
+        block_offsets = [0]
+        block_starts = [0]
+        offsets = [np.zeros(1, dtype=np.int64)]
+        documents = 0
+        position = 0
+        for part in parts:
+            part_offsets = part.offsets
+            base = int(part_offsets[0])
+            data = memoryview(part.data)
+            # Granice bloków: pierwszy dokument, na którym blok osiąga `block_size` bajtów
+            start = 0
+            while start < len(part):
+                target = int(part_offsets[start]) + block_size
+                stop = int(np.searchsorted(part_offsets, target, side="left"))
+                stop = min(max(stop, start + 1), len(part))
+                blocks += compress(data[int(part_offsets[start]) : int(part_offsets[stop])])
+                block_offsets.append(len(blocks))
+                block_starts.append(documents + stop)
+                start = stop
+            offsets.append(part_offsets[1:] - base + position)
+            position += int(part_offsets[-1]) - base
+            documents += len(part)
+
+        return cls(
+            codec,
+            blocks,
+            np.array(block_offsets, dtype=np.int64),
+            np.array(block_starts, dtype=np.int64),
+            np.concatenate(offsets),
+        )
+
+    @classmethod
+    def from_store(
+        cls, store: DocumentStore, block_size: int = DEFAULT_BLOCK_SIZE, codec: Optional[str] = None
+    ) -> "CompressedDocumentStore":
+        """Kompresuje gotowy magazyn tekstów."""
+        return cls.from_stores([store], block_size=block_size, codec=codec)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def block_count(self) -> int:
+        return len(self.block_starts) - 1
+
+    @property
+    def nbytes(self) -> int:
+        """Pamięć skompresowanych bloków i indeksu (bez rozpakowanych bloków w cache)."""
+        return len(self.blocks) + self.block_offsets.nbytes + self.block_starts.nbytes + self.offsets.nbytes
+
+    @property
+    def raw_nbytes(self) -> int:
+        """Rozmiar tekstów po rozpakowaniu (UTF-8)."""
+        return int(self.offsets[-1])
+
+    def __repr__(self) -> str:
+        return (
+            f"CompressedDocumentStore(documents={len(self)}, codec={self.codec!r}, blocks={self.block_count}, "
+            f"bytes={self.nbytes}, raw_bytes={self.raw_nbytes})"
+        )
+
+    def _unpack(self, block: int) -> DocumentStore:
+        compressed = self.blocks[self.block_offsets[block] : self.block_offsets[block + 1]]
+        first, last = self._starts[block], self._starts[block + 1]
+        offsets = self.offsets[first : last + 1]
+        return DocumentStore(self._decompress(compressed), offsets - offsets[0])
+
+    def block(self, block: int) -> DocumentStore:
+        """Rozpakowany blok (z cache LRU)."""
+        with self._lock:
+            cached = self._cache.get(block)
+            if cached is not None:
+                self._cache.move_to_end(block)
+                return cached
+        unpacked = self._unpack(block)
+        with self._lock:
+            self._cache[block] = unpacked
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return unpacked
+
+    def clear_cache(self) -> None:
+        """Zwalnia rozpakowane bloki."""
+        with self._lock:
+            self._cache.clear()
+
+    def block_of(self, doc_id: int) -> int:
+        """Numer bloku z dokumentem."""
+        return bisect_right(self._starts, doc_id) - 1
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[str, DocumentStore]:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("Wycinki magazynu dokumentów nie obsługują kroku")
+            return self._range(start, max(start, stop))
+        position = int(key)
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(f"Brak dokumentu o numerze {key}")
+        block = self.block_of(position)
+        return self.block(block)[position - self._starts[block]]
+
+    def _range(self, start: int, stop: int) -> DocumentStore:
+        # Kolejne dokumenty jako magazyn bez kompresji, bez dekodowania tekstów. Bloki spoza cache są
+        # rozpakowywane bez zapisu do niego - budowa indeksu porcjami nie wypiera bloków strony wyników
+        parts, offsets, size = [], [np.zeros(1, dtype=np.int64)], 0
+        if start < stop:
+            for block in range(self.block_of(start), self.block_of(stop - 1) + 1):
+                with self._lock:
+                    unpacked = self._cache.get(block)
+                if unpacked is None:
+                    unpacked = self._unpack(block)
+                first = self._starts[block]
+                low, high = max(start, first) - first, min(stop, self._starts[block + 1]) - first
+                bounds = unpacked.offsets[low : high + 1]
+                parts.append(unpacked.data[int(bounds[0]) : int(bounds[-1])])
+                offsets.append(bounds[1:] - bounds[0] + size)
+                size += int(bounds[-1] - bounds[0])
+        return DocumentStore(b"".join(parts), np.concatenate(offsets))
+
+    @property
+    def iat(self) -> "CompressedDocumentStore":
+        """Dostęp pozycyjny jak w pandas (`store.iat[i]` == `store[i]`)."""
+        return self
+
+    def _blocks(self) -> Iterator[tuple[int, DocumentStore]]:
+        # Przejście po wszystkich blokach z pominięciem cache - pełny skan nie wypiera bloków strony wyników
+        for block in range(self.block_count):
+            yield self._starts[block], self._unpack(block)
+
+    def __iter__(self) -> Iterator[str]:
+        for _first, unpacked in self._blocks():
+            yield from unpacked
+
+    def tolist(self) -> list[str]:
+        return list(self)
+
+    def take(self, doc_ids: Iterable[int]) -> list[str]:
+        """Teksty wybranych dokumentów, w podanej kolejności (każdy potrzebny blok rozpakowany raz)."""
+        unpacked: dict[int, DocumentStore] = {}
+        texts = []
+        for doc_id in doc_ids:
+            block = self.block_of(doc_id)
+            store = unpacked.get(block)
+            if store is None:
+                store = unpacked[block] = self.block(block)
+            texts.append(store[doc_id - self._starts[block]])
+        return texts
+
+    def byte_lengths(self) -> np.ndarray:
+        """Długości dokumentów w bajtach UTF-8."""
+        return np.diff(self.offsets)
+
+    def contains(self, query: str, case_sensitive: bool = False) -> np.ndarray:
+        """Dokumenty zawierające podciąg (jak `DocumentStore.contains`), blok po bloku."""
+        found = [unpacked.contains(query, case_sensitive) + first for first, unpacked in self._blocks()]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
@@ -0,0 +1,194 @@
+"""
+Wsadowe wyszukiwanie z linii poleceń.
+
+Czyta plik z zapytaniami (jedno na linię) i zapisuje wyniki jako JSONL.
+Zapytania są rozdzielane między procesy robocze - domyślnie tyle, ile jest rdzeni.
+
+Przykład:
+    python -m search_engine queries.txt -o results.jsonl --workers 8
+    python -m search_engine queries.txt --filter content_type=email --filter domain=gmail.com --facets
+    python -m search_engine queries.txt --date-from 2009-01-01 --date-to 2009-12-31 --sort date_desc --timeline
+    python -m search_engine topics.txt --mode semantic
+    python -m search_engine patterns.txt --mode regex
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+
+import numpy as np
+
+from search_engine.blockstore import CODECS, DEFAULT_BLOCK_SIZE
+from search_engine.corpus import DEFAULT_DATASET, DEFAULT_SPLIT, Corpus, load_corpus
+from search_engine.dedup import get_duplicate_index
+from search_engine.facets import FACET_FIELDS, get_facet_index
+from search_engine.fuzzy import get_deletion_index
+from search_engine.regex import compile_pattern, get_trigram_index
+from search_engine.search import DEFAULT_LIMIT, SEARCH_MODES, SORT_ORDERS, search
+from search_engine.semantic import get_semantic_index
+
+# Korpus procesu roboczego - przy starcie "fork" dziedziczony po rodzicu bez kopiowania
+_WORKER_CORPUS: Optional[Corpus] = None
+
+
+def _init_worker(source: str, split: str, compression: Optional[str], block_size: int) -> None:
+    global _WORKER_CORPUS
+    if _WORKER_CORPUS is None:
+        _WORKER_CORPUS = load_corpus(source, split=split, compression=compression, block_size=block_size)
+
+
+def _run_query(task: tuple[str, bool, dict[str, Any]]) -> dict:
+    query, translate, options = task
+    search_query = query
+    if translate:
+        from translation_utils import translate_query_to_english
+
+        search_query = translate_query_to_english(query)
+
+    result = search(_WORKER_CORPUS, search_query, **options)
+    record = result.to_dict()
+    record["original_query"] = query
+    return record
+
+
+def read_queries(path: str) -> list[str]:
+    """Czyta zapytania z pliku (lub stdin dla '-'), pomijając puste linie."""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding="utf-8") as handle:
+            lines = handle.read().splitlines()
+    return [line.strip() for line in lines if line.strip()]
+
+
+def parse_filters(values: Optional[list[str]]) -> dict[str, list[str]]:
+    """Zamienia argumenty `pole=wartość` na słownik filtrów fasetowych (wartości tego samego pola łączone przez OR)."""
+    filters: dict[str, list[str]] = {}
+    for item in values or []:
+        field, separator, value = item.partition("=")
+        field = field.strip()
+        if not separator or field not in FACET_FIELDS or not value.strip():
+            raise ValueError(f"Niepoprawny filtr {item!r} - oczekiwano pole=wartość, pole: {', '.join(FACET_FIELDS)}")
+        filters.setdefault(field, []).append(value.strip())
+    return filters
+
+
+def _iso_date(value: str) -> str:
+    try:
+        np.datetime64(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"niepoprawna data ISO: {value!r}") from e
+    return value
+
+
+def _write_records(output, records) -> None:
+    for record in records:
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="search_engine", description="Wsadowe wyszukiwanie w korpusie maili.")
+    parser.add_argument("queries", help="Plik z zapytaniami, jedno na linię ('-' = stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Plik wynikowy JSONL ('-' = stdout)")
+    parser.add_argument("--source", default=DEFAULT_DATASET, help="Zbiór Hugging Face lub plik .parquet/.jsonl")
+    parser.add_argument("--split", default=DEFAULT_SPLIT, help="Podział zbioru danych Hugging Face")
+    parser.add_argument("--compress", choices=CODECS, help="Kompresuj teksty blokami (mniej pamięci)")
+    parser.add_argument(
+        "--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="Rozmiar bloku tekstów przed kompresją (bajty)"
+    )
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Maksymalna liczba wyników na zapytanie")
+    parser.add_argument("--case-sensitive", action="store_true", help="Rozróżniaj wielkość liter")
+    parser.add_argument("--mode", choices=SEARCH_MODES, default="exact", help="Tryb wyszukiwania")
+    parser.add_argument("--max-edits", type=int, default=1, help="Maksymalna odległość edycyjna (tryb fuzzy)")
+    parser.add_argument(
+        "--filter",
+        action="append",
+        metavar="POLE=WARTOŚĆ",
+        help=f"Filtr fasetowy (wielokrotnie), pole: {', '.join(FACET_FIELDS)}",
+    )
+    parser.add_argument("--facets", action="store_true", help="Dołącz liczniki faset do wyników")
+    parser.add_argument("--date-from", type=_iso_date, help="Początek zakresu dat (ISO, włącznie)")
+    parser.add_argument("--date-to", type=_iso_date, help="Koniec zakresu dat (ISO, włącznie)")
+    parser.add_argument("--sort", choices=SORT_ORDERS, default="type", help="Kolejność wyników")
+    parser.add_argument("--timeline", action="store_true", help="Dołącz histogram miesięczny trafień")
+    parser.add_argument("--collapse-duplicates", action="store_true", help="Jeden wynik na klaster prawie-duplikatów")
+    parser.add_argument("--suggest", action="store_true", help="Dołącz poprawki pisowni dla zapytań bez wyników")
+    parser.add_argument("--translate", action="store_true", help="Tłumacz polskie zapytania na angielski")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Liczba procesów roboczych")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    global _WORKER_CORPUS
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        filters = parse_filters(args.filter)
+    except ValueError as e:
+        parser.error(str(e))
+    queries = read_queries(args.queries)
+    if args.mode == "regex":
+        for query in queries:
+            try:
+                compile_pattern(query, args.case_sensitive)
+            except ValueError as e:
+                parser.error(f"{query!r}: {e}")
+    options = {
+        "case_sensitive": args.case_sensitive,
+        "limit": args.limit,
+        "mode": args.mode,
+        "max_edits": args.max_edits,
+        "filters": filters,
+        "facets": args.facets,
+        "date_from": args.date_from,
+        "date_to": args.date_to,
+        "sort": args.sort,
+        "timeline": args.timeline,
+        "collapse_duplicates": args.collapse_duplicates,
+        "suggest": args.suggest,
+    }
+    # Wzorce regex nie są tłumaczone
+    translate = args.translate and args.mode != "regex"
+    tasks = [(query, translate, options) for query in queries]
+
+    _WORKER_CORPUS = load_corpus(args.source, split=args.split, compression=args.compress, block_size=args.block_size)
+    header_options = args.facets or args.date_from or args.date_to or args.sort != "type" or args.timeline
+    if filters or header_options or args.mode == "entity":
+        # Zbudowane w rodzicu indeksy trafiają do procesów potomnych razem z korpusem
+        get_facet_index(_WORKER_CORPUS)
+    if args.collapse_duplicates:
+        get_duplicate_index(_WORKER_CORPUS)
+    if args.mode == "semantic":
+        get_semantic_index(_WORKER_CORPUS)
+    if args.mode == "regex":
+        get_trigram_index(_WORKER_CORPUS)
+    if args.suggest:
+        get_deletion_index(_WORKER_CORPUS)
+    workers = max(1, min(args.workers, len(tasks)))
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        if workers == 1:
+            _write_records(output, map(_run_query, tasks))
+        else:
+            # "fork" współdzieli załadowany korpus z procesami potomnymi (copy-on-write)
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            chunksize = max(1, len(tasks) // (workers * 4))
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(args.source, args.split, args.compress, args.block_size),
+            ) as executor:
+                _write_records(output, executor.map(_run_query, tasks, chunksize=chunksize))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return 0
@@ -0,0 +1,386 @@
+"""
+Wyszukiwanie rozproszone: koordynator i workery shardów (scatter-gather).
+
+Korpus jest dzielony na N ciągłych zakresów dokumentów (`load_shard`). Każdy worker to zwykły
+`SearchServer` uruchomiony z `--shard i/N`, z indeksami tylko dla swojego zakresu, dostępny
+przez HTTP albo gniazdo lokalne. Koordynator wysyła zapytanie do wszystkich workerów naraz,
+czeka na każdy co najwyżej `timeout` sekund i scala ich top-k (`merge_results`) w kolejności
+takiej jak dla całego korpusu w jednym procesie. Liczby trafień, osie czasu i liczniki faset
+są sumowane (fasety - z najczęstszych wartości każdego shardu, więc rzadkie wartości mogą być
+niedoliczone). Shard, który nie odpowiedział w czasie albo zwrócił błąd, jest pomijany
+i wymieniony w "failed_shards" (odpowiedź ma "partial": true).
+
+Id dokumentów w odpowiedziach koordynatora są globalne: id w shardzie + początek shardu
+(z /health workera), a /docs/<id> i /metadata/<id> trafiają do workera z tym dokumentem.
+
+Uruchomienie:
+    # workery uruchamiane lokalnie przez koordynator
+    python -m search_engine.cluster --source corpus.parquet --spawn 4 --port 8080
+    # workery uruchomione osobno (python -m search_engine.server --shard 0/2 ...)
+    python -m search_engine.cluster --worker 127.0.0.1:8081 --worker unix:/tmp/shard1.sock --port 8080
+"""
+
+import argparse
+import asyncio
+import logging
+import subprocess
+import sys
+import time
+from typing import Any, Optional
+from urllib.parse import urlencode
+
+import numpy as np
+
+from search_engine.blockstore import CODECS, DEFAULT_BLOCK_SIZE
+from search_engine.corpus import DEFAULT_DATASET, DEFAULT_SPLIT, Shard
+from search_engine.federation import merge_results
+from search_engine.protocol import Request, fetch_json
+from search_engine.search import DEFAULT_LIMIT, SORT_ORDERS, SearchHit, SearchResult
+from search_engine.server import MAX_LIMIT, HTTPError, JSONServer, _parse_bool, _parse_int
+
+logger = logging.getLogger(__name__)
+
+# Czas oczekiwania na odpowiedź jednego shardu (sekundy)
+DEFAULT_SHARD_TIMEOUT = 5.0
+# Czas oczekiwania na start lokalnych workerów (ładowanie shardu i budowa indeksów)
+SPAWN_TIMEOUT = 3600.0
+
+HIT_FIELDS = tuple(SearchHit.__dataclass_fields__)
+
+
+class ShardError(Exception):
+    """Błędna odpowiedź workera shardu."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ShardClient:
+    """
+    Worker shardu pod adresem "host:port" albo "unix:/ścieżka/gniazda".
+
+    Atrybuty:
+        shard: Zakres dokumentów workera (po pierwszym udanym `describe`)
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+        self.unix_socket: Optional[str] = None
+        self.host, self.port = "localhost", 0
+        if address.startswith("unix:"):
+            self.unix_socket = address[len("unix:") :]
+        else:
+            host, separator, port = address.rpartition(":")
+            if not separator or not port.isdigit():
+                raise ValueError(f"Niepoprawny adres workera: {address!r} (oczekiwano host:port albo unix:/ścieżka)")
+            self.host, self.port = host or "127.0.0.1", int(port)
+        self.shard: Optional[Shard] = None
+
+    def __repr__(self) -> str:
+        return f"ShardClient({self.address!r})"
+
+    async def get(self, path: str, timeout: float) -> Any:
+        """
+        Raises:
+            ShardError: Odpowiedź inna niż 200
+            TimeoutError, OSError: Brak odpowiedzi w czasie, brak połączenia
+        """
+        status, payload = await fetch_json(
+            self.host, self.port, "GET", path, timeout=timeout, unix_socket=self.unix_socket
+        )
+        if status != 200:
+            raise ShardError(status, (payload or {}).get("error", f"HTTP {status}"))
+        return payload
+
+    async def describe(self, timeout: float) -> Shard:
+        """Zakres dokumentów workera z /health (serwer bez shardu obsługuje cały korpus)."""
+        self.shard = _shard_from_health(await self.get("/health", timeout))
+        return self.shard
+
+
+def _shard_from_health(health: dict) -> Shard:
+    return Shard(**health["shard"]) if health.get("shard") else Shard(0, 1, 0, health["documents"])
+
+
+def _describe_error(error: BaseException, timeout: float) -> str:
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return f"Brak odpowiedzi w ciągu {timeout:g} s"
+    if isinstance(error, OSError):
+        return f"Brak połączenia: {error}"
+    return str(error)
+
+
+class Coordinator(JSONServer):
+    """
+    Serwer przyjmujący zapytania jak `SearchServer` i rozsyłający je do workerów shardów.
+
+    Endpointy: GET /health, GET /search (parametry jak w `SearchServer`), GET /docs/<id>, GET /metadata/<id>.
+
+    Args:
+        workers: Adresy workerów ("host:port" albo "unix:/ścieżka")
+        host: Adres nasłuchiwania
+        port: Port (0 = wybierz wolny port)
+        timeout: Maksymalny czas oczekiwania na jeden shard (sekundy)
+        unix_socket: Ścieżka gniazda lokalnego (zamiast adresu i portu)
+    """
+
+    description = "Koordynator shardów"
+
+    def __init__(
+        self,
+        workers: list[str],
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        timeout: float = DEFAULT_SHARD_TIMEOUT,
+        unix_socket: Optional[str] = None,
+    ):
+        super().__init__(host, port, unix_socket)
+        if not workers:
+            raise ValueError("Koordynator wymaga co najmniej jednego workera")
+        self.shards = [ShardClient(address) for address in workers]
+        self.timeout = timeout
+        self._routes = {
+            ("GET", "health"): self._handle_health,
+            ("GET", "search"): self._handle_search,
+            ("GET", "docs"): self._handle_doc,
+            ("GET", "metadata"): self._handle_metadata,
+        }
+
+    async def _gather(self, clients: list[ShardClient], path: str) -> dict[str, Any]:
+        # Odpowiedź albo wyjątek każdego shardu; wolny shard nie opóźnia wyniku ponad `timeout`
+        responses = await asyncio.gather(
+            *(client.get(path, self.timeout) for client in clients), return_exceptions=True
+        )
+        return {client.address: response for client, response in zip(clients, responses)}
+
+    async def _describe_missing(self) -> None:
+        missing = [client for client in self.shards if client.shard is None]
+        if missing:
+            await asyncio.gather(*(client.describe(self.timeout) for client in missing), return_exceptions=True)
+
+    async def _handle_health(self, request: Request, args: list[str]) -> dict:
+        responses = await self._gather(self.shards, "/health")
+        shards = []
+        for client in self.shards:
+            response = responses[client.address]
+            if isinstance(response, BaseException):
+                shards.append(
+                    {"address": client.address, "status": "error", "error": _describe_error(response, self.timeout)}
+                )
+                continue
+            client.shard = _shard_from_health(response)
+            shards.append(
+                {
+                    "address": client.address,
+                    "status": "ok",
+                    "documents": response["documents"],
+                    **client.shard.to_dict(),
+                }
+            )
+        healthy = [shard for shard in shards if shard["status"] == "ok"]
+        return {
+            "status": "ok" if len(healthy) == len(shards) else "degraded",
+            "documents": sum(shard["documents"] for shard in healthy),
+            "shards": shards,
+        }
+
+    async def _handle_search(self, request: Request, args: list[str]) -> dict:
+        query = request.query.get("q", "").strip()
+        if not query:
+            raise HTTPError(400, "Brak parametru 'q'")
+        limit = _parse_int(request.query.get("limit"), "limit", DEFAULT_LIMIT, maximum=MAX_LIMIT)
+        sort = request.query.get("sort") or "type"
+        if sort not in SORT_ORDERS:
+            raise HTTPError(400, f"Parametr 'sort' musi mieć wartość: {', '.join(SORT_ORDERS)}")
+
+        search_query = query
+        params = {name: value for name, value in request.query.items() if name != "translate"}
+        # Zapytanie tłumaczone raz, w koordynatorze - nie w każdym shardzie (wzorzec regex bez tłumaczenia)
+        if request.query.get("mode") != "regex" and _parse_bool(request.query.get("translate")):
+            import translation_utils
+
+            loop = asyncio.get_running_loop()
+            search_query = await loop.run_in_executor(None, translation_utils.translate_query_to_english, query)
+        params["q"] = search_query
+
+        await self._describe_missing()
+        clients = [client for client in self.shards if client.shard is not None]
+        responses = await self._gather(clients, "/search?" + urlencode(params))
+
+        results: dict[str, SearchResult] = {}
+        dates: dict[tuple[str, int], np.datetime64] = {}
+        errors = {client.address: "Brak odpowiedzi na /health" for client in self.shards if client.shard is None}
+        for address, response in responses.items():
+            if isinstance(response, ShardError) and response.status == 400:
+                # Niepoprawne zapytanie (wzorzec, filtr, tryb) - ten sam błąd w każdym shardzie
+                raise HTTPError(400, str(response))
+            if isinstance(response, BaseException):
+                logger.warning("Shard %s pominięty: %s", address, response)
+                errors[address] = _describe_error(response, self.timeout)
+                continue
+            hits = [SearchHit(**{name: hit[name] for name in HIT_FIELDS if name in hit}) for hit in response["hits"]]
+            for hit in response["hits"]:
+                dates[address, hit["doc_id"]] = np.datetime64(hit.get("date") or "NaT")
+            fields = {name: response[name] for name in SearchResult.__dataclass_fields__ if name in response}
+            results[address] = SearchResult(**{**fields, "hits": hits})
+        if not results:
+            raise HTTPError(503, "Żaden shard nie odpowiedział: " + "; ".join(f"{a}: {e}" for a, e in errors.items()))
+
+        merged = merge_results(
+            results,
+            search_query,
+            limit,
+            sort,
+            lambda address, hit: dates[address, hit.doc_id],
+            errors,
+            # Podobieństwa z osobnych modeli shardów nie są porównywalne - tryb semantyczny naprzemiennie
+            interleave=request.query.get("mode") == "semantic",
+        )
+        offsets = {client.address: client.shard.offset for client in clients}
+        payload = merged.to_dict()
+        for hit in payload["hits"]:
+            hit["shard"] = hit.pop("corpus")
+            hit["doc_id"] += offsets[hit["shard"]]
+        payload["shards"] = payload.pop("corpora")
+        payload["failed_shards"] = payload.pop("errors")
+        payload["partial"] = bool(errors)
+        payload["original_query"] = query
+        return payload
+
+    async def _route_doc(self, args: list[str]) -> tuple[ShardClient, int]:
+        if len(args) != 1:
+            raise HTTPError(404, "Nie znaleziono")
+        doc_id = _parse_int(args[0], "id", default=-1)
+        await self._describe_missing()
+        for client in self.shards:
+            if client.shard is not None and client.shard.offset <= doc_id < client.shard.stop:
+                return client, doc_id
+        if any(client.shard is None for client in self.shards):
+            raise HTTPError(503, f"Shard z dokumentem {doc_id} jest niedostępny")
+        raise HTTPError(404, f"Brak dokumentu {doc_id}")
+
+    async def _forward_doc(self, endpoint: str, args: list[str]) -> dict:
+        client, doc_id = await self._route_doc(args)
+        try:
+            payload = await client.get(f"/{endpoint}/{doc_id - client.shard.offset}", self.timeout)
+        except ShardError as e:
+            raise HTTPError(e.status, str(e)) from e
+        except (TimeoutError, asyncio.TimeoutError, OSError) as e:
+            raise HTTPError(504, f"Shard {client.address}: {_describe_error(e, self.timeout)}") from e
+        payload["doc_id"] = doc_id
+        return payload
+
+    async def _handle_doc(self, request: Request, args: list[str]) -> dict:
+        return await self._forward_doc("docs", args)
+
+    async def _handle_metadata(self, request: Request, args: list[str]) -> dict:
+        return await self._forward_doc("metadata", args)
+
+
+def spawn_workers(
+    source: str,
+    count: int,
+    base_port: int,
+    split: str = DEFAULT_SPLIT,
+    compression: Optional[str] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    host: str = "127.0.0.1",
+) -> list[subprocess.Popen]:
+    """Uruchamia `count` lokalnych workerów (`search_engine.server --shard i/count`) na kolejnych portach."""
+    processes = []
+    for index in range(count):
+        command = [
+            sys.executable,
+            "-m",
+            "search_engine.server",
+            "--source",
+            source,
+            "--split",
+            split,
+            "--shard",
+            f"{index}/{count}",
+            "--host",
+            host,
+            "--port",
+            str(base_port + index),
+            "--block-size",
+            str(block_size),
+        ]
+        if compression:
+            command += ["--compress", compression]
+        processes.append(subprocess.Popen(command))
+    return processes
+
+
+async def wait_for_workers(
+    clients: list[ShardClient], processes: list[subprocess.Popen], timeout: float = SPAWN_TIMEOUT
+) -> None:
+    """
+    Czeka, aż każdy worker odpowie na /health (ładowanie shardu i indeksów może trwać minuty).
+
+    Raises:
+        RuntimeError: Proces workera zakończył się albo minął `timeout`
+    """
+    deadline = time.monotonic() + timeout
+    pending = list(zip(clients, processes))
+    while pending:
+        for client, process in list(pending):
+            if process.poll() is not None:
+                raise RuntimeError(f"Worker {client.address} zakończył się kodem {process.returncode}")
+            try:
+                await client.describe(timeout=1.0)
+            except (ShardError, TimeoutError, asyncio.TimeoutError, OSError):
+                continue
+            pending.remove((client, process))
+            logger.info("Worker %s gotowy (%s)", client.address, client.shard)
+        if pending:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Workery nie wystartowały w wyznaczonym czasie")
+            await asyncio.sleep(0.5)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="search_engine.cluster", description="Koordynator shardów wyszukiwarki.")
+    parser.add_argument("--worker", action="append", default=[], help="Adres workera host:port albo unix:/ścieżka")
+    parser.add_argument("--spawn", type=int, default=0, help="Uruchom lokalnie tyle workerów (shardów) korpusu")
+    parser.add_argument("--source", default=DEFAULT_DATASET, help="Zbiór Hugging Face lub plik .parquet/.jsonl")
+    parser.add_argument("--split", default=DEFAULT_SPLIT, help="Podział zbioru danych Hugging Face")
+    parser.add_argument("--compress", choices=CODECS, help="Kompresuj teksty w workerach blokami")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="Rozmiar bloku tekstów (bajty)")
+    parser.add_argument("--worker-port", type=int, default=8081, help="Port pierwszego lokalnego workera")
+    parser.add_argument("--host", default="127.0.0.1", help="Adres nasłuchiwania koordynatora")
+    parser.add_argument("--port", type=int, default=8080, help="Port koordynatora")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_SHARD_TIMEOUT, help="Limit czasu shardu (sekundy)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.worker and args.spawn <= 0:
+        parser.error("Podaj adresy workerów (--worker) albo liczbę lokalnych workerów (--spawn)")
+
+    processes = []
+    workers = list(args.worker)
+    if args.spawn > 0:
+        processes = spawn_workers(args.source, args.spawn, args.worker_port, args.split, args.compress, args.block_size)
+        workers += [f"127.0.0.1:{args.worker_port + index}" for index in range(args.spawn)]
+    coordinator = Coordinator(workers, host=args.host, port=args.port, timeout=args.timeout)
+
+    async def run() -> None:
+        if processes:
+            await wait_for_workers(coordinator.shards[len(args.worker) :], processes)
+        await coordinator.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,211 @@
+"""
+Graf współwystępowania encji jako rzadka macierz dokument × encja.
+
+Macierz `X` (CSR, wartości 0/1) ma wiersz na dokument i kolumnę na encję indeksu encji.
+Liczba dokumentów, w których encja `e` występuje razem z każdą inną encją, to
+`Xᵀ X[:, e]` - iloczyn rzadkiej macierzy i wektora: wektor dokumentów encji (wiersz
+macierzy transponowanej) razy `X` dotyka tylko wierszy tych dokumentów, więc czas
+zależy od liczby wzmianek w dokumentach encji, a nie od wielkości korpusu.
+
+Bazowy blok macierzy korzysta bez kopiowania z tablic CSR indeksu encji
+(`doc_offsets`/`doc_codes` oraz `postings_offsets`/`postings` dla transpozycji).
+Dokumenty dopisane później (`add_documents`) trafiają do małego bloku przyrostowego,
+scalanego z bazowym, gdy urośnie powyżej `COMPACT_RATIO` jego rozmiaru.
+"""
+
+import threading
+from collections import Counter
+from typing import Iterable, Optional
+
+import numpy as np
+from scipy import sparse
+
+from instrumentation import timed
+from search_engine.entities import ENTITY_TYPES, EntityIndex, extract_entities, get_entity_index
+from translation_utils import extract_email_metadata
+
+DEFAULT_RELATED = 20
+# Blok przyrostowy jest scalany z bazowym, gdy ma więcej dokumentów niż ten ułamek bazy (ale nie mniej niż minimum)
+COMPACT_RATIO = 0.1
+MIN_COMPACT_DOCUMENTS = 1000
+
+
+def _block(offsets: np.ndarray, codes: np.ndarray, columns: int) -> tuple[sparse.csr_matrix, sparse.csr_matrix]:
+    """Macierz dokument × encja z tablic CSR i jej transpozycja (encja × dokument)."""
+    matrix = sparse.csr_matrix((np.ones(len(codes), dtype=np.int32), codes, offsets), shape=(len(offsets) - 1, columns))
+    return matrix, matrix.T.tocsr()
+
+
+class CooccurrenceGraph:
+    """
+    Współwystępowanie encji w dokumentach.
+
+    Atrybuty:
+        entities: Indeks encji, z którego zbudowano bazowy blok macierzy
+        blocks: Kolejne bloki wierszy (macierz dokument × encja, transpozycja), od dokumentu 0
+    """
+
+    def __init__(self, entities: EntityIndex):
+        self.entities = entities
+        transposed = sparse.csr_matrix(
+            (np.ones(len(entities.postings), dtype=np.int32), entities.postings, entities.postings_offsets),
+            shape=(len(entities), len(entities.doc_offsets) - 1),
+        )
+        matrix = sparse.csr_matrix(
+            (transposed.data, entities.doc_codes, entities.doc_offsets), shape=transposed.shape[::-1]
+        )
+        self.blocks: tuple[tuple[sparse.csr_matrix, sparse.csr_matrix], ...] = ((matrix, transposed),)
+
+        # Encje spoza indeksu (tylko w dopisanych dokumentach) dostają kolejne kody
+        self._added_codes: dict[tuple[str, str], int] = {}
+        self._added_keys: list[tuple[str, str]] = []
+        self._pending_offsets = [0]
+        self._pending_codes: list[int] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Liczba dokumentów w grafie."""
+        return sum(matrix.shape[0] for matrix, _ in self.blocks)
+
+    @property
+    def entity_count(self) -> int:
+        return len(self.entities) + len(self._added_keys)
+
+    def code(self, entity_type: str, value: str) -> Optional[int]:
+        """Kod encji (kolumna macierzy) albo None dla nieznanej."""
+        code = self.entities.codes_by_key.get((entity_type, value))
+        return self._added_codes.get((entity_type, value)) if code is None else code
+
+    def key(self, code: int) -> tuple[str, str]:
+        """(typ, wartość) encji o podanym kodzie."""
+        if code < len(self.entities):
+            return ENTITY_TYPES[self.entities.types[code]], self.entities.values[code]
+        return self._added_keys[code - len(self.entities)]
+
+    def related(
+        self,
+        entity_type: str,
+        value: str,
+        limit: int = DEFAULT_RELATED,
+        related_type: Optional[str] = "person",
+    ) -> list[dict]:
+        """
+        Encje najczęściej występujące w tych samych dokumentach co podana.
+
+        Args:
+            entity_type: Typ encji (np. "person")
+            value: Znormalizowana wartość encji
+            limit: Maksymalna liczba powiązanych encji
+            related_type: Tylko powiązane encje tego typu (None - wszystkie typy)
+
+        Returns:
+            Lista {"type", "value", "documents"} malejąco po liczbie wspólnych dokumentów
+            (pusta dla nieznanej encji)
+        """
+        if related_type is not None and related_type not in ENTITY_TYPES:
+            raise ValueError(f"Nieznany typ encji: {related_type!r} (dostępne: {', '.join(ENTITY_TYPES)})")
+        code = self.code(entity_type, value)
+        if code is None:
+            return []
+
+        codes, counts = self._cooccurrence(code)
+        keep = codes != code
+        if related_type is not None:
+            types = np.full(len(codes), ENTITY_TYPES.index(related_type), dtype=np.int8)
+            known = codes < len(self.entities)
+            types[known] = self.entities.types[codes[known]]
+            added = np.flatnonzero(~known)
+            types[added] = [ENTITY_TYPES.index(self.key(codes[position])[0]) for position in added]
+            keep &= types == ENTITY_TYPES.index(related_type)
+        codes, counts = codes[keep], counts[keep]
+
+        if len(codes) > limit:
+            # Top-k bez pełnego sortowania; z remisów na granicy wchodzą encje o najmniejszych kodach
+            threshold = np.partition(counts, len(counts) - limit)[len(counts) - limit]
+            above = np.flatnonzero(counts > threshold)
+            tied = np.flatnonzero(counts == threshold)
+            tied = tied[np.argsort(codes[tied], kind="stable")][: limit - len(above)]
+            best = np.concatenate((above, tied))
+            codes, counts = codes[best], counts[best]
+        # Remisy po kodzie encji - kolejność stabilna między wywołaniami
+        order = np.lexsort((codes, -counts))
+        return [
+            {"type": kind, "value": found, "documents": int(counts[position])}
+            for position in order
+            for kind, found in (self.key(int(codes[position])),)
+        ]
+
+    def _cooccurrence(self, code: int) -> tuple[np.ndarray, np.ndarray]:
+        """Niezerowe wartości `Xᵀ X[:, code]`: (kody encji, liczby wspólnych dokumentów)."""
+        parts = []
+        for matrix, transposed in self.blocks:
+            if code >= transposed.shape[0]:
+                continue
+            documents = transposed[code]
+            if documents.nnz:
+                product = documents @ matrix
+                parts.append((product.indices, product.data))
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0][0].astype(np.int64), parts[0][1].astype(np.int64)
+        codes, inverse = np.unique(np.concatenate([indices for indices, _ in parts]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([data for _, data in parts]))
+        return codes.astype(np.int64), counts.astype(np.int64)
+
+    def add_documents(self, texts: Iterable[str], metadata: Optional[Iterable[dict[str, str]]] = None) -> range:
+        """
+        Dopisuje dokumenty bez przebudowy macierzy (kolejne id po ostatnim dokumencie grafu).
+
+        Args:
+            texts: Teksty nowych dokumentów
+            metadata: Metadane maili równoległe do `texts` (domyślnie wyciągane tutaj)
+
+        Returns:
+            Zakres id dopisanych dokumentów
+        """
+        texts = list(texts)
+        if metadata is None:
+            metadata = map(extract_email_metadata, texts)
+        with self._lock:
+            first = len(self)
+            for text, document_metadata in zip(texts, metadata):
+                keys = Counter((kind, value) for kind, value, _ in extract_entities(text, document_metadata))
+                for key in keys:
+                    code = self.code(*key)
+                    if code is None:
+                        code = self.entity_count
+                        self._added_codes[key] = code
+                        self._added_keys.append(key)
+                    self._pending_codes.append(code)
+                self._pending_offsets.append(len(self._pending_codes))
+            self._publish()
+        return range(first, first + len(texts))
+
+    def _publish(self) -> None:
+        """Podmienia bloki na nowe (zapytania w innych wątkach widzą stary albo nowy stan, nigdy pośredni)."""
+        columns = self.entity_count
+        pending = _block(
+            np.array(self._pending_offsets, dtype=np.int64), np.array(self._pending_codes, dtype=np.int32), columns
+        )
+        base = self.blocks[0][0]
+        if pending[0].shape[0] > max(MIN_COMPACT_DOCUMENTS, COMPACT_RATIO * base.shape[0]):
+            # Szersza macierz na tych samych tablicach - bazowy blok czytany równolegle się nie zmienia
+            widened = sparse.csr_matrix((base.data, base.indices, base.indptr), shape=(base.shape[0], columns))
+            merged = sparse.vstack([widened, pending[0]], format="csr")
+            self.blocks = ((merged, merged.T.tocsr()),)
+            self._pending_offsets = [0]
+            self._pending_codes = []
+        else:
+            self.blocks = (self.blocks[0], pending)
+
+
+def get_cooccurrence_graph(corpus) -> CooccurrenceGraph:
+    """Zwraca (budując przy pierwszym użyciu z indeksu encji) graf współwystępowania encji korpusu."""
+
+    def _build(corpus):
+        entities = get_entity_index(corpus)
+        with timed("index.cooccurrence"):
+            return CooccurrenceGraph(entities)
+
+    return corpus.get_index("cooccurrence", _build)
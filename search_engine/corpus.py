@@ -0,0 +1,393 @@
+"""
+Korpus dokumentów i jego ładowanie bez zależności od Streamlit.
+
+Obsługuje zbiory danych z Hugging Face oraz lokalne pliki Parquet i JSONL. Teksty i nazwy
+plików są trzymane w zwartych magazynach (`search_engine.docstore`), a nie w DataFrame -
+pliki Parquet i zbiory Hugging Face trafiają do nich prosto z kolumn Arrow.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Mapping, Optional, Union
+
+import pandas as pd
+
+from search_engine.blockstore import DEFAULT_BLOCK_SIZE, CompressedDocumentStore
+from search_engine.docstore import DocumentStore
+
+DEFAULT_DATASET = "tensonaut/EPSTEIN_FILES_20K"
+DEFAULT_SPLIT = "train"
+
+REQUIRED_COLUMNS = ("text", "filename")
+MISSING_FILENAME = "N/A"
+
+# Wiersze partii Arrow przy strumieniowej kompresji tekstów
+ARROW_BATCH_ROWS = 8192
+
+# Wiersze czytane naraz z pliku JSONL przy ładowaniu shardu
+JSONL_CHUNK_ROWS = 50_000
+
+# Liczba zapamiętanych wyników dopasowania (id dokumentów) dla ostatnich zapytań
+MATCH_CACHE_SIZE = 32
+
+
+class Corpus:
+    """
+    Zbiór dokumentów (tekst + nazwa pliku) przeszukiwany przez silnik.
+
+    Teksty są normalizowane raz, przy ładowaniu, i trzymane w jednym buforze UTF-8
+    (`DocumentStore`) zamiast osobnego obiektu `str` na dokument; ścieżka wyszukiwania
+    skanuje ten bufor bezpośrednio.
+
+    Indeksy (słownik, indeks rozmyty itd.) są budowane leniwie przy pierwszym
+    użyciu przez `get_index` i współdzielone przez wszystkie wątki.
+    """
+
+    def __init__(self, frame: pd.DataFrame, name: str = "corpus"):
+        _check_columns(frame.columns)
+        self._setup(
+            DocumentStore.from_texts(frame["text"], default=""),
+            DocumentStore.from_texts(frame["filename"], default=MISSING_FILENAME),
+            name,
+        )
+
+    def _setup(self, texts: Union[DocumentStore, CompressedDocumentStore], filenames: DocumentStore, name: str) -> None:
+        if len(texts) != len(filenames):
+            raise ValueError("Liczba tekstów i nazw plików korpusu musi być równa")
+        self.name = name
+        self._texts = texts
+        self._filenames = filenames
+        self._metadata_cache: dict[int, dict[str, str]] = {}
+        self._indexes: dict[str, Any] = {}
+        # Funkcje, którymi zbudowano indeksy - nowa wersja korpusu odbudowuje nimi indeksy bez aktualizacji przyrostowej
+        self._builders: dict[str, Callable[["Corpus"], Any]] = {}
+        self._index_lock = threading.RLock()
+        # (zapytanie, opcje) -> (id dokumentów, termy); zmiana filtrów nie wymaga ponownego skanu
+        self._match_cache: OrderedDict[tuple, tuple] = OrderedDict()
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping[str, str]], name: str = "corpus") -> "Corpus":
+        """Tworzy korpus z listy słowników z kluczami `text` i `filename`."""
+        return cls(pd.DataFrame(list(records), columns=list(REQUIRED_COLUMNS)), name=name)
+
+    @classmethod
+    def from_arrow(
+        cls, table, name: str = "corpus", compression: Optional[str] = None, block_size: int = DEFAULT_BLOCK_SIZE
+    ) -> "Corpus":
+        """
+        Tworzy korpus z tabeli Arrow (Parquet, Hugging Face) bez tworzenia obiektów `str` dla tekstów.
+
+        Args:
+            table: Tabela z kolumnami `text` i `filename`
+            name: Nazwa korpusu
+            compression: Kodek kompresji tekstów blokami ("zstd", "zlib", "lzma"); None - bez kompresji
+            block_size: Rozmiar bloku przed kompresją (w bajtach)
+        """
+        _check_columns(table.column_names)
+        if compression:
+            return cls.from_batches(
+                table.to_batches(max_chunksize=ARROW_BATCH_ROWS), name, compression=compression, block_size=block_size
+            )
+        return cls.from_stores(
+            DocumentStore.from_arrow(table.column("text"), default=""),
+            DocumentStore.from_arrow(table.column("filename"), default=MISSING_FILENAME),
+            name=name,
+        )
+
+    @classmethod
+    def from_batches(
+        cls, batches: Iterable, name: str = "corpus", compression: str = "zlib", block_size: int = DEFAULT_BLOCK_SIZE
+    ) -> "Corpus":
+        """
+        Tworzy korpus z tekstami skompresowanymi blokami z kolejnych partii Arrow (RecordBatch).
+
+        Nieskompresowana jest tylko bieżąca partia, więc korpus większy niż pamięć na pełne
+        teksty można wczytać wprost z pliku Parquet.
+        """
+        import pyarrow as pa
+
+        filenames = []
+
+        def text_parts():
+            for batch in batches:
+                _check_columns(batch.schema.names)
+                filenames.append(batch.column(batch.schema.get_field_index("filename")).cast(pa.large_string()))
+                yield DocumentStore.from_arrow(batch.column(batch.schema.get_field_index("text")), default="")
+
+        texts = CompressedDocumentStore.from_stores(text_parts(), block_size=block_size, codec=compression)
+        filename_store = DocumentStore.from_arrow(
+            pa.chunked_array(filenames, type=pa.large_string()), default=MISSING_FILENAME
+        )
+        return cls.from_stores(texts, filename_store, name=name)
+
+    @classmethod
+    def from_stores(
+        cls, texts: Union[DocumentStore, CompressedDocumentStore], filenames: DocumentStore, name: str = "corpus"
+    ) -> "Corpus":
+        """Tworzy korpus z gotowych magazynów (np. świeży korpus bez indeksów na tych samych buforach)."""
+        corpus = cls.__new__(cls)
+        corpus._setup(texts, filenames, name)
+        return corpus
+
+    def compressed(self, compression: Optional[str] = None, block_size: int = DEFAULT_BLOCK_SIZE) -> "Corpus":
+        """Nowy korpus (bez zbudowanych indeksów) z tekstami skompresowanymi blokami."""
+        return Corpus.from_stores(
+            CompressedDocumentStore.from_store(self._texts, block_size=block_size, codec=compression),
+            self._filenames,
+            name=self.name,
+        )
+
+    @property
+    def texts(self) -> Union[DocumentStore, CompressedDocumentStore]:
+        """Pełne teksty dokumentów (`texts[i]`, iteracja, `texts.contains(...)`)."""
+        return self._texts
+
+    @property
+    def filenames(self) -> DocumentStore:
+        """Nazwy plików dokumentów."""
+        return self._filenames
+
+    def get_index(self, name: str, builder: Callable[["Corpus"], Any]) -> Any:
+        """
+        Zwraca indeks o podanej nazwie, budując go przy pierwszym wywołaniu.
+
+        Args:
+            name: Nazwa indeksu (klucz w cache korpusu)
+            builder: Funkcja budująca indeks z korpusu
+
+        Returns:
+            Zbudowany (lub zapamiętany wcześniej) indeks
+        """
+        index = self._indexes.get(name)
+        if index is None:
+            with self._index_lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    index = builder(self)
+                    self._indexes[name] = index
+                    self._builders[name] = builder
+        return index
+
+    def built_indexes(self) -> dict[str, tuple[Any, Callable[["Corpus"], Any]]]:
+        """Zbudowane dotąd indeksy {nazwa: (indeks, funkcja budująca)} - brakujące nie są budowane."""
+        with self._index_lock:
+            return {name: (index, self._builders[name]) for name, index in self._indexes.items()}
+
+    def set_index(self, name: str, index: Any, builder: Callable[["Corpus"], Any]) -> None:
+        """Zapisuje gotowy indeks (np. przeniesiony z poprzedniej wersji korpusu) zamiast budować go przez `get_index`."""
+        with self._index_lock:
+            self._indexes[name] = index
+            self._builders[name] = builder
+
+    def cached_match(self, key: tuple, compute: Callable[[], tuple]) -> tuple:
+        """
+        Zwraca zapamiętany wynik dopasowania zapytania albo oblicza go i zapamiętuje (LRU).
+
+        Args:
+            key: Zapytanie wraz z opcjami wpływającymi na dopasowanie
+            compute: Funkcja obliczająca wynik przy braku w cache
+
+        Returns:
+            Wynik `compute` (z cache lub świeżo obliczony)
+        """
+        with self._index_lock:
+            cached = self._match_cache.get(key)
+            if cached is not None:
+                self._match_cache.move_to_end(key)
+                return cached
+        value = compute()
+        with self._index_lock:
+            self._match_cache[key] = value
+            while len(self._match_cache) > MATCH_CACHE_SIZE:
+                self._match_cache.popitem(last=False)
+        return value
+
+    def clear_match_cache(self) -> None:
+        """Czyści zapamiętane wyniki dopasowania zapytań."""
+        with self._index_lock:
+            self._match_cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __repr__(self) -> str:
+        return f"Corpus(name={self.name!r}, documents={len(self)})"
+
+
+def load_corpus(
+    source: str = DEFAULT_DATASET,
+    split: str = DEFAULT_SPLIT,
+    name: Optional[str] = None,
+    compression: Optional[str] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    revision: Optional[str] = None,
+) -> Corpus:
+    """
+    Ładuje korpus z Hugging Face lub z lokalnego pliku.
+
+    Args:
+        source: Nazwa zbioru danych na Hugging Face albo ścieżka do pliku .parquet / .jsonl
+        split: Podział zbioru danych (tylko dla Hugging Face)
+        name: Nazwa korpusu (domyślnie `source`)
+        compression: Kodek kompresji tekstów blokami ("zstd", "zlib", "lzma"); None - teksty bez kompresji
+        block_size: Rozmiar bloku przed kompresją (w bajtach) - większy oszczędza pamięć, mniejszy przyspiesza odczyt
+        revision: Rewizja zbioru Hugging Face (hash commitu, gałąź); None - najnowsza
+
+    Returns:
+        Załadowany korpus
+    """
+    path = Path(source)
+    suffix = path.suffix.lower()
+
+    name = name or source
+    if suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        if compression:
+            # Plik czytany partiami - w pamięci jest tylko bieżąca partia nieskompresowanych tekstów
+            parquet = pq.ParquetFile(path)
+            _check_columns(parquet.schema_arrow.names)
+            batches = parquet.iter_batches(batch_size=ARROW_BATCH_ROWS, columns=list(REQUIRED_COLUMNS))
+            return Corpus.from_batches(batches, name=name, compression=compression, block_size=block_size)
+        return Corpus.from_arrow(pq.read_table(path), name=name)
+    if suffix in (".jsonl", ".json"):
+        corpus = Corpus(pd.read_json(path, lines=True), name=name)
+        return corpus.compressed(compression, block_size) if compression else corpus
+
+    from datasets import load_dataset
+
+    # Tabela Arrow zbioru (mapowana z dysku) - bez konwersji całego zbioru do pandas
+    table = load_dataset(source, split=split, revision=revision).data.table
+    return Corpus.from_arrow(table, name=name, compression=compression, block_size=block_size)
+
+
+@dataclass(frozen=True)
+class Shard:
+    """
+    Ciągły zakres dokumentów pełnego korpusu obsługiwany przez jeden proces wyszukiwania.
+
+    Dokument `i` shardu to dokument `offset + i` pełnego korpusu.
+    """
+
+    index: int
+    count: int
+    offset: int = 0
+    # Liczba dokumentów pełnego korpusu
+    total: int = 0
+
+    @property
+    def stop(self) -> int:
+        """Numer (w pełnym korpusie) pierwszego dokumentu za shardem."""
+        return shard_bounds(self.total, self.index, self.count)[1]
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def shard_bounds(total: int, index: int, count: int) -> tuple[int, int]:
+    """Zakres [początek, koniec) dokumentów shardu `index` z `count` (shardy różnią się co najwyżej o 1)."""
+    return total * index // count, total * (index + 1) // count
+
+
+def load_shard(
+    source: str,
+    index: int,
+    count: int,
+    split: str = DEFAULT_SPLIT,
+    name: Optional[str] = None,
+    compression: Optional[str] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> tuple[Corpus, Shard]:
+    """
+    Ładuje tylko jeden z `count` ciągłych zakresów dokumentów korpusu (jak `load_corpus`).
+
+    Z pliku Parquet czytane są tylko grupy wierszy shardu, zbiór Hugging Face jest mapowany
+    z dysku i przycinany, a plik JSONL czytany porcjami - w pamięci jest tylko shard.
+
+    Returns:
+        (korpus shardu, położenie shardu w pełnym korpusie)
+
+    Raises:
+        ValueError: Numer shardu spoza zakresu albo brak wymaganych kolumn
+    """
+    if not 0 <= index < count:
+        raise ValueError(f"Niepoprawny shard {index}/{count}")
+    path = Path(source)
+    suffix = path.suffix.lower()
+    name = name or source
+
+    if suffix == ".parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        _check_columns(parquet.schema_arrow.names)
+        total = parquet.metadata.num_rows
+        start, stop = shard_bounds(total, index, count)
+        groups, first_row, row = [], start, 0
+        for group in range(parquet.metadata.num_row_groups):
+            rows = parquet.metadata.row_group(group).num_rows
+            if row < stop and row + rows > start:
+                if not groups:
+                    first_row = row
+                groups.append(group)
+            row += rows
+        batches = _slice_batches(
+            parquet.iter_batches(batch_size=ARROW_BATCH_ROWS, row_groups=groups, columns=list(REQUIRED_COLUMNS))
+            if groups
+            else [],
+            start - first_row,
+            stop - start,
+        )
+        if compression:
+            corpus = Corpus.from_batches(batches, name=name, compression=compression, block_size=block_size)
+        else:
+            schema = pa.schema([parquet.schema_arrow.field(column) for column in REQUIRED_COLUMNS])
+            corpus = Corpus.from_arrow(pa.Table.from_batches(list(batches), schema=schema), name=name)
+    elif suffix in (".jsonl", ".json"):
+        # Liczba wierszy nie jest znana z góry - plik czytany porcjami, zostają tylko wiersze shardu.
+        # Granice shardu liczone z pełnej liczby wierszy, więc najpierw jest ona ustalana jednym przejściem.
+        with open(path, "rb") as handle:
+            total = sum(1 for line in handle if line.strip())
+        start, stop = shard_bounds(total, index, count)
+        frames, row = [], 0
+        for frame in pd.read_json(path, lines=True, chunksize=JSONL_CHUNK_ROWS):
+            if row < stop and row + len(frame) > start:
+                frames.append(frame.iloc[max(start - row, 0) : stop - row])
+            row += len(frame)
+        frame = pd.concat(frames) if frames else pd.DataFrame(columns=list(REQUIRED_COLUMNS))
+        corpus = Corpus(frame, name=name)
+        if compression:
+            corpus = corpus.compressed(compression, block_size)
+    else:
+        from datasets import load_dataset
+
+        table = load_dataset(source, split=split).data.table
+        total = table.num_rows
+        start, stop = shard_bounds(total, index, count)
+        corpus = Corpus.from_arrow(
+            table.slice(start, stop - start), name=name, compression=compression, block_size=block_size
+        )
+    return corpus, Shard(index=index, count=count, offset=start, total=total)
+
+
+def _slice_batches(batches: Iterable, skip: int, length: int) -> Iterable:
+    # Partie Arrow przycięte do `length` wierszy po pominięciu pierwszych `skip`
+    for batch in batches:
+        if length <= 0:
+            return
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+        part = batch.slice(skip, length)
+        skip = 0
+        length -= part.num_rows
+        yield part
+
+
+def _check_columns(columns: Iterable[str]) -> None:
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Brak wymaganych kolumn w korpusie: {', '.join(missing)}")
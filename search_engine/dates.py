@@ -0,0 +1,257 @@
+"""
+Znormalizowane daty dokumentów: filtrowanie po zakresie i oś czasu.
+
+Daty z nagłówków maili ("Sent: Tuesday, March 3, 2009 4:12 PM", "Date: 03/03/2009 ...")
+są parsowane przy ładowaniu do kolumny `datetime64`. Dokumenty bez daty mają NaT,
+a te, których daty nie udało się odczytać, dodatkowo flagę `parse_failed`.
+
+Posortowana permutacja (`order`) pozwala znaleźć dokumenty z zakresu dat
+wyszukiwaniem binarnym w O(log n + k). Oś czasu (histogram miesięczny)
+to jeden `np.bincount` po kodach miesięcy dokumentów z wyniku.
+"""
+
+import re
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+from search_engine.updates import CorpusChanges
+
+# Formaty nagłówków w kolejności prób (strefa czasowa jest wcześniej odcinana)
+DATE_FORMATS = (
+    "%A, %B %d, %Y %I:%M %p",
+    "%a, %d %b %Y %H:%M:%S",
+    "%d %b %Y %H:%M:%S",
+    "%m/%d/%Y %I:%M %p",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%B %d, %Y %I:%M %p",
+    "%B %d, %Y",
+    "%A, %B %d, %Y",
+    "%d %B %Y",
+)
+
+# Daty spoza tego zakresu to prawie zawsze błędy OCR ("2O09", "1009")
+MIN_YEAR = 1950
+MAX_YEAR = 2035
+
+TIMELINE_CACHE_SIZE = 64
+
+# Kolejność prób formatów - ostatnio pasujący format idzie na początek (korpus ma ich zwykle kilka)
+_format_order = list(DATE_FORMATS)
+
+_TIMEZONE_RE = re.compile(r"\s*(?:[+-]\d{4}|\((?:[A-Z]{2,5})\)|\b(?:[A-Z]{2,4}T|GMT|UTC|UT|Z))\s*$")
+_ORDINAL_RE = re.compile(r"(\d)(st|nd|rd|th)\b", re.IGNORECASE)
+_AT_RE = re.compile(r"\s+at\s+", re.IGNORECASE)
+
+DateLike = Union[str, date, datetime, np.datetime64]
+
+
+def parse_header_date(value: str) -> Optional[datetime]:
+    """
+    Parsuje datę z nagłówka maila (czas lokalny nadawcy, strefa czasowa jest pomijana).
+
+    Args:
+        value: Surowa wartość nagłówka, np. "Tuesday, March 3, 2009 4:12 PM"
+
+    Returns:
+        Data lub None, jeśli nie udało się jej odczytać
+    """
+    if not value or value == "N/A":
+        return None
+    text = re.sub(r"\s+", " ", value).strip().rstrip(".")
+    text = _AT_RE.sub(" ", _ORDINAL_RE.sub(r"\1", text))
+    for _ in range(2):
+        text = _TIMEZONE_RE.sub("", text)
+
+    parsed = None
+    for position, date_format in enumerate(_format_order):
+        try:
+            parsed = datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+        if position:
+            _format_order.insert(0, _format_order.pop(position))
+        break
+
+    if parsed is None:
+        try:
+            from dateutil import parser as date_parser
+        except ImportError:
+            return None
+        try:
+            parsed = date_parser.parse(text, fuzzy=True, ignoretz=True, default=datetime(1900, 1, 1))
+        except (ValueError, OverflowError):
+            return None
+        if parsed.year == 1900:
+            # dateutil uzupełnia brakujący rok wartością domyślną - to nie jest data
+            return None
+
+    if not MIN_YEAR <= parsed.year <= MAX_YEAR:
+        return None
+    return parsed
+
+
+def _bound(value: Optional[DateLike], inclusive_end: bool = False) -> Optional[np.datetime64]:
+    """
+    Granica zakresu jako `datetime64[s]`.
+
+    Dla końca zakresu zwracana jest pierwsza chwila po nim w jednostce podanej wartości:
+    "2009-03-31" obejmuje cały dzień, a "2009-03" cały miesiąc.
+    """
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    value = value if isinstance(value, np.datetime64) else np.datetime64(value)
+    if inclusive_end:
+        unit = np.datetime_data(value.dtype)[0]
+        value = value + np.timedelta64(1, unit)
+    return value.astype("datetime64[s]")
+
+
+class DateIndex:
+    """
+    Kolumna dat dokumentów z posortowaną permutacją.
+
+    Atrybuty:
+        dates: `datetime64[s]` dla każdego dokumentu (NaT, gdy brak daty)
+        parse_failed: Dokument ma nagłówek z datą, ale nie udało się jej odczytać
+        order: Id dokumentów z datą, posortowane rosnąco po dacie
+        sorted_dates: `dates[order]` (do wyszukiwania binarnego)
+    """
+
+    def __init__(self, dates: np.ndarray, parse_failed: np.ndarray):
+        self.dates = dates
+        self.parse_failed = parse_failed
+        valid = np.flatnonzero(~np.isnat(dates))
+        self.order = valid[np.argsort(dates[valid], kind="stable")].astype(np.int64)
+        self.sorted_dates = dates[self.order]
+
+        # Pozycja dokumentu w porządku dat (dokumenty bez daty na końcu) - do sortowania wyników
+        self.rank = np.full(len(dates), len(dates), dtype=np.int64)
+        self.rank[self.order] = np.arange(len(self.order))
+
+        # Kod miesiąca (liczba miesięcy od 1970-01) do histogramów; -1 = brak daty
+        months = dates.astype("datetime64[M]").astype(np.int64)
+        self.month_codes = np.where(np.isnat(dates), -1, months)
+        self._timeline_cache: OrderedDict = OrderedDict()
+
+    @classmethod
+    def build(cls, raw_dates: Iterable[str]) -> "DateIndex":
+        """Buduje indeks z surowych dat nagłówków (id dokumentu = pozycja w sekwencji)."""
+        # Surowe daty często się powtarzają (wątki, duplikaty) - każdą parsujemy raz
+        parsed_cache: dict[str, np.datetime64] = {}
+        dates = []
+        failed = []
+        for raw in raw_dates:
+            value = parsed_cache.get(raw)
+            if value is None:
+                parsed = parse_header_date(raw)
+                value = np.datetime64(parsed, "s") if parsed is not None else np.datetime64("NaT", "s")
+                parsed_cache[raw] = value
+            dates.append(value)
+            failed.append(bool(raw) and raw != "N/A" and np.isnat(value))
+        return cls(np.array(dates, dtype="datetime64[s]"), np.array(failed, dtype=bool))
+
+    def merged(self, changes: CorpusChanges, added: "DateIndex") -> "DateIndex":
+        """Indeks nowej wersji korpusu: daty niezmienionych dokumentów z tego indeksu, dodanych z `added`."""
+        return DateIndex(changes.carry(self.dates, added.dates), changes.carry(self.parse_failed, added.parse_failed))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def failure_count(self) -> int:
+        return int(self.parse_failed.sum())
+
+    def bounds(self) -> tuple[Optional[np.datetime64], Optional[np.datetime64]]:
+        """Najwcześniejsza i najpóźniejsza data w korpusie (None, gdy brak dat)."""
+        if not len(self.sorted_dates):
+            return None, None
+        return self.sorted_dates[0], self.sorted_dates[-1]
+
+    def _positions(self, start: Optional[DateLike], end: Optional[DateLike]) -> tuple[int, int]:
+        start_value, end_value = _bound(start), _bound(end, inclusive_end=True)
+        low = 0 if start_value is None else int(np.searchsorted(self.sorted_dates, start_value, side="left"))
+        high = len(self.sorted_dates)
+        if end_value is not None:
+            high = int(np.searchsorted(self.sorted_dates, end_value, side="left"))
+        return low, max(low, high)
+
+    def range_ids(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> np.ndarray:
+        """
+        Dokumenty z datą w zakresie [start, end] w kolejności dat - O(log n + k).
+
+        Koniec zakresu obejmuje całą swoją jednostkę (end="2009-03-31" zawiera cały 31 marca).
+        """
+        low, high = self._positions(start, end)
+        return self.order[low:high]
+
+    def filter(
+        self, doc_ids: np.ndarray, start: Optional[DateLike] = None, end: Optional[DateLike] = None
+    ) -> np.ndarray:
+        """
+        Zawęża posortowane id dokumentów do dat z zakresu (dokumenty bez daty odpadają).
+
+        Granice są wyznaczane binarnie na posortowanej kolumnie, a dokumenty
+        sprawdzane przez porównanie ich pozycji w porządku dat.
+        """
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        low, high = self._positions(start, end)
+        if high - low < len(doc_ids):
+            # Zakres węższy niż wynik: k dokumentów z zakresu zamiast sprawdzania całego wyniku
+            in_range = np.sort(self.order[low:high])
+            return in_range[np.isin(in_range, doc_ids, assume_unique=True)]
+        ranks = self.rank[doc_ids]
+        return doc_ids[(ranks >= low) & (ranks < high)]
+
+    def sort(self, doc_ids: np.ndarray, descending: bool = False) -> np.ndarray:
+        """Sortuje id dokumentów po dacie; dokumenty bez daty zawsze na końcu."""
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        ranks = self.rank[doc_ids]
+        if descending:
+            ranks = np.where(ranks == len(self.dates), -1, ranks)
+            return doc_ids[np.argsort(-ranks, kind="stable")]
+        return doc_ids[np.argsort(ranks, kind="stable")]
+
+    def timeline(self, doc_ids: Optional[np.ndarray] = None, cache_key: Optional[tuple] = None) -> dict[str, int]:
+        """
+        Histogram miesięczny dokumentów (domyślnie całego korpusu).
+
+        Args:
+            doc_ids: Id dokumentów (np. wynik wyszukiwania)
+            cache_key: Klucz zapamiętania wyniku (np. zapytanie z filtrami)
+
+        Returns:
+            {"RRRR-MM": liczba dokumentów} dla każdego miesiąca od pierwszego do ostatniego (także zer)
+        """
+        if cache_key is not None and cache_key in self._timeline_cache:
+            self._timeline_cache.move_to_end(cache_key)
+            return self._timeline_cache[cache_key]
+
+        codes = self.month_codes if doc_ids is None else self.month_codes[np.asarray(doc_ids, dtype=np.int64)]
+        codes = codes[codes >= 0]
+        if len(codes):
+            first = int(codes.min())
+            counts = np.bincount(codes - first)
+            months = np.arange(first, first + len(counts)).astype("datetime64[M]")
+            result = {str(month): int(count) for month, count in zip(months, counts)}
+        else:
+            result = {}
+
+        if cache_key is not None:
+            self._timeline_cache[cache_key] = result
+            while len(self._timeline_cache) > TIMELINE_CACHE_SIZE:
+                self._timeline_cache.popitem(last=False)
+        return result
+
+
+def get_date_index(corpus) -> DateIndex:
+    """Zwraca (budując przy pierwszym użyciu razem z indeksem faset) indeks dat korpusu."""
+    from search_engine.headers import get_header_indexes
+
+    return get_header_indexes(corpus).dates
@@ -0,0 +1,277 @@
+"""
+Wykrywanie prawie-duplikatów (MinHash + LSH) i zwijanie ich w wynikach.
+
+Korpus zawiera wiele kopii tych samych wątków: przekazania, odpowiedzi cytujące
+całą historię, zdublowane strony OCR. Przy ładowaniu każdy dokument dostaje
+identyfikator klastra duplikatów (`cluster_ids`) - najmniejsze id dokumentu w klastrze.
+
+Etapy (wszystkie poza tokenizacją są zwektoryzowane w NumPy i liczone partiami):
+    1. Shingle: hashe (CRC32, deterministyczne) trójek kolejnych słów.
+    2. Sygnatury MinHash: `NUM_PERM` funkcji haszujących multiply-shift,
+       minimum po shinglach dokumentu przez `np.minimum.reduceat`.
+    3. LSH: sygnatura dzielona na `BANDS` pasm; dokumenty z identycznym pasmem są
+       kandydatami, weryfikowanymi szacowanym podobieństwem Jaccarda.
+    4. Spójne składowe grafu par (propagacja minimalnej etykiety).
+
+Do weryfikacji przechowywane są tylko dolne 16 bitów wartości MinHash
+(b-bit minwise hashing) - 128 bajtów na dokument zamiast 256. Indeks zachowuje je razem
+z kluczami pasm (64 bajty na dokument), więc po aktualizacji korpusu sygnatury liczone są
+tylko dla dodanych dokumentów, a klastry wyznaczane ponownie z zachowanych sygnatur.
+"""
+
+import zlib
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from instrumentation import timed
+from search_engine.updates import CorpusChanges
+from search_engine.vocabulary import TOKEN_RE
+
+NUM_PERM = 64
+BANDS = 8
+SHINGLE_SIZE = 3
+# Minimalne szacowane podobieństwo Jaccarda, by uznać parę za duplikaty
+DEFAULT_THRESHOLD = 0.8
+BATCH_SIZE = 20_000
+SEED = 20240101
+
+_MAX_HASH = np.uint32(0xFFFFFFFF)
+
+
+def _hash_params(num_perm: int = NUM_PERM, seed: int = SEED) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    offsets = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    return multipliers, offsets
+
+
+def _token_hashes(text: str) -> np.ndarray:
+    # CRC32 zamiast `hash()` - ten sam korpus daje te same klastry w każdym procesie
+    tokens = TOKEN_RE.findall(text.lower())
+    return np.fromiter(map(zlib.crc32, map(str.encode, tokens)), dtype=np.uint64, count=len(tokens))
+
+
+def _shingles(token_hashes: np.ndarray) -> np.ndarray:
+    """Hashe trójek kolejnych słów (krótsze dokumenty: pojedyncze słowa)."""
+    if len(token_hashes) < SHINGLE_SIZE:
+        return token_hashes
+    shingles = token_hashes[: len(token_hashes) - SHINGLE_SIZE + 1].copy()
+    for shift in range(1, SHINGLE_SIZE):
+        # Mnożenie przez stałą nieparzystą i XOR - kolejność słów ma znaczenie
+        shingles = (
+            shingles * np.uint64(0x9E3779B97F4A7C15)
+            ^ token_hashes[shift : len(token_hashes) - SHINGLE_SIZE + 1 + shift]
+        )
+    return shingles
+
+
+def minhash_signatures(
+    texts: Sequence[str], num_perm: int = NUM_PERM, seed: int = SEED
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sygnatury MinHash dokumentów.
+
+    Args:
+        texts: Teksty dokumentów
+        num_perm: Liczba funkcji haszujących (długość sygnatury)
+        seed: Ziarno parametrów funkcji haszujących
+
+    Returns:
+        (sygnatury uint32 o kształcie [dokumenty, num_perm], maska dokumentów bez żadnego słowa)
+    """
+    multipliers, offsets = _hash_params(num_perm, seed)
+    shingle_arrays = [_shingles(_token_hashes(text)) for text in texts]
+    lengths = np.fromiter((len(shingles) for shingles in shingle_arrays), dtype=np.int64, count=len(shingle_arrays))
+    empty = lengths == 0
+    signatures = np.full((len(shingle_arrays), num_perm), _MAX_HASH, dtype=np.uint32)
+    if empty.all():
+        return signatures, empty
+
+    shingles = np.concatenate([array for array in shingle_arrays if len(array)])
+    starts = np.concatenate(([0], np.cumsum(lengths[~empty])[:-1]))
+    non_empty = np.flatnonzero(~empty)
+    with np.errstate(over="ignore"):
+        for perm in range(num_perm):
+            # Multiply-shift: górne 32 bity (a*x + b) mod 2^64
+            hashed = ((shingles * multipliers[perm] + offsets[perm]) >> np.uint64(32)).astype(np.uint32)
+            signatures[non_empty, perm] = np.minimum.reduceat(hashed, starts)
+    return signatures, empty
+
+
+def _band_keys(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """Hash każdego pasma sygnatury: [dokumenty, pasma] uint64."""
+    rows = signatures.shape[1] // bands
+    banded = signatures[:, : bands * rows].reshape(len(signatures), bands, rows).astype(np.uint64)
+    keys = np.zeros((len(signatures), bands), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for row in range(rows):
+            keys = keys * np.uint64(0x100000001B3) ^ banded[:, :, row]
+    return keys
+
+
+def connected_components(size: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """
+    Spójne składowe grafu o `size` wierzchołkach i krawędziach (left[i], right[i]).
+
+    Returns:
+        Etykieta każdego wierzchołka = najmniejszy wierzchołek jego składowej
+    """
+    labels = np.arange(size, dtype=np.int64)
+    if not len(left):
+        return labels
+    while True:
+        # Propagacja mniejszej etykiety wzdłuż krawędzi i skracanie ścieżek
+        smaller = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, smaller)
+        np.minimum.at(updated, right, smaller)
+        updated = updated[updated]
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+class DuplicateIndex:
+    """
+    Klastry prawie-duplikatów.
+
+    Atrybuty:
+        cluster_ids: Id klastra dokumentu (= najmniejsze id dokumentu w klastrze)
+        cluster_sizes: Liczba dokumentów w klastrze, indeksowana id klastra
+        fingerprints: Dolne 16 bitów sygnatur MinHash [dokumenty, num_perm]
+        band_keys: Hashe pasm LSH [dokumenty, pasma]
+        empty: Dokumenty bez żadnego słowa (nie są duplikatami niczego)
+        threshold: Minimalne szacowane podobieństwo Jaccarda pary w klastrze
+    """
+
+    def __init__(
+        self,
+        cluster_ids: np.ndarray,
+        fingerprints: np.ndarray,
+        band_keys: np.ndarray,
+        empty: np.ndarray,
+        threshold: float = DEFAULT_THRESHOLD,
+    ):
+        self.cluster_ids = cluster_ids
+        self.cluster_sizes = np.bincount(cluster_ids, minlength=len(cluster_ids)).astype(np.int32)
+        self.fingerprints = fingerprints
+        self.band_keys = band_keys
+        self.empty = empty
+        self.threshold = threshold
+
+    @classmethod
+    def build(
+        cls,
+        texts: Sequence[str],
+        threshold: float = DEFAULT_THRESHOLD,
+        bands: int = BANDS,
+        num_perm: int = NUM_PERM,
+        batch_size: int = BATCH_SIZE,
+    ) -> "DuplicateIndex":
+        """
+        Grupuje dokumenty w klastry prawie-duplikatów.
+
+        Args:
+            texts: Teksty dokumentów (id dokumentu = pozycja) - lista albo magazyn dokumentów; wycinki
+                `batch_size` dokumentów są dekodowane po kolei
+            threshold: Minimalne szacowane podobieństwo Jaccarda pary
+            bands: Liczba pasm LSH (więcej pasm = więcej kandydatów przy niższym podobieństwie)
+            num_perm: Długość sygnatury MinHash
+            batch_size: Liczba dokumentów liczonych naraz (ogranicza pamięć tymczasową)
+        """
+        size = len(texts)
+        fingerprints = np.empty((size, num_perm), dtype=np.uint16)
+        keys = np.empty((size, bands), dtype=np.uint64)
+        empty = np.empty(size, dtype=bool)
+        for start in range(0, size, batch_size):
+            batch = texts[start : start + batch_size]
+            signatures, batch_empty = minhash_signatures(batch, num_perm)
+            fingerprints[start : start + len(signatures)] = signatures.astype(np.uint16)
+            keys[start : start + len(signatures)] = _band_keys(signatures, bands)
+            empty[start : start + len(signatures)] = batch_empty
+        return cls.from_signatures(fingerprints, keys, empty, threshold)
+
+    @classmethod
+    def from_signatures(
+        cls, fingerprints: np.ndarray, keys: np.ndarray, empty: np.ndarray, threshold: float = DEFAULT_THRESHOLD
+    ) -> "DuplicateIndex":
+        """Klastry z sygnatur dokumentów: kandydaci z LSH, weryfikacja podobieństwem, spójne składowe."""
+        candidates = np.flatnonzero(~empty)
+        left_parts, right_parts = [], []
+        for band in range(keys.shape[1]):
+            band_keys = keys[candidates, band]
+            order = candidates[np.argsort(band_keys, kind="stable")]
+            sorted_keys = keys[order, band]
+            same = np.flatnonzero(sorted_keys[1:] == sorted_keys[:-1])
+            # Sąsiedzi w porządku kluczy tworzą łańcuch w obrębie kubełka
+            left, right = order[same], order[same + 1]
+            similarity = (fingerprints[left] == fingerprints[right]).mean(axis=1)
+            keep = similarity >= threshold
+            left_parts.append(left[keep])
+            right_parts.append(right[keep])
+
+        left = np.concatenate(left_parts) if left_parts else np.empty(0, dtype=np.int64)
+        right = np.concatenate(right_parts) if right_parts else np.empty(0, dtype=np.int64)
+        return cls(connected_components(len(empty), left, right), fingerprints, keys, empty, threshold)
+
+    def merged(self, changes: CorpusChanges, added: "DuplicateIndex") -> "DuplicateIndex":
+        """
+        Klastry nowej wersji korpusu z sygnatur niezmienionych dokumentów stąd i dodanych z `added`.
+
+        Args:
+            changes: Zmiany między wersjami korpusu
+            added: Indeks zbudowany tylko z dodanych dokumentów (w kolejności `changes.added`)
+        """
+        return DuplicateIndex.from_signatures(
+            changes.carry(self.fingerprints, added.fingerprints),
+            changes.carry(self.band_keys, added.band_keys),
+            changes.carry(self.empty, added.empty),
+            self.threshold,
+        )
+
+    def __len__(self) -> int:
+        return len(self.cluster_ids)
+
+    @property
+    def cluster_count(self) -> int:
+        return int(np.count_nonzero(self.cluster_sizes))
+
+    def members(self, doc_id: int) -> np.ndarray:
+        """Wszystkie dokumenty z klastra dokumentu."""
+        return np.flatnonzero(self.cluster_ids == self.cluster_ids[doc_id])
+
+    def collapse(self, doc_ids: Iterable[int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Zostawia jeden dokument na klaster.
+
+        Args:
+            doc_ids: Id dokumentów (np. wynik wyszukiwania) w dowolnej kolejności
+
+        Returns:
+            (reprezentanci - pierwszy dokument każdego klastra w kolejności wejścia,
+             liczba dokumentów z wejścia w klastrze każdego reprezentanta)
+        """
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        if not len(doc_ids):
+            return doc_ids, np.empty(0, dtype=np.int64)
+        clusters = self.cluster_ids[doc_ids]
+        _, first, counts = np.unique(clusters, return_index=True, return_counts=True)
+        order = np.argsort(first, kind="stable")
+        return doc_ids[first[order]], counts[order]
+
+
+def get_duplicate_index(corpus) -> DuplicateIndex:
+    """Zwraca (budując przy pierwszym użyciu) indeks prawie-duplikatów korpusu."""
+
+    def _build(corpus):
+        with timed("index.duplicates"):
+            # Magazyn tekstów wprost - build dekoduje tylko bieżącą porcję, nie cały korpus naraz
+            return DuplicateIndex.build(corpus.texts)
+
+    return corpus.get_index("duplicates", _build)
@@ -0,0 +1,241 @@
+"""
+Zwarty magazyn tekstów: jeden ciągły bufor UTF-8 i tablica offsetów int64.
+
+Kolumna object w pandas trzyma osobny obiekt `str` na dokument - nagłówek obiektu,
+wskaźnik w tablicy i, gdy w tekście jest choć jeden znak spoza Latin-1 (typowe "’" z OCR),
+2 albo 4 bajty na każdy znak całego tekstu. Tutaj teksty leżą jeden za drugim w jednym
+buforze; dokument `i` to bajty `data[offsets[i]:offsets[i + 1]]`, dekodowane dopiero przy
+odczycie. Wycinki magazynu współdzielą bufor, a kolumnę Arrow (Parquet, Hugging Face)
+można przejąć bez tworzenia obiektów Pythona dla dokumentów.
+
+Wyszukiwanie podciągu przegląda cały bufor naraz (`bytes.find`), pozycję trafienia zamienia
+na dokument wyszukiwaniem binarnym w offsetach i przeskakuje na początek następnego
+dokumentu - koszt zależy od rozmiaru bufora i liczby pasujących dokumentów, nie wystąpień.
+"""
+
+from bisect import bisect_right
+from typing import Iterable, Iterator, Optional, Union
+
+import numpy as np
+
+ENCODING = "utf-8"
+# Samotne surogaty (uszkodzone teksty) przechodzą przez bufor bez błędu
+ENCODING_ERRORS = "surrogatepass"
+
+# Znaki spoza ASCII, których `upper()` zawiera litery ASCII ("ß" -> "SS", "ﬁ" -> "FI", "ı" -> "I").
+# Dla dokumentów z takimi znakami porównanie bez wielkości liter na buforze ASCII byłoby niepełne.
+ASCII_UPPER_SOURCES = "ßıŉſǰẖẗẘẙẚﬀﬁﬂﬃﬄﬅﬆ"
+
+
+class DocumentStore:
+    """
+    Teksty dokumentów w jednym buforze UTF-8 (niezmienne, bezpieczne dla wielu wątków).
+
+    Interfejs odpowiada temu, czego silnik używał z kolumny pandas: `len`, indeksowanie
+    (`store[i]`, `store.iat[i]`), iteracja, wycinki (`store[a:b]`, bez kopiowania) i `tolist()`.
+
+    Atrybuty:
+        data: Bufor z tekstami wszystkich dokumentów (UTF-8)
+        offsets: Początki dokumentów w buforze i koniec ostatniego (int64, długość = liczba dokumentów + 1)
+    """
+
+    __slots__ = ("data", "offsets", "_bounds", "_folded", "_non_ascii", "_unfoldable")
+
+    def __init__(self, data: bytes, offsets: np.ndarray):
+        self.data = data
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+        # Widok offsetów z indeksowaniem do int Pythona - `bisect` bez narzutu skalarów numpy
+        self._bounds = memoryview(self.offsets)
+        self._folded: Optional[bytes] = None
+        self._non_ascii: Optional[np.ndarray] = None
+        self._unfoldable: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[Optional[str]], default: str = "") -> "DocumentStore":
+        """
+        Buduje magazyn z tekstów; brakujące wartości (None, NaN) zastępuje `default`.
+
+        Args:
+            texts: Teksty dokumentów (dowolne wartości są zamieniane na `str`)
+            default: Tekst dla brakujących wartości
+        """
+        import pyarrow as pa
+
+        if not isinstance(texts, (list, tuple)) and not hasattr(texts, "dtype"):
+            texts = list(texts)
+        try:
+            # Konwersja w C (kolumna pandas oparta na Arrow - bez kopiowania tekstów)
+            return cls.from_arrow(pa.array(texts, type=pa.large_string(), from_pandas=True), default)
+        except (pa.ArrowException, TypeError, UnicodeEncodeError):
+            # Wartości inne niż tekst albo samotne surogaty - kodowanie dokument po dokumencie
+            pass
+        encoded = [_encode(default if _is_missing(text) else str(text)) for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    @classmethod
+    def from_arrow(cls, column, default: str = "") -> "DocumentStore":
+        """
+        Przejmuje kolumnę tekstową Arrow (Array lub ChunkedArray) bez tworzenia obiektów `str`.
+
+        Args:
+            column: Kolumna typu string/large_string (inne typy są rzutowane na tekst)
+            default: Tekst dla brakujących wartości
+        """
+        import pyarrow as pa
+
+        if isinstance(column, pa.ChunkedArray):
+            column = column.combine_chunks() if column.num_chunks else pa.array([], type=pa.large_string())
+        column = column.cast(pa.large_string()).fill_null(default)
+        _validity, offsets_buffer, data_buffer = column.buffers()
+        offsets = np.frombuffer(offsets_buffer, dtype=np.int64)[column.offset : column.offset + len(column) + 1]
+        if data_buffer is None or not len(column):
+            return cls(b"", np.zeros(len(column) + 1, dtype=np.int64))
+        start, stop = int(offsets[0]), int(offsets[-1])
+        # Jedna kopia bufora (bytes daje szybkie `find`); offsety przesunięte do początku kopii
+        return cls(bytes(memoryview(data_buffer)[start:stop]), offsets - start)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[str, "DocumentStore"]:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("Wycinki magazynu dokumentów nie obsługują kroku")
+            # Widok na ten sam bufor - kopiowane są tylko offsety wycinka
+            return DocumentStore(self.data, self.offsets[start : max(start, stop) + 1])
+        position = int(key)
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(f"Brak dokumentu o numerze {key}")
+        return self.data[self._bounds[position] : self._bounds[position + 1]].decode(ENCODING, ENCODING_ERRORS)
+
+    @property
+    def iat(self) -> "DocumentStore":
+        """Dostęp pozycyjny jak w pandas (`store.iat[i]` == `store[i]`)."""
+        return self
+
+    def __iter__(self) -> Iterator[str]:
+        data, bounds = self.data, self._bounds
+        for position in range(len(self)):
+            yield data[bounds[position] : bounds[position + 1]].decode(ENCODING, ENCODING_ERRORS)
+
+    def tolist(self) -> list[str]:
+        return list(self)
+
+    def take(self, doc_ids: Iterable[int]) -> list[str]:
+        """Teksty wybranych dokumentów, w podanej kolejności."""
+        return [self[doc_id] for doc_id in doc_ids]
+
+    def byte_lengths(self) -> np.ndarray:
+        """Długości dokumentów w bajtach UTF-8."""
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self) -> int:
+        """Pamięć zajmowana przez bufor tekstów i offsety (bez leniwie budowanej kopii do porównań)."""
+        start, stop = self._span()
+        return stop - start + self.offsets.nbytes
+
+    def __repr__(self) -> str:
+        return f"DocumentStore(documents={len(self)}, bytes={self.nbytes})"
+
+    def contains(self, query: str, case_sensitive: bool = False) -> np.ndarray:
+        """
+        Dokumenty zawierające podciąg (dosłownie, bez wyrażeń regularnych).
+
+        Bez rozróżniania wielkości liter porównywane są `query.upper()` i `text.upper()` - jak
+        `Series.str.contains(..., case=False)` na kolumnie object ("STRASSE" pasuje do "Straße").
+
+        Args:
+            query: Szukany podciąg (dosłownie)
+            case_sensitive: Czy rozróżniać wielkość liter
+
+        Returns:
+            Posortowana tablica numerów dokumentów (int64)
+        """
+        if not query:
+            return np.arange(len(self), dtype=np.int64)
+        if case_sensitive:
+            return self._scan(self.data, _encode(query))
+
+        pattern = query.upper()
+        if not pattern.isascii():
+            # Wzorzec spoza ASCII może wystąpić tylko w dokumentach spoza ASCII
+            return self._check(self._non_ascii_docs(), pattern)
+        found = self._scan(self._folded_data(), pattern.encode("ascii"))
+        unfoldable = self._unfoldable_docs()
+        if not len(unfoldable):
+            return found
+        # Dokumenty ze znakami typu "ß"/"ﬁ" sprawdzane pełnym `upper()`
+        rest = unfoldable[~np.isin(unfoldable, found, assume_unique=True)]
+        return np.union1d(found, self._check(rest, pattern))
+
+    def _span(self) -> tuple[int, int]:
+        return self._bounds[0], self._bounds[len(self)]
+
+    def _scan(self, buffer: bytes, needle: bytes) -> np.ndarray:
+        bounds = self._bounds
+        start, stop = self._span()
+        width = len(needle)
+        found = []
+        position = buffer.find(needle, start, stop)
+        while position != -1:
+            doc_id = bisect_right(bounds, position) - 1
+            doc_end = bounds[doc_id + 1]
+            if position + width <= doc_end:
+                found.append(doc_id)
+                position = buffer.find(needle, doc_end, stop)
+            else:
+                # Trafienie na granicy dwóch dokumentów
+                position = buffer.find(needle, position + 1, stop)
+        return np.array(found, dtype=np.int64)
+
+    def _check(self, doc_ids: np.ndarray, pattern: str) -> np.ndarray:
+        return np.array([doc_id for doc_id in doc_ids.tolist() if pattern in self[doc_id].upper()], dtype=np.int64)
+
+    def _folded_data(self) -> bytes:
+        # Kopia bufora z wielkimi literami ASCII (bajty UTF-8 spoza ASCII bez zmian), budowana raz
+        if self._folded is None:
+            self._folded = self.data.upper()
+        return self._folded
+
+    def _non_ascii_docs(self) -> np.ndarray:
+        if self._non_ascii is None:
+            start, stop = self._span()
+            if self.data[start:stop].isascii():
+                self._non_ascii = np.empty(0, dtype=np.int64)
+            else:
+                high = np.frombuffer(self.data, dtype=np.uint8)[start:stop] >= 0x80
+                lengths = self.byte_lengths()
+                present = np.flatnonzero(lengths)
+                counts = np.add.reduceat(high, self.offsets[present] - start, dtype=np.int64)
+                self._non_ascii = present[counts > 0]
+        return self._non_ascii
+
+    def _unfoldable_docs(self) -> np.ndarray:
+        if self._unfoldable is None:
+            if len(self._non_ascii_docs()):
+                found = [self._scan(self.data, _encode(char)) for char in ASCII_UPPER_SOURCES]
+                self._unfoldable = np.unique(np.concatenate(found))
+            else:
+                self._unfoldable = np.empty(0, dtype=np.int64)
+        return self._unfoldable
+
+
+def _encode(text: str) -> bytes:
+    return text.encode(ENCODING, ENCODING_ERRORS)
+
+
+def _is_missing(value) -> bool:
+    # None, NaN (jedyna wartość różna od samej siebie) i pd.NA (porównanie nie daje wartości logicznej)
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:
+        return True
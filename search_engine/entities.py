@@ -0,0 +1,383 @@
+"""
+Indeks encji: osoby, adresy e-mail, numery telefonów i adresy URL.
+
+Przy ładowaniu korpusu z każdego dokumentu wyciągane są wzmianki o encjach:
+    - e-maile, telefony i URL-e - skompilowanymi wyrażeniami regularnymi (cały tekst),
+    - osoby - z nazw w nagłówkach From/To (`extract_email_metadata`) oraz heurystyką
+      "dwa-trzy kolejne słowa z wielkiej litery" w temacie i treści.
+
+Wartości są normalizowane (małe litery dla adresów, same cyfry dla telefonów,
+"Imię Nazwisko" dla osób), a indeks przechowuje listy dokumentów każdej encji (postings)
+z liczbą dokumentów i wzmianek. Wyszukiwanie encji to odczyt jej listy - bez skanu tekstów.
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from search_engine.facets import EMAIL_RE
+from search_engine.threads import header_end
+from search_engine.updates import CorpusChanges, compact_codes, merge_values
+from translation_utils import extract_email_metadata
+
+ENTITY_TYPES = ("person", "email", "phone", "url")
+
+_URL_RE = re.compile(r"\b(?:https?://|www\.)[^\s<>\"'()\[\]]+", re.I)
+_PHONE_RE = re.compile(
+    r"(?<![\w+])(?:\+?1[ .-]?)?(?:\(\d{3}\)[ .-]?|\d{3}[ .-])\d{3}[ .-]\d{4}(?!\d)|\+\d{1,3}(?:[ .-]\d{1,4}){2,4}(?!\d)"
+)
+# Tani wstępny filtr: ciągi cyfr i separatorów, w których dopiero szukamy numerów telefonów
+_PHONE_CANDIDATE_RE = re.compile(r"[+(\d][\d() .+-]{8,}\d")
+_EMAIL_LOCAL_RE = re.compile(r"[\w.+-]+$")
+_EMAIL_DOMAIN_RE = re.compile(r"[\w-]+(?:\.[\w-]+)+")
+_PERSON_RE = re.compile(r"\b[A-Z][a-z]+(?:[ \t]+(?:[A-Z]\.[ \t]*)?[A-Z][a-z]+){1,3}\b")
+_INITIAL_RE = re.compile(r"\b[A-Z]\.\s*")
+
+# Słowa pisane wielką literą, które nie są imionami ani nazwiskami (na brzegach dopasowania)
+NAME_STOPWORDS = frozenset(
+    """
+    the a an and or of for to in on at by with from sent subject re fw fwd cc bcc date dear hi hello hey
+    thanks thank best regards sincerely cheers please kind warm original message forwarded wrote attached
+    call see meet ask tell send let
+    monday tuesday wednesday thursday friday saturday sunday january february march april june july
+    august september october november december mr mrs ms dr sir madam new united states st street avenue road
+    beach island court county district office inc llc ltd corp company group foundation university
+    """.split()
+)
+
+# Liczba najczęstszych encji pokazywana domyślnie
+DEFAULT_TOP = 50
+
+_MIN_PHONE_DIGITS = 8
+
+
+def normalize_entity(entity_type: str, value: str) -> Optional[str]:
+    """
+    Normalizuje wartość encji; None, gdy wartość nie jest poprawną encją danego typu.
+
+    Args:
+        entity_type: Jeden z `ENTITY_TYPES`
+        value: Wartość w postaci z tekstu, np. "(212) 555-0100" albo "JE@Gmail.com"
+    """
+    value = value.strip()
+    if entity_type == "email":
+        return value.lower() if EMAIL_RE.fullmatch(value) else None
+    if entity_type == "url":
+        url = re.sub(r"^https?://", "", value.lower()).rstrip(".,;:!?/")
+        return url or None
+    if entity_type == "phone":
+        digits = re.sub(r"\D", "", value)
+        international = value.startswith("+")
+        if len(digits) == 11 and digits.startswith("1"):
+            # Numer amerykański z kierunkowym kraju ("+1 212 ...", "1-800-...")
+            digits, international = digits[1:], False
+        if len(digits) == 10 and not international:
+            return f"{digits[:3]}-{digits[3:6]}-{digits[6:]}"
+        return f"+{digits}" if len(digits) >= _MIN_PHONE_DIGITS else None
+    if entity_type == "person":
+        return _normalize_person(value)
+    raise ValueError(f"Nieznany typ encji: {entity_type!r} (dostępne: {', '.join(ENTITY_TYPES)})")
+
+
+@lru_cache(maxsize=65536)
+def _normalize_person(value: str) -> Optional[str]:
+    value = re.sub(r"[\"'<>()\[\]]", " ", value).strip(" ,.")
+    if "," in value:
+        # "Epstein, Jeffrey" -> "Jeffrey Epstein"
+        last, _, first = value.partition(",")
+        value = f"{first} {last}"
+    words = _INITIAL_RE.sub(" ", value).split()
+    while words and words[0].lower() in NAME_STOPWORDS:
+        words.pop(0)
+    while words and words[-1].lower() in NAME_STOPWORDS:
+        words.pop()
+    if not 2 <= len(words) <= 3 or not all(word.isalpha() for word in words):
+        return None
+    return " ".join(word.capitalize() for word in words)
+
+
+def _header_people(field_value: str) -> list[tuple[str, str]]:
+    """Osoby z pola nagłówka ("Jeffrey Epstein <je@x.com>; Ghislaine Maxwell")."""
+    if not field_value or field_value == "N/A":
+        return []
+    people = []
+    for part in field_value.split(";"):
+        name = EMAIL_RE.sub(" ", part)
+        normalized = _normalize_person(name)
+        if normalized is not None:
+            people.append((normalized, name.strip(" <>\"'")))
+    return people
+
+
+def _contacts(text: str) -> Iterator[tuple[str, str]]:
+    """
+    Adresy e-mail, URL-e i telefony w tekście jako (typ, postać z tekstu).
+
+    Pełne wyrażenia uruchamiane są tylko tam, gdzie mogą coś znaleźć: e-maile są rozwijane
+    wokół znaków "@", URL-e szukane tylko w tekstach z "www."/"http", a telefony
+    wewnątrz ciągów cyfr - skan całego tekstu złożonym wyrażeniem był kilkukrotnie wolniejszy.
+    """
+    at = text.find("@")
+    while at != -1:
+        local = _EMAIL_LOCAL_RE.search(text, max(0, at - 64), at)
+        domain = _EMAIL_DOMAIN_RE.match(text, at + 1)
+        if local and domain:
+            yield "email", text[local.start() : domain.end()]
+        at = text.find("@", at + 1)
+    if "www." in text or "http" in text or "WWW." in text or "HTTP" in text:
+        for match in _URL_RE.finditer(text):
+            yield "url", match.group().rstrip(".,;:!?")
+    for candidate in _PHONE_CANDIDATE_RE.finditer(text):
+        for match in _PHONE_RE.finditer(candidate.group()):
+            yield "phone", match.group()
+
+
+def extract_entities(text: str, metadata: Optional[dict[str, str]] = None) -> list[tuple[str, str, str]]:
+    """
+    Wzmianki o encjach w dokumencie.
+
+    Args:
+        text: Tekst dokumentu
+        metadata: Wyciągnięte już metadane maila (domyślnie `extract_email_metadata(text)`)
+
+    Returns:
+        Lista (typ, znormalizowana wartość, postać z tekstu) - jedna pozycja na wzmiankę
+    """
+    if not text:
+        return []
+    if metadata is None:
+        metadata = extract_email_metadata(text)
+
+    mentions = []
+    for entity_type, surface in _contacts(text):
+        value = normalize_entity(entity_type, surface)
+        if value is not None:
+            mentions.append((entity_type, value, surface))
+
+    for header in ("from", "to"):
+        mentions.extend(("person", value, surface) for value, surface in _header_people(metadata[header]))
+    # Osoby z treści (nagłówki są już uwzględnione) i z tematu
+    sources = [text[header_end(text) :]]
+    if metadata["subject"] != "N/A":
+        sources.append(metadata["subject"])
+    for source in sources:
+        for match in _PERSON_RE.finditer(source):
+            value = _normalize_person(match.group())
+            if value is not None:
+                # Do podświetlania sama nazwa, bez pominiętych słów ("Dear", "Thanks")
+                surface = value if value in match.group() else match.group()
+                mentions.append(("person", value, surface))
+    return mentions
+
+
+def _guess_type(value: str) -> str:
+    if "@" in value:
+        return "email"
+    if _URL_RE.match(value):
+        return "url"
+    if _PHONE_CANDIDATE_RE.fullmatch(value):
+        return "phone"
+    return "person"
+
+
+def parse_entity_query(query: str) -> tuple[str, str]:
+    """
+    Rozpoznaje encję w zapytaniu: "typ:wartość" albo sama wartość (typ wykrywany automatycznie).
+
+    Returns:
+        (typ, znormalizowana wartość)
+
+    Raises:
+        ValueError: Gdy zapytanie nie jest poprawną encją
+    """
+    query = query.strip()
+    entity_type, separator, value = query.partition(":")
+    if separator and entity_type in ENTITY_TYPES:
+        normalized = normalize_entity(entity_type, value)
+    else:
+        entity_type = _guess_type(query)
+        normalized = normalize_entity(entity_type, query)
+    if normalized is None:
+        raise ValueError(f"Zapytanie {query!r} nie jest encją (osoba, e-mail, telefon lub URL)")
+    return entity_type, normalized
+
+
+class EntityIndex:
+    """
+    Indeks encji korpusu.
+
+    Atrybuty:
+        types: Kod typu (pozycja w `ENTITY_TYPES`) każdej encji
+        values: Znormalizowana wartość każdej encji
+        postings_offsets: Dokumenty encji `e` to `postings[postings_offsets[e]:postings_offsets[e + 1]]`
+        postings: Posortowane id dokumentów kolejnych encji
+        mentions: Łączna liczba wzmianek każdej encji w korpusie
+        doc_offsets, doc_codes, doc_mentions: Encje każdego dokumentu (CSR) z liczbą wzmianek
+    """
+
+    def __init__(
+        self,
+        types: np.ndarray,
+        values: list[str],
+        doc_offsets: np.ndarray,
+        doc_codes: np.ndarray,
+        doc_mentions: np.ndarray,
+    ):
+        self.types = types
+        self.values = values
+        self.codes_by_key = {(ENTITY_TYPES[kind], value): code for code, (kind, value) in enumerate(zip(types, values))}
+        self.doc_offsets = doc_offsets
+        self.doc_codes = doc_codes
+        self.doc_mentions = doc_mentions
+
+        # Transpozycja CSR: dla każdej encji posortowane id dokumentów
+        doc_ids = np.repeat(np.arange(len(doc_offsets) - 1, dtype=np.int32), np.diff(doc_offsets))
+        order = np.argsort(doc_codes, kind="stable")
+        self.postings = doc_ids[order]
+        self.postings_offsets = np.searchsorted(doc_codes[order], np.arange(len(values) + 1))
+        self.mentions = np.bincount(doc_codes, weights=doc_mentions, minlength=len(values)).astype(np.int64)
+
+    @classmethod
+    def build(cls, texts: Iterable[str], metadata: Optional[Iterable[dict[str, str]]] = None) -> "EntityIndex":
+        """
+        Buduje indeks z tekstów dokumentów (id dokumentu = pozycja w sekwencji).
+
+        Args:
+            texts: Teksty dokumentów
+            metadata: Metadane maili równoległe do `texts` (domyślnie wyciągane tutaj)
+        """
+        builder = EntityIndexBuilder()
+        if metadata is None:
+            metadata = map(extract_email_metadata, texts)
+        for text, document_metadata in zip(texts, metadata):
+            builder.add(text, document_metadata)
+        return builder.build()
+
+    def merged(self, changes: CorpusChanges, added: "EntityIndex") -> "EntityIndex":
+        """
+        Indeks nowej wersji korpusu: encje niezmienionych dokumentów z tego indeksu, dodanych z `added`.
+
+        Args:
+            changes: Zmiany między wersjami korpusu
+            added: Indeks zbudowany tylko z dodanych dokumentów (w kolejności `changes.added`)
+        """
+        keys, added_codes = merge_values(list(self.codes_by_key), added.codes_by_key, self.codes_by_key)
+        offsets, (codes, mentions) = changes.carry_rows(
+            self.doc_offsets,
+            [self.doc_codes, self.doc_mentions],
+            added.doc_offsets,
+            [added_codes[added.doc_codes], added.doc_mentions],
+        )
+        # Encje wspominane tylko w usuniętych dokumentach znikają z indeksu
+        used, remap = compact_codes(codes, len(keys))
+        return EntityIndex(
+            np.array([ENTITY_TYPES.index(keys[code][0]) for code in used], dtype=np.int8),
+            [keys[code][1] for code in used],
+            offsets,
+            remap[codes].astype(np.int32),
+            mentions.astype(np.int32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def document_counts(self) -> np.ndarray:
+        """Liczba dokumentów każdej encji."""
+        return np.diff(self.postings_offsets)
+
+    def lookup(self, entity_type: str, value: str) -> np.ndarray:
+        """Posortowane id dokumentów wspominających encję (pusta tablica dla nieznanej) - O(1)."""
+        code = self.codes_by_key.get((entity_type, value))
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self.postings[self.postings_offsets[code] : self.postings_offsets[code + 1]].astype(np.int64)
+
+    def top(
+        self, entity_type: Optional[str] = None, limit: int = DEFAULT_TOP, doc_ids: Optional[np.ndarray] = None
+    ) -> list[dict]:
+        """
+        Najczęstsze encje korpusu albo podanych dokumentów.
+
+        Args:
+            entity_type: Tylko encje tego typu (domyślnie wszystkie)
+            limit: Maksymalna liczba encji
+            doc_ids: Id dokumentów (np. wynik wyszukiwania); domyślnie cały korpus
+
+        Returns:
+            Lista {"type", "value", "documents", "mentions"} malejąco po liczbie dokumentów
+        """
+        if doc_ids is None:
+            documents, mentions = self.document_counts, self.mentions
+        else:
+            documents, mentions = self._subset_counts(np.asarray(doc_ids, dtype=np.int64))
+        if entity_type is not None:
+            if entity_type not in ENTITY_TYPES:
+                raise ValueError(f"Nieznany typ encji: {entity_type!r} (dostępne: {', '.join(ENTITY_TYPES)})")
+            documents = np.where(self.types == ENTITY_TYPES.index(entity_type), documents, 0)
+        order = np.lexsort((-mentions, -documents))[:limit]
+        return [
+            {
+                "type": ENTITY_TYPES[self.types[code]],
+                "value": self.values[code],
+                "documents": int(documents[code]),
+                "mentions": int(mentions[code]),
+            }
+            for code in order
+            if documents[code] > 0
+        ]
+
+    def _subset_counts(self, doc_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        starts = self.doc_offsets[doc_ids]
+        lengths = self.doc_offsets[doc_ids + 1] - starts
+        # Indeksy encji wszystkich wskazanych dokumentów bez pętli w Pythonie
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(int(lengths.sum()))
+        codes = self.doc_codes[positions]
+        documents = np.bincount(codes, minlength=len(self.values))
+        mentions = np.bincount(codes, weights=self.doc_mentions[positions], minlength=len(self.values))
+        return documents, mentions.astype(np.int64)
+
+
+class EntityIndexBuilder:
+    """Przyrostowa budowa `EntityIndex` - dokument po dokumencie (np. w jednym przejściu z innymi indeksami)."""
+
+    def __init__(self):
+        self._codes: dict[tuple[str, str], int] = {}
+        self._doc_codes: list[int] = []
+        self._doc_mentions: list[int] = []
+        self._doc_counts: list[int] = [0]
+
+    def add(self, text: str, metadata: Optional[dict[str, str]] = None) -> None:
+        """Dodaje kolejny dokument (id = liczba dodanych wcześniej)."""
+        counts = Counter((entity_type, value) for entity_type, value, _ in extract_entities(text, metadata))
+        for key, count in counts.items():
+            self._doc_codes.append(self._codes.setdefault(key, len(self._codes)))
+            self._doc_mentions.append(count)
+        self._doc_counts.append(len(counts))
+
+    def build(self) -> EntityIndex:
+        keys = list(self._codes)
+        types = np.array([ENTITY_TYPES.index(entity_type) for entity_type, _ in keys], dtype=np.int8)
+        return EntityIndex(
+            types,
+            [value for _, value in keys],
+            np.cumsum(np.array(self._doc_counts, dtype=np.int64)),
+            np.array(self._doc_codes, dtype=np.int32),
+            np.array(self._doc_mentions, dtype=np.int32),
+        )
+
+
+def count_mentions(text: str, entity_type: str, value: str) -> tuple[int, set[str]]:
+    """Liczba wzmianek encji w tekście i ich postaci z tekstu (do podświetlania)."""
+    surfaces = [surface for kind, found, surface in extract_entities(text) if kind == entity_type and found == value]
+    return len(surfaces), set(surfaces)
+
+
+def get_entity_index(corpus) -> EntityIndex:
+    """Zwraca (budując przy pierwszym użyciu razem z pozostałymi indeksami nagłówków) indeks encji korpusu."""
+    from search_engine.headers import get_header_indexes
+
+    return get_header_indexes(corpus).entities
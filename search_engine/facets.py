@@ -0,0 +1,340 @@
+"""
+Filtry fasetowe: nadawca, odbiorca, domena i typ zawartości.
+
+Indeks jest budowany raz, przy ładowaniu korpusu: metadane maili są wyciągane
+dla wszystkich dokumentów, normalizowane, a każda wartość fasety dostaje
+skompresowaną mapę bitową id dokumentów (`Bitmap`). Nałożenie albo zmiana
+filtra to iloczyn map bitowych - tekst dokumentów nie jest ponownie skanowany.
+
+Liczniki faset dla wyników liczone są z tablic kodów wartości (CSR dokument -> wartości)
+tylko dla dokumentów z wyniku, więc ich koszt zależy od liczby trafień, nie od korpusu.
+"""
+
+import re
+from typing import Iterable, Mapping, Optional
+
+import numpy as np
+
+from search_engine.updates import CorpusChanges, compact_codes, merge_values
+from translation_utils import classify_content_type, extract_email_metadata
+
+FACET_FIELDS = ("sender", "recipient", "domain", "content_type")
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+
+class Bitmap:
+    """
+    Niezmienny zbiór id dokumentów z korpusu o rozmiarze `size`.
+
+    Mała liczność: posortowana tablica int32 (4 bajty na dokument w zbiorze).
+    Duża liczność: spakowane bity (1 bit na dokument korpusu). Wybierana jest
+    tańsza reprezentacja, podobnie jak w kontenerach Roaring.
+    """
+
+    __slots__ = ("size", "_ids", "_bits")
+
+    def __init__(self, size: int, ids: Optional[np.ndarray] = None, bits: Optional[np.ndarray] = None):
+        self.size = size
+        self._ids = ids
+        self._bits = bits
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int], size: int) -> "Bitmap":
+        """Tworzy mapę z posortowanych (rosnąco, bez powtórzeń) id dokumentów."""
+        ids = np.asarray(ids, dtype=np.int32)
+        if len(ids) * 32 > size:
+            mask = np.zeros(size, dtype=bool)
+            mask[ids] = True
+            return cls(size, bits=np.packbits(mask, bitorder="little"))
+        return cls(size, ids=ids)
+
+    @property
+    def is_dense(self) -> bool:
+        return self._bits is not None
+
+    @property
+    def nbytes(self) -> int:
+        return self._bits.nbytes if self.is_dense else self._ids.nbytes
+
+    def to_ids(self) -> np.ndarray:
+        """Posortowane id dokumentów."""
+        if self.is_dense:
+            return np.flatnonzero(np.unpackbits(self._bits, count=self.size, bitorder="little")).astype(np.int32)
+        return self._ids
+
+    def _contains(self, ids: np.ndarray) -> np.ndarray:
+        return ((self._bits[ids >> 3] >> (ids & 7)) & 1).astype(bool)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        if self.is_dense and other.is_dense:
+            bits = self._bits & other._bits
+            return Bitmap.from_ids(np.flatnonzero(np.unpackbits(bits, count=self.size, bitorder="little")), self.size)
+        if self.is_dense:
+            return Bitmap(self.size, ids=other._ids[self._contains(other._ids)])
+        if other.is_dense:
+            return Bitmap(self.size, ids=self._ids[other._contains(self._ids)])
+        return Bitmap(self.size, ids=np.intersect1d(self._ids, other._ids, assume_unique=True))
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        if self.is_dense and other.is_dense:
+            return Bitmap(self.size, bits=self._bits | other._bits)
+        return Bitmap.from_ids(np.union1d(self.to_ids(), other.to_ids()), self.size)
+
+    def __len__(self) -> int:
+        if self.is_dense:
+            return int(np.unpackbits(self._bits, count=self.size, bitorder="little").sum())
+        return len(self._ids)
+
+    def __repr__(self) -> str:
+        kind = "dense" if self.is_dense else "sparse"
+        return f"Bitmap({kind}, {len(self)}/{self.size})"
+
+
+def _clean(value: str) -> str:
+    return re.sub(r"\s+", " ", value.strip(" \t\"'<>[]()")).lower()
+
+
+def header_addresses(field_value: str, split_names: str) -> list[str]:
+    """Znormalizowane adresy z pola nagłówka: e-maile, a gdy ich brak - nazwy."""
+    if not field_value or field_value == "N/A":
+        return []
+    emails = [email.lower() for email in EMAIL_RE.findall(field_value)]
+    if emails:
+        return list(dict.fromkeys(emails))
+    names = [_clean(part) for part in re.split(split_names, field_value)]
+    return list(dict.fromkeys(name for name in names if name and name != "..."))
+
+
+def document_facets(text: str, metadata: Optional[dict[str, str]] = None) -> dict[str, list[str]]:
+    """
+    Znormalizowane wartości faset pojedynczego dokumentu.
+
+    Args:
+        text: Tekst dokumentu
+        metadata: Wyciągnięte już metadane maila (domyślnie `extract_email_metadata(text)`)
+
+    Returns:
+        Słownik {pole fasety: lista wartości}; nadawca i odbiorca to adresy e-mail
+        (małe litery) albo nazwy, gdy nagłówek nie zawiera adresu
+    """
+    if metadata is None:
+        metadata = extract_email_metadata(text)
+    senders = header_addresses(metadata["from"], split_names=r";")
+    recipients = header_addresses(metadata["to"], split_names=r";")
+    domains = [address.split("@", 1)[1] for address in senders + recipients if "@" in address]
+    return {
+        "sender": senders,
+        "recipient": recipients,
+        "domain": list(dict.fromkeys(domains)),
+        "content_type": [classify_content_type(text)[0]],
+    }
+
+
+class _Facet:
+    """Jedno pole fasety: wartości, mapa bitowa każdej wartości i kody wartości per dokument (CSR)."""
+
+    def __init__(self, size: int, values: list[str], doc_offsets: np.ndarray, codes: np.ndarray):
+        self.values = values
+        self.codes_by_value = {value: code for code, value in enumerate(values)}
+        self.doc_offsets = doc_offsets
+        self.codes = codes
+
+        # Transpozycja CSR: dla każdej wartości posortowane id dokumentów
+        doc_ids = np.repeat(np.arange(size, dtype=np.int32), np.diff(doc_offsets))
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.searchsorted(codes[order], np.arange(len(values) + 1))
+        sorted_docs = doc_ids[order]
+        self.bitmaps = [
+            Bitmap.from_ids(sorted_docs[boundaries[code] : boundaries[code + 1]], size) for code in range(len(values))
+        ]
+
+    def counts(self, doc_ids: np.ndarray) -> np.ndarray:
+        """Liczba dokumentów z `doc_ids` dla każdego kodu wartości."""
+        starts = self.doc_offsets[doc_ids]
+        lengths = self.doc_offsets[doc_ids + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(len(self.values), dtype=np.int64)
+        # Indeksy wszystkich kodów wskazanych dokumentów bez pętli w Pythonie
+        shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = shifts + np.arange(total)
+        return np.bincount(self.codes[positions], minlength=len(self.values))
+
+
+class FacetIndex:
+    """
+    Indeks faset korpusu.
+
+    Args:
+        size: Liczba dokumentów w korpusie
+        facets: Pola faset (nazwa -> `_Facet`)
+        labels: Czytelne etykiety wartości (np. "Jan Kowalski <jan@x.com>" dla "jan@x.com")
+    """
+
+    def __init__(self, size: int, facets: dict[str, _Facet], labels: dict[str, dict[str, str]]):
+        self.size = size
+        self.facets = facets
+        self.labels = labels
+
+    @classmethod
+    def build(cls, texts: Iterable[str], metadata: Optional[Iterable[dict[str, str]]] = None) -> "FacetIndex":
+        """
+        Buduje indeks z tekstów dokumentów (id dokumentu = pozycja w sekwencji).
+
+        Args:
+            texts: Teksty dokumentów
+            metadata: Metadane maili równoległe do `texts` (domyślnie wyciągane tutaj)
+        """
+        if metadata is None:
+            metadata = map(extract_email_metadata, texts)
+
+        values: dict[str, dict[str, int]] = {field: {} for field in FACET_FIELDS}
+        codes: dict[str, list[int]] = {field: [] for field in FACET_FIELDS}
+        counts: dict[str, list[int]] = {field: [0] for field in FACET_FIELDS}
+        labels: dict[str, dict[str, str]] = {"sender": {}, "recipient": {}}
+
+        size = 0
+        for text, document_metadata in zip(texts, metadata):
+            size += 1
+            document = document_facets(text, document_metadata)
+            for field in FACET_FIELDS:
+                field_values = values[field]
+                for value in document[field]:
+                    codes[field].append(field_values.setdefault(value, len(field_values)))
+                counts[field].append(len(document[field]))
+            for field, header in (("sender", "from"), ("recipient", "to")):
+                if len(document[field]) == 1:
+                    labels[field].setdefault(document[field][0], document_metadata[header])
+
+        facets = {
+            field: _Facet(
+                size,
+                list(values[field]),
+                np.cumsum(np.array(counts[field], dtype=np.int64)),
+                np.array(codes[field], dtype=np.int32),
+            )
+            for field in FACET_FIELDS
+        }
+        return cls(size, facets, labels)
+
+    def merged(self, changes: CorpusChanges, added: "FacetIndex") -> "FacetIndex":
+        """
+        Indeks nowej wersji korpusu: wartości niezmienionych dokumentów z tego indeksu, dodanych z `added`.
+
+        Args:
+            changes: Zmiany między wersjami korpusu
+            added: Indeks zbudowany tylko z dodanych dokumentów (w kolejności `changes.added`)
+        """
+        facets = {}
+        for field in FACET_FIELDS:
+            facet, added_facet = self.facets[field], added.facets[field]
+            values, added_codes = merge_values(facet.values, added_facet.values, facet.codes_by_value)
+            offsets, (codes,) = changes.carry_rows(
+                facet.doc_offsets, [facet.codes], added_facet.doc_offsets, [added_codes[added_facet.codes]]
+            )
+            # Wartości tylko z usuniętych dokumentów znikają z indeksu
+            used, remap = compact_codes(codes, len(values))
+            facets[field] = _Facet(
+                changes.size, [values[code] for code in used], offsets, remap[codes].astype(np.int32)
+            )
+
+        labels = {
+            field: {value: label for value, label in field_labels.items() if value in facets[field].codes_by_value}
+            for field, field_labels in self.labels.items()
+        }
+        for field, field_labels in added.labels.items():
+            for value, label in field_labels.items():
+                labels[field].setdefault(value, label)
+        return FacetIndex(changes.size, facets, labels)
+
+    def label(self, field: str, value: str) -> str:
+        """Etykieta wartości do wyświetlenia (domyślnie sama wartość)."""
+        return self.labels.get(field, {}).get(value, value)
+
+    def bitmap(self, field: str, value: str) -> Bitmap:
+        """Mapa bitowa dokumentów z daną wartością fasety (pusta dla nieznanej wartości)."""
+        facet = self._facet(field)
+        code = facet.codes_by_value.get(value)
+        if code is None:
+            return Bitmap(self.size, ids=np.empty(0, dtype=np.int32))
+        return facet.bitmaps[code]
+
+    def select(self, field: str, values: Iterable[str]) -> Bitmap:
+        """Dokumenty z dowolną z podanych wartości fasety (suma map bitowych)."""
+        selected = None
+        for value in values:
+            bitmap = self.bitmap(field, value)
+            selected = bitmap if selected is None else selected | bitmap
+        return selected if selected is not None else Bitmap(self.size, ids=np.empty(0, dtype=np.int32))
+
+    def filter(
+        self, doc_ids: np.ndarray, filters: Mapping[str, Iterable[str]], skip: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Zawęża id dokumentów do pasujących do filtrów.
+
+        W obrębie pola wartości są łączone przez OR, między polami przez AND.
+
+        Args:
+            doc_ids: Posortowane id dokumentów (np. wynik wyszukiwania)
+            filters: {pole fasety: wybrane wartości}; puste listy są pomijane
+            skip: Pole pominięte przy filtrowaniu (do liczników faset)
+
+        Returns:
+            Posortowane id dokumentów
+        """
+        result = Bitmap.from_ids(doc_ids, self.size)
+        for field, values in filters.items():
+            values = list(values)
+            if field == skip or not values:
+                continue
+            result = result & self.select(field, values)
+        return result.to_ids().astype(np.int64)
+
+    def counts(
+        self, doc_ids: np.ndarray, filters: Optional[Mapping[str, Iterable[str]]] = None, top: int = 20
+    ) -> dict[str, dict[str, int]]:
+        """
+        Liczniki faset dla wyników wyszukiwania.
+
+        Licznik pola uwzględnia filtry pozostałych pól, ale nie własny - dzięki temu
+        po wybraniu nadawcy widać nadal pozostałych nadawców i można rozszerzyć wybór.
+
+        Returns:
+            {pole fasety: {wartość: liczba dokumentów}} - `top` najczęstszych wartości
+            (malejąco) oraz zawsze wartości wybrane w filtrach
+        """
+        filters = {field: list(values) for field, values in (filters or {}).items()}
+        result = {}
+        for field in FACET_FIELDS:
+            facet = self.facets[field]
+            ids = self.filter(doc_ids, filters, skip=field) if filters else np.asarray(doc_ids, dtype=np.int64)
+            counts = facet.counts(ids)
+            order = np.argsort(-counts, kind="stable")[:top]
+            field_counts = {facet.values[code]: int(counts[code]) for code in order if counts[code] > 0}
+            for value in filters.get(field, []):
+                code = facet.codes_by_value.get(value)
+                field_counts.setdefault(value, 0 if code is None else int(counts[code]))
+            result[field] = field_counts
+        return result
+
+    def _facet(self, field: str) -> _Facet:
+        facet = self.facets.get(field)
+        if facet is None:
+            raise ValueError(f"Nieznane pole fasety: {field!r} (dostępne: {', '.join(FACET_FIELDS)})")
+        return facet
+
+
+def validate_filters(filters: Mapping[str, Iterable[str]]) -> None:
+    """Sprawdza nazwy pól filtrów fasetowych."""
+    unknown = [field for field in filters if field not in FACET_FIELDS]
+    if unknown:
+        raise ValueError(f"Nieznane pole fasety: {', '.join(unknown)} (dostępne: {', '.join(FACET_FIELDS)})")
+
+
+def get_facet_index(corpus) -> FacetIndex:
+    """Zwraca (budując przy pierwszym użyciu razem z indeksem dat) indeks faset korpusu."""
+    from search_engine.headers import get_header_indexes
+
+    return get_header_indexes(corpus).facets
@@ -0,0 +1,500 @@
+"""
+Rejestr wielu korpusów i wyszukiwanie federacyjne.
+
+Kilka powiązanych zbiorów (kolejne wydania, własne partie OCR) jest trzymanych obok siebie,
+każdy jako osobny `Corpus` z własnymi indeksami. Korpus można załadować, przeładować ze
+źródła albo zwolnić niezależnie od pozostałych: nowy korpus jest ładowany (i rozgrzewany)
+poza blokadą rejestru i podmieniany atomowo, więc trwające zapytania kończą się na starym.
+Przeładowanie jest przyrostowe (`search_engine.updates`): indeksy niezmienionych dokumentów
+są przenoszone ze starego korpusu, a `refresh_if_changed` przeładowuje korpus tylko po zmianie
+rewizji źródła.
+
+Zapytanie federacyjne jest wykonywane równolegle na wybranych korpusach (osobna pula wątków
+rejestru - bez zakleszczenia z pulą serwera), a wyniki są scalane z oznaczeniem źródła:
+przy kolejności po typie - typ, potem pozycja w wynikach własnego korpusu (naprzemiennie),
+przy kolejności po dacie - data z indeksu dat każdego korpusu. Liczniki faset i oś czasu
+są sumowane; błąd jednego korpusu nie przerywa zapytania, tylko trafia do `errors`.
+"""
+
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Mapping, Optional
+
+import numpy as np
+
+from instrumentation import increment, timed
+from search_engine.blockstore import DEFAULT_BLOCK_SIZE
+from search_engine.corpus import DEFAULT_SPLIT, Corpus, load_corpus
+from search_engine.dates import get_date_index
+from search_engine.search import DEFAULT_LIMIT, TYPE_ORDER, SearchHit, SearchResult, search
+from search_engine.updates import source_revision, update_corpus, warm_indexes
+
+logger = logging.getLogger(__name__)
+
+# Nazwy korpusów trafiają do ścieżek URL (/corpora/<nazwa>) - litery, cyfry, "_", "-" i "."
+CORPUS_NAME_PATTERN = re.compile(r"[\w.-]{1,64}")
+
+# Maksymalna liczba korpusów przeszukiwanych jednocześnie przez pulę rejestru
+MAX_PARALLEL_CORPORA = 8
+
+
+def corpus_name(source: str) -> str:
+    """
+    Domyślna nazwa korpusu dla źródła: nazwa pliku bez rozszerzenia albo ostatni człon nazwy zbioru.
+
+    >>> corpus_name("tensonaut/EPSTEIN_FILES_20K")
+    'EPSTEIN_FILES_20K'
+    """
+    name = Path(source).stem if Path(source).suffix else source.rstrip("/").rsplit("/", 1)[-1]
+    return re.sub(r"[^\w.-]+", "-", name)[:64] or "corpus"
+
+
+def validate_corpus_name(name: str) -> str:
+    """
+    Raises:
+        ValueError: Pusta nazwa albo znaki spoza liter, cyfr, "_", "-" i "."
+    """
+    if not isinstance(name, str) or not CORPUS_NAME_PATTERN.fullmatch(name):
+        raise ValueError(f"Niepoprawna nazwa korpusu: {name!r} (dozwolone litery, cyfry, '_', '-' i '.')")
+    return name
+
+
+@dataclass(frozen=True)
+class CorpusSource:
+    """Skąd korpus został załadowany - wystarcza do przeładowania."""
+
+    source: str
+    split: str = DEFAULT_SPLIT
+    compression: Optional[str] = None
+    block_size: int = DEFAULT_BLOCK_SIZE
+
+    def load(self, revision: Optional[str] = None) -> Corpus:
+        return load_corpus(
+            self.source, split=self.split, compression=self.compression, block_size=self.block_size, revision=revision
+        )
+
+    def revision(self) -> Optional[str]:
+        """Bieżąca rewizja źródła (None - nie da się jej ustalić)."""
+        return source_revision(self.source)
+
+
+@dataclass
+class RegisteredCorpus:
+    """Korpus w rejestrze wraz ze źródłem i chwilą załadowania."""
+
+    name: str
+    corpus: Corpus
+    source: Optional[CorpusSource] = None
+    loaded_at: float = field(default_factory=time.time)
+    # Numer załadowania (1 - pierwsze, każde przeładowanie zwiększa o 1)
+    generation: int = 1
+    # Rewizja źródła w chwili załadowania (None - nieznana)
+    revision: Optional[str] = None
+    # Zmiany względem poprzedniej wersji przy przeładowaniu przyrostowym (`CorpusChanges.to_dict` i czas)
+    changes: Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "documents": len(self.corpus),
+            "source": self.source.source if self.source else None,
+            "split": self.source.split if self.source else None,
+            "compression": self.source.compression if self.source else None,
+            "loaded_at": datetime.fromtimestamp(self.loaded_at).isoformat(timespec="seconds"),
+            "generation": self.generation,
+            "revision": self.revision,
+            "changes": self.changes,
+        }
+
+
+@dataclass
+class FederatedHit(SearchHit):
+    """Wynik wyszukiwania federacyjnego - `doc_id` jest numerem dokumentu w korpusie `corpus`."""
+
+    corpus: str = ""
+
+
+@dataclass
+class FederatedResult(SearchResult):
+    """Scalony wynik z kilku korpusów; `total`, fasety i oś czasu są sumami po korpusach."""
+
+    # Liczba trafień w każdym korpusie
+    corpora: dict[str, int] = field(default_factory=dict)
+    # Korpusy, których nie udało się przeszukać {nazwa: komunikat błędu}
+    errors: dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        payload = super().to_dict()
+        payload["corpora"] = self.corpora
+        payload["errors"] = self.errors
+        return payload
+
+
+class CorpusRegistry:
+    """
+    Nazwane korpusy ładowane, przeładowywane i zwalniane niezależnie (bezpieczne dla wielu wątków).
+
+    Args:
+        prepare: Wywoływane dla każdego nowo załadowanego korpusu przed udostępnieniem go
+            zapytaniom (np. budowa indeksów faset i dat)
+        max_workers: Wątki puli przeszukującej korpusy równolegle
+    """
+
+    def __init__(self, prepare: Optional[Callable[[Corpus], None]] = None, max_workers: int = MAX_PARALLEL_CORPORA):
+        self.prepare = prepare
+        self._entries: dict[str, RegisteredCorpus] = {}
+        self._lock = threading.Lock()
+        # Blokady ładowania per nazwa - dwa równoczesne przeładowania tego samego korpusu nie ładują go dwa razy
+        self._loading: dict[str, threading.Lock] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="federation")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def names(self) -> list[str]:
+        """Nazwy korpusów w kolejności rejestracji."""
+        with self._lock:
+            return list(self._entries)
+
+    def entries(self) -> list[RegisteredCorpus]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def entry(self, name: str) -> RegisteredCorpus:
+        """
+        Raises:
+            KeyError: Brak korpusu o tej nazwie
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Nieznany korpus: {name!r}")
+        return entry
+
+    def get(self, name: str) -> Corpus:
+        """Korpus o danej nazwie (KeyError, gdy nie jest załadowany)."""
+        return self.entry(name).corpus
+
+    def add(
+        self,
+        name: str,
+        corpus: Corpus,
+        source: Optional[CorpusSource] = None,
+        revision: Optional[str] = None,
+        changes: Optional[dict] = None,
+    ) -> RegisteredCorpus:
+        """Rejestruje gotowy korpus (zastępuje korpus o tej samej nazwie); `prepare` nie jest wywoływane."""
+        validate_corpus_name(name)
+        with self._lock:
+            previous = self._entries.get(name)
+            generation = previous.generation + 1 if previous else 1
+            entry = RegisteredCorpus(name, corpus, source, generation=generation, revision=revision, changes=changes)
+            self._entries[name] = entry
+        return entry
+
+    def load(
+        self,
+        name: str,
+        source: str,
+        split: str = DEFAULT_SPLIT,
+        compression: Optional[str] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> RegisteredCorpus:
+        """
+        Ładuje korpus ze źródła (zbiór Hugging Face, plik .parquet/.jsonl) i rejestruje go pod nazwą.
+
+        Korpus o tej samej nazwie pozostaje dostępny do chwili podmiany na nowy.
+
+        Raises:
+            ValueError: Niepoprawna nazwa, brak wymaganych kolumn albo nieznany kodek
+        """
+        validate_corpus_name(name)
+        return self._load(name, CorpusSource(source, split, compression, block_size))
+
+    def get_or_load(
+        self,
+        name: str,
+        source: str,
+        split: str = DEFAULT_SPLIT,
+        compression: Optional[str] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> Corpus:
+        """Korpus z rejestru; ładowany tylko, gdy go jeszcze nie ma (także przy równoczesnych wywołaniach)."""
+        validate_corpus_name(name)
+        with self._name_lock(name):
+            if name in self._entries:
+                return self.get(name)
+            return self._load_locked(name, CorpusSource(source, split, compression, block_size)).corpus
+
+    def refresh(self, name: str, incremental: bool = True) -> RegisteredCorpus:
+        """
+        Przeładowuje korpus z jego źródła (np. po aktualizacji zbioru) i podmienia go atomowo.
+
+        Przy przeładowaniu przyrostowym indeksy niezmienionych dokumentów są przenoszone ze starego
+        korpusu i liczone tylko dla dodanych; pozostałe indeksy zbudowane w starym korpusie są
+        odbudowywane w tle, już po podmianie.
+
+        Args:
+            name: Nazwa korpusu
+            incremental: False - wszystkie indeksy budowane od nowa
+
+        Raises:
+            KeyError: Brak korpusu o tej nazwie
+            ValueError: Korpus dodany bez źródła (`add`) - nie ma skąd go przeładować
+        """
+        source = self._source(name)
+        with self._name_lock(name):
+            return self._load_locked(name, source, self.entry(name) if incremental else None)
+
+    def refresh_if_changed(self, name: str, revision: Optional[str] = None) -> Optional[RegisteredCorpus]:
+        """
+        Przeładowuje korpus przyrostowo tylko wtedy, gdy zmieniła się rewizja jego źródła.
+
+        Args:
+            name: Nazwa korpusu
+            revision: Sprawdzona już rewizja źródła (domyślnie ustalana tutaj)
+
+        Returns:
+            Nowy wpis albo None, gdy źródło się nie zmieniło lub jego rewizji nie da się ustalić
+
+        Raises:
+            KeyError: Brak korpusu o tej nazwie
+            ValueError: Korpus dodany bez źródła (`add`)
+        """
+        source = self._source(name)
+        revision = revision or source.revision()
+        if revision is None or revision == self.entry(name).revision:
+            return None
+        with self._name_lock(name):
+            entry = self.entry(name)
+            # Inny wątek mógł przeładować korpus, zanim dostaliśmy blokadę
+            if revision == entry.revision:
+                return None
+            return self._load_locked(name, source, entry)
+
+    def unload(self, name: str) -> None:
+        """
+        Usuwa korpus z rejestru; pamięć jest zwalniana po zakończeniu trwających na nim zapytań.
+
+        Raises:
+            KeyError: Brak korpusu o tej nazwie
+        """
+        with self._lock:
+            if self._entries.pop(name, None) is None:
+                raise KeyError(f"Nieznany korpus: {name!r}")
+        logger.info("Zwolniono korpus %s", name)
+
+    def search(self, query: str, names: Optional[Iterable[str]] = None, **options) -> FederatedResult:
+        """
+        Wyszukiwanie federacyjne w wybranych korpusach (domyślnie we wszystkich).
+
+        Raises:
+            KeyError: Nieznana nazwa korpusu
+            ValueError: Jak w `search` (tryb, kolejność, filtry, wzorzec)
+        """
+        if names is None:
+            selected = {entry.name: entry.corpus for entry in self.entries()}
+        else:
+            selected = {name: self.get(name) for name in names}
+        return federated_search(selected, query, executor=self._executor, **options)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def _name_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            return self._loading.setdefault(name, threading.Lock())
+
+    def _load(self, name: str, source: CorpusSource) -> RegisteredCorpus:
+        with self._name_lock(name):
+            return self._load_locked(name, source)
+
+    def _source(self, name: str) -> CorpusSource:
+        source = self.entry(name).source
+        if source is None:
+            raise ValueError(f"Korpus {name!r} nie ma źródła do przeładowania")
+        return source
+
+    def _load_locked(
+        self, name: str, source: CorpusSource, previous: Optional[RegisteredCorpus] = None
+    ) -> RegisteredCorpus:
+        # Rewizja ustalana przed wczytaniem - zmiana w trakcie ładowania zostanie wykryta przy następnym sprawdzeniu
+        revision = source.revision()
+        changes = None
+        with timed("federation.load"):
+            corpus = source.load(revision)
+            if previous is not None:
+                started = time.perf_counter()
+                changes = update_corpus(previous.corpus, corpus).to_dict()
+                changes["seconds"] = round(time.perf_counter() - started, 3)
+            if self.prepare is not None:
+                self.prepare(corpus)
+        entry = self.add(name, corpus, source, revision=revision, changes=changes)
+        if previous is None:
+            logger.info("Załadowano korpus %s (%d dokumentów) z %s", name, len(corpus), source.source)
+        else:
+            logger.info("Przeładowano przyrostowo korpus %s: %s", name, changes)
+            self._executor.submit(self._warm, name, corpus, previous.corpus)
+        return entry
+
+    def _warm(self, name: str, corpus: Corpus, previous: Corpus) -> None:
+        """Buduje (w tle) indeksy, które stary korpus miał zbudowane, a nie dało się ich przenieść."""
+        try:
+            with timed("federation.warm"):
+                built = warm_indexes(corpus, previous)
+        except Exception:
+            logger.exception("Błąd budowy indeksów przeładowanego korpusu %s", name)
+            return
+        if built:
+            logger.info("Zbudowano w tle indeksy korpusu %s: %s", name, ", ".join(built))
+
+
+def federated_search(
+    corpora: Mapping[str, Corpus],
+    query: str,
+    case_sensitive: bool = False,
+    limit: int = DEFAULT_LIMIT,
+    executor: Optional[Executor] = None,
+    **options,
+) -> FederatedResult:
+    """
+    Wyszukuje w kilku korpusach i scala wyniki z oznaczeniem źródła.
+
+    Args:
+        corpora: Przeszukiwane korpusy {nazwa: korpus}; kolejność rozstrzyga remisy przy scalaniu
+        query: Szukana fraza
+        case_sensitive: Czy rozróżniać wielkość liter
+        limit: Maksymalna liczba scalonych wyników (każdy korpus zwraca co najwyżej tyle samo)
+        executor: Pula do równoległego przeszukiwania (None - korpusy kolejno)
+        **options: Pozostałe parametry `search` (mode, filters, sort, facets, timeline, ...)
+
+    Returns:
+        FederatedResult z wynikami typu `FederatedHit` i liczbą trafień w każdym korpusie
+
+    Raises:
+        ValueError: Jak w `search` - niepoprawne zapytanie jest błędem we wszystkich korpusach
+    """
+    increment("federation.queries")
+
+    def run(corpus: Corpus) -> SearchResult:
+        return search(corpus, query, case_sensitive, limit, **options)
+
+    results: dict[str, SearchResult] = {}
+    errors: dict[str, str] = {}
+    with timed("federation.search"):
+        if executor is None or len(corpora) < 2:
+            futures = None
+        else:
+            futures = {name: executor.submit(run, corpus) for name, corpus in corpora.items()}
+        for name, corpus in corpora.items():
+            try:
+                results[name] = futures[name].result() if futures else run(corpus)
+            except ValueError:
+                raise
+            except Exception as e:
+                logger.exception("Błąd wyszukiwania w korpusie %s", name)
+                errors[name] = str(e)
+
+    with timed("federation.merge"):
+        sort = options.get("sort", "type")
+        dates = {name: get_date_index(corpora[name]).dates for name in results} if sort != "type" else {}
+
+        def date_of(name: str, hit: SearchHit) -> np.datetime64:
+            return dates[name][hit.doc_id]
+
+        return merge_results(results, query, limit, sort, date_of if sort != "type" else None, errors)
+
+
+def merge_results(
+    results: Mapping[str, SearchResult],
+    query: str,
+    limit: int = DEFAULT_LIMIT,
+    sort: str = "type",
+    date_of: Optional[Callable[[str, SearchHit], np.datetime64]] = None,
+    errors: Optional[dict[str, str]] = None,
+    interleave: bool = True,
+) -> FederatedResult:
+    """
+    Scala wyniki wyszukiwania z kilku źródeł (korpusów albo shardów) w jeden ranking.
+
+    Args:
+        results: Wyniki każdego źródła {nazwa: wynik}; kolejność rozstrzyga remisy
+        query: Zapytanie (gdy żadne źródło nie zwróciło wyniku)
+        limit: Maksymalna liczba scalonych wyników
+        sort: Kolejność wyników źródeł ("type", "date_desc", "date_asc")
+        date_of: Data wyniku (NaT - brak daty); wymagana przy kolejności po dacie
+        errors: Źródła, których nie udało się przeszukać {nazwa: komunikat}
+        interleave: W obrębie typu wyniki źródeł naprzemiennie (korpusy); False - jak `search` na źródłach
+            złączonych po kolei (shardy jednego korpusu): pierwsze `limit` dokumentów, potem po typie
+    """
+    keyed = []
+    for rank, (name, result) in enumerate(results.items()):
+        for position, hit in enumerate(result.hits):
+            if sort == "type":
+                type_rank = TYPE_ORDER.get(hit.content_type, len(TYPE_ORDER))
+                key = (type_rank, position, rank) if interleave else (rank, hit.doc_id)
+            else:
+                # Dokumenty bez daty na końcu, w obu kierunkach. Remisy jak w `DateIndex.sort` na źródłach
+                # złączonych po kolei (shardy: jak na całym korpusie) - malejąco od ostatniego dokumentu
+                date = date_of(name, hit)
+                if np.isnat(date):
+                    key = (True, 0, rank, position)
+                else:
+                    value = int(date.astype("datetime64[s]").astype(np.int64))
+                    key = (False, -value, -rank, -position) if sort == "date_desc" else (False, value, rank, position)
+            keyed.append((key, FederatedHit(**hit.to_dict(), corpus=name)))
+    keyed.sort(key=lambda item: item[0])
+    hits = [hit for _key, hit in keyed[:limit]]
+    if sort == "type" and not interleave:
+        hits.sort(key=lambda hit: TYPE_ORDER.get(hit.content_type, len(TYPE_ORDER)))
+
+    terms: list[str] = []
+    facets: dict[str, dict[str, int]] = {}
+    timeline: dict[str, int] = {}
+    suggestions: dict[str, dict] = {}
+    for result in results.values():
+        terms.extend(term for term in result.terms if term not in terms)
+        for facet, counts in result.facets.items():
+            merged = facets.setdefault(facet, {})
+            for value, count in counts.items():
+                merged[value] = merged.get(value, 0) + count
+        for month, count in result.timeline.items():
+            timeline[month] = timeline.get(month, 0) + count
+        for suggestion in result.suggestions:
+            known = suggestions.get(suggestion["query"])
+            if known is None:
+                suggestions[suggestion["query"]] = dict(suggestion)
+            else:
+                known["hits"] += suggestion["hits"]
+
+    total = sum(result.total for result in results.values())
+    return FederatedResult(
+        query=next((result.query for result in results.values()), query.strip()),
+        total=total,
+        hits=hits,
+        terms=terms,
+        facets={
+            facet: dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+            for facet, counts in facets.items()
+        },
+        timeline=dict(sorted(timeline.items())),
+        collapsed=sum(result.collapsed for result in results.values()),
+        truncated=any(result.truncated for result in results.values()),
+        # Podpowiedzi tylko, gdy zapytanie nie znalazło nic w żadnym korpusie
+        suggestions=(
+            sorted(suggestions.values(), key=lambda item: (-item["hits"] / 10 ** item["distance"], item["query"]))
+            if not total
+            else []
+        ),
+        corpora={name: result.total for name, result in results.items()},
+        errors=errors or {},
+    )
@@ -0,0 +1,51 @@
+"""
+Formatowanie tekstu maili do wyświetlenia (HTML z akapitami i podświetleniem).
+
+Czyste funkcje bez zależności od Streamlit - używane przez aplikację i benchmarki.
+"""
+
+import re
+
+
+def format_email_text(text, highlight_pattern=None, case_sensitive=False):
+    """
+    Formatuje tekst maila z podziałem na akapity i podświetleniem.
+
+    `highlight_pattern` to fraza albo lista termów (np. warianty z wyszukiwania przybliżonego);
+    lista jest podświetlana jako całe słowa.
+    """
+    if not text or not text.strip():
+        return ""
+
+    # Podziel na akapity
+    paragraphs = text.split("\n\n")
+    if len(paragraphs) == 1:
+        paragraphs = [p for p in text.split("\n") if p.strip()]
+
+    formatted_paragraphs = []
+    for para in paragraphs:
+        if not para.strip():
+            continue
+
+        para = " ".join(para.split())
+
+        # Podświetl jeśli jest wzorzec
+        if highlight_pattern:
+            try:
+                if isinstance(highlight_pattern, str):
+                    regex = re.escape(highlight_pattern)
+                else:
+                    regex = r"\b(?:" + "|".join(re.escape(term) for term in highlight_pattern) + r")\b"
+                pattern = re.compile(regex, re.IGNORECASE if not case_sensitive else 0)
+                para = pattern.sub(
+                    lambda m: f"<mark style='background-color: #ffeb3b; padding: 2px 4px; border-radius: 3px; font-weight: bold;'>{m.group()}</mark>",
+                    para,
+                )
+            except (re.error, Exception):
+                pass
+
+        formatted_paragraphs.append(
+            f"<p style='margin-bottom: 1em; line-height: 1.6; text-align: left; word-wrap: break-word;'>{para}</p>"
+        )
+
+    return "\n".join(formatted_paragraphs)
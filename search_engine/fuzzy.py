@@ -0,0 +1,239 @@
+"""
+Wyszukiwanie przybliżone odporne na błędy OCR ("Epstien", "Maxwel1").
+
+Indeks usunięć w stylu SymSpell: dla każdego termu słownika zapisujemy wszystkie
+warianty powstałe przez usunięcie do `max_distance` znaków (z prefiksu termu).
+Zapytanie generuje swoje warianty usunięć, a kandydaci ze wspólnym wariantem są
+weryfikowani ograniczoną odległością Damerau-Levenshteina. Nie ma skanu całego
+słownika ani korpusu - koszt zależy tylko od długości zapytania.
+
+Warianty są trzymane jako 64-bitowe hashe w posortowanej tablicy NumPy
+(wyszukiwanie przez `searchsorted`), co jest wielokrotnie oszczędniejsze niż słownik.
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+from instrumentation import timed
+from search_engine.vocabulary import Vocabulary, get_vocabulary, tokenize
+
+DEFAULT_MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+MIN_TERM_LENGTH = 3
+MAX_TERM_LENGTH = 30
+
+
+def damerau_levenshtein(first: str, second: str, max_distance: int) -> int:
+    """
+    Ograniczona odległość Damerau-Levenshteina (wariant OSA - z transpozycją sąsiednich znaków).
+
+    Returns:
+        Odległość lub `max_distance + 1`, jeśli przekracza limit
+    """
+    if first == second:
+        return 0
+    len_first, len_second = len(first), len(second)
+    if abs(len_first - len_second) > max_distance:
+        return max_distance + 1
+
+    previous_previous: Optional[list[int]] = None
+    previous = list(range(len_second + 1))
+    for i in range(1, len_first + 1):
+        current = [i] + [0] * len_second
+        row_min = current[0]
+        char_first = first[i - 1]
+        for j in range(1, len_second + 1):
+            cost = 0 if char_first == second[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (
+                previous_previous is not None
+                and j > 1
+                and char_first == second[j - 2]
+                and first[i - 2] == second[j - 1]
+            ):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+
+    distance = previous[len_second]
+    return distance if distance <= max_distance else max_distance + 1
+
+
+def _deletes(term: str, max_distance: int) -> set[str]:
+    """Warianty prefiksu termu powstałe przez usunięcie do `max_distance` znaków (łącznie z samym prefiksem)."""
+    key = term[:PREFIX_LENGTH]
+    result = {key}
+    frontier = [key]
+    for _ in range(max_distance):
+        next_frontier = []
+        for word in frontier:
+            if len(word) <= 1:
+                continue
+            for i in range(len(word)):
+                variant = word[:i] + word[i + 1 :]
+                if variant not in result:
+                    result.add(variant)
+                    next_frontier.append(variant)
+        frontier = next_frontier
+    return result
+
+
+def effective_distance(term: str, max_distance: int) -> int:
+    """Ogranicza dopuszczalną odległość dla krótkich termów (inaczej "to" pasowałoby do wszystkiego)."""
+    if len(term) < MIN_TERM_LENGTH + 1:
+        return 0
+    if len(term) < 6:
+        return min(max_distance, 1)
+    return max_distance
+
+
+class DeletionIndex:
+    """
+    Indeks usunięć (SymSpell) nad słownikiem korpusu.
+
+    Args:
+        vocabulary: Słownik korpusu
+        max_distance: Maksymalna odległość edycyjna obsługiwana przez indeks
+        previous: Indeks poprzedniej wersji słownika (po aktualizacji korpusu) - warianty jego termów
+            są przepisywane, a generowane tylko dla nowych termów
+    """
+
+    def __init__(
+        self,
+        vocabulary: Vocabulary,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        previous: Optional["DeletionIndex"] = None,
+    ):
+        self.vocabulary = vocabulary
+        self.max_distance = max_distance
+
+        term_ids = range(len(vocabulary))
+        kept_hashes = np.empty(0, dtype=np.int64)
+        kept_term_ids = np.empty(0, dtype=np.int32)
+        if previous is not None and previous.max_distance == max_distance:
+            remap = np.fromiter(
+                (vocabulary.term_ids.get(term, -1) for term in previous.vocabulary.terms),
+                dtype=np.int64,
+                count=len(previous.vocabulary),
+            )
+            current = remap[previous._term_ids]
+            keep = current >= 0
+            kept_hashes, kept_term_ids = previous._hashes[keep], current[keep].astype(np.int32)
+            known = np.zeros(len(vocabulary), dtype=bool)
+            known[remap[remap >= 0]] = True
+            term_ids = np.flatnonzero(~known).tolist()
+
+        hashes = []
+        new_term_ids = []
+        for term_id in term_ids:
+            term = vocabulary.terms[term_id]
+            if not self._indexable(term):
+                continue
+            for variant in _deletes(term, max_distance):
+                hashes.append(hash(variant))
+                new_term_ids.append(term_id)
+
+        hashes_np = np.concatenate((kept_hashes, np.array(hashes, dtype=np.int64)))
+        order = np.argsort(hashes_np, kind="stable")
+        self._hashes = hashes_np[order]
+        self._term_ids = np.concatenate((kept_term_ids, np.array(new_term_ids, dtype=np.int32)))[order]
+
+    @staticmethod
+    def _indexable(term: str) -> bool:
+        return MIN_TERM_LENGTH <= len(term) <= MAX_TERM_LENGTH and not term.isdigit()
+
+    def candidates(self, term: str, max_distance: int) -> np.ndarray:
+        """Id termów dzielących z `term` przynajmniej jeden wariant usunięcia."""
+        variants = np.array([hash(variant) for variant in _deletes(term, max_distance)], dtype=np.int64)
+        left = np.searchsorted(self._hashes, variants, side="left")
+        right = np.searchsorted(self._hashes, variants, side="right")
+        found = [self._term_ids[start:end] for start, end in zip(left, right) if end > start]
+        if not found:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(found))
+
+    def lookup(self, term: str, max_distance: Optional[int] = None) -> list[tuple[str, int]]:
+        """
+        Znajduje termy słownika w odległości co najwyżej `max_distance` od `term`.
+
+        Returns:
+            Lista (term, odległość) posortowana po odległości i malejącej częstości
+        """
+        term = term.lower()
+        max_distance = min(self.max_distance if max_distance is None else max_distance, self.max_distance)
+
+        matches = []
+        if term in self.vocabulary:
+            matches.append((term, 0))
+        if max_distance > 0:
+            for term_id in self.candidates(term, max_distance):
+                candidate = self.vocabulary.terms[term_id]
+                if candidate == term:
+                    continue
+                distance = damerau_levenshtein(term, candidate, max_distance)
+                if distance <= max_distance:
+                    matches.append((candidate, distance))
+
+        matches.sort(key=lambda match: (match[1], -self.vocabulary.frequency(match[0]), match[0]))
+        return matches
+
+
+def get_deletion_index(corpus) -> DeletionIndex:
+    """Zwraca (budując przy pierwszym użyciu) indeks usunięć korpusu."""
+
+    def _build(corpus):
+        vocabulary = get_vocabulary(corpus)
+        with timed("index.deletion"):
+            return DeletionIndex(vocabulary)
+
+    return corpus.get_index("deletion_index", _build)
+
+
+def expand_query(corpus, query: str, max_distance: int = 1) -> list[list[str]]:
+    """
+    Rozwija każde słowo zapytania do termów słownika w zadanej odległości.
+
+    Returns:
+        Lista (dla każdego słowa zapytania) list pasujących termów
+    """
+    index = get_deletion_index(corpus)
+    expansions = []
+    for word in tokenize(query):
+        distance = effective_distance(word, max_distance)
+        expansions.append([term for term, _distance in index.lookup(word, distance)])
+    return expansions
+
+
+def fuzzy_match(corpus, query: str, max_distance: int = 1) -> tuple[np.ndarray, list[str]]:
+    """
+    Dokumenty pasujące do zapytania z tolerancją błędów.
+
+    Dokument pasuje, jeśli zawiera (dla każdego słowa zapytania) przynajmniej jeden
+    term z rozwinięcia tego słowa.
+
+    Returns:
+        (posortowane id dokumentów, lista wszystkich dopasowanych termów)
+    """
+    vocabulary = get_vocabulary(corpus)
+    with timed("search.fuzzy_expand"):
+        expansions = expand_query(corpus, query, max_distance)
+
+    if not expansions or any(not terms for terms in expansions):
+        return np.empty(0, dtype=np.int64), sorted({term for terms in expansions for term in terms})
+
+    doc_ids: Optional[np.ndarray] = None
+    for terms in expansions:
+        postings = vocabulary.union_postings(terms)
+        doc_ids = postings if doc_ids is None else np.intersect1d(doc_ids, postings, assume_unique=True)
+    matched_terms = sorted({term for terms in expansions for term in terms})
+    return doc_ids.astype(np.int64), matched_terms
+
+
+def count_term_occurrences(text: str, terms: Iterable[str]) -> int:
+    """Liczy wystąpienia dowolnego z termów w tekście (całe słowa, bez rozróżniania wielkości liter)."""
+    wanted = set(terms)
+    return sum(1 for token in tokenize(text) if token in wanted)
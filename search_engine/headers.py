@@ -0,0 +1,77 @@
+"""
+Indeksy budowane z nagłówków maili: fasety, daty, wątki i encje.
+
+Metadane (`extract_email_metadata`) są wyciągane raz dla każdego dokumentu,
+w jednym przejściu przy ładowaniu korpusu, i zasilają wszystkie te indeksy.
+Po zmianie zbioru (`update_header_indexes`) metadane są wyciągane tylko z dodanych dokumentów.
+"""
+
+from typing import Iterator, NamedTuple, Sequence
+
+from instrumentation import timed
+from search_engine.dates import DateIndex
+from search_engine.entities import EntityIndex, EntityIndexBuilder
+from search_engine.facets import FacetIndex
+from search_engine.threads import ThreadIndex, thread_keys
+from search_engine.updates import CorpusChanges
+from translation_utils import extract_email_metadata
+
+
+class HeaderIndexes(NamedTuple):
+    facets: FacetIndex
+    dates: DateIndex
+    threads: ThreadIndex
+    entities: EntityIndex
+
+
+def build_header_indexes(texts: Sequence[str]) -> HeaderIndexes:
+    """Buduje indeksy faset, dat, wątków i encji w jednym przejściu po dokumentach."""
+    raw_dates: list[str] = []
+    keys: list[list[int]] = []
+    entities = EntityIndexBuilder()
+
+    def metadata_stream() -> Iterator[dict[str, str]]:
+        for text in texts:
+            metadata = extract_email_metadata(text)
+            raw_dates.append(metadata["date"])
+            keys.append(thread_keys(metadata))
+            entities.add(text, metadata)
+            yield metadata
+
+    facets = FacetIndex.build(texts, metadata_stream())
+    dates = DateIndex.build(raw_dates)
+    return HeaderIndexes(
+        facets=facets,
+        dates=dates,
+        threads=ThreadIndex.build(texts, keys, dates),
+        entities=entities.build(),
+    )
+
+
+def update_header_indexes(indexes: HeaderIndexes, changes: CorpusChanges, texts: Sequence[str]) -> HeaderIndexes:
+    """
+    Indeksy nagłówków nowej wersji korpusu - metadane są wyciągane tylko z dodanych dokumentów.
+
+    Args:
+        indexes: Indeksy poprzedniej wersji korpusu
+        changes: Zmiany między wersjami
+        texts: Teksty dodanych dokumentów (w kolejności `changes.added`)
+    """
+    added = build_header_indexes(texts)
+    dates = indexes.dates.merged(changes, added.dates)
+    return HeaderIndexes(
+        facets=indexes.facets.merged(changes, added.facets),
+        dates=dates,
+        threads=indexes.threads.merged(changes, added.threads, dates),
+        entities=indexes.entities.merged(changes, added.entities),
+    )
+
+
+def get_header_indexes(corpus) -> HeaderIndexes:
+    """Zwraca (budując przy pierwszym użyciu) indeksy nagłówków korpusu."""
+
+    def _build(corpus):
+        with timed("index.headers"):
+            return build_header_indexes(corpus.texts)
+
+    return corpus.get_index("headers", _build)
@@ -0,0 +1,105 @@
+"""
+Test obciążeniowy serwera API wyszukiwarki.
+
+Uruchamia N równoczesnych klientów (każdy z własnym połączeniem keep-alive),
+którzy wysyłają zapytania wyszukiwania, i raportuje opóźnienia p50/p95/p99.
+
+Przykład:
+    python -m search_engine.loadtest --port 8080 --clients 64 --requests 50 --queries queries.txt
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from typing import Optional
+from urllib.parse import urlencode
+
+from search_engine.protocol import encode_request, read_response
+
+DEFAULT_QUERIES = ["Epstein", "Maxwell", "flight", "island", "court", "travel", "Clinton", "payment"]
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Percentyl metodą najbliższej rangi (wartości muszą być posortowane)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def _client(
+    host: str, port: int, queries: list[str], offset: int, requests: int, latencies: list[float], errors: list[str]
+) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(requests):
+            query = queries[(offset + i) % len(queries)]
+            path = "/search?" + urlencode({"q": query, "limit": 20})
+            started = time.perf_counter()
+            writer.write(encode_request("GET", path, host=host))
+            await writer.drain()
+            status, _headers, _body = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(f"HTTP {status}")
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+    finally:
+        writer.close()
+
+
+async def run_load_test(
+    host: str, port: int, queries: list[str], clients: int = 50, requests_per_client: int = 20
+) -> dict:
+    """
+    Uruchamia test obciążeniowy.
+
+    Returns:
+        Raport: liczba żądań, błędów, przepustowość i percentyle opóźnień w milisekundach
+    """
+    latencies: list[float] = []
+    errors: list[str] = []
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(_client(host, port, queries, i, requests_per_client, latencies, errors) for i in range(clients))
+    )
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="search_engine.loadtest", description="Test obciążeniowy serwera API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Adres serwera")
+    parser.add_argument("--port", type=int, default=8080, help="Port serwera")
+    parser.add_argument("--clients", type=int, default=50, help="Liczba równoczesnych klientów")
+    parser.add_argument("--requests", type=int, default=20, help="Liczba żądań na klienta")
+    parser.add_argument("--queries", help="Plik z zapytaniami, jedno na linię")
+    args = parser.parse_args(argv)
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as handle:
+            queries = [line.strip() for line in handle if line.strip()] or DEFAULT_QUERIES
+
+    report = asyncio.run(run_load_test(args.host, args.port, queries, args.clients, args.requests))
+    print(json.dumps(report, indent=2))
+    return 0 if report["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
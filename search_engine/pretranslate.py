@@ -0,0 +1,448 @@
+"""
+Wsadowe tłumaczenie całego korpusu na polski - zadanie offline, wznawialne po przerwaniu.
+
+Tłumaczenie na żądanie w aplikacji kosztuje kilka sekund na dokument, a polskiego tekstu
+nie da się przeszukiwać. To zadanie tłumaczy korpus z góry: długie dokumenty są dzielone na
+fragmenty, a krótkie pakowane po kilka w jedno żądanie (`translate_documents`). Żądania są
+wysyłane do usługi tłumaczenia z kilku wątków naraz, ze wspólnym limitem żądań na sekundę
+i ponawianiem nieudanych żądań.
+
+Tłumaczenia trafiają do katalogu plików Parquet (kolumny `content_hash`, `filename`, `text_pl`),
+dopisywanych co `checkpoint_every` dokumentów. Zapisany plik jest kompletny (zapis do pliku
+tymczasowego i zmiana nazwy), więc po awarii ponowne uruchomienie pomija dokumenty z zapisanych
+plików i traci najwyżej jedną porcję. Kluczem jest hash treści (`search_engine.updates`), nie numer
+dokumentu: tłumaczenia przeżywają nową wersję zbioru, a powtórzony dokument jest tłumaczony raz.
+
+Aplikacja dołącza tłumaczenia do korpusu jako indeks `translations` (kolumna `text_pl` w kolejności
+dokumentów). `translated_corpus` buduje z niej polski korpus do wyszukiwania - z indeksami nagłówków
+i duplikatów współdzielonymi z oryginałem, więc filtry i daty działają jak dla tekstów angielskich.
+
+Uruchomienie:
+    python -m search_engine.pretranslate --source corpus.parquet --output translations
+    python -m search_engine.pretranslate --output translations --workers 8 --rate 10 --checkpoint 500
+"""
+
+import argparse
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from instrumentation import increment, timed
+from search_engine.corpus import DEFAULT_DATASET, DEFAULT_SPLIT, Corpus, load_corpus
+from search_engine.docstore import DocumentStore
+from search_engine.headers import get_header_indexes
+from search_engine.updates import get_content_hashes
+from translation_utils import (
+    MAX_CHUNK_LENGTH,
+    PACK_SEPARATOR,
+    CircuitOpenError,
+    backoff_delay,
+    translate_chunk,
+    translate_documents,
+)
+
+logger = logging.getLogger(__name__)
+
+# Maksymalna długość żądania do usługi tłumaczenia (fragment długiego dokumentu albo kilka krótkich)
+CHUNK_LENGTH = MAX_CHUNK_LENGTH
+
+# Liczba przetłumaczonych dokumentów zapisywana naraz jako jeden plik
+CHECKPOINT_DOCUMENTS = 200
+
+# Wątki wysyłające żądania i limit żądań na sekundę wspólny dla wszystkich wątków
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 5.0
+
+# Próby wysłania żądania i opóźnienie przed pierwszą ponowną próbą (podwajane)
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 1.0
+
+PART_PREFIX = "part-"
+TRANSLATION_COLUMN = "text_pl"
+
+# Indeksy polskiego korpusu przejmowane z oryginału - zbudowane z nagłówków, które nie są tłumaczone
+SHARED_INDEXES = ("headers", "duplicates", "cooccurrence")
+POLISH_SUFFIX = "-pl"
+
+
+class RateLimiter:
+    """
+    Limit żądań na sekundę wspólny dla wielu wątków (wiadro żetonów).
+
+    Pozwala na krótką serię `burst` żądań, potem przepuszcza średnio `rate` żądań na sekundę.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("Limit żądań musi być dodatni")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Czeka, aż żądanie zmieści się w limicie."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class TranslationStore:
+    """
+    Katalog z tłumaczeniami: pliki Parquet `part-NNNNN.parquet`, każdy z jedną porcją dokumentów.
+
+    Pliki są tylko dopisywane; przy powtórzonym hashu obowiązuje tłumaczenie z późniejszego pliku.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def parts(self) -> list[Path]:
+        """Zapisane porcje w kolejności zapisu."""
+        if not self.path.is_dir():
+            return []
+        return sorted(self.path.glob(f"{PART_PREFIX}*.parquet"))
+
+    def read(self, columns: Optional[list[str]] = None):
+        """Wszystkie tłumaczenia jako jedna tabela Arrow."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        parts = self.parts()
+        if not parts:
+            return _schema().empty_table().select(columns) if columns else _schema().empty_table()
+        return pa.concat_tables(pq.read_table(part, columns=columns, schema=_schema()) for part in parts)
+
+    def hashes(self) -> np.ndarray:
+        """Hashe treści przetłumaczonych dokumentów (uint64)."""
+        return self.read(["content_hash"]).column("content_hash").to_numpy().astype(np.uint64)
+
+    def write(self, hashes: list[int], filenames: list[str], translations: list[str]) -> Path:
+        """
+        Zapisuje porcję tłumaczeń jako nowy plik - w całości albo wcale.
+
+        Returns:
+            Ścieżka zapisanego pliku
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        table = pa.table(
+            {
+                "content_hash": pa.array(hashes, type=pa.uint64()),
+                "filename": pa.array(filenames, type=pa.string()),
+                TRANSLATION_COLUMN: pa.array(translations, type=pa.large_string()),
+            },
+            schema=_schema(),
+        )
+        parts = self.parts()
+        number = int(parts[-1].stem[len(PART_PREFIX) :]) + 1 if parts else 0
+        path = self.path / f"{PART_PREFIX}{number:05d}.parquet"
+        temporary = path.with_suffix(".tmp")
+        pq.write_table(table, temporary)
+        os.replace(temporary, path)
+        return path
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [("content_hash", pa.uint64()), ("filename", pa.string()), (TRANSLATION_COLUMN, pa.large_string())]
+    )
+
+
+@dataclass
+class PretranslationReport:
+    """
+    Podsumowanie przebiegu zadania.
+
+    Atrybuty:
+        documents: Liczba dokumentów korpusu
+        translated: Dokumenty przetłumaczone w tym przebiegu
+        skipped: Dokumenty pominięte - przetłumaczone wcześniej albo powtórzone w korpusie
+        failed: Dokumenty, których nie udało się przetłumaczyć (zostaną ponowione przy następnym uruchomieniu)
+        parts: Liczba zapisanych plików
+        seconds: Czas przebiegu
+    """
+
+    documents: int
+    translated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    parts: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def translate_batch(
+    texts: Sequence[str],
+    translate: Callable[[str], str],
+    limiter: Optional[RateLimiter] = None,
+    attempts: int = MAX_ATTEMPTS,
+    retry_delay: float = RETRY_DELAY,
+) -> list[str]:
+    """
+    Tłumaczy porcję dokumentów (`translate_documents`); nieudane żądanie jest ponawiane z rosnącym opóźnieniem.
+
+    Opóźnienie rośnie wykładniczo z losowym rozrzutem (`backoff_delay`), a gdy bezpiecznik usługi
+    wstrzymał żądania (`CircuitOpenError`) - trwa do końca wstrzymania.
+
+    Raises:
+        Exception: Błąd ostatniej próby któregoś żądania - żaden dokument porcji nie ma tłumaczenia
+    """
+
+    def send(request: str) -> str:
+        for attempt in range(attempts):
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                return translate(request)
+            except Exception as e:
+                increment("pretranslate.retries")
+                if attempt == attempts - 1:
+                    raise
+                delay = e.retry_after if isinstance(e, CircuitOpenError) else backoff_delay(attempt, retry_delay)
+                time.sleep(delay)
+
+    return translate_documents(texts, send, max_length=CHUNK_LENGTH)
+
+
+def document_batches(corpus: Corpus, doc_ids: Iterable[int], max_length: int = CHUNK_LENGTH) -> Iterator[list[int]]:
+    """
+    Kolejne porcje dokumentów o łącznej długości najwyżej `max_length` znaków (długi dokument - sam).
+
+    Krótkie maile z jednej porcji trafiają do usługi tłumaczenia jednym żądaniem.
+    """
+    batch: list[int] = []
+    length = 0
+    for doc_id in doc_ids:
+        size = len(corpus.texts.iat[doc_id]) + len(PACK_SEPARATOR)
+        if batch and length + size > max_length:
+            yield batch
+            batch, length = [], 0
+        batch.append(doc_id)
+        length += size
+    if batch:
+        yield batch
+
+
+def pending_documents(corpus: Corpus, store: TranslationStore) -> tuple[np.ndarray, int]:
+    """
+    Dokumenty do przetłumaczenia: bez tłumaczenia w magazynie, pierwsze wystąpienie każdego dokumentu.
+
+    Returns:
+        (id dokumentów rosnąco, liczba pominiętych dokumentów)
+    """
+    hashes = get_content_hashes(corpus)
+    _unique, first = np.unique(hashes, return_index=True)
+    first.sort()
+    pending = first[~np.isin(hashes[first], store.hashes())]
+    return pending, len(corpus) - len(pending)
+
+
+def pretranslate(
+    corpus: Corpus,
+    output,
+    translate: Callable[[str], str] = translate_chunk,
+    workers: int = DEFAULT_WORKERS,
+    rate: Optional[float] = DEFAULT_RATE,
+    checkpoint_every: int = CHECKPOINT_DOCUMENTS,
+    limit: Optional[int] = None,
+    retry_delay: float = RETRY_DELAY,
+) -> PretranslationReport:
+    """
+    Tłumaczy dokumenty korpusu, których nie ma jeszcze w magazynie `output`.
+
+    Przetłumaczone dokumenty są zapisywane co `checkpoint_every` dokumentów oraz na końcu - także
+    po przerwaniu (Ctrl+C, wyjątek), więc kolejne uruchomienie zaczyna od pierwszego brakującego.
+
+    Args:
+        corpus: Korpus do przetłumaczenia
+        output: Katalog magazynu tłumaczeń
+        translate: Tłumaczenie jednego żądania (zgłasza wyjątek przy błędzie)
+        workers: Liczba wątków wysyłających żądania
+        rate: Limit żądań na sekundę dla wszystkich wątków razem (None - bez limitu)
+        checkpoint_every: Liczba dokumentów w jednym zapisanym pliku
+        limit: Najwyżej tyle dokumentów w tym przebiegu (None - wszystkie brakujące)
+        retry_delay: Opóźnienie przed pierwszą ponowną próbą żądania (sekundy)
+
+    Returns:
+        Podsumowanie przebiegu
+    """
+    start = time.perf_counter()
+    store = TranslationStore(output)
+    pending, skipped = pending_documents(corpus, store)
+    if limit is not None:
+        pending = pending[:limit]
+    report = PretranslationReport(documents=len(corpus), skipped=skipped)
+    hashes = get_content_hashes(corpus)
+    limiter = RateLimiter(rate, burst=workers) if rate else None
+    buffer: list[tuple[int, str]] = []
+
+    def checkpoint():
+        if not buffer:
+            return
+        with timed("pretranslate.checkpoint"):
+            store.write(
+                [int(hashes[doc_id]) for doc_id, _text in buffer],
+                [corpus.filenames.iat[doc_id] for doc_id, _text in buffer],
+                [text for _doc_id, text in buffer],
+            )
+        report.translated += len(buffer)
+        report.parts += 1
+        buffer.clear()
+        logger.info("Przetłumaczono %d z %d dokumentów", report.translated, len(pending))
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pretranslate")
+    queue = document_batches(corpus, pending.tolist())
+    in_flight = {}
+
+    def submit(count):
+        for batch in islice(queue, count):
+            texts = [corpus.texts.iat[doc_id] for doc_id in batch]
+            in_flight[executor.submit(translate_batch, texts, translate, limiter, MAX_ATTEMPTS, retry_delay)] = batch
+
+    try:
+        # Kolejka ograniczona do dwóch porcji na wątek - pamięć nie zależy od wielkości korpusu
+        submit(2 * workers)
+        while in_flight:
+            done, _running = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                try:
+                    buffer.extend(zip(batch, future.result()))
+                except Exception as e:
+                    report.failed += len(batch)
+                    increment("pretranslate.failed", len(batch))
+                    logger.warning("Nie udało się przetłumaczyć dokumentów %d-%d: %s", batch[0], batch[-1], e)
+            if len(buffer) >= checkpoint_every:
+                checkpoint()
+            submit(len(done))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        # Dokumenty z zakończonych już żądań (także po przerwaniu) trafiają do magazynu
+        for future, batch in in_flight.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                buffer.extend(zip(batch, future.result()))
+        checkpoint()
+        report.seconds = time.perf_counter() - start
+    return report
+
+
+def load_translations(corpus: Corpus, path) -> DocumentStore:
+    """
+    Tłumaczenia z magazynu w kolejności dokumentów korpusu (pusty tekst - brak tłumaczenia).
+
+    Args:
+        corpus: Korpus, do którego dołączane są tłumaczenia (dopasowanie po hashu treści)
+        path: Katalog magazynu tłumaczeń
+    """
+    import pyarrow as pa
+
+    with timed("index.translations"):
+        table = TranslationStore(path).read(["content_hash", TRANSLATION_COLUMN])
+        stored = table.column("content_hash").to_numpy().astype(np.uint64)
+        # Stabilne sortowanie od końca - przy powtórzonym hashu wygrywa późniejszy plik
+        order = len(stored) - 1 - np.argsort(stored[::-1], kind="stable")
+        sorted_hashes = stored[order]
+        hashes = get_content_hashes(corpus)
+        positions = np.minimum(np.searchsorted(sorted_hashes, hashes), max(len(order) - 1, 0))
+        found = sorted_hashes[positions] == hashes if len(order) else np.zeros(len(hashes), dtype=bool)
+        rows = pa.array(np.where(found, order[positions] if len(order) else 0, 0), mask=~found, type=pa.int64())
+        return DocumentStore.from_arrow(table.column(TRANSLATION_COLUMN).take(rows), default="")
+
+
+def attach_translations(corpus: Corpus, path) -> DocumentStore:
+    """Dołącza tłumaczenia z magazynu do korpusu jako indeks `translations` (przenoszony do nowych wersji zbioru)."""
+    return corpus.get_index("translations", functools.partial(load_translations, path=str(path)))
+
+
+def get_translations(corpus: Corpus) -> Optional[DocumentStore]:
+    """Dołączone tłumaczenia korpusu albo None, gdy korpus ich nie ma."""
+    built = corpus.built_indexes().get("translations")
+    return built[0] if built else None
+
+
+def translated_corpus(corpus: Corpus) -> Optional[Corpus]:
+    """
+    Polski korpus do wyszukiwania w tłumaczeniach - te same id dokumentów i nazwy plików.
+
+    Indeksy nagłówków i duplikatów pochodzą z oryginału, więc fasety, daty, wątki i zwijanie
+    duplikatów działają tak samo; słownik, trygramy i indeks semantyczny są budowane z tekstu polskiego.
+
+    Returns:
+        Polski korpus albo None, gdy do korpusu nie dołączono tłumaczeń
+    """
+    if get_translations(corpus) is None:
+        return None
+
+    def _build(corpus):
+        polish = Corpus.from_stores(get_translations(corpus), corpus.filenames, name=corpus.name + POLISH_SUFFIX)
+        # Nagłówki tłumaczenia ("Od:", "Temat:") nie dałyby faset ani dat - indeksy zawsze z oryginału
+        get_header_indexes(corpus)
+        built = corpus.built_indexes()
+        for name in SHARED_INDEXES:
+            if name in built:
+                polish.set_index(name, *built[name])
+        return polish
+
+    return corpus.get_index("translated_corpus", _build)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="search_engine.pretranslate", description="Wsadowe tłumaczenie korpusu na polski (wznawialne)."
+    )
+    parser.add_argument("--source", default=DEFAULT_DATASET, help="Zbiór Hugging Face lub plik .parquet/.jsonl")
+    parser.add_argument("--split", default=DEFAULT_SPLIT, help="Podział zbioru danych Hugging Face")
+    parser.add_argument("--output", required=True, help="Katalog magazynu tłumaczeń")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Wątki wysyłające żądania")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Limit żądań na sekundę (0 - bez limitu)")
+    parser.add_argument(
+        "--checkpoint", type=int, default=CHECKPOINT_DOCUMENTS, help="Zapis co tyle przetłumaczonych dokumentów"
+    )
+    parser.add_argument("--limit", type=int, help="Najwyżej tyle dokumentów w tym przebiegu")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    corpus = load_corpus(args.source, split=args.split)
+    try:
+        report = pretranslate(
+            corpus,
+            args.output,
+            workers=args.workers,
+            rate=args.rate or None,
+            checkpoint_every=args.checkpoint,
+            limit=args.limit,
+        )
+    except KeyboardInterrupt:
+        logger.info("Przerwano - zapisane tłumaczenia zostaną pominięte przy następnym uruchomieniu")
+        return 130
+    print(json.dumps(report.to_dict(), indent=2))
+    return 0 if report.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
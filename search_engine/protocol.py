@@ -0,0 +1,186 @@
+"""
+Minimalna obsługa HTTP/1.1 na strumieniach asyncio (bez zależności zewnętrznych).
+
+Używana przez serwer API, koordynator shardów i skrypt testu obciążeniowego. Obsługuje tylko to,
+czego potrzebujemy: Content-Length, keep-alive i treści JSON.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+
+MAX_HEADER_SIZE = 64 * 1024
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+class ProtocolError(Exception):
+    """Niepoprawne żądanie lub odpowiedź HTTP."""
+
+
+@dataclass
+class Request:
+    """Sparsowane żądanie HTTP."""
+
+    method: str
+    path: str
+    query: dict[str, str] = field(default_factory=dict)
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+    def json(self) -> Any:
+        if not self.body:
+            return {}
+        try:
+            return json.loads(self.body)
+        except ValueError as e:
+            raise ProtocolError(f"Niepoprawny JSON: {e}") from e
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Optional[list[str]]:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ProtocolError("Przerwany nagłówek HTTP") from e
+    except asyncio.LimitOverrunError as e:
+        raise ProtocolError("Za duży nagłówek HTTP") from e
+
+    if len(head) > MAX_HEADER_SIZE:
+        raise ProtocolError("Za duży nagłówek HTTP")
+    return head.decode("latin-1").split("\r\n")[:-2]
+
+
+def _parse_headers(lines: list[str]) -> dict[str, str]:
+    headers = {}
+    for line in lines:
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise ProtocolError(f"Niepoprawny nagłówek: {line!r}")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: dict[str, str]) -> bytes:
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError as e:
+        raise ProtocolError("Niepoprawny Content-Length") from e
+    if length < 0 or length > MAX_BODY_SIZE:
+        raise ProtocolError("Niepoprawny rozmiar treści")
+    if length == 0:
+        return b""
+    return await reader.readexactly(length)
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    """Czyta jedno żądanie; zwraca None, gdy klient zamknął połączenie."""
+    lines = await _read_head(reader)
+    if lines is None:
+        return None
+
+    try:
+        method, target, _version = lines[0].split(" ", 2)
+    except ValueError as e:
+        raise ProtocolError(f"Niepoprawna linia żądania: {lines[0]!r}") from e
+
+    headers = _parse_headers(lines[1:])
+    body = await _read_body(reader, headers)
+    url = urlsplit(target)
+    query = {key: values[-1] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+    return Request(method=method.upper(), path=url.path, query=query, headers=headers, body=body)
+
+
+def encode_response(
+    status: int, payload: Any, keep_alive: bool = True, content_type: str = "application/json; charset=utf-8"
+) -> bytes:
+    """Koduje odpowiedź HTTP; słowniki i listy są serializowane do JSON."""
+    if isinstance(payload, (bytes, bytearray)):
+        body = bytes(payload)
+    elif isinstance(payload, str):
+        body = payload.encode("utf-8")
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def encode_request(method: str, path: str, payload: Any = None, host: str = "localhost") -> bytes:
+    """Koduje żądanie HTTP klienta (treść JSON, jeśli podana)."""
+    body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n"
+    if body:
+        head += "Content-Type: application/json\r\n"
+    return (head + "\r\n").encode("latin-1") + body
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, dict[str, str], bytes]:
+    """Czyta odpowiedź HTTP; zwraca (status, nagłówki, treść)."""
+    lines = await _read_head(reader)
+    if lines is None:
+        raise ProtocolError("Serwer zamknął połączenie")
+
+    try:
+        status = int(lines[0].split(" ", 2)[1])
+    except (IndexError, ValueError) as e:
+        raise ProtocolError(f"Niepoprawna linia statusu: {lines[0]!r}") from e
+
+    headers = _parse_headers(lines[1:])
+    return status, headers, await _read_body(reader, headers)
+
+
+async def fetch_json(
+    host: str,
+    port: int,
+    method: str,
+    path: str,
+    payload: Any = None,
+    timeout: float = 30.0,
+    unix_socket: Optional[str] = None,
+) -> tuple[int, Any]:
+    """
+    Wykonuje pojedyncze żądanie na nowym połączeniu i zwraca (status, zdekodowany JSON).
+
+    Z `unix_socket` połączenie idzie przez gniazdo lokalne (host i port są wtedy ignorowane).
+    """
+
+    async def _fetch():
+        if unix_socket:
+            reader, writer = await asyncio.open_unix_connection(unix_socket)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(encode_request(method, path, payload, host=host))
+            await writer.drain()
+            status, _headers, body = await read_response(reader)
+            return status, json.loads(body) if body else None
+        finally:
+            writer.close()
+
+    return await asyncio.wait_for(_fetch(), timeout)
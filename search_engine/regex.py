@@ -0,0 +1,402 @@
+"""
+Wyszukiwanie wyrażeniami regularnymi z filtrem trigramów.
+
+Pełny skan `re` po każdym dokumencie jest zbyt wolny, więc zapytanie przechodzi trzy etapy:
+    1. Analiza wzorca (drzewo `re._parser`): trigramy, które musi zawierać każdy pasujący tekst,
+       w postaci koniunkcji alternatyw (np. `Jeff(rey)?\\s+E` -> "jef" AND "eff").
+    2. Indeks trigramów: iloczyn list dokumentów zawierających trigramy - kandydaci.
+    3. Weryfikacja skompilowanym wzorcem tylko na kandydatach, z budżetem czasu na zapytanie;
+       po jego przekroczeniu wynik jest niepełny (`truncated`), a serwer nie zostaje zablokowany.
+
+Trigramy są liczone po uproszczeniu znaków: litery ASCII małe, znaki spoza ASCII sprowadzone
+do jednego znacznika (poza tymi, które `re.IGNORECASE` utożsamia z literą ASCII, np. "K" z "k").
+Indeks jest więc nadzbiorem dopasowań niezależnie od wielkości liter i flag wzorca,
+a klucz trigramu mieści się w 24 bitach.
+"""
+
+import re
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from instrumentation import increment, timed
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+# Maksymalny czas weryfikacji wzorca na kandydatach w jednym zapytaniu (sekundy)
+DEFAULT_TIME_BUDGET = 2.0
+MAX_PATTERN_LENGTH = 500
+# Ograniczenia analizy: liczba dokładnych wariantów fragmentu, znaków klasy i klauzul filtra
+MAX_EXACT = 16
+MAX_CLASS_SIZE = 8
+MAX_CLAUSES = 16
+# Liczba znaków tekstu przetwarzanych naraz przy budowie indeksu (pamięć tymczasowa)
+BATCH_CHARS = 2_000_000
+# Ile różnych dopasowanych fragmentów zbierać do podświetlania
+MAX_HIGHLIGHT_TERMS = 20
+
+_OTHER = 128
+# Znaki spoza ASCII, które `re.IGNORECASE` dopasowuje do liter ASCII (İ, ı, ſ, znak kelwina)
+_ASCII_ALIASES = {0x130: ord("i"), 0x131: ord("i"), 0x17F: ord("s"), 0x212A: ord("k")}
+_ASCII_FOLD = np.array([ord(chr(code).lower()) for code in range(128)], dtype=np.uint32)
+
+_REPEATS = tuple(
+    op
+    for op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, getattr(sre_constants, "POSSESSIVE_REPEAT", None))
+    if op is not None
+)
+_ATOMIC_GROUP = getattr(sre_constants, "ATOMIC_GROUP", None)
+
+
+def _fold(codes: np.ndarray) -> np.ndarray:
+    """Upraszcza kody znaków do alfabetu indeksu (ASCII małymi literami + znacznik innych znaków)."""
+    folded = np.full(len(codes), _OTHER, dtype=np.uint32)
+    ascii_chars = codes < 128
+    folded[ascii_chars] = _ASCII_FOLD[codes[ascii_chars]]
+    for code, alias in _ASCII_ALIASES.items():
+        folded[codes == code] = alias
+    return folded
+
+
+def _trigram_keys(folded: np.ndarray) -> np.ndarray:
+    return (folded[:-2] << 16) | (folded[1:-1] << 8) | folded[2:]
+
+
+def _distinct_sorted(values: np.ndarray) -> np.ndarray:
+    """Usuwa powtórzenia z posortowanej tablicy."""
+    if not len(values):
+        return values
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+
+def _trigram_key(trigram: str) -> int:
+    return (ord(trigram[0]) << 16) | (ord(trigram[1]) << 8) | ord(trigram[2])
+
+
+class TrigramIndex:
+    """
+    Listy dokumentów dla trigramów tekstu w układzie CSR (jak w słowniku korpusu).
+
+    Atrybuty:
+        keys: Posortowane klucze trigramów
+        offsets: Dokumenty trigramu `keys[i]` to `doc_ids[offsets[i]:offsets[i + 1]]`
+        doc_ids: Posortowane id dokumentów każdej listy
+    """
+
+    def __init__(self, keys: np.ndarray, offsets: np.ndarray, doc_ids: np.ndarray):
+        self.keys = keys
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+
+    @classmethod
+    def build(cls, texts) -> "TrigramIndex":
+        """Buduje indeks z tekstów dokumentów (id dokumentu = pozycja w sekwencji)."""
+        # Pary (trigram, dokument) jako jedna liczba: klucz trigramu w górnych 32 bitach
+        pairs: list[np.ndarray] = []
+        batch: list[str] = []
+        batch_chars = 0
+        first_doc = 0
+
+        def flush():
+            lengths = np.fromiter(map(len, batch), dtype=np.int64, count=len(batch))
+            codes = np.frombuffer("".join(batch).encode("utf-32-le"), dtype=np.uint32)
+            keys = _trigram_keys(_fold(codes)).astype(np.int64)
+            docs = np.repeat(np.arange(first_doc, first_doc + len(batch), dtype=np.int64), lengths)
+            # Trigramy na granicy dwóch dokumentów są odrzucane
+            inside = docs[:-2] == docs[2:] if len(docs) > 2 else np.zeros(0, dtype=bool)
+            # Sortowanie z usunięciem sąsiednich powtórzeń jest wielokrotnie szybsze niż `np.unique` na tej skali
+            pairs.append(_distinct_sorted(np.sort((keys[inside] << 32) | docs[:-2][inside])))
+
+        for text in texts:
+            batch.append(text)
+            batch_chars += len(text)
+            if batch_chars >= BATCH_CHARS:
+                flush()
+                first_doc += len(batch)
+                batch, batch_chars = [], 0
+        if batch:
+            flush()
+
+        merged = np.concatenate(pairs) if pairs else np.empty(0, dtype=np.int64)
+        pairs.clear()
+        merged.sort()
+        keys = (merged >> 32).astype(np.int32)
+        doc_ids = (merged & 0xFFFFFFFF).astype(np.int32)
+        del merged
+        # Początek listy każdego trigramu: pierwsza para z nowym kluczem
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1]))[: len(keys)])
+        offsets = np.append(starts, len(keys)).astype(np.int64)
+        return cls(keys[starts], offsets, doc_ids)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def postings(self, trigram: str) -> np.ndarray:
+        """Posortowane id dokumentów zawierających trigram (pusta tablica, jeśli brak)."""
+        key = _trigram_key(trigram)
+        position = int(np.searchsorted(self.keys, key))
+        if position == len(self.keys) or self.keys[position] != key:
+            return np.empty(0, dtype=np.int32)
+        return self.doc_ids[self.offsets[position] : self.offsets[position + 1]]
+
+    def candidates(self, clauses: list[frozenset[str]]) -> Optional[np.ndarray]:
+        """
+        Dokumenty spełniające filtr: w każdej klauzuli przynajmniej jeden trigram.
+
+        Returns:
+            Posortowane id dokumentów albo None, gdy filtr niczego nie wyklucza (brak klauzul)
+        """
+        if not clauses:
+            return None
+        unions = []
+        for clause in clauses:
+            arrays = [self.postings(trigram) for trigram in clause]
+            arrays = [postings for postings in arrays if len(postings)]
+            if not arrays:
+                return np.empty(0, dtype=np.int64)
+            unions.append(arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays)))
+        # Najpierw najkrótsze listy - iloczyn szybko maleje
+        unions.sort(key=len)
+        doc_ids = unions[0]
+        for postings in unions[1:]:
+            if not len(doc_ids):
+                break
+            doc_ids = np.intersect1d(doc_ids, postings, assume_unique=True)
+        return doc_ids.astype(np.int64)
+
+
+class _Info(NamedTuple):
+    """Wynik analizy fragmentu wzorca."""
+
+    # Wszystkie teksty, do których fragment może pasować (uproszczone znaki), albo None - zbyt wiele
+    exact: Optional[frozenset[str]]
+    # Wymagane trigramy spoza `exact`: każda klauzula to zbiór alternatyw
+    clauses: list[frozenset[str]]
+
+
+_ANY = _Info(None, [])
+_EMPTY = _Info(frozenset([""]), [])
+
+
+def _fold_char(code: int) -> Optional[str]:
+    """Znak w alfabecie indeksu; None dla znaków spoza ASCII (zmiana wielkości liter mogłaby je zmienić)."""
+    return chr(code).lower() if code < 128 else None
+
+
+def _string_clauses(exact: Optional[frozenset[str]]) -> list[frozenset[str]]:
+    """Klauzule wynikające z tego, że tekst zawiera jeden z napisów `exact`."""
+    if not exact or any(len(string) < 3 for string in exact):
+        return []
+    trigrams = [[string[i : i + 3] for i in range(len(string) - 2)] for string in exact]
+    if len(trigrams) == 1:
+        return [frozenset([trigram]) for trigram in dict.fromkeys(trigrams[0])][:MAX_CLAUSES]
+    # Kilka napisów: k-ta klauzula to k-ty trigram każdego z nich (którykolwiek musi wystąpić)
+    longest = max(len(string_trigrams) for string_trigrams in trigrams)
+    clauses = {
+        frozenset(string_trigrams[k % len(string_trigrams)] for string_trigrams in trigrams)
+        for k in range(min(longest, MAX_CLAUSES))
+    }
+    return list(clauses)
+
+
+def _requirement(info: _Info) -> list[frozenset[str]]:
+    return info.clauses + _string_clauses(info.exact)
+
+
+def _any_of(requirements: list[list[frozenset[str]]]) -> list[frozenset[str]]:
+    """Klauzule alternatywy wymagań (rozdzielność: (a AND b) OR c = (a OR c) AND (b OR c))."""
+    combined = requirements[0]
+    for requirement in requirements[1:]:
+        if not combined or not requirement:
+            return []
+        combined = list({left | right for left in combined[:4] for right in requirement[:4]})[:MAX_CLAUSES]
+    return combined
+
+
+def _analyze_sequence(items) -> _Info:
+    current: Optional[frozenset[str]] = frozenset([""])
+    clauses: list[frozenset[str]] = []
+    for op, av in items:
+        info = _analyze_item(op, av)
+        if info.exact is not None and current is not None and len(current) * len(info.exact) <= MAX_EXACT:
+            current = frozenset(left + right for left in current for right in info.exact)
+            continue
+        if current is not None:
+            clauses.extend(_string_clauses(current))
+        clauses.extend(info.clauses)
+        current = info.exact
+    return _Info(current, clauses)
+
+
+def _analyze_class(items) -> _Info:
+    chars = set()
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            chars.add(av)
+        elif op is sre_constants.RANGE and av[1] - av[0] < MAX_CLASS_SIZE:
+            chars.update(range(av[0], av[1] + 1))
+        else:
+            # Negacja, kategorie (\d, \w) i szerokie zakresy - dowolny znak
+            return _ANY
+    folded = {_fold_char(code) for code in chars}
+    if None in folded or len(folded) > MAX_CLASS_SIZE:
+        return _ANY
+    return _Info(frozenset(folded), [])
+
+
+def _analyze_item(op, av) -> _Info:
+    if op is sre_constants.LITERAL:
+        char = _fold_char(av)
+        return _ANY if char is None else _Info(frozenset([char]), [])
+    if op is sre_constants.IN:
+        return _analyze_class(av)
+    if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        # Kotwice i asercje nie zużywają znaków
+        return _EMPTY
+    if op is sre_constants.SUBPATTERN:
+        return _analyze_sequence(av[-1])
+    if _ATOMIC_GROUP is not None and op is _ATOMIC_GROUP:
+        return _analyze_sequence(av)
+    if op is sre_constants.BRANCH:
+        alternatives = [_analyze_sequence(alternative) for alternative in av[1]]
+        if all(alternative.exact is not None for alternative in alternatives):
+            union = frozenset().union(*(alternative.exact for alternative in alternatives))
+            if len(union) <= MAX_EXACT and not any(alternative.clauses for alternative in alternatives):
+                return _Info(union, [])
+        return _Info(None, _any_of([_requirement(alternative) for alternative in alternatives]))
+    if op in _REPEATS:
+        minimum, maximum, body = av
+        if minimum == 0:
+            return _ANY
+        inner = _analyze_sequence(body)
+        if minimum == maximum and inner.exact is not None and len(inner.exact) ** minimum <= MAX_EXACT:
+            return _analyze_sequence(list(body) * minimum)
+        return _Info(None, _requirement(inner))
+    # Dowolny znak, negacja znaku, odwołania do grup
+    return _ANY
+
+
+def required_trigrams(pattern: str, flags: int = 0) -> list[frozenset[str]]:
+    """
+    Trigramy, które musi zawierać każdy tekst pasujący do wzorca.
+
+    Returns:
+        Lista klauzul - w tekście występuje przynajmniej jeden trigram z każdej (pusta = brak ograniczeń)
+    """
+    return _requirement(_analyze_sequence(sre_parse.parse(pattern, flags)))
+
+
+def _has_nested_repeat(items, inside_repeat: bool = False) -> bool:
+    """Czy wzorzec zawiera nieograniczone powtórzenie wewnątrz innego nieograniczonego (np. `(a+)+`)."""
+    for op, av in items:
+        if op in _REPEATS:
+            minimum, maximum, body = av
+            if inside_repeat and maximum == sre_constants.MAXREPEAT:
+                return True
+            if _has_nested_repeat(body, inside_repeat or maximum == sre_constants.MAXREPEAT):
+                return True
+        elif op is sre_constants.SUBPATTERN:
+            if _has_nested_repeat(av[-1], inside_repeat):
+                return True
+        elif _ATOMIC_GROUP is not None and op is _ATOMIC_GROUP:
+            if _has_nested_repeat(av, inside_repeat):
+                return True
+        elif op is sre_constants.BRANCH:
+            if any(_has_nested_repeat(alternative, inside_repeat) for alternative in av[1]):
+                return True
+    return False
+
+
+def compile_pattern(pattern: str, case_sensitive: bool = False) -> re.Pattern:
+    """
+    Kompiluje wzorzec zapytania.
+
+    Raises:
+        ValueError: Niepoprawny wzorzec, zbyt długi albo z zagnieżdżonymi powtórzeniami
+            (katastrofalne nawroty - pojedynczy dokument mógłby zablokować wyszukiwanie)
+    """
+    if not pattern:
+        raise ValueError("Pusty wzorzec wyrażenia regularnego")
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        raise ValueError(f"Wzorzec dłuższy niż {MAX_PATTERN_LENGTH} znaków")
+    flags = 0 if case_sensitive else re.IGNORECASE
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+        compiled = re.compile(pattern, flags)
+    except re.error as e:
+        raise ValueError(f"Niepoprawne wyrażenie regularne: {e}") from e
+    if _has_nested_repeat(parsed):
+        raise ValueError("Zagnieżdżone powtórzenia (np. '(a+)+') są niedozwolone")
+    return compiled
+
+
+def regex_match(
+    corpus, pattern: str, case_sensitive: bool = False, time_budget: Optional[float] = None
+) -> tuple[np.ndarray, list[str], bool]:
+    """
+    Dokumenty pasujące do wyrażenia regularnego.
+
+    Args:
+        corpus: Przeszukiwany korpus
+        pattern: Wyrażenie regularne (składnia `re`)
+        case_sensitive: Czy rozróżniać wielkość liter
+        time_budget: Maksymalny czas weryfikacji kandydatów w sekundach (domyślnie `DEFAULT_TIME_BUDGET`)
+
+    Returns:
+        (posortowane id dokumentów, [], czy sprawdzono wszystkich kandydatów przed upływem budżetu)
+    """
+    compiled = compile_pattern(pattern, case_sensitive)
+    index = get_trigram_index(corpus)
+    with timed("search.regex_prefilter"):
+        candidates = index.candidates(required_trigrams(pattern, compiled.flags))
+    increment("search.regex_candidates", len(corpus) if candidates is None else len(candidates))
+
+    texts = corpus.texts
+    search_text = compiled.search
+    matched = []
+    complete = True
+    deadline = time.perf_counter() + (DEFAULT_TIME_BUDGET if time_budget is None else time_budget)
+    if candidates is None:
+        documents = enumerate(texts)
+    else:
+        documents = ((doc_id, texts.iat[doc_id]) for doc_id in candidates.tolist())
+    with timed("search.regex_verify"):
+        for doc_id, text in documents:
+            if search_text(text) is not None:
+                matched.append(doc_id)
+            if time.perf_counter() > deadline:
+                complete = False
+                increment("search.regex_timeouts")
+                break
+    return np.array(matched, dtype=np.int64), [], complete
+
+
+def regex_counter(compiled: re.Pattern, terms: list[str]):
+    """Funkcja licząca dopasowania w tekście; dopasowane fragmenty są dopisywane do `terms` (do podświetlania)."""
+
+    def count(text: str) -> int:
+        matches = 0
+        for match in compiled.finditer(text):
+            matches += 1
+            surface = match.group()
+            if surface and surface not in terms and len(terms) < MAX_HIGHLIGHT_TERMS:
+                terms.append(surface)
+        return matches
+
+    return count
+
+
+def get_trigram_index(corpus) -> TrigramIndex:
+    """Zwraca (budując przy pierwszym użyciu) indeks trigramów korpusu."""
+
+    def _build(corpus):
+        with timed("index.trigrams"):
+            return TrigramIndex.build(corpus.texts)
+
+    return corpus.get_index("trigrams", _build)
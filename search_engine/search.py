@@ -0,0 +1,354 @@
+"""
+Wyszukiwanie pełnotekstowe w korpusie.
+
+Ta sama logika, która wcześniej była wpisana bezpośrednio w `app.py`:
+skan `str.contains`, ograniczenie liczby wyników, klasyfikacja i sortowanie po typie.
+Tryb przybliżony (`mode="fuzzy"`) zamiast skanu korzysta z indeksu usunięć słownika,
+tryb encji (`mode="entity"`) - z list dokumentów osób, adresów, telefonów i URL-i,
+tryb semantyczny (`mode="semantic"`) - z najbliższych sąsiadów w przestrzeni LSA (TF-IDF + SVD),
+a tryb wyrażeń regularnych (`mode="regex"`) - z indeksu trigramów zawężającego skan `re` do kandydatów.
+Filtry fasetowe są nakładane na zapamiętany wynik dopasowania jako iloczyn map bitowych,
+a zakres dat - wyszukiwaniem binarnym na posortowanej kolumnie dat. Opcjonalnie
+prawie-duplikaty (ten sam wątek, kopie stron OCR) są zwijane do jednego wyniku na klaster.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Iterable, Mapping, Optional
+
+import numpy as np
+
+from instrumentation import increment, timed
+from search_engine.corpus import Corpus
+from search_engine.dates import DateLike, get_date_index
+from translation_utils import classify_content_type, extract_email_metadata
+
+DEFAULT_LIMIT = 100
+
+# Tryby wyszukiwania: dosłowne dopasowanie frazy, przybliżone (tolerancja błędów OCR)
+# albo encja (osoba, e-mail, telefon, URL - "typ:wartość" lub sama wartość),
+# albo semantyczne (dokumenty o podobnej tematyce, także bez słów zapytania),
+# albo wyrażenie regularne (składnia `re`)
+SEARCH_MODES = ("exact", "fuzzy", "entity", "semantic", "regex")
+
+# Kolejność wyników: po typie zawartości albo po dacie (dokumenty bez daty na końcu)
+SORT_ORDERS = ("type", "date_desc", "date_asc")
+
+# Kolejność wyświetlania typów zawartości (maile najpierw)
+TYPE_ORDER = {"email": 0, "metadata": 1, "json": 2, "other": 3}
+
+
+@dataclass
+class SearchHit:
+    """Pojedynczy wynik wyszukiwania."""
+
+    doc_id: int
+    filename: str
+    content_type: str
+    content_label: str
+    occurrences: int
+    # Liczba pozostałych pasujących dokumentów z tego samego klastra duplikatów (przy zwijaniu)
+    duplicates: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class SearchResult:
+    """Wynik zapytania: liczba wszystkich trafień i posortowana, ograniczona lista wyników."""
+
+    query: str
+    total: int
+    hits: list[SearchHit] = field(default_factory=list)
+    # Termy faktycznie dopasowane w trybie przybliżonym (do podświetlania)
+    terms: list[str] = field(default_factory=list)
+    # Liczniki faset {pole: {wartość: liczba}} (tylko gdy zażądano `facets=True`)
+    facets: dict[str, dict[str, int]] = field(default_factory=dict)
+    # Liczba trafień w miesiącach {"RRRR-MM": liczba} (tylko gdy zażądano `timeline=True`)
+    timeline: dict[str, int] = field(default_factory=dict)
+    # Liczba dokumentów ukrytych jako duplikaty (tylko przy `collapse_duplicates=True`)
+    collapsed: int = 0
+    # Dopasowanie przerwane po przekroczeniu budżetu czasu (tryb "regex") - wynik niepełny
+    truncated: bool = False
+    # Podpowiedzi "Czy chodziło o..." dla zapytania bez dopasowań (tylko przy `suggest=True`)
+    suggestions: list[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "query": self.query,
+            "total": self.total,
+            "hits": [hit.to_dict() for hit in self.hits],
+            "terms": self.terms,
+            "facets": self.facets,
+            "timeline": self.timeline,
+            "collapsed": self.collapsed,
+            "truncated": self.truncated,
+            "suggestions": self.suggestions,
+        }
+
+
+def match_doc_ids(corpus: Corpus, query: str, case_sensitive: bool = False) -> np.ndarray:
+    """
+    Zwraca identyfikatory wszystkich dokumentów zawierających zapytanie.
+
+    Args:
+        corpus: Przeszukiwany korpus
+        query: Szukana fraza (dopasowanie dosłowne, bez regex)
+        case_sensitive: Czy rozróżniać wielkość liter
+
+    Returns:
+        Posortowana tablica identyfikatorów dokumentów
+    """
+    if not query:
+        return np.empty(0, dtype=np.int64)
+
+    return corpus.texts.contains(query, case_sensitive)
+
+
+def _count_occurrences(text: str, query: str, case_sensitive: bool) -> int:
+    if case_sensitive:
+        return text.count(query)
+    return text.lower().count(query.lower())
+
+
+def search(
+    corpus: Corpus,
+    query: str,
+    case_sensitive: bool = False,
+    limit: int = DEFAULT_LIMIT,
+    mode: str = "exact",
+    max_edits: int = 1,
+    filters: Optional[Mapping[str, Iterable[str]]] = None,
+    facets: bool = False,
+    date_from: Optional[DateLike] = None,
+    date_to: Optional[DateLike] = None,
+    sort: str = "type",
+    timeline: bool = False,
+    collapse_duplicates: bool = False,
+    suggest: bool = False,
+) -> SearchResult:
+    """
+    Wyszukuje frazę w korpusie.
+
+    Args:
+        corpus: Przeszukiwany korpus
+        query: Szukana fraza (już przetłumaczona na angielski, jeśli trzeba)
+        case_sensitive: Czy rozróżniać wielkość liter (tryby "exact" i "regex")
+        limit: Maksymalna liczba zwracanych wyników
+        mode: "exact" (dosłowna fraza), "fuzzy" (słowa z tolerancją błędów), "entity" (encja z indeksu)
+            "semantic" (najbardziej podobne tematycznie, w kolejności podobieństwa) lub "regex" (wyrażenie regularne)
+        max_edits: Maksymalna odległość edycyjna w trybie "fuzzy"
+        filters: Filtry fasetowe {pole: wybrane wartości}, np. {"domain": ["gmail.com"]}
+        facets: Czy policzyć liczniki faset dla wyników
+        date_from: Początek zakresu dat (włącznie), np. "2009-03-01"
+        date_to: Koniec zakresu dat (włącznie z całym dniem/miesiącem), np. "2009-03-31"
+        sort: "type" (maile najpierw; w trybie "semantic" kolejność podobieństwa), "date_desc" (najnowsze)
+            lub "date_asc" (najstarsze)
+        timeline: Czy policzyć histogram miesięczny trafień
+        collapse_duplicates: Czy pokazać jeden dokument na klaster prawie-duplikatów
+        suggest: Czy dla zapytania bez dopasowań (tryby "exact" i "fuzzy") podpowiedzieć poprawki pisowni
+
+    Returns:
+        SearchResult z łączną liczbą trafień (po filtrach) i wynikami w zadanej kolejności
+
+    Raises:
+        ValueError: Nieznany tryb lub kolejność, niepoprawne filtry albo wyrażenie regularne
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Nieznany tryb wyszukiwania: {mode!r}")
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Nieznana kolejność wyników: {sort!r}")
+    if filters:
+        from search_engine.facets import validate_filters
+
+        validate_filters(filters)
+
+    query = query.strip() if query else ""
+    increment("search.queries")
+    complete = True
+
+    if mode == "fuzzy":
+        from search_engine.fuzzy import count_term_occurrences, fuzzy_match
+
+        match_key = ("fuzzy", query, max_edits)
+        doc_ids, terms = corpus.cached_match(match_key, lambda: fuzzy_match(corpus, query, max_edits))
+
+        def count(text: str) -> int:
+            return count_term_occurrences(text, terms)
+
+    elif mode == "entity":
+        from search_engine.entities import count_mentions, get_entity_index, parse_entity_query
+
+        entity_type, value = parse_entity_query(query)
+        match_key = ("entity", entity_type, value)
+        doc_ids, _ = corpus.cached_match(match_key, lambda: (get_entity_index(corpus).lookup(entity_type, value), []))
+        # Postaci encji z tekstu ("(212) 555-0100", "EPSTEIN, JEFFREY") zbierane przy liczeniu wzmianek
+        terms: list[str] = []
+
+        def count(text: str) -> int:
+            mentions, surfaces = count_mentions(text, entity_type, value)
+            terms.extend(sorted(surfaces.difference(terms)))
+            return mentions
+
+    elif mode == "semantic":
+        from search_engine.fuzzy import count_term_occurrences
+        from search_engine.semantic import semantic_match
+
+        match_key = ("semantic", query)
+        ranking, terms = corpus.cached_match(match_key, lambda: semantic_match(corpus, query))
+        # Filtry działają na posortowanych id; kolejność podobieństwa jest przywracana po nich
+        doc_ids = np.sort(ranking)
+
+        def count(text: str) -> int:
+            return count_term_occurrences(text, terms)
+
+    elif mode == "regex":
+        from search_engine.regex import compile_pattern, regex_counter, regex_match
+
+        compiled = compile_pattern(query, case_sensitive)
+        match_key = ("regex", query, case_sensitive)
+        # Wynik niepełny (po przekroczeniu budżetu czasu) też jest zapamiętywany -
+        # ponowienie tego samego wzorca nie zajmuje serwera drugi raz
+        doc_ids, _, complete = corpus.cached_match(match_key, lambda: regex_match(corpus, query, case_sensitive))
+        # Dopasowane fragmenty zbierane przy liczeniu wystąpień (do podświetlania)
+        terms = []
+        count = regex_counter(compiled, terms)
+
+    else:
+
+        def scan() -> tuple[np.ndarray, list[str]]:
+            with timed("search.scan"):
+                return match_doc_ids(corpus, query, case_sensitive), []
+
+        match_key = ("exact", query, case_sensitive)
+        doc_ids, terms = corpus.cached_match(match_key, scan)
+
+        def count(text: str) -> int:
+            return _count_occurrences(text, query, case_sensitive)
+
+    # Podpowiedzi tylko gdy samo zapytanie nic nie znalazło - nie gdy wyniki odrzuciły filtry
+    suggestions: list[dict] = []
+    if suggest and mode in ("exact", "fuzzy") and not len(doc_ids):
+        from search_engine.spelling import suggest_corrections
+
+        suggestions = suggest_corrections(corpus, query)
+
+    date_index = None
+    if date_from or date_to or sort != "type" or timeline:
+        date_index = get_date_index(corpus)
+    if date_from or date_to:
+        with timed("search.date_filter"):
+            doc_ids = date_index.filter(doc_ids, date_from, date_to)
+
+    facet_counts: dict[str, dict[str, int]] = {}
+    if filters or facets:
+        from search_engine.facets import get_facet_index
+
+        index = get_facet_index(corpus)
+        with timed("search.facets"):
+            if facets:
+                facet_counts = index.counts(doc_ids, filters)
+            if filters:
+                doc_ids = index.filter(doc_ids, filters)
+
+    if mode == "semantic":
+        doc_ids = ranking[np.isin(ranking, doc_ids, assume_unique=True)]
+    increment("search.matches", len(doc_ids))
+
+    collapsed = 0
+    duplicates: dict[int, int] = {}
+    if collapse_duplicates:
+        from search_engine.dedup import get_duplicate_index
+
+        with timed("search.collapse"):
+            representatives, cluster_counts = get_duplicate_index(corpus).collapse(doc_ids)
+        collapsed = len(doc_ids) - len(representatives)
+        duplicates = {
+            int(doc_id): int(count) - 1 for doc_id, count in zip(representatives, cluster_counts) if count > 1
+        }
+        doc_ids = representatives
+
+    month_counts: dict[str, int] = {}
+    if timeline:
+        filter_key = tuple(sorted((name, tuple(values)) for name, values in (filters or {}).items()))
+        month_counts = date_index.timeline(
+            doc_ids, cache_key=(match_key, filter_key, str(date_from), str(date_to), collapse_duplicates)
+        )
+
+    with timed("search.classify_sort"):
+        if sort == "type":
+            # Tryb semantyczny zostaje w kolejności podobieństwa - typ treści jej nie zmienia
+            hits = _build_hits(corpus, doc_ids[:limit], count, duplicates, by_type=mode != "semantic")
+        else:
+            ordered = date_index.sort(doc_ids, descending=sort == "date_desc")
+            hits = _build_hits(corpus, ordered[:limit], count, duplicates, by_type=False)
+    return SearchResult(
+        query=query,
+        total=len(doc_ids),
+        hits=hits,
+        terms=list(terms),
+        facets=facet_counts,
+        timeline=month_counts,
+        collapsed=collapsed,
+        truncated=not complete,
+        suggestions=suggestions,
+    )
+
+
+def _build_hits(
+    corpus: Corpus,
+    doc_ids: np.ndarray,
+    count: Callable[[str], int],
+    duplicates: Optional[Mapping[int, int]] = None,
+    by_type: bool = True,
+) -> list[SearchHit]:
+    duplicates = duplicates or {}
+    hits = []
+    for doc_id in doc_ids:
+        text = corpus.texts.iat[doc_id]
+        content_type, content_label = classify_content_type(text)
+        hits.append(
+            SearchHit(
+                doc_id=int(doc_id),
+                filename=corpus.filenames.iat[doc_id],
+                content_type=content_type,
+                content_label=content_label,
+                occurrences=count(text),
+                duplicates=duplicates.get(int(doc_id), 0),
+            )
+        )
+
+    if by_type:
+        # Sortowanie stabilne - w obrębie typu zachowana jest kolejność dokumentów
+        hits.sort(key=lambda hit: TYPE_ORDER.get(hit.content_type, len(TYPE_ORDER)))
+    return hits
+
+
+def get_docs(corpus: Corpus, doc_ids: Iterable[int]) -> list[dict]:
+    """
+    Pobiera dokumenty po identyfikatorach.
+
+    Returns:
+        Lista słowników {'doc_id': ..., 'filename': ..., 'text': ...}
+    """
+    return [
+        {"doc_id": int(doc_id), "filename": corpus.filenames.iat[doc_id], "text": corpus.texts.iat[doc_id]}
+        for doc_id in doc_ids
+    ]
+
+
+def extract_metadata(corpus: Corpus, doc_ids: Iterable[int]) -> list[dict[str, str]]:
+    """
+    Wyciąga metadane maili (data, nadawca, odbiorca, temat) dla wskazanych dokumentów.
+
+    Wyniki są zapamiętywane w korpusie, więc ponowne wyświetlenie tego samego dokumentu nic nie kosztuje.
+    """
+    results = []
+    for doc_id in doc_ids:
+        doc_id = int(doc_id)
+        metadata = corpus._metadata_cache.get(doc_id)
+        if metadata is None:
+            metadata = extract_email_metadata(corpus.texts.iat[doc_id])
+            corpus._metadata_cache[doc_id] = metadata
+        results.append(metadata)
+    return results
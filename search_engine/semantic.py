@@ -0,0 +1,338 @@
+"""
+Wyszukiwanie semantyczne: "więcej takich" i zapytania opisowe bez zewnętrznych usług.
+
+Potok (lokalnie, NumPy + SciPy):
+    1. TF-IDF: cechy to termy słownika korpusu (bez słów funkcyjnych, bardzo rzadkich
+       i występujących w prawie każdym dokumencie). Wektory budowane są wprost z list
+       postingów słownika - bez ponownej tokenizacji tekstów (TF binarne).
+    2. Obcięte SVD (randomizowane, Halko i in.): baza `DIMENSIONS` kierunków liczona na
+       próbie dokumentów; każdy dokument to gęsty, znormalizowany wektor float32.
+    3. Indeks IVF: k-średnich (sferyczne) dzieli wektory na ~√n list; zapytanie
+       porównywane jest z centroidami, a potem tylko z dokumentami `PROBES` najbliższych list.
+
+Wektory dokumentów leżą w jednej macierzy uporządkowanej po listach IVF - przeszukanie
+listy to wycinek ciągłej pamięci i jedno mnożenie macierz-wektor.
+"""
+
+from typing import Optional
+
+import numpy as np
+from scipy import sparse
+
+from instrumentation import timed
+from search_engine.vocabulary import Vocabulary, get_vocabulary, tokenize
+
+DIMENSIONS = 64
+# Cechy: termy w co najmniej MIN_DF dokumentach i co najwyżej MAX_DF_RATIO dokumentów korpusu
+MIN_DF = 2
+MAX_DF_RATIO = 0.9
+MAX_FEATURES = 50_000
+MIN_TERM_LENGTH = 3
+# Baza SVD jest liczona na próbie dokumentów (koszt nie rośnie z korpusem)
+FIT_SAMPLE = 20_000
+SVD_OVERSAMPLE = 10
+SVD_ITERATIONS = 4
+# IVF: liczba list ~ √n; mniejsze korpusy przeszukiwane są w całości
+MIN_IVF_DOCUMENTS = 5_000
+MAX_LISTS = 4096
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 40
+PROBES = 16
+# Ograniczenie pamięci tymczasowej przy budowie: liczba postingów i dokumentów liczonych naraz
+BLOCK_POSTINGS = 5_000_000
+BATCH_SIZE = 65_536
+SEED = 20240101
+
+# Dopasowanie trybu semantycznego: najbliższe dokumenty o podobieństwie co najmniej MIN_SIMILARITY
+SEMANTIC_LIMIT = 500
+MIN_SIMILARITY = 0.2
+
+STOPWORDS = frozenset(
+    "the of and to in a is that for it as was with be by on not he this are or his from at which but have an they "
+    "you were her she there been one all we their has would when if so no what up out about who them my can more "
+    "will time only could new some these two may first then do any like now such made over did down way its our "
+    "your him had me us than into also just should very here re fw fwd sent subject cc bcc http https www com".split()
+)
+
+
+def _select_features(vocabulary: Vocabulary, size: int) -> np.ndarray:
+    """Id termów słownika użytych jako cechy (rosnąco)."""
+    doc_freq = vocabulary.doc_freq
+    eligible = (doc_freq >= MIN_DF) & (doc_freq <= max(MIN_DF, MAX_DF_RATIO * size))
+    candidates = np.flatnonzero(eligible)
+    candidates = np.array(
+        [
+            term_id
+            for term_id in candidates
+            if len(vocabulary.terms[term_id]) >= MIN_TERM_LENGTH
+            and vocabulary.terms[term_id].isalpha()
+            and vocabulary.terms[term_id] not in STOPWORDS
+        ],
+        dtype=np.int64,
+    )
+    if len(candidates) > MAX_FEATURES:
+        candidates = candidates[np.argsort(-doc_freq[candidates], kind="stable")[:MAX_FEATURES]]
+    return np.sort(candidates)
+
+
+def _feature_blocks(vocabulary: Vocabulary, features: np.ndarray):
+    """Kolejne bloki cech: (zakres cech, id dokumentów z ich postingów, długości postingów cech bloku)."""
+    starts = vocabulary.offsets[features]
+    lengths = vocabulary.offsets[features + 1] - starts
+    first = 0
+    while first < len(features):
+        last = first + max(1, int(np.searchsorted(np.cumsum(lengths[first:]), BLOCK_POSTINGS, side="right")))
+        block_starts, block_lengths = starts[first:last], lengths[first:last]
+        # Postingi wszystkich cech bloku bez pętli w Pythonie
+        positions = np.repeat(block_starts - np.cumsum(block_lengths) + block_lengths, block_lengths)
+        positions += np.arange(int(block_lengths.sum()))
+        yield slice(first, last), vocabulary.doc_ids[positions], block_lengths
+        first = last
+
+
+def randomized_svd(
+    matrix: sparse.spmatrix, rank: int, rng: np.random.Generator, oversample: int = SVD_OVERSAMPLE
+) -> np.ndarray:
+    """
+    Prawe wektory osobliwe rzadkiej macierzy (randomizowane SVD z iteracją potęgową).
+
+    Returns:
+        Macierz [kolumny macierzy, rank] - baza podprzestrzeni cech
+    """
+    sketch = rng.standard_normal((matrix.shape[1], rank + oversample)).astype(np.float32)
+    basis, _ = np.linalg.qr(matrix @ sketch)
+    for _ in range(SVD_ITERATIONS):
+        basis, _ = np.linalg.qr(matrix.T @ basis)
+        basis, _ = np.linalg.qr(matrix @ basis)
+    _, _, right = np.linalg.svd((matrix.T @ basis).T, full_matrices=False)
+    return np.ascontiguousarray(right[:rank].T, dtype=np.float32)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Normalizuje wiersze do długości 1 w miejscu (wiersze zerowe zostają zerowe)."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def _spherical_kmeans(vectors: np.ndarray, lists: int, rng: np.random.Generator) -> np.ndarray:
+    """Centroidy (znormalizowane) k-średnich z podobieństwem kosinusowym."""
+    centroids = vectors[rng.choice(len(vectors), lists, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = np.flatnonzero(~sums.any(axis=1))
+        # Pusta lista dostaje losowy wektor z próby
+        sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class SemanticIndex:
+    """
+    Wektory semantyczne dokumentów z indeksem IVF.
+
+    Atrybuty:
+        terms: Termy-cechy (kolumny TF-IDF)
+        term_columns: Słownik term -> kolumna cechy
+        idf: Waga IDF każdej cechy
+        components: Baza SVD [cechy, wymiary] - rzut wektora TF-IDF na przestrzeń semantyczną
+        centroids: Znormalizowane centroidy list IVF [listy, wymiary]
+        vectors: Znormalizowane wektory dokumentów uporządkowane po listach IVF
+        doc_ids: Id dokumentu każdego wiersza `vectors`
+        rows: Wiersz `vectors` każdego dokumentu
+        offsets: Dokumenty listy `l` to wiersze `offsets[l]:offsets[l + 1]`
+    """
+
+    def __init__(
+        self,
+        terms: list[str],
+        idf: np.ndarray,
+        components: np.ndarray,
+        centroids: np.ndarray,
+        vectors: np.ndarray,
+        doc_ids: np.ndarray,
+        offsets: np.ndarray,
+    ):
+        self.terms = terms
+        self.term_columns = {term: column for column, term in enumerate(terms)}
+        self.idf = idf
+        self.components = components
+        self.centroids = centroids
+        self.vectors = vectors
+        self.doc_ids = doc_ids
+        self.rows = np.empty(len(doc_ids), dtype=np.int64)
+        self.rows[doc_ids] = np.arange(len(doc_ids))
+        self.offsets = offsets
+
+    @classmethod
+    def build(
+        cls, vocabulary: Vocabulary, size: int, dimensions: int = DIMENSIONS, seed: int = SEED
+    ) -> "SemanticIndex":
+        """
+        Buduje wektory i indeks IVF.
+
+        Args:
+            vocabulary: Słownik korpusu z listami postingów
+            size: Liczba dokumentów korpusu
+            dimensions: Liczba wymiarów po SVD
+            seed: Ziarno próbkowania, SVD i k-średnich (ten sam korpus - ten sam indeks)
+        """
+        rng = np.random.default_rng(seed)
+        features = _select_features(vocabulary, size)
+        terms = [vocabulary.terms[term_id] for term_id in features]
+        idf = (np.log((1 + size) / (1 + vocabulary.doc_freq[features])) + 1).astype(np.float32)
+
+        # Macierz TF-IDF próby dokumentów (wiersze znormalizowane) do wyznaczenia bazy SVD
+        sample = np.sort(rng.choice(size, FIT_SAMPLE, replace=False)) if size > FIT_SAMPLE else np.arange(size)
+        sample_rows = np.full(size, -1, dtype=np.int32)
+        sample_rows[sample] = np.arange(len(sample))
+        rows, columns = [], []
+        for block, docs, lengths in _feature_blocks(vocabulary, features):
+            block_columns = np.repeat(np.arange(block.start, block.stop, dtype=np.int32), lengths)
+            in_sample = sample_rows[docs]
+            keep = in_sample >= 0
+            rows.append(in_sample[keep])
+            columns.append(block_columns[keep])
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int32)
+        columns = np.concatenate(columns) if columns else np.empty(0, dtype=np.int32)
+        fit_matrix = sparse.csr_matrix((idf[columns], (rows, columns)), shape=(len(sample), len(features)))
+        norms = np.sqrt(np.asarray(fit_matrix.multiply(fit_matrix).sum(axis=1)).ravel())
+        fit_matrix = sparse.diags(np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)) @ fit_matrix
+
+        rank = max(1, min(dimensions, len(features), len(sample)))
+        components = randomized_svd(fit_matrix, rank, rng) if len(features) else np.zeros((0, rank), dtype=np.float32)
+
+        # Rzut wszystkich dokumentów: suma wierszy bazy ważonych IDF po cechach dokumentu
+        vectors = np.zeros((size, rank), dtype=np.float32)
+        weighted = components * idf[:, None]
+        for block, docs, lengths in _feature_blocks(vocabulary, features):
+            indptr = np.concatenate(([0], np.cumsum(lengths)))
+            block_matrix = sparse.csc_matrix(
+                (np.ones(len(docs), dtype=np.float32), docs, indptr), shape=(size, block.stop - block.start)
+            ).tocsr()
+            # Partiami po dokumentach - wynik tymczasowy ma BATCH_SIZE wierszy, a nie tyle co korpus
+            for start in range(0, size, BATCH_SIZE):
+                vectors[start : start + BATCH_SIZE] += block_matrix[start : start + BATCH_SIZE] @ weighted[block]
+        _normalize(vectors)
+
+        lists = 1 if size < MIN_IVF_DOCUMENTS else min(MAX_LISTS, int(np.sqrt(size)))
+        nonzero = np.flatnonzero(vectors.any(axis=1))
+        if lists > 1 and len(nonzero) >= lists * 2:
+            train = rng.choice(nonzero, min(len(nonzero), lists * KMEANS_SAMPLE_PER_LIST), replace=False)
+            centroids = _spherical_kmeans(vectors[train], lists, rng)
+            assignment = np.empty(size, dtype=np.int64)
+            for start in range(0, size, BATCH_SIZE):
+                assignment[start : start + BATCH_SIZE] = np.argmax(
+                    vectors[start : start + BATCH_SIZE] @ centroids.T, axis=1
+                )
+        else:
+            centroids = np.zeros((1, rank), dtype=np.float32)
+            assignment = np.zeros(size, dtype=np.int64)
+
+        doc_ids = np.argsort(assignment, kind="stable")
+        offsets = np.searchsorted(assignment[doc_ids], np.arange(len(centroids) + 1))
+        return cls(terms, idf, components, centroids, vectors[doc_ids], doc_ids, offsets)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def list_count(self) -> int:
+        return len(self.centroids)
+
+    def query_terms(self, query: str) -> list[str]:
+        """Słowa zapytania będące cechami indeksu (bez powtórzeń, w kolejności zapytania)."""
+        return [term for term in dict.fromkeys(tokenize(query)) if term in self.term_columns]
+
+    def embed(self, query: str) -> Optional[np.ndarray]:
+        """Wektor zapytania opisowego (None, gdy żadne słowo nie jest cechą indeksu)."""
+        columns = [self.term_columns[term] for term in self.query_terms(query)]
+        if not columns:
+            return None
+        vector = self.idf[columns] @ self.components[columns]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def vector(self, doc_id: int) -> np.ndarray:
+        return self.vectors[self.rows[doc_id]]
+
+    def nearest(
+        self,
+        vector: np.ndarray,
+        limit: int,
+        probes: int = PROBES,
+        min_similarity: float = 0.0,
+        exclude: Optional[int] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Przybliżeni najbliżsi sąsiedzi wektora (podobieństwo kosinusowe).
+
+        Args:
+            vector: Znormalizowany wektor zapytania
+            limit: Maksymalna liczba dokumentów
+            probes: Liczba przeszukiwanych list IVF (więcej = dokładniej i wolniej)
+            min_similarity: Dokumenty mniej podobne są pomijane
+            exclude: Id dokumentu pomijanego w wyniku (np. sam dokument w "więcej takich")
+
+        Returns:
+            (id dokumentów, podobieństwa) malejąco po podobieństwie
+        """
+        probes = min(probes, self.list_count)
+        if probes < self.list_count:
+            chosen = np.argpartition(-(self.centroids @ vector), probes - 1)[:probes]
+        else:
+            chosen = np.arange(self.list_count)
+        starts = self.offsets[chosen]
+        lengths = self.offsets[chosen + 1] - starts
+        rows = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(int(lengths.sum()))
+
+        scores = self.vectors[rows] @ vector
+        keep = scores > max(min_similarity, 0.0)
+        if exclude is not None:
+            keep &= rows != self.rows[exclude]
+        rows, scores = rows[keep], scores[keep]
+        if len(rows) > limit:
+            best = np.argpartition(-scores, limit - 1)[:limit]
+            rows, scores = rows[best], scores[best]
+        order = np.lexsort((rows, -scores))
+        return self.doc_ids[rows[order]].astype(np.int64), scores[order]
+
+
+def semantic_match(corpus, query: str) -> tuple[np.ndarray, list[str]]:
+    """
+    Dopasowanie trybu semantycznego.
+
+    Returns:
+        (id dokumentów malejąco po podobieństwie, słowa zapytania znane indeksowi - do podświetlania)
+    """
+    index = get_semantic_index(corpus)
+    vector = index.embed(query)
+    if vector is None:
+        return np.empty(0, dtype=np.int64), []
+    with timed("search.semantic"):
+        doc_ids, _ = index.nearest(vector, SEMANTIC_LIMIT, min_similarity=MIN_SIMILARITY)
+    return doc_ids, index.query_terms(query)
+
+
+def similar_documents(corpus, doc_id: int, limit: int = 10) -> list[tuple[int, float]]:
+    """Dokumenty najbardziej podobne treścią do wskazanego ("więcej takich"), bez niego samego."""
+    index = get_semantic_index(corpus)
+    vector = index.vector(doc_id)
+    if not vector.any():
+        return []
+    with timed("search.similar"):
+        doc_ids, scores = index.nearest(vector, limit, exclude=doc_id)
+    return [(int(similar), float(score)) for similar, score in zip(doc_ids, scores)]
+
+
+def get_semantic_index(corpus) -> SemanticIndex:
+    """Zwraca (budując przy pierwszym użyciu ze słownika korpusu) indeks semantyczny."""
+
+    def _build(corpus):
+        vocabulary = get_vocabulary(corpus)
+        with timed("index.semantic"):
+            return SemanticIndex.build(vocabulary, len(corpus))
+
+    return corpus.get_index("semantic", _build)
@@ -0,0 +1,665 @@
+"""
+Asynchroniczny serwer JSON API nad współdzielonym korpusem.
+
+Endpointy:
+    GET  /health                 - stan serwera, liczba dokumentów, zakres shardu (worker koordynatora)
+                                   i stan bezpiecznika usługi tłumaczenia
+    GET  /metrics                - pomiary etapów w formacie tekstowym Prometheusa
+    GET  /search?q=...           - wyszukiwanie (parametry: case_sensitive, limit, translate, mode, max_edits,
+                                   facets, filtry sender/recipient/domain/content_type - wartości po przecinku,
+                                   date_from/date_to - daty ISO, sort - type/date_desc/date_asc, timeline,
+                                   collapse - jeden wynik na klaster prawie-duplikatów;
+                                   mode=entity szuka encji "typ:wartość" w indeksie encji,
+                                   mode=semantic - dokumentów podobnych tematycznie,
+                                   mode=regex - wyrażenie regularne; "truncated" oznacza przekroczony budżet czasu;
+                                   zapytanie bez dopasowań zwraca "suggestions" - poprawki pisowni z wynikami)
+    GET  /docs/<id>              - pełny dokument
+    GET  /metadata/<id>          - metadane maila (data, nadawca, odbiorca, temat)
+    GET  /threads/<id>           - wątek dokumentu: członkowie w kolejności dat z metadanymi
+    GET  /similar/<id>           - dokumenty najbardziej podobne treścią ("więcej takich"; parametr: limit)
+    GET  /complete?q=...         - podpowiedzi zapytania: termy i encje zaczynające się od q (parametr: limit)
+    GET  /entities               - najczęstsze encje (parametry: type - person/email/phone/url, limit)
+    GET  /entities/related?entity=... - encje współwystępujące z encją "typ:wartość" (parametry: type, limit)
+    POST /translate              - tłumaczenie {"text": ..., "direction": "en-pl" | "pl-en"}
+                                   albo kilku tekstów naraz {"texts": [...]} (en-pl)
+    GET  /corpora                - załadowane korpusy (nazwa, źródło, liczba dokumentów, chwila załadowania)
+    POST /corpora                - załadowanie korpusu {"name": ..., "source": ..., "split": ..., "compression": ...}
+    POST /corpora/<nazwa>/refresh - przyrostowe przeładowanie korpusu z jego źródła (parametry: if_changed=1 -
+                                   tylko po zmianie rewizji źródła, full=1 - wszystkie indeksy od nowa)
+    DELETE /corpora/<nazwa>      - zwolnienie korpusu (zmiany korpusów wymagają --manage-corpora)
+
+Parametr `corpora` wyszukiwania (nazwy po przecinku albo "all") przeszukuje kilka korpusów
+równolegle i scala wyniki - każdy wynik ma pole "corpus". Parametr `corpus` endpointów
+dokumentów, wątków, podobnych, podpowiedzi i encji wybiera korpus (domyślnie główny).
+
+Wyszukiwanie i tłumaczenie są wykonywane w puli wątków, więc pętla zdarzeń
+pozostaje responsywna także przy wielu równoczesnych klientach.
+
+Uruchomienie:
+    python -m search_engine.server --source corpus.parquet --port 8080
+    python -m search_engine.server --corpus ocr=batches/ocr.parquet --corpus v2=releases/v2.jsonl
+    python -m search_engine.server --source corpus.parquet --shard 0/4 --port 8081   # worker shardu
+"""
+
+import argparse
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+import instrumentation
+from search_engine.autocomplete import DEFAULT_LIMIT as COMPLETION_LIMIT
+from search_engine.autocomplete import MAX_LIMIT as MAX_COMPLETION_LIMIT
+from search_engine.autocomplete import complete, get_completion_index
+from search_engine.blockstore import CODECS, DEFAULT_BLOCK_SIZE
+from search_engine.cooccurrence import DEFAULT_RELATED, get_cooccurrence_graph
+from search_engine.corpus import DEFAULT_DATASET, DEFAULT_SPLIT, Corpus, Shard, load_shard
+from search_engine.dates import get_date_index
+from search_engine.dedup import get_duplicate_index
+from search_engine.entities import DEFAULT_TOP, ENTITY_TYPES, get_entity_index, parse_entity_query
+from search_engine.facets import FACET_FIELDS
+from search_engine.federation import CorpusRegistry, corpus_name
+from search_engine.fuzzy import get_deletion_index
+from search_engine.headers import get_header_indexes
+from search_engine.protocol import ProtocolError, Request, encode_response, read_request
+from search_engine.regex import compile_pattern, get_trigram_index
+from search_engine.search import DEFAULT_LIMIT, SEARCH_MODES, SORT_ORDERS, extract_metadata, get_docs, search
+from search_engine.semantic import get_semantic_index, similar_documents
+from search_engine.threads import get_thread_index
+
+logger = logging.getLogger(__name__)
+
+MAX_LIMIT = 1000
+SIMILAR_LIMIT = 10
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class HTTPError(Exception):
+    """Błąd zwracany klientowi jako odpowiedź JSON z danym statusem."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _parse_bool(value: Optional[str]) -> bool:
+    return (value or "").lower() in ("1", "true", "yes", "on")
+
+
+def _parse_int(value: Optional[str], name: str, default: int, minimum: int = 0, maximum: Optional[int] = None) -> int:
+    if value is None or value == "":
+        return default
+    try:
+        number = int(value)
+    except ValueError as e:
+        raise HTTPError(400, f"Parametr '{name}' musi być liczbą całkowitą") from e
+    if number < minimum or (maximum is not None and number > maximum):
+        raise HTTPError(400, f"Parametr '{name}' poza zakresem")
+    return number
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        np.datetime64(value)
+    except ValueError as e:
+        raise HTTPError(400, f"Parametr '{name}' musi być datą ISO (np. 2009-03-31)") from e
+    return value
+
+
+def prepare_corpus(corpus: Corpus) -> None:
+    """
+    Buduje indeksy przy ładowaniu, a nie przy pierwszym zapytaniu: indeksy nagłówków (fasety, daty, wątki
+    i encje - jedno przejście), duplikaty, graf współwystępowania, wektory semantyczne, trigramy,
+    podpowiedzi i poprawki pisowni.
+    """
+    get_header_indexes(corpus)
+    get_duplicate_index(corpus)
+    get_cooccurrence_graph(corpus)
+    get_semantic_index(corpus)
+    get_trigram_index(corpus)
+    get_completion_index(corpus)
+    get_deletion_index(corpus)
+
+
+class JSONServer:
+    """
+    Serwer HTTP/1.1 z odpowiedziami JSON; podklasy rejestrują handlery w `_routes`.
+
+    Args:
+        host: Adres nasłuchiwania
+        port: Port (0 = wybierz wolny port)
+        unix_socket: Ścieżka gniazda lokalnego (zamiast adresu i portu)
+    """
+
+    description = "Serwer"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, unix_socket: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self._server: Optional[asyncio.Server] = None
+        # (metoda, pierwszy człon ścieżki) -> handler(request, pozostałe człony)
+        self._routes: dict[tuple[str, str], Callable] = {}
+
+    async def start(self) -> None:
+        """Zaczyna nasłuchiwanie; po starcie `self.port` zawiera faktyczny port."""
+        if self.unix_socket:
+            self._server = await asyncio.start_unix_server(self._handle_connection, self.unix_socket)
+            logger.info("%s nasłuchuje na gnieździe %s", self.description, self.unix_socket)
+            return
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("%s nasłuchuje na http://%s:%d", self.description, self.host, self.port)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ProtocolError as e:
+                    writer.write(encode_response(400, {"error": str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+
+                with instrumentation.timed("server.request"):
+                    status, payload = await self.dispatch(request)
+                instrumentation.increment(f"server.responses.{status}")
+
+                # Tekstowe odpowiedzi (np. /metrics) nie są serializowane do JSON
+                if isinstance(payload, str):
+                    response = encode_response(status, payload, request.keep_alive, PROMETHEUS_CONTENT_TYPE)
+                else:
+                    response = encode_response(status, payload, keep_alive=request.keep_alive)
+                writer.write(response)
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request: Request) -> tuple[int, Any]:
+        """Kieruje żądanie do handlera; zwraca (status, treść JSON)."""
+        parts = [part for part in request.path.split("/") if part]
+        if not parts:
+            return 404, {"error": "Nie znaleziono"}
+
+        handler = self._routes.get((request.method, parts[0]))
+        if handler is None:
+            if any(route == parts[0] for _method, route in self._routes):
+                return 405, {"error": f"Metoda {request.method} niedozwolona"}
+            return 404, {"error": "Nie znaleziono"}
+
+        try:
+            return 200, await handler(request, parts[1:])
+        except HTTPError as e:
+            return e.status, {"error": e.message}
+        except ProtocolError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            logger.exception("Błąd podczas obsługi %s %s", request.method, request.path)
+            return 500, {"error": f"Błąd serwera: {e}"}
+
+
+class SearchServer(JSONServer):
+    """
+    Serwer HTTP udostępniający wyszukiwanie we współdzielonych korpusach.
+
+    Args:
+        corpus: Główny korpus (wraz z indeksami) współdzielony przez wszystkie połączenia
+        host: Adres nasłuchiwania
+        port: Port (0 = wybierz wolny port)
+        executor: Pula wykonująca operacje obciążające CPU (domyślnie wątki = liczba rdzeni)
+        registry: Rejestr korpusów do wyszukiwania federacyjnego (domyślnie tylko główny korpus)
+        manage_corpora: Czy klienci mogą ładować, przeładowywać i zwalniać korpusy
+        unix_socket: Ścieżka gniazda lokalnego (zamiast adresu i portu)
+        shard: Zakres pełnego korpusu obsługiwany przez ten serwer (worker koordynatora)
+    """
+
+    description = "Serwer wyszukiwania"
+
+    def __init__(
+        self,
+        corpus: Corpus,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        executor: Optional[Executor] = None,
+        registry: Optional[CorpusRegistry] = None,
+        manage_corpora: bool = False,
+        unix_socket: Optional[str] = None,
+        shard: Optional[Shard] = None,
+    ):
+        super().__init__(host, port, unix_socket)
+        self._owns_registry = registry is None
+        self.registry = registry or CorpusRegistry()
+        # Główny korpus jest w rejestrze pod własną nazwą (o ile nie został tam dodany wcześniej)
+        self.primary = next(
+            (entry.name for entry in self.registry.entries() if entry.corpus is corpus), corpus_name(corpus.name)
+        )
+        if self.primary not in self.registry:
+            self.registry.add(self.primary, corpus)
+        self.manage_corpora = manage_corpora
+        self.shard = shard
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="search")
+        self._routes = {
+            ("GET", "health"): self._handle_health,
+            ("GET", "metrics"): self._handle_metrics,
+            ("GET", "search"): self._handle_search,
+            ("GET", "docs"): self._handle_doc,
+            ("GET", "metadata"): self._handle_metadata,
+            ("GET", "threads"): self._handle_thread,
+            ("GET", "similar"): self._handle_similar,
+            ("GET", "complete"): self._handle_complete,
+            ("GET", "entities"): self._handle_entities,
+            ("POST", "translate"): self._handle_translate,
+            ("GET", "corpora"): self._handle_corpora,
+            ("POST", "corpora"): self._handle_corpora_change,
+            ("DELETE", "corpora"): self._handle_corpora_unload,
+        }
+
+    @property
+    def corpus(self) -> Corpus:
+        """Główny korpus (po przeładowaniu - nowy egzemplarz z rejestru)."""
+        return self.registry.get(self.primary)
+
+    async def close(self) -> None:
+        await super().close()
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
+        if self._owns_registry:
+            self.registry.close()
+
+    async def _run_in_executor(self, func: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def _corpus(self, request: Request) -> Corpus:
+        name = request.query.get("corpus") or self.primary
+        try:
+            return self.registry.get(name)
+        except KeyError as e:
+            raise HTTPError(404, f"Nieznany korpus: {name}") from e
+
+    def _corpus_names(self, value: str) -> list[str]:
+        if value == "all":
+            return self.registry.names()
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.registry]
+        if unknown:
+            raise HTTPError(404, f"Nieznane korpusy: {', '.join(unknown)}")
+        return names
+
+    def _doc_id(self, args: list[str], corpus: Corpus) -> int:
+        if len(args) != 1:
+            raise HTTPError(404, "Nie znaleziono")
+        doc_id = _parse_int(args[0], "id", default=-1)
+        if doc_id >= len(corpus):
+            raise HTTPError(404, f"Brak dokumentu {doc_id}")
+        return doc_id
+
+    async def _handle_health(self, request: Request, args: list[str]) -> dict:
+        import translation_utils
+
+        return {
+            "status": "ok",
+            "corpus": self.corpus.name,
+            "documents": len(self.corpus),
+            "corpora": len(self.registry),
+            "shard": self.shard.to_dict() if self.shard else None,
+            "translation": translation_utils.get_circuit_breaker().snapshot(),
+        }
+
+    async def _handle_metrics(self, request: Request, args: list[str]) -> str:
+        return instrumentation.to_prometheus()
+
+    async def _handle_search(self, request: Request, args: list[str]) -> dict:
+        query = request.query.get("q", "").strip()
+        if not query:
+            raise HTTPError(400, "Brak parametru 'q'")
+        case_sensitive = _parse_bool(request.query.get("case_sensitive"))
+        limit = _parse_int(request.query.get("limit"), "limit", DEFAULT_LIMIT, maximum=MAX_LIMIT)
+        mode = request.query.get("mode") or "exact"
+        if mode not in SEARCH_MODES:
+            raise HTTPError(400, f"Parametr 'mode' musi mieć wartość: {', '.join(SEARCH_MODES)}")
+        if mode == "entity":
+            try:
+                parse_entity_query(query)
+            except ValueError as e:
+                raise HTTPError(400, str(e)) from e
+        if mode == "regex":
+            try:
+                compile_pattern(query, case_sensitive)
+            except ValueError as e:
+                raise HTTPError(400, str(e)) from e
+        max_edits = _parse_int(request.query.get("max_edits"), "max_edits", 1, maximum=2)
+        filters = {
+            field: [value.strip() for value in request.query[field].split(",") if value.strip()]
+            for field in FACET_FIELDS
+            if request.query.get(field)
+        }
+        facets = _parse_bool(request.query.get("facets"))
+        date_from = _parse_date(request.query.get("date_from"), "date_from")
+        date_to = _parse_date(request.query.get("date_to"), "date_to")
+        sort = request.query.get("sort") or "type"
+        if sort not in SORT_ORDERS:
+            raise HTTPError(400, f"Parametr 'sort' musi mieć wartość: {', '.join(SORT_ORDERS)}")
+        timeline = _parse_bool(request.query.get("timeline"))
+        collapse = _parse_bool(request.query.get("collapse"))
+
+        search_query = query
+        # Wzorzec regex nie jest tłumaczony - tłumaczenie zniszczyłoby jego składnię
+        if mode != "regex" and _parse_bool(request.query.get("translate")):
+            import translation_utils
+
+            search_query = await self._run_in_executor(translation_utils.translate_query_to_english, query)
+
+        options = dict(
+            mode=mode,
+            max_edits=max_edits,
+            filters=filters,
+            facets=facets,
+            date_from=date_from,
+            date_to=date_to,
+            sort=sort,
+            timeline=timeline,
+            collapse_duplicates=collapse,
+            suggest=True,
+        )
+        if request.query.get("corpora"):
+            names = self._corpus_names(request.query["corpora"])
+            result = await self._run_in_executor(
+                self.registry.search, search_query, names, case_sensitive=case_sensitive, limit=limit, **options
+            )
+        else:
+            corpus = self._corpus(request)
+            result = await self._run_in_executor(search, corpus, search_query, case_sensitive, limit, **options)
+        payload = result.to_dict()
+        payload["original_query"] = query
+        if sort != "type":
+            # Daty wyników - koordynator shardów scala po nich wyniki kilku serwerów. Indeks dat jest gotowy
+            # po `prepare_corpus`; korpus dodany bez przygotowania zbuduje go w puli wątków, nie w pętli zdarzeń
+            dates = {}
+            for name in {hit.get("corpus") or self.primary for hit in payload["hits"]}:
+                dates[name] = (await self._run_in_executor(get_date_index, self.registry.get(name))).dates
+            for hit in payload["hits"]:
+                date = dates[hit.get("corpus") or self.primary][hit["doc_id"]]
+                hit["date"] = None if np.isnat(date) else np.datetime_as_string(date, unit="s")
+        return payload
+
+    async def _handle_doc(self, request: Request, args: list[str]) -> dict:
+        corpus = self._corpus(request)
+        return get_docs(corpus, [self._doc_id(args, corpus)])[0]
+
+    async def _handle_metadata(self, request: Request, args: list[str]) -> dict:
+        corpus = self._corpus(request)
+        doc_id = self._doc_id(args, corpus)
+        return {"doc_id": doc_id, **extract_metadata(corpus, [doc_id])[0]}
+
+    async def _handle_thread(self, request: Request, args: list[str]) -> dict:
+        corpus = self._corpus(request)
+        doc_id = self._doc_id(args, corpus)
+        threads = await self._run_in_executor(get_thread_index, corpus)
+        members = threads.members(doc_id)
+        metadata = extract_metadata(corpus, members)
+        return {
+            "doc_id": doc_id,
+            "thread_id": threads.thread_id(doc_id),
+            "members": [
+                {"doc_id": int(member), "filename": corpus.filenames.iat[member], **member_metadata}
+                for member, member_metadata in zip(members, metadata)
+            ],
+        }
+
+    async def _handle_similar(self, request: Request, args: list[str]) -> dict:
+        corpus = self._corpus(request)
+        doc_id = self._doc_id(args, corpus)
+        limit = _parse_int(request.query.get("limit"), "limit", SIMILAR_LIMIT, minimum=1, maximum=MAX_LIMIT)
+        similar = await self._run_in_executor(similar_documents, corpus, doc_id, limit)
+        return {
+            "doc_id": doc_id,
+            "similar": [
+                {"doc_id": similar_id, "filename": corpus.filenames.iat[similar_id], "similarity": round(score, 4)}
+                for similar_id, score in similar
+            ],
+        }
+
+    async def _handle_complete(self, request: Request, args: list[str]) -> dict:
+        prefix = request.query.get("q", "")
+        limit = _parse_int(
+            request.query.get("limit"), "limit", COMPLETION_LIMIT, minimum=1, maximum=MAX_COMPLETION_LIMIT
+        )
+        # Podpowiedź to wyszukiwanie binarne w gotowym indeksie; w puli wątków, bo korpus dodany
+        # bez `prepare_corpus` buduje indeks przy pierwszym użyciu
+        completions = await self._run_in_executor(complete, self._corpus(request), prefix, limit)
+        return {"query": prefix, "completions": completions}
+
+    async def _handle_entities(self, request: Request, args: list[str]) -> dict:
+        entity_type = request.query.get("type") or None
+        if entity_type is not None and entity_type not in ENTITY_TYPES:
+            raise HTTPError(400, f"Parametr 'type' musi mieć wartość: {', '.join(ENTITY_TYPES)}")
+        corpus = self._corpus(request)
+        if args == ["related"]:
+            return await self._handle_related(request, corpus, entity_type)
+        if args:
+            raise HTTPError(404, "Nie znaleziono")
+        limit = _parse_int(request.query.get("limit"), "limit", DEFAULT_TOP, minimum=1, maximum=MAX_LIMIT)
+        index = await self._run_in_executor(get_entity_index, corpus)
+        return {"entities": index.top(entity_type, limit=limit)}
+
+    async def _handle_related(self, request: Request, corpus: Corpus, entity_type: Optional[str]) -> dict:
+        try:
+            kind, value = parse_entity_query(request.query.get("entity") or "")
+        except ValueError as e:
+            raise HTTPError(400, str(e)) from e
+        limit = _parse_int(request.query.get("limit"), "limit", DEFAULT_RELATED, minimum=1, maximum=MAX_LIMIT)
+        graph = await self._run_in_executor(get_cooccurrence_graph, corpus)
+        related = await self._run_in_executor(graph.related, kind, value, limit, entity_type)
+        return {"entity": {"type": kind, "value": value}, "related": related}
+
+    async def _handle_translate(self, request: Request, args: list[str]) -> dict:
+        import translation_utils
+
+        body = request.json()
+        texts = body.get("texts") if isinstance(body, dict) else None
+        if texts is not None:
+            # Kilka tekstów (np. strona wyników) - krótkie są tłumaczone jednym żądaniem do usługi
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise HTTPError(400, "Pole 'texts' musi być listą napisów")
+            if body.get("direction", "en-pl") != "en-pl":
+                raise HTTPError(400, "Lista tekstów jest tłumaczona tylko w kierunku 'en-pl'")
+            translated = await self._run_in_executor(translation_utils.translate_texts, texts)
+            return {"texts": texts, "translated": translated, "direction": "en-pl"}
+
+        text = body.get("text") if isinstance(body, dict) else None
+        if not isinstance(text, str):
+            raise HTTPError(400, "Pole 'text' musi być napisem")
+
+        direction = body.get("direction", "en-pl")
+        if direction == "en-pl":
+            translated = await self._run_in_executor(translation_utils.translate_text, text)
+        elif direction == "pl-en":
+            translated = await self._run_in_executor(translation_utils.translate_query_to_english, text)
+        else:
+            raise HTTPError(400, "Pole 'direction' musi mieć wartość 'en-pl' lub 'pl-en'")
+
+        return {"text": text, "translated": translated, "direction": direction}
+
+    async def _handle_corpora(self, request: Request, args: list[str]) -> dict:
+        if args:
+            raise HTTPError(404, "Nie znaleziono")
+        return {"primary": self.primary, "corpora": [entry.to_dict() for entry in self.registry.entries()]}
+
+    def _check_manage(self) -> None:
+        if not self.manage_corpora:
+            raise HTTPError(403, "Zmiany korpusów są wyłączone (uruchom serwer z --manage-corpora)")
+
+    async def _handle_corpora_change(self, request: Request, args: list[str]) -> dict:
+        self._check_manage()
+        if len(args) == 2 and args[1] == "refresh":
+            try:
+                if _parse_bool(request.query.get("if_changed")):
+                    entry = await self._run_in_executor(self.registry.refresh_if_changed, args[0])
+                else:
+                    incremental = not _parse_bool(request.query.get("full"))
+                    entry = await self._run_in_executor(self.registry.refresh, args[0], incremental)
+            except KeyError as e:
+                raise HTTPError(404, f"Nieznany korpus: {args[0]}") from e
+            except ValueError as e:
+                raise HTTPError(400, str(e)) from e
+            if entry is None:
+                return {**self.registry.entry(args[0]).to_dict(), "reloaded": False}
+            return {**entry.to_dict(), "reloaded": True}
+        if args:
+            raise HTTPError(404, "Nie znaleziono")
+
+        body = request.json()
+        if not isinstance(body, dict) or not isinstance(body.get("source"), str) or not body["source"]:
+            raise HTTPError(400, "Pole 'source' musi być napisem")
+        name = body.get("name") or corpus_name(body["source"])
+        if name in self.registry:
+            raise HTTPError(409, f"Korpus {name} jest już załadowany (przeładowanie: POST /corpora/{name}/refresh)")
+        compression = body.get("compression") or None
+        if compression is not None and compression not in CODECS:
+            raise HTTPError(400, f"Pole 'compression' musi mieć wartość: {', '.join(CODECS)}")
+        block_size = body.get("block_size", DEFAULT_BLOCK_SIZE)
+        if not isinstance(block_size, int) or block_size <= 0:
+            raise HTTPError(400, "Pole 'block_size' musi być dodatnią liczbą całkowitą")
+        try:
+            entry = await self._run_in_executor(
+                self.registry.load,
+                name,
+                body["source"],
+                split=body.get("split") or DEFAULT_SPLIT,
+                compression=compression,
+                block_size=block_size,
+            )
+        except (ValueError, OSError) as e:
+            raise HTTPError(400, f"Nie udało się załadować korpusu: {e}") from e
+        return entry.to_dict()
+
+    async def _handle_corpora_unload(self, request: Request, args: list[str]) -> dict:
+        self._check_manage()
+        if len(args) != 1:
+            raise HTTPError(404, "Nie znaleziono")
+        if args[0] == self.primary:
+            raise HTTPError(409, "Głównego korpusu nie można zwolnić")
+        try:
+            self.registry.unload(args[0])
+        except KeyError as e:
+            raise HTTPError(404, f"Nieznany korpus: {args[0]}") from e
+        return {"name": args[0], "unloaded": True}
+
+
+def _parse_shard(value: str) -> tuple[int, int]:
+    # "0/4" -> (0, 4)
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError as e:
+        raise SystemExit(f"Niepoprawny shard {value!r} (oczekiwano NR/LICZBA, np. 0/4)") from e
+    if not 0 <= index < count:
+        raise SystemExit(f"Niepoprawny shard {value!r}: numer musi być w zakresie 0..{count - 1}")
+    return index, count
+
+
+def _parse_corpus_option(value: str) -> tuple[str, str]:
+    # "nazwa=źródło" albo samo źródło (nazwa z nazwy pliku/zbioru)
+    name, separator, source = value.partition("=")
+    if not separator:
+        return corpus_name(value), value
+    return name, source
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="search_engine.server", description="Serwer JSON API wyszukiwarki maili.")
+    parser.add_argument("--source", default=DEFAULT_DATASET, help="Zbiór Hugging Face lub plik .parquet/.jsonl")
+    parser.add_argument("--split", default=DEFAULT_SPLIT, help="Podział zbioru danych Hugging Face")
+    parser.add_argument("--host", default="127.0.0.1", help="Adres nasłuchiwania")
+    parser.add_argument("--port", type=int, default=8080, help="Port nasłuchiwania")
+    parser.add_argument(
+        "--compress", choices=CODECS, help="Kompresuj teksty blokami (mniej pamięci, wolniejszy pełny skan)"
+    )
+    parser.add_argument(
+        "--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="Rozmiar bloku tekstów przed kompresją (bajty)"
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        default=[],
+        metavar="NAZWA=ŹRÓDŁO",
+        help="Dodatkowy korpus do wyszukiwania federacyjnego (można podać wielokrotnie)",
+    )
+    parser.add_argument(
+        "--manage-corpora", action="store_true", help="Pozwól klientom ładować, przeładowywać i zwalniać korpusy"
+    )
+    parser.add_argument(
+        "--shard", metavar="NR/LICZBA", help="Załaduj tylko shard korpusu, np. 0/4 (worker koordynatora shardów)"
+    )
+    parser.add_argument("--unix-socket", help="Nasłuchuj na gnieździe lokalnym zamiast na porcie")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 4, help="Wątki dla wyszukiwania")
+    parser.add_argument("--metrics", action="store_true", help="Zbieraj pomiary etapów (endpoint /metrics)")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        instrumentation.enable()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    registry = CorpusRegistry(prepare=prepare_corpus)
+    primary = corpus_name(args.source)
+    shard = None
+    if args.shard:
+        index, count = _parse_shard(args.shard)
+        corpus, shard = load_shard(
+            args.source, index, count, split=args.split, compression=args.compress, block_size=args.block_size
+        )
+        prepare_corpus(corpus)
+        registry.add(primary, corpus)
+        logger.info(
+            "Shard %d/%d: dokumenty %d-%d z %d", index, count, shard.offset, shard.offset + len(corpus), shard.total
+        )
+    else:
+        registry.load(primary, args.source, split=args.split, compression=args.compress, block_size=args.block_size)
+    for option in args.corpus:
+        name, source = _parse_corpus_option(option)
+        registry.load(name, source, split=args.split, compression=args.compress, block_size=args.block_size)
+    server = SearchServer(
+        registry.get(primary),
+        host=args.host,
+        port=args.port,
+        executor=ThreadPoolExecutor(max_workers=args.threads),
+        registry=registry,
+        manage_corpora=args.manage_corpora,
+        unix_socket=args.unix_socket,
+        shard=shard,
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
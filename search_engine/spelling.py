@@ -0,0 +1,92 @@
+"""
+Podpowiedzi "Czy chodziło o..." dla zapytań bez wyników.
+
+Korzysta z gotowego indeksu usunięć słownika (SymSpell, `search_engine.fuzzy`): każde słowo
+zapytania rozwijane jest do kilku najbliższych termów korpusu, a kombinacje są oceniane
+liczbą dokumentów zawierających wszystkie poprawione słowa - iloczyn list postingów,
+bez skanu tekstów. Przy zbudowanym indeksie podpowiedź kosztuje kilka milisekund.
+
+Ranking: liczba trafień dzielona przez `EDIT_PENALTY` do potęgi odległości edycyjnej - każda
+dodatkowa edycja musi być uzasadniona wielokrotnie większą liczbą dokumentów. Dzięki temu
+wariant OCR obecny w korpusie ("Maxwel1", kilkanaście dokumentów) przegrywa z częstym
+termem w odległości 1 ("Maxwell")."""
+
+from itertools import islice, product
+
+import numpy as np
+
+from instrumentation import timed
+from search_engine.fuzzy import effective_distance, get_deletion_index
+from search_engine.vocabulary import TOKEN_RE
+
+DEFAULT_SUGGESTIONS = 3
+MAX_DISTANCE = 2
+# Kandydaci na słowo i ograniczenie liczby ocenianych kombinacji (zapytania wielowyrazowe)
+CANDIDATES_PER_WORD = 3
+MAX_COMBINATIONS = 27
+MAX_WORDS = 6
+EDIT_PENALTY = 10
+
+
+def _match_case(original: str, corrected: str) -> str:
+    """Przenosi wielkość liter słowa z zapytania na poprawkę ("EPSTIEN" -> "EPSTEIN", "Epstien" -> "Epstein")."""
+    if len(original) > 1 and original.isupper():
+        return corrected.upper()
+    if original[:1].isupper():
+        return corrected[:1].upper() + corrected[1:]
+    return corrected
+
+
+def suggest_corrections(corpus, query: str, limit: int = DEFAULT_SUGGESTIONS) -> list[dict]:
+    """
+    Poprawki pisowni zapytania, po których są wyniki.
+
+    Args:
+        corpus: Przeszukiwany korpus
+        query: Zapytanie bez wyników
+        limit: Maksymalna liczba podpowiedzi
+
+    Returns:
+        Lista {"query": poprawione zapytanie, "hits": liczba dokumentów ze wszystkimi słowami,
+        "distance": łączna odległość edycyjna} - od najlepszej (trafienia ważone odległością)
+    """
+    matches = list(TOKEN_RE.finditer(query))
+    if not matches or len(matches) > MAX_WORDS:
+        return []
+
+    index = get_deletion_index(corpus)
+    vocabulary = index.vocabulary
+    with timed("search.spelling"):
+        options = []
+        for match in matches:
+            word = match.group().lower()
+            # Krótkie słowa i liczby nie są poprawiane (zbyt wiele termów w małej odległości)
+            distance = 0 if word.isdigit() else effective_distance(word, MAX_DISTANCE)
+            candidates = sorted(
+                index.lookup(word, distance),
+                key=lambda candidate: -vocabulary.frequency(candidate[0]) / EDIT_PENALTY ** candidate[1],
+            )[:CANDIDATES_PER_WORD]
+            if not candidates:
+                return []
+            options.append(candidates)
+
+        suggestions = []
+        for combination in islice(product(*options), MAX_COMBINATIONS):
+            terms = [term for term, _distance in combination]
+            distance = sum(distance for _term, distance in combination)
+            if distance == 0:
+                continue
+            doc_ids = vocabulary.postings(terms[0])
+            for term in terms[1:]:
+                doc_ids = np.intersect1d(doc_ids, vocabulary.postings(term), assume_unique=True)
+            if not len(doc_ids):
+                continue
+            # Poprawione słowa wstawione w miejsce oryginalnych - interpunkcja i odstępy zostają
+            replacements = iter(terms)
+            corrected = TOKEN_RE.sub(lambda found: _match_case(found.group(), next(replacements)), query)
+            suggestions.append({"query": corrected, "hits": int(len(doc_ids)), "distance": distance})
+
+    suggestions.sort(
+        key=lambda suggestion: (-suggestion["hits"] / EDIT_PENALTY ** suggestion["distance"], suggestion["query"])
+    )
+    return suggestions[:limit]
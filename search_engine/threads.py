@@ -0,0 +1,317 @@
+"""
+Rekonstrukcja wątków mailowych.
+
+Przy ładowaniu korpusu dokumenty są łączone w wątki na podstawie:
+    - znormalizowanego tematu (bez "Re:", "Fw:" itp.) i wspólnego uczestnika
+      (nadawca lub odbiorca), o ile wiadomości dzieli najwyżej `MAX_THREAD_GAP`,
+    - cytowanego tekstu: odpowiedź cytująca początek treści innego dokumentu
+      (bloki "> ...", "-----Original Message-----", "On ... wrote:") jest z nim łączona.
+
+Wątki to spójne składowe grafu tych powiązań. Dla każdego dokumentu przechowywany
+jest identyfikator wątku (najmniejsze id dokumentu w wątku), a członkowie wątków
+leżą w jednej tablicy posortowanej po (wątek, data), z przesunięciami indeksowanymi
+id wątku - pobranie całego wątku to wycinek tablicy, bez ponownego wyszukiwania.
+"""
+
+import re
+from itertools import chain, islice
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from search_engine.dates import DateIndex
+from search_engine.dedup import connected_components
+from search_engine.facets import header_addresses
+from search_engine.updates import CorpusChanges
+from search_engine.vocabulary import TOKEN_RE
+from translation_utils import extract_email_metadata
+
+# Wiadomości o tym samym temacie i uczestniku dalej od siebie to już osobne wątki
+MAX_THREAD_GAP = np.timedelta64(90, "D")
+
+# Klucz treści: pierwsze słowa wiadomości (krótsze fragmenty są zbyt pospolite, by łączyć)
+KEY_WORDS = 20
+MIN_KEY_WORDS = 8
+# Treść wspólna dla większej liczby dokumentów to szablon (stopka, formularz), nie wątek
+MAX_SHARED_KEY = 20
+
+# Temat po normalizacji jest przycinany - nagłówki są skracane do 100 znaków razem z "Re: "
+SUBJECT_KEY_LENGTH = 60
+
+_SUBJECT_PREFIX_RE = re.compile(r"^\s*(?:(?:re|fw|fwd|aw|wg|odp|sv|tr)\s*(?:\[\d+\]|\(\d+\))?\s*:\s*)+", re.I)
+_GENERIC_SUBJECTS = {"", "n/a", "no subject", "(no subject)", "brak tematu"}
+
+_HEADER_LINE_RE = re.compile(r"^[ \t]*(?:From|Sent|To|Cc|Bcc|Date|Subject|Importance)[ \t]*:.*$", re.I | re.M)
+_BLANK_LINE_RE = re.compile(r"\n[ \t]*\n")
+_QUOTE_START_RE = re.compile(
+    r"^[ \t]*(?:>|-{2,}\s*(?:Original Message|Forwarded message)|On\b[^\n]{0,200}?\bwrote:|From[ \t]*:)",
+    re.I | re.M,
+)
+_QUOTE_SEPARATOR_RE = re.compile(
+    r"^(?:-{2,}\s*(?:Original Message|Forwarded message)[^\n]*|On\b[^\n]{0,200}?\bwrote:[^\n]*|(?=From[ \t]*:))",
+    re.I | re.M,
+)
+_QUOTE_PREFIX_RE = re.compile(r"^[ \t>]+", re.M)
+
+
+def normalize_subject(subject: str) -> str:
+    """Temat bez przedrostków odpowiedzi i przekazania, małymi literami ("" dla tematów ogólnych)."""
+    if not subject:
+        return ""
+    normalized = _SUBJECT_PREFIX_RE.sub("", subject)
+    normalized = re.sub(r"\s+", " ", normalized).strip(" .").lower()
+    if normalized.endswith("..."):
+        normalized = normalized[:-3].rstrip()
+    if normalized in _GENERIC_SUBJECTS:
+        return ""
+    return normalized[:SUBJECT_KEY_LENGTH]
+
+
+def thread_keys(metadata: dict[str, str]) -> list[int]:
+    """
+    Hashe kluczy (temat, uczestnik) dokumentu - dokumenty o wspólnym kluczu mogą należeć do jednego wątku.
+
+    Przechowywane są 64-bitowe hashe, nie napisy: klucze są potrzebne tylko do porównań w obrębie budowy indeksu.
+    """
+    subject = normalize_subject(metadata["subject"])
+    if not subject:
+        return []
+    participants = header_addresses(metadata["from"], split_names=r";") + header_addresses(
+        metadata["to"], split_names=r";"
+    )
+    return [hash(f"{subject}\n{participant}") for participant in dict.fromkeys(participants)]
+
+
+def header_end(text: str) -> int:
+    """Pozycja początku treści: za blokiem nagłówków, jeśli dokument się nim zaczyna (inaczej 0)."""
+    if not _HEADER_LINE_RE.match(text):
+        return 0
+    blank = _BLANK_LINE_RE.search(text)
+    return blank.end() if blank else len(text)
+
+
+def split_message(text: str) -> tuple[str, str]:
+    """
+    Dzieli dokument na własną treść wiadomości i cytowaną historię.
+
+    Returns:
+        (treść bez nagłówków, cytowany fragment - pusty, gdy wiadomość niczego nie cytuje)
+    """
+    body = text[header_end(text) :]
+    quote = _QUOTE_START_RE.search(body)
+    if quote is None:
+        return body, ""
+    return body[: quote.start()], body[quote.start() :]
+
+
+def text_key(text: str) -> Optional[int]:
+    """Hash pierwszych `KEY_WORDS` słów wiadomości (None dla zbyt krótkich)."""
+    words = [match.group() for match in islice(TOKEN_RE.finditer(text[:2000].lower()), KEY_WORDS)]
+    return hash(" ".join(words)) if len(words) >= MIN_KEY_WORDS else None
+
+
+def quoted_keys(quoted: str) -> list[int]:
+    """Klucze treści cytowanych wiadomości (każda cytowana wiadomość osobno)."""
+    if not quoted:
+        return []
+    unquoted = _QUOTE_PREFIX_RE.sub("", quoted)
+    keys = []
+    for segment in _QUOTE_SEPARATOR_RE.split(unquoted):
+        key = text_key(_HEADER_LINE_RE.sub("", segment))
+        if key is not None:
+            keys.append(key)
+    return keys
+
+
+class ThreadKeys(NamedTuple):
+    """
+    Klucze powiązań dokumentów, z których wyliczane są wątki (po aktualizacji korpusu - bez ponownego czytania tekstów).
+
+    Atrybuty:
+        subject_offsets, subjects: Hashe `thread_keys` dokumentu `d` to `subjects[subject_offsets[d]:subject_offsets[d + 1]]`
+        own: Klucz `text_key` własnej treści każdego dokumentu (0, gdy brak)
+        has_own: Czy dokument ma klucz własnej treści
+        quote_offsets, quotes: Klucze cytowanych wiadomości dokumentów (CSR jak wyżej)
+    """
+
+    subject_offsets: np.ndarray
+    subjects: np.ndarray
+    own: np.ndarray
+    has_own: np.ndarray
+    quote_offsets: np.ndarray
+    quotes: np.ndarray
+
+    @classmethod
+    def build(cls, texts: Sequence[str], keys: Sequence[list[int]]) -> "ThreadKeys":
+        """Klucze z tekstów dokumentów i ich kluczy `thread_keys` (id dokumentu = pozycja)."""
+        lengths = np.fromiter(map(len, keys), dtype=np.int64, count=len(keys))
+        subjects = np.fromiter(chain.from_iterable(keys), dtype=np.int64, count=int(lengths.sum()))
+        own = np.zeros(len(texts), dtype=np.int64)
+        has_own = np.zeros(len(texts), dtype=bool)
+        quote_counts, quotes = [], []
+        for doc_id, text in enumerate(texts):
+            body, quoted = split_message(text or "")
+            key = text_key(body)
+            if key is not None:
+                own[doc_id] = key
+                has_own[doc_id] = True
+            found = quoted_keys(quoted)
+            quotes.extend(found)
+            quote_counts.append(len(found))
+        return cls(
+            np.concatenate(([0], np.cumsum(lengths))),
+            subjects,
+            own,
+            has_own,
+            np.concatenate(([0], np.cumsum(np.array(quote_counts, dtype=np.int64)))),
+            np.array(quotes, dtype=np.int64),
+        )
+
+    def merged(self, changes: CorpusChanges, added: "ThreadKeys") -> "ThreadKeys":
+        """Klucze nowej wersji korpusu: niezmienionych dokumentów stąd, dodanych z `added`."""
+        subject_offsets, (subjects,) = changes.carry_rows(
+            self.subject_offsets, [self.subjects], added.subject_offsets, [added.subjects]
+        )
+        quote_offsets, (quotes,) = changes.carry_rows(
+            self.quote_offsets, [self.quotes], added.quote_offsets, [added.quotes]
+        )
+        return ThreadKeys(
+            subject_offsets,
+            subjects,
+            changes.carry(self.own, added.own),
+            changes.carry(self.has_own, added.has_own),
+            quote_offsets,
+            quotes,
+        )
+
+
+class ThreadIndex:
+    """
+    Wątki mailowe.
+
+    Atrybuty:
+        thread_ids: Id wątku dokumentu (= najmniejsze id dokumentu w wątku)
+        order: Id dokumentów posortowane po (wątek, data, id dokumentu)
+        offsets: Członkowie wątku `t` to `order[offsets[t]:offsets[t + 1]]`
+        keys: Klucze powiązań dokumentów, z których wyliczono wątki
+    """
+
+    def __init__(self, thread_ids: np.ndarray, order: np.ndarray, offsets: np.ndarray, keys: ThreadKeys):
+        self.thread_ids = thread_ids
+        self.order = order
+        self.offsets = offsets
+        self.keys = keys
+
+    @classmethod
+    def build(
+        cls,
+        texts: Sequence[str],
+        keys: Optional[Sequence[list[int]]] = None,
+        dates: Optional[DateIndex] = None,
+    ) -> "ThreadIndex":
+        """
+        Łączy dokumenty w wątki.
+
+        Args:
+            texts: Teksty dokumentów (id dokumentu = pozycja)
+            keys: Klucze `thread_keys` każdego dokumentu (domyślnie wyciągane tutaj)
+            dates: Indeks dat dokumentów (domyślnie budowany tutaj)
+        """
+        if keys is None or dates is None:
+            metadata = [extract_email_metadata(text) for text in texts]
+            keys = [thread_keys(document) for document in metadata] if keys is None else keys
+            dates = DateIndex.build(document["date"] for document in metadata) if dates is None else dates
+        return cls.from_keys(ThreadKeys.build(texts, keys), dates)
+
+    @classmethod
+    def from_keys(cls, keys: ThreadKeys, dates: DateIndex) -> "ThreadIndex":
+        """Wątki z kluczy powiązań i dat dokumentów."""
+        size = len(keys.own)
+        links = [_subject_links(keys, dates.dates), _quote_links(keys)]
+        left = np.concatenate([pair[0] for pair in links])
+        right = np.concatenate([pair[1] for pair in links])
+        thread_ids = connected_components(size, left, right)
+
+        order = np.lexsort((np.arange(size), dates.rank, thread_ids))
+        offsets = np.searchsorted(thread_ids[order], np.arange(size + 1), side="left")
+        return cls(thread_ids, order, offsets, keys)
+
+    def merged(self, changes: CorpusChanges, added: "ThreadIndex", dates: DateIndex) -> "ThreadIndex":
+        """
+        Wątki nowej wersji korpusu - z kluczy niezmienionych dokumentów stąd i dodanych z `added`.
+
+        Args:
+            changes: Zmiany między wersjami korpusu
+            added: Indeks zbudowany tylko z dodanych dokumentów (w kolejności `changes.added`)
+            dates: Indeks dat nowej wersji korpusu
+        """
+        return ThreadIndex.from_keys(self.keys.merged(changes, added.keys), dates)
+
+    def __len__(self) -> int:
+        return len(self.thread_ids)
+
+    @property
+    def thread_count(self) -> int:
+        return int(np.count_nonzero(np.diff(self.offsets)))
+
+    def thread_id(self, doc_id: int) -> int:
+        return int(self.thread_ids[doc_id])
+
+    def members(self, doc_id: int) -> np.ndarray:
+        """Wszystkie dokumenty wątku dokumentu w kolejności dat (bez daty na końcu) - O(1)."""
+        thread = self.thread_ids[doc_id]
+        return self.order[self.offsets[thread] : self.offsets[thread + 1]]
+
+    def size(self, doc_id: int) -> int:
+        thread = self.thread_ids[doc_id]
+        return int(self.offsets[thread + 1] - self.offsets[thread])
+
+
+def _subject_links(keys: ThreadKeys, dates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Pary kolejnych (w czasie) dokumentów o wspólnym kluczu temat + uczestnik."""
+    key_hashes = keys.subjects
+    key_docs = np.repeat(np.arange(len(keys.own), dtype=np.int64), np.diff(keys.subject_offsets))
+    key_dates = dates[key_docs]
+    order = np.lexsort((key_docs, key_dates, key_hashes))
+    key_hashes, key_docs, key_dates = key_hashes[order], key_docs[order], key_dates[order]
+
+    same = key_hashes[1:] == key_hashes[:-1]
+    gap = key_dates[1:] - key_dates[:-1]
+    # Brak daty u jednej ze stron nie rozdziela wątku
+    close = np.isnat(gap) | (gap <= MAX_THREAD_GAP)
+    pairs = np.flatnonzero(same & close)
+    return key_docs[pairs], key_docs[pairs + 1]
+
+
+def _quote_links(keys: ThreadKeys) -> tuple[np.ndarray, np.ndarray]:
+    """Pary (odpowiedź, cytowany dokument) oraz kopie tej samej wiadomości."""
+    own_docs = np.flatnonzero(keys.has_own)
+    own_hashes = keys.own[own_docs]
+    order = np.lexsort((own_docs, own_hashes))
+    own_docs, own_hashes = own_docs[order], own_hashes[order]
+    # Grupy dokumentów o tej samej treści: pierwszy dokument grupy jest celem powiązań
+    unique_hashes, starts, counts = np.unique(own_hashes, return_index=True, return_counts=True)
+    first_docs = own_docs[starts]
+    shared = (counts > 1) & (counts <= MAX_SHARED_KEY)
+    group = np.repeat(np.arange(len(unique_hashes)), counts)
+    copies = np.flatnonzero(shared[group] & (own_docs != first_docs[group]))
+
+    quote_docs = np.repeat(np.arange(len(keys.own), dtype=np.int64), np.diff(keys.quote_offsets))
+    quote_hashes = keys.quotes
+    positions = np.minimum(np.searchsorted(unique_hashes, quote_hashes), max(len(unique_hashes) - 1, 0))
+    if len(unique_hashes):
+        found = (unique_hashes[positions] == quote_hashes) & (counts[positions] <= MAX_SHARED_KEY)
+        found &= first_docs[positions] != quote_docs
+    else:
+        found = np.zeros(len(quote_hashes), dtype=bool)
+
+    left = np.concatenate((own_docs[copies], quote_docs[found]))
+    right = np.concatenate((first_docs[group[copies]], first_docs[positions[found]]))
+    return left, right
+
+
+def get_thread_index(corpus) -> ThreadIndex:
+    """Zwraca (budując przy pierwszym użyciu razem z pozostałymi indeksami nagłówków) indeks wątków korpusu."""
+    from search_engine.headers import get_header_indexes
+
+    return get_header_indexes(corpus).threads
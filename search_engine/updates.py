@@ -0,0 +1,335 @@
+"""
+Przyrostowa aktualizacja korpusu po zmianie zbioru danych.
+
+Nowa wersja zbioru jest porównywana ze starą po hashach treści dokumentów (BLAKE2b nazwy
+pliku i tekstu, 8 bajtów na dokument): dokument, którego hash występuje w starym korpusie,
+jest niezmieniony, pozostałe są dodane, a dokumenty starego korpusu bez odpowiednika -
+usunięte. Zmieniony dokument (ta sama nazwa pliku, inna treść) to para usunięty + dodany.
+
+Indeksy starego korpusu nie są budowane od nowa. Kolumny per dokument (kody faset, daty,
+encje, klucze wątków, sygnatury MinHash, postingi słownika) niezmienionych dokumentów są
+przepisywane pod ich nowe id, a liczone są tylko dla dodanych dokumentów - małym indeksem
+tego samego typu, scalanym ze starym (`merged`). Usunięte dokumenty nie trafiają do nowych
+tablic, więc nowy korpus jest od razu zwarty: bez nagrobków sprawdzanych przy każdym zapytaniu
+i bez osobnego kompaktowania. Struktury globalne (wątki, klastry duplikatów) są wyliczane
+ponownie z przepisanych kolumn - operacjami NumPy, bez ponownego czytania tekstów.
+
+Indeksy bez ścieżki przyrostowej (np. semantyczny, trygramów) nie są przenoszone -
+`warm_indexes` buduje je w nowym korpusie, zwykle w tle po jego udostępnieniu.
+
+Rewizja źródła (`source_revision`) pozwala pominąć przeładowanie, gdy zbiór się nie zmienił.
+"""
+
+import hashlib
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+
+from instrumentation import timed
+from search_engine.docstore import ENCODING, ENCODING_ERRORS
+
+logger = logging.getLogger(__name__)
+
+# Długość hasha treści dokumentu w bajtach (uint64)
+HASH_SIZE = 8
+
+FILE_SUFFIXES = (".parquet", ".jsonl", ".json")
+
+
+def content_hashes(texts: Iterable[str], filenames: Iterable[str]) -> np.ndarray:
+    """Hash treści każdego dokumentu (nazwa pliku i tekst) jako uint64."""
+    digests = bytearray()
+    for filename, text in zip(filenames, texts):
+        digest = hashlib.blake2b(filename.encode(ENCODING, ENCODING_ERRORS), digest_size=HASH_SIZE)
+        digest.update(b"\0")
+        digest.update(text.encode(ENCODING, ENCODING_ERRORS))
+        digests += digest.digest()
+    return np.frombuffer(bytes(digests), dtype=np.uint64)
+
+
+def get_content_hashes(corpus) -> np.ndarray:
+    """Zwraca (licząc przy pierwszym użyciu) hashe treści dokumentów korpusu."""
+
+    def _build(corpus):
+        with timed("index.content_hashes"):
+            return content_hashes(corpus.texts, corpus.filenames)
+
+    return corpus.get_index("content_hashes", _build)
+
+
+def source_revision(source: str) -> Optional[str]:
+    """
+    Rewizja źródła korpusu - zmienia się razem z danymi.
+
+    Dla pliku to rozmiar i czas modyfikacji, dla zbioru Hugging Face - hash ostatniego commitu
+    repozytorium (wymaga pakietu `huggingface_hub` i dostępu do sieci).
+
+    Returns:
+        Rewizja albo None, gdy nie da się jej ustalić
+    """
+    path = Path(source)
+    if path.suffix.lower() in FILE_SUFFIXES:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+    try:
+        from huggingface_hub import HfApi
+
+        return HfApi().dataset_info(source).sha
+    except (ImportError, OSError, ValueError) as e:
+        logger.warning("Nie udało się ustalić rewizji zbioru %s: %s", source, e)
+        return None
+
+
+@dataclass
+class CorpusChanges:
+    """
+    Zmiany między dwiema wersjami korpusu.
+
+    Atrybuty:
+        sources: Id w starym korpusie każdego dokumentu nowego korpusu (-1 - dokument dodany)
+        old_size: Liczba dokumentów starego korpusu
+        changed: Liczba dodanych dokumentów zastępujących usunięty dokument o tej samej nazwie pliku
+    """
+
+    sources: np.ndarray
+    old_size: int
+    changed: int = 0
+
+    @property
+    def size(self) -> int:
+        """Liczba dokumentów nowego korpusu."""
+        return len(self.sources)
+
+    @property
+    def kept(self) -> np.ndarray:
+        """Id (w nowym korpusie) niezmienionych dokumentów."""
+        return np.flatnonzero(self.sources >= 0)
+
+    @property
+    def added(self) -> np.ndarray:
+        """Id (w nowym korpusie) dodanych dokumentów, rosnąco."""
+        return np.flatnonzero(self.sources < 0)
+
+    @property
+    def targets(self) -> np.ndarray:
+        """Id w nowym korpusie każdego dokumentu starego korpusu (-1 - dokument usunięty)."""
+        targets = np.full(self.old_size, -1, dtype=np.int64)
+        kept = self.kept
+        targets[self.sources[kept]] = kept
+        return targets
+
+    @property
+    def removed(self) -> np.ndarray:
+        """Id (w starym korpusie) usuniętych dokumentów."""
+        return np.flatnonzero(self.targets < 0)
+
+    @property
+    def unchanged(self) -> bool:
+        """Te same dokumenty w tej samej kolejności."""
+        return self.size == self.old_size and bool(np.array_equal(self.sources, np.arange(self.size)))
+
+    def carry(self, values: np.ndarray, added: np.ndarray) -> np.ndarray:
+        """
+        Kolumna per dokument nowego korpusu.
+
+        Args:
+            values: Kolumna starego korpusu (pierwszy wymiar - dokumenty)
+            added: Wartości dodanych dokumentów w kolejności `added`
+        """
+        result = np.empty((self.size,) + values.shape[1:], dtype=values.dtype)
+        kept = self.kept
+        result[kept] = values[self.sources[kept]]
+        result[self.added] = added
+        return result
+
+    def carry_rows(
+        self,
+        offsets: np.ndarray,
+        columns: Sequence[np.ndarray],
+        added_offsets: np.ndarray,
+        added_columns: Sequence[np.ndarray],
+    ) -> tuple[np.ndarray, list[np.ndarray]]:
+        """
+        Tablice CSR (wiersz wartości na dokument) nowego korpusu.
+
+        Args:
+            offsets: Wartości dokumentu `d` starego korpusu to `columns[...][offsets[d]:offsets[d + 1]]`
+            columns: Równoległe tablice wartości starego korpusu (np. kody i liczby wzmianek)
+            added_offsets, added_columns: To samo dla dodanych dokumentów, w kolejności `added`
+
+        Returns:
+            (przesunięcia wierszy, tablice wartości) nowego korpusu
+        """
+        kept, added = self.kept, self.added
+        starts = np.empty(self.size, dtype=np.int64)
+        lengths = np.empty(self.size, dtype=np.int64)
+        old_rows = self.sources[kept]
+        starts[kept] = offsets[old_rows]
+        lengths[kept] = offsets[old_rows + 1] - offsets[old_rows]
+        # Wartości dodanych dokumentów leżą za wartościami starego korpusu
+        starts[added] = added_offsets[:-1] + offsets[-1]
+        lengths[added] = np.diff(added_offsets)
+
+        new_offsets = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(lengths, out=new_offsets[1:])
+        positions = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+        merged = [
+            np.concatenate((column[: offsets[-1]], added_column))[positions]
+            for column, added_column in zip(columns, added_columns)
+        ]
+        return new_offsets, merged
+
+    def to_dict(self) -> dict:
+        added, removed = len(self.added), self.old_size - len(self.kept)
+        return {
+            "documents": self.size,
+            "kept": len(self.kept),
+            "added": added - self.changed,
+            "changed": self.changed,
+            "removed": removed - self.changed,
+        }
+
+
+def merge_values(values: Sequence, added_values: Iterable, codes: Mapping[Any, int]) -> tuple[list, np.ndarray]:
+    """
+    Scala słowniki wartości (np. wartości faset) starego indeksu i indeksu dodanych dokumentów.
+
+    Args:
+        values: Wartości starego indeksu (kod = pozycja)
+        added_values: Wartości indeksu dodanych dokumentów (bez powtórzeń)
+        codes: Kod każdej wartości starego indeksu
+
+    Returns:
+        (scalone wartości - stare, potem nowe; kod po scaleniu każdej wartości z `added_values`)
+    """
+    merged = list(values)
+    added_codes = []
+    for value in added_values:
+        code = codes.get(value)
+        if code is None:
+            code = len(merged)
+            merged.append(value)
+        added_codes.append(code)
+    return merged, np.array(added_codes, dtype=np.int64)
+
+
+def compact_codes(codes: np.ndarray, count: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Usuwa kody wartości, które po aktualizacji nie mają żadnego dokumentu.
+
+    Returns:
+        (używane kody rosnąco, nowy kod każdego starego kodu albo -1)
+    """
+    used = np.flatnonzero(np.bincount(codes, minlength=count) > 0)
+    remap = np.full(count, -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    return used, remap
+
+
+def _occurrences(hashes: np.ndarray) -> np.ndarray:
+    """Numer kolejnego wystąpienia każdego hasha (0 dla pierwszego) - powtórzone dokumenty parowane po kolei."""
+    if not len(hashes):
+        return np.empty(0, dtype=np.int64)
+    order = np.argsort(hashes, kind="stable")
+    sorted_hashes = hashes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_hashes[1:] != sorted_hashes[:-1]])
+    run_starts = np.repeat(starts, np.diff(np.r_[starts, len(hashes)]))
+    occurrences = np.empty(len(hashes), dtype=np.int64)
+    occurrences[order] = np.arange(len(hashes)) - run_starts
+    return occurrences
+
+
+def match_documents(old_hashes: np.ndarray, new_hashes: np.ndarray) -> np.ndarray:
+    """
+    Paruje dokumenty dwóch wersji korpusu po hashach treści.
+
+    Returns:
+        Id w starym korpusie każdego dokumentu nowego (-1 - brak dokumentu o tej treści)
+    """
+    hashes = np.concatenate((old_hashes, new_hashes))
+    occurrences = np.concatenate((_occurrences(old_hashes), _occurrences(new_hashes)))
+    is_new = np.arange(len(hashes)) >= len(old_hashes)
+    # Para (hash, wystąpienie) jest najwyżej raz w każdej wersji - dokument stary i nowy leżą obok siebie
+    order = np.lexsort((is_new, occurrences, hashes))
+    same = (hashes[order][1:] == hashes[order][:-1]) & (occurrences[order][1:] == occurrences[order][:-1])
+    pairs = np.flatnonzero(same)
+    sources = np.full(len(new_hashes), -1, dtype=np.int64)
+    sources[order[pairs + 1] - len(old_hashes)] = order[pairs]
+    return sources
+
+
+def diff_corpora(old, new) -> CorpusChanges:
+    """Zmiany między wersjami korpusu (hashe treści nowego korpusu zostają w nim zapamiętane)."""
+    with timed("index.diff"):
+        changes = CorpusChanges(match_documents(get_content_hashes(old), get_content_hashes(new)), len(old))
+        added = changes.added
+        if len(added):
+            removed_names = Counter(old.filenames.take(changes.removed.tolist()))
+            added_names = Counter(new.filenames.take(added.tolist()))
+            changes.changed = sum((removed_names & added_names).values())
+    return changes
+
+
+def _updaters() -> dict[str, Callable[[Any, CorpusChanges, Any, list[str]], Any]]:
+    """Aktualizacje przyrostowe indeksów w kolejności zależności (słownik przed indeksem usunięć)."""
+    from search_engine.dedup import DuplicateIndex
+    from search_engine.fuzzy import DeletionIndex
+    from search_engine.headers import update_header_indexes
+    from search_engine.vocabulary import Vocabulary, get_vocabulary
+
+    return {
+        "headers": lambda index, changes, corpus, texts: update_header_indexes(index, changes, texts),
+        "duplicates": lambda index, changes, corpus, texts: index.merged(
+            changes,
+            DuplicateIndex.build(
+                texts, index.threshold, bands=index.band_keys.shape[1], num_perm=index.fingerprints.shape[1]
+            ),
+        ),
+        "vocabulary": lambda index, changes, corpus, texts: index.merged(changes, Vocabulary.build(texts)),
+        "deletion_index": lambda index, changes, corpus, texts: DeletionIndex(
+            get_vocabulary(corpus), index.max_distance, previous=index
+        ),
+    }
+
+
+def update_corpus(old, new) -> CorpusChanges:
+    """
+    Przenosi indeksy zbudowane w starej wersji korpusu do nowej, licząc je tylko dla dodanych dokumentów.
+
+    Args:
+        old: Poprzednia wersja korpusu (bez zmian - nadal może obsługiwać zapytania)
+        new: Świeżo załadowana wersja, jeszcze nieudostępniona zapytaniom
+
+    Returns:
+        Zmiany między wersjami
+    """
+    changes = diff_corpora(old, new)
+    built = old.built_indexes()
+    with timed("index.update"):
+        texts = new.texts.take(changes.added.tolist())
+        for name, update in _updaters().items():
+            if name in built:
+                index, builder = built[name]
+                new.set_index(name, update(index, changes, new, texts), builder)
+    return changes
+
+
+def warm_indexes(new, old) -> list[str]:
+    """
+    Buduje w nowej wersji korpusu indeksy, które były zbudowane w starej, a nie zostały przeniesione.
+
+    Returns:
+        Nazwy zbudowanych indeksów
+    """
+    present = new.built_indexes()
+    missing = {name: builder for name, (_index, builder) in old.built_indexes().items() if name not in present}
+    for name, builder in missing.items():
+        new.get_index(name, builder)
+    return list(missing)
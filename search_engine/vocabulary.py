@@ -0,0 +1,132 @@
+"""
+Słownik korpusu: termy (słowa) i listy dokumentów, w których występują.
+
+Listy postingów są trzymane w jednej tablicy NumPy w układzie CSR
+(`offsets` + `doc_ids`), co jest znacznie oszczędniejsze niż słownik list.
+Po aktualizacji korpusu (`merged`) tokenizowane są tylko dodane dokumenty - postingi
+pozostałych są przepisywane pod ich nowe id.
+"""
+
+import re
+from array import array
+from typing import Iterable
+
+import numpy as np
+
+from instrumentation import timed
+from search_engine.updates import CorpusChanges, compact_codes, merge_values
+
+# Słowa z liter i cyfr (cyfry są ważne dla błędów OCR, np. "Maxwel1")
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Dzieli tekst na termy (małe litery)."""
+    return TOKEN_RE.findall(text.lower())
+
+
+class Vocabulary:
+    """
+    Termy korpusu z listami postingów.
+
+    Atrybuty:
+        terms: Lista termów (id termu = indeks na liście)
+        term_ids: Słownik term -> id
+        doc_freq: Liczba dokumentów zawierających każdy term
+    """
+
+    def __init__(self, terms: list[str], offsets: np.ndarray, doc_ids: np.ndarray):
+        self.terms = terms
+        self.term_ids = {term: term_id for term_id, term in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.doc_freq = np.diff(offsets)
+
+    @classmethod
+    def build(cls, texts: Iterable[str]) -> "Vocabulary":
+        """Buduje słownik z tekstów dokumentów (id dokumentu = pozycja w sekwencji)."""
+        term_ids: dict[str, int] = {}
+        pair_terms = array("i")
+        pair_docs = array("i")
+
+        for doc_id, text in enumerate(texts):
+            for term in set(tokenize(text)):
+                term_id = term_ids.setdefault(term, len(term_ids))
+                pair_terms.append(term_id)
+                pair_docs.append(doc_id)
+
+        terms = list(term_ids)
+        pair_terms_np = np.frombuffer(pair_terms, dtype=np.int32)
+        # Sortowanie stabilne zachowuje rosnącą kolejność dokumentów w obrębie termu
+        order = np.argsort(pair_terms_np, kind="stable")
+        doc_ids = np.frombuffer(pair_docs, dtype=np.int32)[order].copy()
+        counts = np.bincount(pair_terms_np, minlength=len(terms))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(terms, offsets, doc_ids)
+
+    def merged(self, changes: CorpusChanges, added: "Vocabulary") -> "Vocabulary":
+        """
+        Słownik nowej wersji korpusu: postingi niezmienionych dokumentów stąd, dodanych z `added`.
+
+        Termy występujące tylko w usuniętych dokumentach znikają ze słownika.
+
+        Args:
+            changes: Zmiany między wersjami korpusu
+            added: Słownik zbudowany tylko z dodanych dokumentów (w kolejności `changes.added`)
+        """
+        terms, added_codes = merge_values(self.terms, added.terms, self.term_ids)
+        old_docs = changes.targets[self.doc_ids]
+        keep = old_docs >= 0
+        pair_terms = np.concatenate(
+            (
+                np.repeat(np.arange(len(self.terms), dtype=np.int64), self.doc_freq)[keep],
+                added_codes[np.repeat(np.arange(len(added.terms), dtype=np.int64), added.doc_freq)],
+            )
+        )
+        pair_docs = np.concatenate((old_docs[keep], changes.added[added.doc_ids]))
+        used, remap = compact_codes(pair_terms, len(terms))
+        pair_terms = remap[pair_terms]
+        # Klucz (term, dokument); przepisane postingi są już prawie posortowane - sortowanie stabilne to wykorzystuje
+        order = np.argsort(pair_terms * max(changes.size, 1) + pair_docs, kind="stable")
+        offsets = np.zeros(len(used) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_terms, minlength=len(used)), out=offsets[1:])
+        return Vocabulary([terms[term_id] for term_id in used], offsets, pair_docs[order].astype(np.int32))
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.term_ids
+
+    def postings(self, term: str) -> np.ndarray:
+        """Posortowane id dokumentów zawierających term (pusta tablica, jeśli brak)."""
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return np.empty(0, dtype=np.int32)
+        return self.doc_ids[self.offsets[term_id] : self.offsets[term_id + 1]]
+
+    def frequency(self, term: str) -> int:
+        """Liczba dokumentów zawierających term."""
+        term_id = self.term_ids.get(term)
+        return 0 if term_id is None else int(self.doc_freq[term_id])
+
+    def union_postings(self, terms: Iterable[str]) -> np.ndarray:
+        """Suma list postingów dla wielu termów (posortowana, bez powtórzeń)."""
+        arrays = [self.postings(term) for term in terms]
+        arrays = [postings for postings in arrays if len(postings)]
+        if not arrays:
+            return np.empty(0, dtype=np.int32)
+        if len(arrays) == 1:
+            return arrays[0]
+        return np.unique(np.concatenate(arrays))
+
+
+def get_vocabulary(corpus) -> Vocabulary:
+    """Zwraca (budując przy pierwszym użyciu) słownik korpusu."""
+
+    def _build(corpus):
+        with timed("index.vocabulary"):
+            return Vocabulary.build(corpus.texts)
+
+    return corpus.get_index("vocabulary", _build)
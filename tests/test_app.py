@@ -0,0 +1,106 @@
+"""
+Testy dymne aplikacji Streamlit: strona ładuje się na małym zbiorze i obsługuje wyszukiwanie.
+
+Uruchom: pytest tests/ -v
+"""
+import sys
+import threading
+import types
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("streamlit.testing.v1")
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import search_engine  # noqa: E402
+import translation_utils  # noqa: E402
+
+ROOT = Path(__file__).parent.parent
+TIMEOUT = 60
+
+
+def email(day, sender, body):
+    return f"From: {sender}\nTo: office@example.com\nDate: 2009-03-{day:02d}\nSubject: Flight {day}\n\n{body}"
+
+
+RECORDS = [
+    {"filename": f"{i}.txt", "text": email(i % 28 + 1, f"user{i % 3}@example.com", f"Flight plan number {i}.")}
+    for i in range(20)
+] + [{"filename": "note.txt", "text": "Court filing about property taxes."}]
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    """Mały zbiór w pliku Parquet zamiast zbioru z Hugging Face."""
+    path = tmp_path / "emails.parquet"
+    pq.write_table(pa.Table.from_pylist(RECORDS), path)
+    monkeypatch.setattr(search_engine, "DEFAULT_DATASET", str(path))
+    monkeypatch.setenv("TRANSLATIONS_DIR", str(tmp_path / "translations"))
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    yield path
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+@pytest.mark.parametrize("script", ["app.py", "app_simple.py"])
+def test_app_loads(dataset, script):
+    app = AppTest.from_file(str(ROOT / script), default_timeout=TIMEOUT).run()
+
+    assert not app.exception
+    assert not app.error
+    assert app.title[0].value == "📧 Akta Epsteina - Wyszukiwarka Maili"
+
+
+def test_app_search(dataset):
+    """Wyszukiwanie i ponowny przebieg po zmianie sortowania nie kończą się wyjątkiem."""
+    app = AppTest.from_file(str(ROOT / "app.py"), default_timeout=TIMEOUT).run()
+    app.text_input(key="search_query").input("flight")
+    app.button(key="search_button").click().run()
+
+    assert not app.exception
+    assert not app.error
+    assert app.expander
+
+    # Kolejne przebiegi (np. zmiana sortowania) korzystają z wyniku zapisanego w session_state
+    app.selectbox(key="result_sort").select("date_desc").run()
+    assert not app.exception
+
+
+class FakeTranslator:
+    """Atrapa GoogleTranslator: tłumaczy słowo "Flight"."""
+
+    def __init__(self, source, target):
+        pass
+
+    def translate(self, text):
+        return text.replace("Flight", "Lot")
+
+
+@pytest.mark.parametrize("script", ["app.py", "app_simple.py"])
+def test_app_translation_success_is_shown(dataset, monkeypatch, script):
+    """Komunikat o udanym tłumaczeniu zostaje na stronie (bez przebiegu, który by go wymazał)."""
+    monkeypatch.setitem(sys.modules, "deep_translator", types.SimpleNamespace(GoogleTranslator=FakeTranslator))
+    monkeypatch.setattr(translation_utils, "_TRANSLATION_CACHE", {})
+    monkeypatch.setattr(translation_utils, "_THREAD_TRANSLATORS", threading.local())
+    monkeypatch.setattr(translation_utils, "_BREAKER", translation_utils.CircuitBreaker())
+
+    app = AppTest.from_file(str(ROOT / script), default_timeout=TIMEOUT).run()
+    app.text_input[0].input("flight")
+    app.button(key="search_button").click().run()
+    # Kolejny przebieg pokazuje wyniki zapisane w session_state - z nich użytkownik tłumaczy maile
+    app.run()
+    translate = next(button for button in app.button if button.key.startswith("translate_btn_"))
+    translate.click().run()
+
+    assert not app.exception
+    assert "Tłumaczenie zakończone pomyślnie!" in [message.value for message in app.success]
+    assert any("Lot" in markdown.value for markdown in app.markdown)
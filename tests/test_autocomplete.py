@@ -0,0 +1,92 @@
+"""
+Testy podpowiedzi zapytań (posortowane klucze, ranking po liczbie dokumentów).
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus  # noqa: E402
+from search_engine import autocomplete  # noqa: E402
+from search_engine.autocomplete import CompletionIndex, complete, normalize_prefix  # noqa: E402
+from search_engine.entities import get_entity_index  # noqa: E402
+from search_engine.protocol import Request  # noqa: E402
+from search_engine.server import SearchServer  # noqa: E402
+from search_engine.vocabulary import Vocabulary, get_vocabulary  # noqa: E402
+
+
+@pytest.fixture
+def corpus():
+    return Corpus.from_records(
+        [
+            {
+                "filename": "a.txt",
+                "text": "From: Jeffrey Epstein <je@gmail.com>\nFlight to the island, call 212-555-0100.",
+            },
+            {"filename": "b.txt", "text": "Epstein flight manifest: Ghislaine Maxwell on the island."},
+            {"filename": "c.txt", "text": "Epstein estate, island property and flights."},
+            {"filename": "d.txt", "text": "Episcopal church newsletter."},
+        ]
+    )
+
+
+def test_normalize_prefix():
+    assert normalize_prefix("  Jeffrey   EP") == "jeffrey ep"
+    assert normalize_prefix("Jeffrey ") == "jeffrey "
+    assert normalize_prefix("   ") == ""
+
+
+def test_completions_ranked_by_documents(corpus):
+    """Termy i encje z prefiksem, malejąco po liczbie dokumentów; osoby także od nazwiska."""
+    completions = complete(corpus, "Ep", limit=5)
+
+    assert completions[0] == {"text": "epstein", "type": "term", "documents": 3}
+    texts = [completion["text"] for completion in completions]
+    assert "Jeffrey Epstein" in texts and "episcopal" in texts
+    assert texts.index("episcopal") > texts.index("epstein")
+    assert complete(corpus, "212")[0] == {"text": "212-555-0100", "type": "phone", "documents": 1}
+    assert complete(corpus, "qzx") == []
+
+
+def test_multiword_prefix_completes_last_word(corpus):
+    """Wielowyrazowy prefiks: pełne nazwy osób, potem ostatnie słowo uzupełnione termem."""
+    assert complete(corpus, "jeffrey ")[0]["text"] == "Jeffrey Epstein"
+    texts = [completion["text"] for completion in complete(corpus, "flight to isl")]
+    assert texts == ["flight to island"]
+
+
+def test_precomputed_prefixes_match_range_scan(corpus, monkeypatch):
+    """Podpowiedzi policzone z góry dla krótkich prefiksów są takie same jak z przeszukania zakresu."""
+    vocabulary, entities = get_vocabulary(corpus), get_entity_index(corpus)
+    precomputed = CompletionIndex.build(vocabulary, entities)
+    monkeypatch.setattr(autocomplete, "PRECOMPUTED_PREFIX", 0)
+    scanned = CompletionIndex.build(vocabulary, entities)
+
+    for prefix in ["e", "ep", "f", "fl", "g", "2", "21", "x"]:
+        assert precomputed.complete(prefix, limit=20) == scanned.complete(prefix, limit=20)
+
+
+def test_empty_index():
+    index = CompletionIndex.build(Vocabulary.build([]))
+
+    assert len(index) == 0
+    assert index.complete("a") == []
+
+
+def test_server_complete(corpus):
+    server = SearchServer(corpus, executor=None)
+
+    def get(**query):
+        return asyncio.run(server.dispatch(Request(method="GET", path="/complete", query=query)))
+
+    status, payload = get(q="isl", limit="3")
+    assert status == 200
+    assert payload["completions"][0]["text"] == "island"
+    assert get(q="isl", limit="500")[0] == 400
+    server.executor.shutdown()
@@ -0,0 +1,52 @@
+"""
+Testy generatora syntetycznego korpusu i mechanizmu budżetów benchmarków.
+
+Uruchom: pytest tests/ -v
+"""
+import sys
+from pathlib import Path
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.run import BenchContext, check_budgets, run_benchmarks  # noqa: E402
+from benchmarks.synthetic_corpus import generate_records, parse_size  # noqa: E402
+
+
+def test_generator_is_deterministic():
+    """Ten sam seed daje ten sam korpus, inny seed - inny."""
+    first = list(generate_records(200, seed=1))
+    second = list(generate_records(200, seed=1))
+    other = list(generate_records(200, seed=2))
+
+    assert first == second
+    assert first != other
+    assert first[0]["filename"] == "SYNTH-0000000.txt"
+    assert all(record["text"] for record in first)
+
+
+def test_generator_produces_email_like_documents():
+    """Korpus zawiera maile z nagłówkami i odpowiedzi w wątkach."""
+    texts = [record["text"] for record in generate_records(500, seed=3)]
+
+    assert sum(text.startswith("From:") for text in texts) > 100
+    assert any("Subject: Re:" in text or "Subject: RE:" in text for text in texts)
+    assert any("-----Original Message-----" in text for text in texts)
+
+
+def test_parse_size():
+    """Test etykiet rozmiarów korpusu."""
+    assert parse_size("20k") == 20_000
+    assert parse_size("2M") == 2_000_000
+    assert parse_size("1234") == 1234
+
+
+def test_budgets_detect_violations():
+    """Przekroczenie budżetu czasu lub pamięci jest raportowane."""
+    ctx = BenchContext.build(300, seed=4)
+    results = run_benchmarks(ctx, only=["search.name"], repeat=1)
+
+    assert list(results) == ["search.name"]
+    assert check_budgets(results, {"search.name": {"time_ms": 10_000, "peak_mb": 1_000}}) == []
+    violations = check_budgets(results, {"search.name": {"time_ms": 0, "peak_mb": 0}})
+    assert len(violations) == 2
@@ -0,0 +1,97 @@
+"""
+Testy tekstów skompresowanych blokami (dostęp swobodny, skan, ładowanie strumieniowe).
+
+Uruchom: pytest tests/ -v
+"""
+import sys
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus, load_corpus, search  # noqa: E402
+from search_engine.blockstore import CompressedDocumentStore, available_codecs, get_codec  # noqa: E402
+from search_engine.docstore import DocumentStore  # noqa: E402
+
+TEXTS = [f"Document {i}: Jeffrey Epstein flight log, page {i}" if i % 7 == 0 else f"Plain text {i}" for i in range(200)]
+TEXTS[3] = ""
+TEXTS[10] = "Straße in München " * 50
+
+
+@pytest.fixture
+def store():
+    return DocumentStore.from_texts(TEXTS)
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+@pytest.mark.parametrize("block_size", [1, 256, 4096, 10**9])
+def test_random_access_and_scan(store, codec, block_size):
+    """Każdy kodek i rozmiar bloku: te same teksty i wyniki skanu co magazyn bez kompresji."""
+    compressed = CompressedDocumentStore.from_store(store, block_size=block_size, codec=codec)
+
+    assert len(compressed) == len(TEXTS)
+    assert compressed[10] == compressed.iat[10] == TEXTS[10]
+    assert compressed[-1] == TEXTS[-1]
+    assert compressed.take([150, 3, 0, 151]) == [TEXTS[150], TEXTS[3], TEXTS[0], TEXTS[151]]
+    assert compressed.tolist() == TEXTS
+    assert compressed[5:9].tolist() == TEXTS[5:9]
+    assert compressed[:].tolist() == TEXTS and compressed[9:5].tolist() == []
+    for query, case_sensitive in [("epstein", False), ("Epstein", True), ("STRASSE", False), ("qzx", False)]:
+        assert compressed.contains(query, case_sensitive).tolist() == store.contains(query, case_sensitive).tolist()
+
+
+def test_blocks_follow_block_size(store):
+    """Mniejsze bloki - więcej bloków; dokument nigdy nie jest dzielony między bloki."""
+    small = CompressedDocumentStore.from_store(store, block_size=256, codec="zlib")
+    large = CompressedDocumentStore.from_store(store, block_size=64 * 1024, codec="zlib")
+
+    assert small.block_count > large.block_count == 1
+    assert small.block_starts[0] == 0 and small.block_starts[-1] == len(TEXTS)
+    assert large.nbytes < large.raw_nbytes
+    with pytest.raises(ValueError):
+        CompressedDocumentStore.from_store(store, block_size=0)
+
+
+def test_reads_use_block_cache(store):
+    compressed = CompressedDocumentStore.from_store(store, block_size=256, codec="zlib")
+    compressed[0]
+    block = compressed.block(0)
+
+    assert compressed.block(0) is block
+    compressed.clear_cache()
+    assert compressed.block(0) is not block
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("brotli")
+
+
+def test_compressed_corpus_search(store):
+    """Wyszukiwanie na korpusie z tekstami skompresowanymi daje te same wyniki."""
+    corpus = Corpus.from_records([{"filename": f"{i}.txt", "text": text} for i, text in enumerate(TEXTS)])
+    compressed = corpus.compressed("zlib", block_size=512)
+
+    for mode in ("exact", "fuzzy", "regex"):
+        expected = search(corpus, "Epstein", mode=mode)
+        result = search(compressed, "Epstein", mode=mode)
+        assert [hit.doc_id for hit in result.hits] == [hit.doc_id for hit in expected.hits]
+        assert result.total == expected.total
+
+
+def test_load_parquet_in_batches(tmp_path, monkeypatch):
+    """Parquet z kompresją jest czytany partiami; bloki nie przekraczają granic partii."""
+    path = tmp_path / "corpus.parquet"
+    pq.write_table(pa.table({"text": TEXTS, "filename": [f"{i}.txt" for i in range(len(TEXTS))]}), path)
+    monkeypatch.setattr("search_engine.corpus.ARROW_BATCH_ROWS", 64)
+
+    corpus = load_corpus(str(path), compression="zlib", block_size=4096)
+
+    assert isinstance(corpus.texts, CompressedDocumentStore)
+    assert corpus.texts.tolist() == TEXTS
+    assert corpus.filenames[199] == "199.txt"
+    assert search(corpus, "Epstein").total == len([text for text in TEXTS if "Epstein" in text])
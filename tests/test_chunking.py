@@ -0,0 +1,122 @@
+"""
+Testy dzielenia tekstu na fragmenty i pakowania krótkich tekstów w żądania tłumaczenia.
+
+Uruchom: pytest tests/ -v
+"""
+import random
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import translation_utils  # noqa: E402
+from translation_utils import (  # noqa: E402
+    PACK_SEPARATOR,
+    iter_text_chunks,
+    pack_segments,
+    split_text_into_chunks,
+    translate_documents,
+    translate_segments,
+)
+
+
+class Recorder:
+    """Atrapa usługi tłumaczenia: zamienia litery na wielkie i zapamiętuje żądania."""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, text):
+        self.requests.append(text)
+        return text.upper()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_chunks_are_lossless_and_bounded(seed):
+    rng = random.Random(seed)
+    pieces = ["word ", "Sentence. ", "Why? ", "\n", "\n\n", "x" * rng.randint(1, 300)]
+    text = "".join(rng.choice(pieces) for _ in range(3000))
+
+    chunks = split_text_into_chunks(text, max_length=500)
+
+    assert "".join(chunks) == text
+    assert all(250 <= len(chunk) <= 500 for chunk in chunks[:-1])
+
+
+def test_chunk_boundaries_prefer_paragraphs():
+    paragraph = "First line.\nSecond line. " * 10
+    text = "\n\n".join([paragraph] * 6)
+
+    chunks = list(iter_text_chunks(text, max_length=len(paragraph) * 2 + 10))
+
+    assert all(chunk.endswith("\n\n") for chunk in chunks[:-1])
+    # Bez akapitów: koniec linii, potem koniec zdania, na końcu twarde cięcie
+    assert list(iter_text_chunks("aaaa. bbbb\ncccc. dddd", max_length=14))[0] == "aaaa. bbbb\n"
+    assert list(iter_text_chunks("aaaa. bbbb cccc. dddd", max_length=14))[0] == "aaaa. bbbb "
+    assert list(iter_text_chunks("a" * 25, max_length=10)) == ["a" * 10, "a" * 10, "a" * 5]
+    assert split_text_into_chunks("") == [""]
+    assert split_text_into_chunks("short") == ["short"]
+
+
+def test_pack_segments():
+    segments = ["a" * 10, "b" * 10, "c" * 30, "###", "d" * 5, "e" * 5]
+    separator = len(PACK_SEPARATOR)
+
+    groups = pack_segments(segments, max_length=20 + separator)
+
+    assert groups == [[0, 1], [2], [3], [4, 5]]
+
+
+def test_translate_segments_splits_response():
+    recorder = Recorder()
+
+    translated = translate_segments(["one", "two", "three"], recorder)
+
+    assert translated == ["ONE", "TWO", "THREE"]
+    assert len(recorder.requests) == 1
+
+    # Usługa zgubiła separator - teksty tłumaczone pojedynczo
+    broken = Recorder()
+    broken_translate = lambda text: broken(text).replace("###", "")  # noqa: E731
+    assert translate_segments(["one", "two"], broken_translate) == ["ONE", "TWO"]
+    assert len(broken.requests) == 3
+
+
+def test_translate_documents_request_count():
+    """Strona krótkich wyników to jedno żądanie; długi dokument - kilka, z zachowanymi odstępami."""
+    recorder = Recorder()
+    page = [f"  Email {i}\nbody text.\n" for i in range(10)]
+
+    assert translate_documents(page, recorder) == [text.upper() for text in page]
+    assert len(recorder.requests) == 1
+
+    recorder = Recorder()
+    long_text = ("Paragraph text. " * 100 + "\n\n") * 20
+    assert translate_documents([long_text, "", "   "], recorder) == [long_text.upper(), "", "   "]
+    # Po dwa akapity (3200 znaków) na żądanie - trzeci przekroczyłby limit 4500
+    assert len(recorder.requests) == len(split_text_into_chunks(long_text)) == 10
+
+
+def test_translate_texts_uses_cache(monkeypatch):
+    class FakeGoogleTranslator:
+        requests = []
+
+        def __init__(self, source, target):
+            pass
+
+        def translate(self, text):
+            self.requests.append(text)
+            return text.replace("Hello", "Cześć")
+
+    monkeypatch.setitem(sys.modules, "deep_translator", types.SimpleNamespace(GoogleTranslator=FakeGoogleTranslator))
+    monkeypatch.setattr(translation_utils, "_TRANSLATION_CACHE", {})
+
+    texts = ["Hello Anna", "Hello Bob", "", "Hello Anna"]
+    assert translation_utils.translate_texts(texts) == ["Cześć Anna", "Cześć Bob", "", "Cześć Anna"]
+    assert len(FakeGoogleTranslator.requests) == 1
+    assert translation_utils.translate_texts(["Hello Bob"]) == ["Cześć Bob"]
+    assert len(FakeGoogleTranslator.requests) == 1
@@ -0,0 +1,307 @@
+"""
+Testy bezpiecznika usługi tłumaczenia: wstrzymanie po błędach, żądanie próbne i szybka odmowa.
+
+Uruchom: pytest tests/ -v
+"""
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import instrumentation  # noqa: E402
+import translation_utils  # noqa: E402
+from search_engine.pretranslate import translate_batch  # noqa: E402
+from translation_utils import CircuitBreaker, CircuitOpenError, backoff_delay, classify_error  # noqa: E402
+
+BACKOFF = {"rate_limited": 30.0, "connection": 5.0}
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=3, backoff=BACKOFF, max_backoff=300.0, clock=clock)
+
+
+def fail(error):
+    def compute():
+        raise error
+
+    return compute
+
+
+def counter(name):
+    return instrumentation.snapshot()["counters"].get(name, 0)
+
+
+def test_classify_error():
+    class TooManyRequests(Exception):
+        pass
+
+    assert classify_error(Exception("429 Client Error: Too Many Requests")) == "rate_limited"
+    assert classify_error(TooManyRequests("Server Error")) == "rate_limited"
+    assert classify_error(ConnectionError("reset by peer")) == "connection"
+    assert classify_error(Exception("HTTPSConnectionPool: Read timed out")) == "connection"
+    assert classify_error(ValueError("text must be a valid text")) == "other"
+    assert classify_error(CircuitOpenError(5)) == "circuit_open"
+
+
+def test_backoff_delay_grows_with_jitter():
+    for attempt, full in [(0, 5.0), (1, 10.0), (3, 40.0), (10, 300.0)]:
+        delays = [backoff_delay(attempt, 5.0, cap=300.0) for _ in range(50)]
+        assert all(full / 2 <= delay <= full for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_rate_limit_opens_and_fails_fast(breaker, clock):
+    with pytest.raises(Exception, match="429"):
+        breaker.call(fail(Exception("429 Too Many Requests")))
+
+    assert breaker.state == breaker.OPEN
+    retry_after = breaker.retry_after()
+    assert 15.0 <= retry_after <= 30.0
+
+    calls = []
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.call(lambda: calls.append(1))
+    assert calls == [] and error.value.retry_after == pytest.approx(retry_after)
+    assert counter("translation.breaker.rejected") == 1
+    assert counter("translation.rate_limited") == counter("translation.breaker.opened") == 1
+
+    # Po wstrzymaniu: żądanie próbne, którego sukces zamyka bezpiecznik
+    clock.now += retry_after
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == breaker.CLOSED
+    assert breaker.snapshot() == {
+        "state": "closed",
+        "consecutive_failures": 0,
+        "retry_after_s": 0.0,
+        "last_error": "rate_limited: 429 Too Many Requests",
+        "calls": 2,
+        "failures": 1,
+        "rejected": 1,
+        "opened": 1,
+    }
+
+
+def test_connection_errors_open_after_threshold(breaker):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail(ConnectionError("connection refused")))
+    # Błąd samego żądania nie świadczy o stanie usługi, a sukces zeruje serię
+    with pytest.raises(ValueError):
+        breaker.call(fail(ValueError("bad input")))
+    assert breaker.state == breaker.CLOSED
+    breaker.call(lambda: "ok")
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail(ConnectionError("connection refused")))
+    assert breaker.state == breaker.CLOSED
+
+    with pytest.raises(ConnectionError):
+        breaker.call(fail(ConnectionError("connection refused")))
+    assert breaker.state == breaker.OPEN
+    assert 2.5 <= breaker.retry_after() <= 5.0
+
+
+def test_failed_probe_reopens_for_longer(breaker, clock):
+    with pytest.raises(Exception):
+        breaker.call(fail(Exception("429")))
+    delays = []
+    for _ in range(3):
+        delays.append(breaker.retry_after())
+        clock.now += delays[-1]
+        with pytest.raises(Exception, match="429"):
+            breaker.call(fail(Exception("429")))
+        assert breaker.state == breaker.OPEN
+
+    # Kolejne wstrzymania: 30, 60, 120, 240 s (z rozrzutem w górnej połowie)
+    assert [15 <= delays[0] <= 30, 30 <= delays[1] <= 60, 60 <= delays[2] <= 120] == [True] * 3
+    assert 120 <= breaker.retry_after() <= 240
+
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    with pytest.raises(Exception):
+        breaker.call(fail(Exception("quota exceeded")))
+    clock.now += breaker.retry_after()
+
+    def probe():
+        # Inne żądanie w trakcie próby jest odrzucane
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: "drugie")
+        return "próba"
+
+    assert breaker.call(probe) == "próba"
+    assert breaker.state == breaker.CLOSED
+    assert counter("translation.breaker.closed") == 1
+
+
+def test_stale_success_does_not_close_open_breaker(breaker):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    thread = threading.Thread(target=breaker.call, args=(slow,))
+    thread.start()
+    started.wait(5)
+    with pytest.raises(Exception):
+        breaker.call(fail(Exception("429")))
+    release.set()
+    thread.join()
+
+    assert breaker.state == breaker.OPEN
+
+
+class Gate:
+    """Żądanie wykonywane w osobnym wątku, zakończone (wynikiem albo błędem) na sygnał testu."""
+
+    def __init__(self, breaker, error=None):
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(breaker,))
+        self.thread.start()
+        assert self.started.wait(5)
+
+    def _run(self, breaker):
+        try:
+            breaker.call(self._compute)
+        except Exception:
+            pass
+
+    def _compute(self):
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return "ok"
+
+    def finish(self):
+        self.release.set()
+        self.thread.join()
+
+
+@pytest.mark.parametrize("stale_error", [None, Exception("429")])
+def test_only_probe_decides_in_half_open(breaker, clock, stale_error):
+    """Żądanie wysłane przed otwarciem, zakończone w trakcie próby, nie zamyka ani nie otwiera bezpiecznika."""
+    stale = Gate(breaker, stale_error)
+    with pytest.raises(Exception, match="429"):
+        breaker.call(fail(Exception("429")))
+    clock.now += breaker.retry_after()
+    probe = Gate(breaker)
+
+    stale.finish()
+    assert breaker.state == breaker.HALF_OPEN
+    assert breaker.retry_after() == 0.0
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "w trakcie próby")
+
+    probe.finish()
+    assert breaker.state == breaker.CLOSED
+    assert counter("translation.breaker.opened") == counter("translation.breaker.closed") == 1
+
+
+def test_failed_probe_with_stale_success(breaker, clock):
+    stale = Gate(breaker)
+    with pytest.raises(Exception, match="429"):
+        breaker.call(fail(Exception("429")))
+    clock.now += breaker.retry_after()
+    probe = Gate(breaker, ConnectionError("connection refused"))
+
+    stale.finish()
+    probe.finish()
+
+    # Druga z kolei przerwa: bazowy czas błędu połączenia razy dwa
+    assert breaker.state == breaker.OPEN
+    assert 5.0 <= breaker.retry_after() <= 10.0
+
+
+def test_translation_pause_message(monkeypatch, breaker, clock):
+    monkeypatch.setattr(translation_utils, "_BREAKER", breaker)
+    assert translation_utils.translation_pause_message() is None
+
+    with pytest.raises(Exception):
+        breaker.call(fail(Exception("429")))
+    message = translation_utils.translation_pause_message()
+    assert message.startswith("⏸️ Usługa tłumaczenia jest chwilowo wstrzymana")
+    assert f"za {breaker.retry_after():.0f} s." in message
+
+    clock.now += breaker.retry_after()
+    assert translation_utils.translation_pause_message() is None
+
+
+class RateLimitedTranslator:
+    """Atrapa GoogleTranslator odpowiadająca limitem żądań."""
+
+    calls = []
+
+    def __init__(self, source, target):
+        pass
+
+    def translate(self, text):
+        self.calls.append(text)
+        raise Exception("Server Error: You made too many requests to the server (429)")
+
+
+def test_translate_text_fails_fast_while_open(monkeypatch):
+    RateLimitedTranslator.calls = []
+    monkeypatch.setitem(sys.modules, "deep_translator", types.SimpleNamespace(GoogleTranslator=RateLimitedTranslator))
+    monkeypatch.setattr(translation_utils, "_TRANSLATION_CACHE", {})
+    monkeypatch.setattr(translation_utils, "_BREAKER", CircuitBreaker(backoff=BACKOFF))
+
+    assert translation_utils.translate_text("First email") == "First email"
+    assert translation_utils.translate_text("Second email") == "Second email"
+    assert translation_utils.translate_texts(["Third", "Fourth " * 2000]) == ["Third", "Fourth " * 2000]
+    assert translation_utils.translate_query_to_english("żółty") == "żółty"
+    with pytest.raises(CircuitOpenError):
+        translation_utils.translate_chunk("Fifth")
+
+    # Do usługi trafiło tylko pierwsze żądanie - pozostałe odrzucił bezpiecznik
+    assert RateLimitedTranslator.calls == ["First email"]
+    # Drugi tekst, pięć żądań strony (długi tekst to cztery fragmenty), zapytanie i fragment
+    assert translation_utils.get_circuit_breaker().snapshot()["rejected"] == 8
+    assert counter("translation.errors") == 1
+
+
+def test_translate_batch_waits_for_breaker():
+    """Zadanie wsadowe czeka do końca wstrzymania zamiast ponawiać według własnego opóźnienia."""
+    responses = [CircuitOpenError(0.05)]
+
+    def translate(text):
+        if responses:
+            raise responses.pop()
+        return text.upper()
+
+    start = time.monotonic()
+    assert translate_batch(["one"], translate, retry_delay=30.0) == ["ONE"]
+    assert time.monotonic() - start < 1.0
@@ -0,0 +1,159 @@
+"""
+Testy wyszukiwania rozproszonego: shardy korpusu, workery i koordynator na jednej maszynie.
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.cluster import Coordinator  # noqa: E402
+from search_engine.corpus import load_shard, shard_bounds  # noqa: E402
+from search_engine.protocol import fetch_json  # noqa: E402
+from search_engine.server import SearchServer  # noqa: E402
+
+
+def email(day, body):
+    return f"From: a{day % 3}@x.com\nDate: 2009-03-{day:02d}\nTo: b@y.com\nSubject: Flight\n\n{body}"
+
+
+RECORDS = [
+    {"filename": f"{i}.txt", "text": email(i + 1, f"Epstein flight {i}") if i % 3 else f"Scanned page {i}, Epstein"}
+    for i in range(20)
+]
+
+
+@pytest.fixture
+def parquet_path(tmp_path):
+    path = tmp_path / "corpus.parquet"
+    pq.write_table(pa.Table.from_pylist(RECORDS), path, row_group_size=3)
+    return str(path)
+
+
+@pytest.mark.parametrize("count", [1, 3, 7])
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_shards_cover_corpus(parquet_path, tmp_path, count, compression):
+    """Shardy z Parquet (wybrane grupy wierszy) i JSONL (porcje) składają się na cały korpus."""
+    jsonl_path = tmp_path / "corpus.jsonl"
+    jsonl_path.write_text("".join(json.dumps(record) + "\n" for record in RECORDS), encoding="utf-8")
+
+    for source in (parquet_path, str(jsonl_path)):
+        texts = []
+        for index in range(count):
+            corpus, shard = load_shard(source, index, count, compression=compression)
+            assert (shard.offset, shard.stop) == shard_bounds(len(RECORDS), index, count)
+            assert shard.total == len(RECORDS)
+            assert corpus.filenames[0] == RECORDS[shard.offset]["filename"]
+            texts += corpus.texts.tolist()
+        assert texts == [record["text"] for record in RECORDS]
+
+    with pytest.raises(ValueError):
+        load_shard(parquet_path, 3, 3)
+
+
+class SlowServer(SearchServer):
+    async def _handle_search(self, request, args):
+        await asyncio.sleep(1.0)
+        return await super()._handle_search(request, args)
+
+
+def run_cluster(parquet_path, scenario, count=3, slow=(), extra_workers=(), timeout=5.0, unix_dir=None):
+    """Uruchamia workery shardów (TCP, opcjonalnie gniazdo lokalne) i koordynator, wykonuje scenariusz."""
+
+    async def _run():
+        workers = []
+        for index in range(count):
+            corpus, shard = load_shard(parquet_path, index, count)
+            server_class = SlowServer if index in slow else SearchServer
+            if unix_dir is not None and index == 0:
+                server = server_class(corpus, unix_socket=str(unix_dir / "shard0.sock"), shard=shard)
+            else:
+                server = server_class(corpus, port=0, shard=shard)
+            await server.start()
+            workers.append(server)
+        addresses = [
+            f"unix:{server.unix_socket}" if server.unix_socket else f"127.0.0.1:{server.port}" for server in workers
+        ]
+        coordinator = Coordinator(addresses + list(extra_workers), port=0, timeout=timeout)
+        await coordinator.start()
+
+        async def get(path):
+            return await fetch_json("127.0.0.1", coordinator.port, "GET", path)
+
+        try:
+            return await scenario(get)
+        finally:
+            await coordinator.close()
+            for server in workers:
+                await server.close()
+
+    return asyncio.run(_run())
+
+
+def test_coordinator_merges_shards(parquet_path, tmp_path):
+    """Wynik koordynatora odpowiada wyszukiwaniu w całym korpusie: trafienia, fasety, kolejność dat, dokumenty."""
+    full = Corpus.from_records(RECORDS)
+    expected = search(full, "epstein", facets=True, sort="date_desc")
+
+    async def scenario(get):
+        return (
+            await get("/search?q=epstein&facets=1&sort=date_desc"),
+            await get("/search?q=epstein&limit=5"),
+            await get("/docs/19"),
+            await get("/metadata/7"),
+            await get("/docs/20"),
+            await get("/health"),
+        )
+
+    by_date, top, doc, metadata, missing, health = run_cluster(parquet_path, scenario, unix_dir=tmp_path)
+
+    status, payload = by_date
+    assert status == 200 and not payload["partial"]
+    assert payload["total"] == expected.total
+    assert [hit["doc_id"] for hit in payload["hits"]] == [hit.doc_id for hit in expected.hits]
+    assert payload["facets"]["sender"] == expected.facets["sender"]
+    assert sum(payload["shards"].values()) == expected.total
+    # Top-k po typie: te same dokumenty co w jednym procesie
+    assert [hit["doc_id"] for hit in top[1]["hits"]] == [hit.doc_id for hit in search(full, "epstein", limit=5).hits]
+    assert doc == (200, {"doc_id": 19, "filename": "19.txt", "text": RECORDS[19]["text"]})
+    assert metadata[1]["doc_id"] == 7 and metadata[1]["from"] == "a2@x.com"
+    assert missing[0] == 404
+    assert health[1]["status"] == "ok" and health[1]["documents"] == len(RECORDS)
+
+
+def test_slow_and_failed_shards_are_skipped(parquet_path):
+    """Shard wolniejszy niż limit czasu i niedostępny worker są pomijane - wynik częściowy."""
+
+    async def scenario(get):
+        return await get("/search?q=epstein&limit=100"), await get("/health")
+
+    (status, payload), (_status, health) = run_cluster(
+        parquet_path, scenario, slow={1}, extra_workers=["127.0.0.1:9"], timeout=0.3
+    )
+
+    assert status == 200 and payload["partial"]
+    slow_address = [address for address in payload["failed_shards"] if address != "127.0.0.1:9"]
+    assert len(slow_address) == 1 and "0.3" in payload["failed_shards"][slow_address[0]]
+    assert "127.0.0.1:9" in payload["failed_shards"]
+    low, high = shard_bounds(len(RECORDS), 1, 3)
+    assert all(not low <= hit["doc_id"] < high for hit in payload["hits"])
+    assert health["status"] == "degraded"
+
+
+def test_invalid_query_is_client_error(parquet_path):
+    async def scenario(get):
+        return await get("/search?q=(unclosed&mode=regex"), await get("/search?q=x&sort=random")
+
+    (regex_status, regex_payload), (sort_status, _payload) = run_cluster(parquet_path, scenario, count=2)
+
+    assert regex_status == 400 and regex_payload["error"]
+    assert sort_status == 400
@@ -0,0 +1,90 @@
+"""
+Testy grafu współwystępowania encji.
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus  # noqa: E402
+from search_engine import cooccurrence  # noqa: E402
+from search_engine.cooccurrence import get_cooccurrence_graph  # noqa: E402
+from search_engine.protocol import Request  # noqa: E402
+from search_engine.server import SearchServer  # noqa: E402
+
+
+@pytest.fixture
+def corpus():
+    return Corpus.from_records(
+        [
+            {
+                "filename": "a.txt",
+                "text": "From: EPSTEIN, JEFFREY <je@gmail.com>\nTo: Ghislaine Maxwell <gm@aol.com>\n"
+                "Subject: Pilot\n\nDear Larry Visoski, call me at (212) 555-0100.",
+            },
+            {"filename": "b.txt", "text": "Jeffrey Epstein flew with Larry Visoski to Palm Beach."},
+            {"filename": "c.txt", "text": "Court filing: Jeffrey Epstein and Jean Luc Brunel."},
+            {"filename": "d.txt", "text": "Jean Luc Brunel called 212-555-0100."},
+        ]
+    )
+
+
+def test_related_counts_shared_documents(corpus):
+    """Liczba wspólnych dokumentów, bez samej encji, z filtrem typu."""
+    graph = get_cooccurrence_graph(corpus)
+
+    assert graph.related("person", "Jeffrey Epstein") == [
+        {"type": "person", "value": "Larry Visoski", "documents": 2},
+        {"type": "person", "value": "Ghislaine Maxwell", "documents": 1},
+        {"type": "person", "value": "Jean Luc Brunel", "documents": 1},
+    ]
+    assert graph.related("person", "Jeffrey Epstein", limit=1)[0]["value"] == "Larry Visoski"
+    assert graph.related("phone", "212-555-0100", related_type="email") == [
+        {"type": "email", "value": "je@gmail.com", "documents": 1},
+        {"type": "email", "value": "gm@aol.com", "documents": 1},
+    ]
+    assert graph.related("person", "Nobody Known") == []
+    with pytest.raises(ValueError):
+        graph.related("person", "Jeffrey Epstein", related_type="planet")
+
+
+def test_add_documents_and_compaction(corpus, monkeypatch):
+    """Dopisane dokumenty (także z nowymi encjami) są widoczne od razu; scalanie bloków nie zmienia wyników."""
+    graph = get_cooccurrence_graph(corpus)
+
+    assert graph.add_documents(["Jeffrey Epstein met Prince Andrew and Jean Luc Brunel."]) == range(4, 5)
+    assert len(graph.blocks) == 2
+    assert graph.related("person", "Prince Andrew") == [
+        {"type": "person", "value": "Jeffrey Epstein", "documents": 1},
+        {"type": "person", "value": "Jean Luc Brunel", "documents": 1},
+    ]
+    before = graph.related("person", "Jeffrey Epstein")
+    assert {"type": "person", "value": "Jean Luc Brunel", "documents": 2} in before
+
+    monkeypatch.setattr(cooccurrence, "MIN_COMPACT_DOCUMENTS", 0)
+    assert graph.add_documents(["Nothing to see here."]) == range(5, 6)
+    assert len(graph.blocks) == 1 and len(graph) == 6
+    assert graph.related("person", "Jeffrey Epstein") == before
+
+
+def test_server_related_endpoint(corpus):
+    """Endpoint /entities/related przyjmuje encję w formacie zapytania trybu encji."""
+    server = SearchServer(corpus, executor=None)
+
+    def get(path, **query):
+        return asyncio.run(server.dispatch(Request(method="GET", path=path, query=query)))
+
+    status, payload = get("/entities/related", entity="Epstein, Jeffrey", type="person", limit="2")
+    assert status == 200
+    assert payload["entity"] == {"type": "person", "value": "Jeffrey Epstein"}
+    assert [entity["value"] for entity in payload["related"]] == ["Larry Visoski", "Ghislaine Maxwell"]
+    assert get("/entities/related", entity="epstein")[0] == 400
+    assert get("/entities/related", entity="Larry Visoski", type="planet")[0] == 400
+    assert get("/entities/unknown")[0] == 404
+    server.executor.shutdown()
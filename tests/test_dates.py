@@ -0,0 +1,87 @@
+"""
+Testy normalizacji dat, filtrowania po zakresie i osi czasu.
+
+Uruchom: pytest tests/ -v
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.dates import DateIndex, get_date_index, parse_header_date  # noqa: E402
+
+
+@pytest.fixture
+def corpus():
+    def email(date_header, body):
+        return f"From: a@x.com\n{date_header}\nTo: b@y.com\nSubject: Flight\n\n{body}"
+
+    return Corpus.from_records(
+        [
+            {"filename": "a.txt", "text": email("Sent: Tuesday, March 3, 2009 4:12 PM", "Flight to the island.")},
+            {"filename": "b.txt", "text": email("Date: Thu, 15 Jan 2009 09:00:00 -0500", "Flight booked.")},
+            {"filename": "c.txt", "text": email("Date: 04/30/2010 11:00 AM", "Another flight.")},
+            {"filename": "d.txt", "text": email("Date: sometime last week", "Flight maybe.")},
+            {"filename": "e.txt", "text": "Court filing about a flight, no headers at all."},
+        ]
+    )
+
+
+def test_parse_header_date_formats():
+    """Różne formaty nagłówków dają tę samą datę; śmieci i daty spoza zakresu - None."""
+    expected = datetime(2009, 3, 3, 16, 12)
+    assert parse_header_date("Tuesday, March 3, 2009 4:12 PM") == expected
+    assert parse_header_date("Tue, 03 Mar 2009 16:12:00 -0500") == expected
+    assert parse_header_date("Tue, 3 Mar 2009 16:12:00 +0000 (GMT)") == expected
+    assert parse_header_date("03/03/2009 04:12 PM") == expected
+    assert parse_header_date("2009-03-03 16:12") == expected
+    assert parse_header_date("Tuesday, March 3rd, 2009 at 4:12 PM") == expected
+    assert parse_header_date("March 03, 2009") == datetime(2009, 3, 3)
+
+    assert parse_header_date("N/A") is None
+    assert parse_header_date("sometime last week") is None
+    assert parse_header_date("March 3, 1009") is None
+
+
+def test_date_index_column_and_failures(corpus):
+    """Kolumna datetime64 z flagą błędu parsowania (brak nagłówka to nie błąd)."""
+    index = get_date_index(corpus)
+
+    assert index.dates.dtype == np.dtype("datetime64[s]")
+    assert index.dates[0] == np.datetime64("2009-03-03T16:12:00")
+    assert np.isnat(index.dates[3]) and np.isnat(index.dates[4])
+    assert index.parse_failed.tolist() == [False, False, False, True, False]
+    assert index.order.tolist() == [1, 0, 2]
+
+
+def test_range_queries():
+    """Zakres jest domknięty, a koniec obejmuje cały dzień lub miesiąc."""
+    dates = np.array(["2009-03-31T23:00", "2009-01-01T00:00", "NaT", "2009-04-01T00:00"], dtype="datetime64[s]")
+    index = DateIndex(dates, np.zeros(4, dtype=bool))
+
+    assert index.range_ids("2009-03-01", "2009-03-31").tolist() == [0]
+    assert index.range_ids("2009-01", "2009-03").tolist() == [1, 0]
+    assert index.range_ids(end="2009-04-01").tolist() == [1, 0, 3]
+    assert index.filter(np.array([0, 1, 2, 3]), "2009-02-01").tolist() == [0, 3]
+    assert index.sort(np.array([0, 1, 2, 3]), descending=True).tolist() == [3, 0, 1, 2]
+    assert index.timeline() == {"2009-01": 1, "2009-02": 0, "2009-03": 1, "2009-04": 1}
+
+
+def test_search_with_dates(corpus):
+    """Wyszukiwanie z zakresem dat, sortowaniem po dacie i osią czasu."""
+    result = search(corpus, "flight", date_from="2009-01-01", date_to="2009-12-31", timeline=True)
+    assert sorted(hit.filename for hit in result.hits) == ["a.txt", "b.txt"]
+    assert result.timeline == {"2009-01": 1, "2009-02": 0, "2009-03": 1}
+
+    newest = search(corpus, "flight", sort="date_desc")
+    assert [hit.filename for hit in newest.hits][:3] == ["c.txt", "a.txt", "b.txt"]
+    assert newest.total == 5
+
+    with pytest.raises(ValueError):
+        search(corpus, "flight", sort="random")
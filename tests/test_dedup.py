@@ -0,0 +1,103 @@
+"""
+Testy wykrywania prawie-duplikatów (MinHash, LSH, zwijanie wyników).
+
+Uruchom: pytest tests/ -v
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.dedup import (  # noqa: E402
+    DuplicateIndex,
+    connected_components,
+    get_duplicate_index,
+    minhash_signatures,
+)
+from search_engine.docstore import DocumentStore  # noqa: E402
+
+THREAD = (
+    "From: Jeffrey Epstein <je@gmail.com>\nTo: gm@aol.com\nSubject: Island schedule\n\n"
+    "Please confirm the flight schedule for next week. The plane leaves Teterboro at nine and the "
+    "staff should prepare the house on the island before the guests arrive on Friday evening. "
+    "Call me when the manifest is final and send a copy to the office in New York."
+)
+
+
+@pytest.fixture
+def corpus():
+    forward = "Fw: Island schedule\n\n" + THREAD
+    ocr_copy = THREAD.replace("schedule", "schedu1e", 1)
+    return Corpus.from_records(
+        [
+            {"filename": "original.txt", "text": THREAD},
+            {"filename": "unrelated.txt", "text": "Court filing about property taxes in Palm Beach and the schedule."},
+            {"filename": "forward.txt", "text": forward},
+            {"filename": "ocr.txt", "text": ocr_copy},
+            {"filename": "empty.txt", "text": ""},
+            {"filename": "empty2.txt", "text": ""},
+        ]
+    )
+
+
+def test_signatures_estimate_similarity():
+    """Zgodność sygnatur przybliża podobieństwo Jaccarda."""
+    signatures, empty = minhash_signatures([THREAD, THREAD + " Thanks.", "Completely different words here", ""])
+
+    assert signatures.shape == (4, 64)
+    assert empty.tolist() == [False, False, False, True]
+    assert (signatures[0] == signatures[1]).mean() > 0.8
+    assert (signatures[0] == signatures[2]).mean() < 0.2
+
+
+def test_connected_components():
+    """Etykieta składowej to jej najmniejszy wierzchołek."""
+    labels = connected_components(7, np.array([5, 1, 3]), np.array([6, 3, 6]))
+    assert labels.tolist() == [0, 1, 2, 1, 4, 1, 1]
+
+
+def test_clusters(corpus):
+    """Przekazanie i kopia OCR trafiają do klastra oryginału; puste dokumenty nie są sklejane."""
+    index = get_duplicate_index(corpus)
+
+    assert index.cluster_ids.tolist() == [0, 1, 0, 0, 4, 5]
+    assert index.members(3).tolist() == [0, 2, 3]
+    assert index.cluster_count == 4
+
+
+def test_build_does_not_materialize_texts(corpus, monkeypatch):
+    """Indeks jest budowany porcjami wprost z magazynu tekstów, bez listy wszystkich dokumentów."""
+
+    def tolist(self):
+        raise AssertionError("pełna lista tekstów korpusu")
+
+    monkeypatch.setattr(DocumentStore, "tolist", tolist)
+
+    assert get_duplicate_index(corpus).cluster_ids.tolist() == [0, 1, 0, 0, 4, 5]
+    assert DuplicateIndex.build(corpus.texts, batch_size=4).cluster_ids.tolist() == [0, 1, 0, 0, 4, 5]
+
+
+def test_build_from_compressed_corpus(corpus):
+    """Skompresowany korpus: te same klastry; porcje są rozpakowywane poza cache bloków."""
+    compressed = corpus.compressed("zlib", block_size=256)
+
+    assert get_duplicate_index(compressed).cluster_ids.tolist() == [0, 1, 0, 0, 4, 5]
+    assert compressed.texts.block_count > 1
+    assert len(compressed.texts._cache) == 0
+
+
+def test_collapse_duplicates_in_search(corpus):
+    """Zwijanie zostawia jednego reprezentanta z liczbą ukrytych kopii."""
+    full = search(corpus, "schedule")
+    collapsed = search(corpus, "schedule", collapse_duplicates=True)
+
+    assert full.total == 4 and full.collapsed == 0
+    assert collapsed.total == 2
+    assert collapsed.collapsed == 2
+    duplicates = {hit.filename: hit.duplicates for hit in collapsed.hits}
+    assert duplicates == {"original.txt": 2, "unrelated.txt": 0}
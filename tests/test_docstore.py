@@ -0,0 +1,93 @@
+"""
+Testy zwartego magazynu tekstów (bufor UTF-8 + offsety) i jego zgodności z kolumną pandas.
+
+Uruchom: pytest tests/ -v
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.docstore import ASCII_UPPER_SOURCES, DocumentStore  # noqa: E402
+
+TEXTS = [
+    "From: Jeffrey Epstein\nMeeting tomorrow.",
+    "",
+    "jeffrey epstein flew to the island",
+    "Straße in München, ﬁle attached",
+    "",
+    "Maxwell’s deposition – CONFIDENTIAL",
+    "ab",
+    "cd",
+    "Dotless ı and long ſ: ſtate",
+]
+
+
+@pytest.fixture
+def store():
+    return DocumentStore.from_texts(TEXTS)
+
+
+def test_access_and_slicing(store):
+    """Odczyt dokumentów, iteracja i wycinki współdzielące bufor."""
+    assert len(store) == len(TEXTS)
+    assert store.tolist() == TEXTS
+    assert store[3] == store.iat[3] == TEXTS[3]
+    assert store[-1] == TEXTS[-1]
+    with pytest.raises(IndexError):
+        store[len(TEXTS)]
+
+    view = store[2:6]
+    assert view.data is store.data
+    assert view.tolist() == TEXTS[2:6]
+    assert view.contains("münchen").tolist() == [1]
+    assert len(store[5:2]) == 0
+    # Uszkodzony tekst (samotny surogat) przechodzi przez bufor bez błędu
+    assert DocumentStore.from_texts(["lone \udc80 surrogate"])[0] == "lone \udc80 surrogate"
+
+
+@pytest.mark.parametrize(
+    "query", ["epstein", "EPSTEIN", "strasse", "STRASSE", "file", "münchen", "ı", "state", "bc", "’s", "a", "qzx"]
+)
+@pytest.mark.parametrize("case_sensitive", [False, True])
+def test_contains_matches_str_semantics(store, query, case_sensitive):
+    """Skan bufora daje te same dokumenty co porównanie na `str` (także "ß"/"ﬁ"/"ſ" i granice dokumentów)."""
+    if case_sensitive:
+        expected = [doc_id for doc_id, text in enumerate(TEXTS) if query in text]
+    else:
+        expected = [doc_id for doc_id, text in enumerate(TEXTS) if query.upper() in text.upper()]
+
+    assert store.contains(query, case_sensitive).tolist() == expected
+
+
+def test_ascii_upper_sources_are_complete():
+    """Lista znaków, których `upper()` daje litery ASCII, obejmuje całe BMP."""
+    sources = {chr(code) for code in range(0x80, 0x10000) if any(ord(char) < 0x80 for char in chr(code).upper())}
+
+    assert sources <= set(ASCII_UPPER_SOURCES)
+
+
+def test_from_arrow_and_missing_values():
+    """Kolumna Arrow (z pustymi wartościami, wiele fragmentów) daje ten sam magazyn co teksty."""
+    column = pa.chunked_array([pa.array(["a", None]), pa.array(["Straße"], type=pa.string())])
+    store = DocumentStore.from_arrow(column, default="-")
+
+    assert store.tolist() == ["a", "-", "Straße"]
+    assert DocumentStore.from_texts(["a", None, float("nan"), pd.NA], default="-").tolist() == ["a", "-", "-", "-"]
+    assert len(DocumentStore.from_arrow(pa.chunked_array([], type=pa.string()))) == 0
+
+
+def test_corpus_from_arrow_searches_like_from_records():
+    table = pa.table({"text": TEXTS, "filename": [f"{i}.txt" for i in range(len(TEXTS))]})
+    corpus = Corpus.from_arrow(table, name="arrow")
+
+    assert corpus.filenames[3] == "3.txt"
+    assert [hit.doc_id for hit in search(corpus, "epstein").hits] == [0, 2]
+    with pytest.raises(ValueError):
+        Corpus.from_arrow(pa.table({"text": ["a"]}))
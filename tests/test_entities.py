@@ -0,0 +1,113 @@
+"""
+Testy indeksu encji (osoby, adresy e-mail, telefony, URL-e).
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import instrumentation  # noqa: E402
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.entities import extract_entities, get_entity_index, parse_entity_query  # noqa: E402
+from search_engine.protocol import Request  # noqa: E402
+from search_engine.server import SearchServer  # noqa: E402
+
+
+@pytest.fixture
+def corpus():
+    return Corpus.from_records(
+        [
+            {
+                "filename": "a.txt",
+                "text": "From: EPSTEIN, JEFFREY <JE@Gmail.com>\nTo: Ghislaine Maxwell <gm@aol.com>\n"
+                "Subject: Pilot\n\nDear Larry Visoski, call me at (212) 555-0100 or 212.555.0100. "
+                "Details: http://www.flights.com/log.",
+            },
+            {
+                "filename": "b.txt",
+                "text": "From: gm@aol.com\nTo: je@gmail.com\nSubject: Re: Pilot\n\n"
+                "Larry Visoski confirmed. +1 212 555 0100",
+            },
+            {"filename": "c.txt", "text": "Court filing: Jeffrey Epstein and Jean Luc Brunel, Palm Beach County."},
+        ]
+    )
+
+
+def test_extract_and_normalize():
+    """Różne zapisy tej samej encji dają jedną znormalizowaną wartość."""
+    mentions = extract_entities(
+        "From: EPSTEIN, JEFFREY <je@x.com>\nSubject: Trip\n\nThanks Bill Clinton, call 1-212-555-0100 "
+        "or +44 20 7946 0958; see www.Site.com/x."
+    )
+    values = {(kind, value) for kind, value, _ in mentions}
+
+    assert values == {
+        ("email", "je@x.com"),
+        ("person", "Jeffrey Epstein"),
+        ("person", "Bill Clinton"),
+        ("phone", "212-555-0100"),
+        ("phone", "+442079460958"),
+        ("url", "www.site.com/x"),
+    }
+    assert ("person", "Bill Clinton", "Bill Clinton") in mentions
+
+    assert parse_entity_query("JE@Gmail.com") == ("email", "je@gmail.com")
+    assert parse_entity_query("phone:(212) 555-0100") == ("phone", "212-555-0100")
+    assert parse_entity_query("Epstein, Jeffrey") == ("person", "Jeffrey Epstein")
+    with pytest.raises(ValueError):
+        parse_entity_query("epstein")
+
+
+def test_postings_and_top_entities(corpus):
+    """Listy dokumentów i liczniki wzmianek; najczęstsze encje w korpusie i w podzbiorze."""
+    index = get_entity_index(corpus)
+
+    assert index.lookup("phone", "212-555-0100").tolist() == [0, 1]
+    assert index.lookup("person", "Jeffrey Epstein").tolist() == [0, 2]
+    assert index.lookup("person", "Palm Beach").tolist() == []
+    assert index.lookup("email", "nobody@x.com").tolist() == []
+
+    top_phones = index.top("phone")
+    assert top_phones == [{"type": "phone", "value": "212-555-0100", "documents": 2, "mentions": 3}]
+    people = [entity["value"] for entity in index.top("person", doc_ids=[2])]
+    assert people == ["Jeffrey Epstein", "Jean Luc Brunel"]
+
+
+def test_entity_search_uses_index(corpus):
+    """Tryb encji czyta listę dokumentów z indeksu - bez skanu tekstów - i zwraca postaci do podświetlenia."""
+    get_entity_index(corpus)
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        result = search(corpus, "phone:212 555 0100", mode="entity")
+        timers = instrumentation.snapshot()["timers"]
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+
+    assert "search.scan" not in timers
+    assert result.total == 2
+    assert {hit.filename: hit.occurrences for hit in result.hits} == {"a.txt": 2, "b.txt": 1}
+    assert result.terms == ["(212) 555-0100", "212.555.0100", "+1 212 555 0100"]
+
+
+def test_server_entities(corpus):
+    """Endpoint /entities i walidacja zapytań w trybie encji."""
+    server = SearchServer(corpus, executor=None)
+
+    def get(path, **query):
+        return asyncio.run(server.dispatch(Request(method="GET", path=path, query=query)))
+
+    status, payload = get("/entities", type="email", limit="1")
+    assert status == 200
+    assert payload["entities"] == [{"type": "email", "value": "je@gmail.com", "documents": 2, "mentions": 2}]
+    assert get("/entities", type="planet")[0] == 400
+    assert get("/search", q="Larry Visoski", mode="entity")[1]["total"] == 2
+    assert get("/search", q="x", mode="entity")[0] == 400
+    server.executor.shutdown()
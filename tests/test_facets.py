@@ -0,0 +1,114 @@
+"""
+Testy filtrów fasetowych (mapy bitowe, liczniki, filtrowanie wyników).
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import instrumentation  # noqa: E402
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.facets import Bitmap, document_facets, get_facet_index  # noqa: E402
+from search_engine.protocol import Request  # noqa: E402
+from search_engine.server import SearchServer  # noqa: E402
+
+
+@pytest.fixture
+def corpus():
+    return Corpus.from_records(
+        [
+            {
+                "filename": "a.txt",
+                "text": "From: Jeffrey Epstein <JE@Gmail.com>\nTo: Ghislaine <gm@aol.com>; bob@gmail.com\n"
+                "Subject: Flight\n\nThe flight to the island is booked.",
+            },
+            {
+                "filename": "b.txt",
+                "text": "From: gm@aol.com\nTo: je@gmail.com\nSubject: Re: Flight\n\nThanks for the flight details.",
+            },
+            {"filename": "c.txt", "text": "Court filing about a flight manifest and property records."},
+            {"filename": "d.txt", "text": '{"id": 4, "note": "flight metadata"}'},
+        ]
+    )
+
+
+def test_bitmap_operations():
+    """Iloczyn i suma działają dla reprezentacji rzadkiej i gęstej."""
+    size = 1000
+    dense = Bitmap.from_ids(np.arange(0, size, 2), size)
+    sparse = Bitmap.from_ids([3, 4, 10, 11], size)
+    other_dense = Bitmap.from_ids(np.arange(0, size, 3), size)
+
+    assert dense.is_dense and not sparse.is_dense
+    assert (dense & sparse).to_ids().tolist() == [4, 10]
+    assert (sparse & dense).to_ids().tolist() == [4, 10]
+    assert (dense & other_dense).to_ids().tolist() == list(range(0, size, 6))
+    assert len(dense | other_dense) == len(set(range(0, size, 2)) | set(range(0, size, 3)))
+    assert dense.nbytes < len(dense) * 4
+
+
+def test_document_facets_are_normalized(corpus):
+    """Adresy są sprowadzane do małych liter, domeny wyciągane z nadawcy i odbiorców."""
+    facets = document_facets(corpus.texts.iat[0])
+
+    assert facets["sender"] == ["je@gmail.com"]
+    assert facets["recipient"] == ["gm@aol.com", "bob@gmail.com"]
+    assert facets["domain"] == ["gmail.com", "aol.com"]
+    assert facets["content_type"] == ["email"]
+
+
+def test_filters_and_counts(corpus):
+    """Filtry zawężają wyniki, a liczniki pola ignorują własny filtr."""
+    result = search(corpus, "flight", facets=True)
+    assert result.total == 4
+    assert result.facets["domain"] == {"gmail.com": 2, "aol.com": 2}
+    assert result.facets["content_type"]["email"] == 2
+
+    filtered = search(corpus, "flight", filters={"sender": ["gm@aol.com"]}, facets=True)
+    assert [hit.filename for hit in filtered.hits] == ["b.txt"]
+    assert filtered.facets["sender"] == {"je@gmail.com": 1, "gm@aol.com": 1}
+    assert filtered.facets["recipient"] == {"je@gmail.com": 1}
+
+    either = search(corpus, "flight", filters={"sender": ["gm@aol.com", "je@gmail.com"], "content_type": ["email"]})
+    assert either.total == 2
+    assert search(corpus, "flight", filters={"domain": ["unknown.org"]}).total == 0
+
+    with pytest.raises(ValueError):
+        search(corpus, "flight", filters={"color": ["red"]})
+
+
+def test_changing_filters_does_not_rescan(corpus):
+    """Zmiana filtrów korzysta z zapamiętanego dopasowania - bez ponownego skanu tekstów."""
+    get_facet_index(corpus)
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        search(corpus, "flight")
+        search(corpus, "flight", filters={"content_type": ["email"]})
+        search(corpus, "flight", filters={"domain": ["aol.com"]}, facets=True)
+        timers = instrumentation.snapshot()["timers"]
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+
+    assert timers["search.scan"]["count"] == 1
+    assert timers["search.facets"]["count"] == 2
+
+
+def test_server_facet_parameters(corpus):
+    """Serwer przyjmuje filtry jako parametry zapytania (wartości po przecinku)."""
+    server = SearchServer(corpus, executor=None)
+    request = Request(method="GET", path="/search", query={"q": "flight", "domain": "aol.com", "facets": "1"})
+    status, payload = asyncio.run(server.dispatch(request))
+    server.executor.shutdown()
+
+    assert status == 200
+    assert payload["total"] == 2
+    assert payload["facets"]["content_type"] == {"email": 2}
@@ -0,0 +1,175 @@
+"""
+Testy rejestru korpusów i wyszukiwania federacyjnego w kilku zbiorach.
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus  # noqa: E402
+from search_engine.federation import (  # noqa: E402
+    CorpusRegistry,
+    FederatedHit,
+    corpus_name,
+    federated_search,
+    validate_corpus_name,
+)
+from search_engine.protocol import Request  # noqa: E402
+from search_engine.server import SearchServer  # noqa: E402
+
+
+def email(date, body):
+    return f"From: a@x.com\nDate: {date}\nTo: b@y.com\nSubject: Flight\n\n{body}"
+
+
+RELEASE = [
+    {"filename": "r0.txt", "text": email("2009-03-03", "Epstein flight to the island.")},
+    {"filename": "r1.txt", "text": "Court filing: Epstein deposition."},
+    {"filename": "r2.txt", "text": email("2011-06-01", "Maxwell meeting.")},
+]
+OCR = [
+    {"filename": "o0.txt", "text": "Scanned page mentioning Epstein."},
+    {"filename": "o1.txt", "text": email("2010-01-15", "Epstein call notes.")},
+]
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def registry():
+    registry = CorpusRegistry()
+    registry.add("release", Corpus.from_records(RELEASE, name="release"))
+    registry.add("ocr", Corpus.from_records(OCR, name="ocr"))
+    yield registry
+    registry.close()
+
+
+def test_merges_results_with_source(registry):
+    """Wyniki z obu korpusów, maile najpierw i naprzemiennie; każdy wynik wskazuje swój korpus."""
+    result = registry.search("epstein")
+
+    assert result.total == 4
+    assert result.corpora == {"release": 2, "ocr": 2}
+    assert [(hit.corpus, hit.doc_id) for hit in result.hits] == [("release", 0), ("ocr", 1), ("release", 1), ("ocr", 0)]
+    assert all(isinstance(hit, FederatedHit) for hit in result.hits)
+    assert result.to_dict()["hits"][1]["corpus"] == "ocr"
+    assert registry.search("epstein", limit=1).hits[0].corpus == "release"
+    assert registry.search("epstein", names=["ocr"]).corpora == {"ocr": 2}
+
+
+def test_date_sort_across_corpora(registry):
+    """Kolejność po dacie z indeksów dat wszystkich korpusów; dokumenty bez daty na końcu."""
+    result = registry.search("epstein", sort="date_desc", timeline=True, facets=True)
+
+    assert [(hit.corpus, hit.doc_id) for hit in result.hits][:2] == [("ocr", 1), ("release", 0)]
+    assert {hit.doc_id for hit in result.hits[2:]} == {0, 1}
+    assert result.timeline == {"2009-03": 1, "2010-01": 1}
+    assert result.facets["content_type"]["email"] == 2
+
+
+def test_suggestions_and_invalid_query(registry):
+    result = registry.search("Epstien", suggest=True)
+
+    assert result.total == 0
+    assert result.suggestions[0] == {"query": "Epstein", "hits": 4, "distance": 1}
+    with pytest.raises(ValueError):
+        registry.search("epstein", mode="unknown")
+    with pytest.raises(KeyError):
+        registry.search("epstein", names=["missing"])
+
+
+def test_failed_corpus_is_reported(registry):
+    """Błąd jednego korpusu nie przerywa zapytania - trafia do `errors`."""
+
+    class Broken(Corpus):
+        def cached_match(self, key, compute):
+            raise RuntimeError("dysk niedostępny")
+
+    corpora = {"release": registry.get("release"), "broken": Broken.from_records(OCR)}
+    result = federated_search(corpora, "epstein")
+
+    assert result.corpora == {"release": 2}
+    assert result.errors == {"broken": "dysk niedostępny"}
+
+
+def test_load_refresh_unload(tmp_path):
+    """Korpus ładowany z pliku, przeładowywany po zmianie pliku i zwalniany niezależnie od pozostałych."""
+    path = tmp_path / "batch.jsonl"
+    write_jsonl(path, OCR)
+    prepared = []
+    registry = CorpusRegistry(prepare=prepared.append)
+    registry.add("release", Corpus.from_records(RELEASE))
+
+    entry = registry.load("batch", str(path))
+    assert entry.to_dict()["documents"] == 2 and entry.generation == 1
+    assert prepared == [entry.corpus]
+    assert registry.get_or_load("batch", "ignored.jsonl") is entry.corpus
+
+    write_jsonl(path, OCR + [{"filename": "o2.txt", "text": "Epstein again."}])
+    refreshed = registry.refresh("batch")
+    assert len(refreshed.corpus) == 3 and refreshed.generation == 2
+    assert registry.search("epstein").corpora == {"release": 2, "batch": 3}
+
+    registry.unload("batch")
+    assert registry.names() == ["release"]
+    with pytest.raises(KeyError):
+        registry.unload("batch")
+    with pytest.raises(ValueError):
+        registry.refresh("release")
+    registry.close()
+
+
+def test_corpus_names():
+    assert corpus_name("tensonaut/EPSTEIN_FILES_20K") == "EPSTEIN_FILES_20K"
+    assert corpus_name("data/ocr batch.parquet") == "ocr-batch"
+    with pytest.raises(ValueError):
+        validate_corpus_name("a/b")
+
+
+def test_server_federated_endpoints(tmp_path):
+    """Serwer: wyszukiwanie w kilku korpusach, dokumenty wybranego korpusu i zarządzanie korpusami."""
+    corpus = Corpus.from_records(RELEASE, name="release")
+    server = SearchServer(corpus, executor=None, manage_corpora=True)
+
+    def call(method, path, query=None, body=None):
+        request = Request(method=method, path=path, query=query or {}, body=json.dumps(body).encode() if body else b"")
+        return asyncio.run(server.dispatch(request))
+
+    status, loaded = call("POST", "/corpora", body={"name": "ocr", "source": write_jsonl(tmp_path / "o.jsonl", OCR)})
+    assert status == 200 and loaded["documents"] == 2
+    assert call("POST", "/corpora", body={"name": "ocr", "source": "x.jsonl"})[0] == 409
+
+    status, payload = call("GET", "/search", {"q": "epstein", "corpora": "all"})
+    assert status == 200
+    assert payload["corpora"] == {"release": 2, "ocr": 2}
+    assert {hit["corpus"] for hit in payload["hits"]} == {"release", "ocr"}
+    assert call("GET", "/search", {"q": "epstein", "corpus": "ocr"})[1]["total"] == 2
+    assert call("GET", "/search", {"q": "epstein", "corpora": "ocr,missing"})[0] == 404
+    assert call("GET", "/docs/0", {"corpus": "ocr"})[1]["filename"] == "o0.txt"
+    assert call("GET", "/docs/2", {"corpus": "ocr"})[0] == 404
+
+    assert [entry["name"] for entry in call("GET", "/corpora")[1]["corpora"]] == ["release", "ocr"]
+    assert call("POST", "/corpora/ocr/refresh")[1]["generation"] == 2
+    assert call("DELETE", "/corpora/release")[0] == 409
+    assert call("DELETE", "/corpora/ocr") == (200, {"name": "ocr", "unloaded": True})
+    assert call("GET", "/docs/0", {"corpus": "ocr"})[0] == 404
+    server.executor.shutdown()
+    server.registry.close()
+
+
+def test_server_corpus_changes_disabled_by_default():
+    server = SearchServer(Corpus.from_records(RELEASE), executor=None)
+    status, _payload = asyncio.run(server.dispatch(Request(method="DELETE", path="/corpora/corpus")))
+
+    assert status == 403
+    server.executor.shutdown()
@@ -0,0 +1,75 @@
+"""
+Testy wyszukiwania przybliżonego (indeks usunięć, odległość edycyjna).
+
+Uruchom: pytest tests/ -v
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.fuzzy import damerau_levenshtein, get_deletion_index  # noqa: E402
+from search_engine.vocabulary import get_vocabulary, tokenize  # noqa: E402
+
+
+@pytest.fixture
+def corpus():
+    return Corpus.from_records(
+        [
+            {"filename": "a.txt", "text": "From: Jeffrey Epstein\nMeeting with Ghislaine Maxwell on the island."},
+            {"filename": "b.txt", "text": "Scanned page: Epstien and Maxwel1 were seen at the airport."},
+            {"filename": "c.txt", "text": "Flight log for Epstein, no other names."},
+            {"filename": "d.txt", "text": "Unrelated court filing about property taxes."},
+        ]
+    )
+
+
+def test_damerau_levenshtein():
+    """Odległość z transpozycją i limitem."""
+    assert damerau_levenshtein("epstein", "epstein", 2) == 0
+    assert damerau_levenshtein("epstein", "epstien", 2) == 1
+    assert damerau_levenshtein("maxwell", "maxwel1", 2) == 1
+    assert damerau_levenshtein("maxwell", "maxwl", 2) == 2
+    assert damerau_levenshtein("epstein", "island", 2) == 3
+
+
+def test_vocabulary_postings(corpus):
+    """Słownik zwraca posortowane listy dokumentów dla termów."""
+    vocabulary = get_vocabulary(corpus)
+
+    assert tokenize("Maxwel1, Epstien!") == ["maxwel1", "epstien"]
+    assert vocabulary.postings("epstein").tolist() == [0, 2]
+    assert vocabulary.frequency("maxwell") == 1
+    assert vocabulary.postings("absent").tolist() == []
+    assert get_vocabulary(corpus) is vocabulary
+
+
+def test_deletion_index_lookup(corpus):
+    """Indeks usunięć znajduje warianty z błędami OCR w obie strony."""
+    index = get_deletion_index(corpus)
+
+    assert index.lookup("epstien", 1)[:2] == [("epstien", 0), ("epstein", 1)]
+    assert ("maxwell", 1) in index.lookup("maxwel1", 1)
+    assert index.lookup("epstein", 0) == [("epstein", 0)]
+
+
+def test_fuzzy_search(corpus):
+    """Tryb przybliżony łączy warianty słowa, a słowa zapytania muszą wystąpić wszystkie."""
+    exact = search(corpus, "Epstein")
+    fuzzy = search(corpus, "Epstein", mode="fuzzy")
+
+    assert exact.total == 2
+    assert fuzzy.total == 3
+    assert fuzzy.terms == ["epstein", "epstien"]
+
+    both = search(corpus, "epstein maxwell", mode="fuzzy")
+    assert sorted(hit.filename for hit in both.hits) == ["a.txt", "b.txt"]
+    assert all(hit.occurrences == 2 for hit in both.hits)
+
+    assert search(corpus, "qzxjv", mode="fuzzy").total == 0
+    with pytest.raises(ValueError):
+        search(corpus, "epstein", mode="unknown")
@@ -0,0 +1,74 @@
+"""
+Testy pomiarów wydajności (timery, liczniki, eksport).
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import instrumentation  # noqa: E402
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.protocol import Request  # noqa: E402
+from search_engine.server import SearchServer  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_disabled_records_nothing():
+    """Wyłączone pomiary nic nie zapisują."""
+    instrumentation.disable()
+    with instrumentation.timed("stage"):
+        pass
+    instrumentation.increment("counter")
+
+    assert instrumentation.snapshot() == {"timers": {}, "counters": {}}
+
+
+def test_search_stages_are_timed():
+    """Wyszukiwanie mierzy skan oraz klasyfikację i sortowanie."""
+    corpus = Corpus.from_records([{"filename": "a.txt", "text": "Epstein flight"}])
+    search(corpus, "epstein")
+    search(corpus, "flight")
+
+    data = instrumentation.snapshot()
+    assert data["timers"]["search.scan"]["count"] == 2
+    assert "search.classify_sort" in data["timers"]
+    assert data["counters"] == {"search.queries": 2, "search.matches": 2}
+
+
+def test_exports():
+    """Eksport do logów i formatu Prometheusa."""
+    instrumentation.record("search.scan", 0.25)
+    instrumentation.increment("translation.cache_hit", 3)
+
+    records = instrumentation.to_log_records()
+    assert {"type": "counter", "name": "translation.cache_hit", "value": 3} in records
+
+    text = instrumentation.to_prometheus()
+    assert 'epstein_search_stage_seconds_count{stage="search.scan"} 1' in text
+    assert 'epstein_search_stage_seconds_sum{stage="search.scan"} 0.250000' in text
+    assert 'epstein_search_events_total{name="translation.cache_hit"} 3' in text
+
+
+def test_server_metrics_endpoint():
+    """Endpoint /metrics zwraca tekst w formacie Prometheusa."""
+    instrumentation.increment("search.queries")
+    server = SearchServer(Corpus.from_records([]), executor=None)
+    status, payload = asyncio.run(server.dispatch(Request(method="GET", path="/metrics")))
+    server.executor.shutdown()
+
+    assert status == 200
+    assert 'epstein_search_events_total{name="search.queries"} 1' in payload
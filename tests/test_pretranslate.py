@@ -0,0 +1,154 @@
+"""
+Testy wsadowego tłumaczenia korpusu: porcje zapisywane na dysk, wznawianie i dołączanie tłumaczeń.
+
+Uruchom: pytest tests/ -v
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.dates import get_date_index  # noqa: E402
+from search_engine.headers import get_header_indexes  # noqa: E402
+from search_engine.pretranslate import (  # noqa: E402
+    RateLimiter,
+    TranslationStore,
+    attach_translations,
+    get_translations,
+    pretranslate,
+    translate_batch,
+    translated_corpus,
+)
+
+
+def email(day, body):
+    return f"From: a@x.com\nDate: 2009-03-{day:02d}\nTo: b@y.com\nSubject: Flight\n\n{body}"
+
+
+# Około 1000 znaków na dokument - do jednego żądania trafiają po cztery dokumenty
+RECORDS = [
+    {"filename": f"{i}.txt", "text": email(i % 28 + 1, f"Flight number {i} to the island. " + "Notes. " * 130)}
+    for i in range(30)
+]
+# Powtórzony dokument jest tłumaczony raz
+RECORDS.append(RECORDS[0])
+
+
+class FakeTranslator:
+    """Tłumaczy słowo "Flight" na "Lot"; wybrane fragmenty kończą się błędem."""
+
+    def __init__(self, failing=(), delay=0.0):
+        self.failing = set(failing)
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, text):
+        with self.lock:
+            self.calls.append(text)
+        time.sleep(self.delay)
+        if any(marker in text for marker in self.failing):
+            raise ConnectionError("usługa niedostępna")
+        return text.replace("Flight", "Lot")
+
+
+def test_translates_and_resumes(tmp_path):
+    """Drugi przebieg tłumaczy tylko dokumenty, których zabrakło w pierwszym (błędy, limit)."""
+    corpus = Corpus.from_records(RECORDS)
+    translator = FakeTranslator(failing={"number 7 "})
+
+    first = pretranslate(
+        corpus, tmp_path, translate=translator, workers=3, rate=None, checkpoint_every=8, limit=20, retry_delay=0
+    )
+    # Dokumenty są pakowane po kilka w żądanie - błąd żądania obejmuje całą porcję
+    assert first.failed > 0 and first.translated + first.failed == 20
+    assert first.parts == len(TranslationStore(tmp_path).parts()) >= 1
+    # Błąd jest ponawiany - trzy próby żądania
+    assert sum("number 7 " in call for call in translator.calls) == 3
+
+    translator = FakeTranslator()
+    second = pretranslate(corpus, tmp_path, translate=translator, workers=3, rate=None, retry_delay=0)
+    assert (second.translated, second.failed, second.skipped) == (10 + first.failed, 0, 21 - first.failed)
+    assert len(translator.calls) < second.translated
+    assert pretranslate(corpus, tmp_path, translate=translator).translated == 0
+
+    translations = attach_translations(corpus, tmp_path)
+    assert len(translations) == len(RECORDS)
+    assert all(translations[i] == RECORDS[i]["text"].replace("Flight", "Lot") for i in range(len(RECORDS)))
+
+
+def test_interrupted_run_keeps_finished_documents(tmp_path):
+    """Po przerwaniu zadania zapisane są dokumenty przetłumaczone do tej chwili."""
+    corpus = Corpus.from_records(RECORDS)
+
+    def translate_or_interrupt(text):
+        if "number 12 " in text:
+            raise KeyboardInterrupt
+        return text.replace("Flight", "Lot")
+
+    with pytest.raises(KeyboardInterrupt):
+        pretranslate(corpus, tmp_path, translate=translate_or_interrupt, workers=1, rate=None, checkpoint_every=100)
+
+    saved = len(TranslationStore(tmp_path).hashes())
+    assert 0 < saved < len(RECORDS)
+    report = pretranslate(corpus, tmp_path, translate=FakeTranslator(), rate=None)
+    assert report.translated == len(RECORDS) - 1 - saved
+
+
+def test_missing_translations_are_empty(tmp_path):
+    corpus = Corpus.from_records(RECORDS)
+    pretranslate(corpus, tmp_path, translate=FakeTranslator(), rate=None, limit=5)
+    other = Corpus.from_records(RECORDS[:3] + [{"filename": "new.txt", "text": "Flight log"}])
+
+    translations = attach_translations(other, tmp_path)
+
+    assert translations[0] == RECORDS[0]["text"].replace("Flight", "Lot")
+    assert translations[3] == ""
+    assert get_translations(Corpus.from_records(RECORDS)) is None
+    assert attach_translations(Corpus.from_records(RECORDS), tmp_path / "missing")[0] == ""
+
+
+def test_polish_search_shares_header_indexes(tmp_path):
+    """Wyszukiwanie w tłumaczeniach: te same id dokumentów, fasety i daty z oryginału."""
+    corpus = Corpus.from_records(RECORDS)
+    pretranslate(corpus, tmp_path, translate=FakeTranslator(), rate=None)
+    assert translated_corpus(corpus) is None
+    attach_translations(corpus, tmp_path)
+
+    polish = translated_corpus(corpus)
+
+    assert get_header_indexes(polish) is get_header_indexes(corpus)
+    assert translated_corpus(corpus) is polish
+    result = search(polish, "lot", facets=True, sort="date_asc")
+    assert result.total == len(RECORDS)
+    assert result.facets["sender"] == {"a@x.com": len(RECORDS)}
+    assert [hit.doc_id for hit in result.hits] == get_date_index(corpus).sort(range(len(RECORDS))).tolist()
+    assert search(corpus, "lot").total == 0
+
+
+def test_translate_batch_packs_short_documents():
+    """Długi dokument idzie fragmentami, krótkie są pakowane; odstępy zostają na miejscu."""
+    translator = FakeTranslator()
+    texts = ["Flight one. " * 800, "  Flight two\n", "   ", "Flight three"]
+
+    translated = translate_batch(texts, translator)
+
+    assert translated == [text.replace("Flight", "Lot") for text in texts]
+    assert len(translator.calls) == 3
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(rate=50, burst=2)
+    start = time.monotonic()
+    for _ in range(7):
+        limiter.acquire()
+    # Dwa żądania od razu, pozostałe pięć co 20 ms
+    assert 0.08 <= time.monotonic() - start < 0.5
+    with pytest.raises(ValueError):
+        RateLimiter(rate=0)
@@ -0,0 +1,107 @@
+"""
+Testy wyszukiwania wyrażeniami regularnymi (analiza wzorca, indeks trigramów, budżet czasu).
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import regex  # noqa: E402
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.protocol import Request  # noqa: E402
+from search_engine.regex import TrigramIndex, compile_pattern, required_trigrams  # noqa: E402
+from search_engine.server import SearchServer  # noqa: E402
+
+TEXTS = [
+    "From: Jeffrey Epstein\nCall me at 212-555-0100 tomorrow.",
+    "Jeff  Epstein flew to the island. Phone: 555-0199",
+    "JEFFREY EPSTEIN deposition transcript",
+    "Ghislaine Maxwell, no phone number here.",
+    "Kelvin sign: King and the straße in München",
+    "",
+]
+
+
+@pytest.fixture
+def corpus():
+    return Corpus.from_records([{"filename": f"{i}.txt", "text": text} for i, text in enumerate(TEXTS)])
+
+
+def test_required_trigrams():
+    """Stałe fragmenty wzorca dają wymagane trigramy, fragmenty opcjonalne - nie."""
+    assert required_trigrams(r"Jeff(rey)?\s+E", re.IGNORECASE) == [frozenset(["jef"]), frozenset(["eff"])]
+    assert required_trigrams(r"\b\d{3}-\d{4}\b") == []
+    assert frozenset(["abc"]) in required_trigrams("(ab){2}c")
+    # Alternatywa: w każdej klauzuli po trigramie z obu gałęzi
+    assert all(len(clause) == 2 for clause in required_trigrams("maxwell|epstein"))
+    assert required_trigrams("a.*b") == []
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [r"Jeff(rey)?\s+E", r"\d{3}-\d{4}", "epstein|maxwell", "[Jj]effrey", "(?-i:EPSTEIN)", "king", "STRASSE|straße", ""],
+)
+def test_candidates_are_superset_of_matches(pattern):
+    """Filtr trigramów nigdy nie odrzuca pasującego dokumentu (także przy IGNORECASE i znakach spoza ASCII)."""
+    index = TrigramIndex.build(TEXTS)
+    compiled = re.compile(pattern, re.IGNORECASE)
+    candidates = index.candidates(required_trigrams(pattern, re.IGNORECASE))
+    expected = {i for i, text in enumerate(TEXTS) if compiled.search(text)}
+
+    assert expected <= (set(range(len(TEXTS))) if candidates is None else set(candidates.tolist()))
+
+
+def test_regex_search(corpus):
+    """Tryb "regex": dopasowania, liczba wystąpień, fragmenty do podświetlania i wielkość liter."""
+    result = search(corpus, r"Jeff(rey)?\s+Epstein", mode="regex")
+
+    assert sorted(hit.doc_id for hit in result.hits) == [0, 1, 2]
+    assert not result.truncated
+    assert "Jeffrey Epstein" in result.terms and "JEFFREY EPSTEIN" in result.terms
+
+    case_sensitive = search(corpus, r"Jeff(rey)?\s+Epstein", mode="regex", case_sensitive=True)
+    assert [hit.doc_id for hit in case_sensitive.hits] == [0, 1]
+    phones = search(corpus, r"\b\d{3}-\d{4}\b", mode="regex")
+    assert sorted(hit.doc_id for hit in phones.hits) == [0, 1]
+    assert search(corpus, "qzx+", mode="regex").total == 0
+
+
+def test_invalid_patterns_are_rejected(corpus):
+    """Niepoprawna składnia i zagnieżdżone powtórzenia kończą się ValueError."""
+    with pytest.raises(ValueError):
+        compile_pattern("Jeff(rey")
+    with pytest.raises(ValueError):
+        compile_pattern("(a+)+$")
+    with pytest.raises(ValueError):
+        search(corpus, "x" * 1000, mode="regex")
+
+
+def test_time_budget_truncates_result(corpus, monkeypatch):
+    """Po przekroczeniu budżetu czasu wynik jest niepełny i oznaczony jako `truncated`."""
+    monkeypatch.setattr(regex, "DEFAULT_TIME_BUDGET", -1.0)
+    result = search(corpus, "e", mode="regex")
+
+    assert result.truncated
+    assert result.total == 1
+    assert result.to_dict()["truncated"] is True
+
+
+def test_server_regex_mode(corpus):
+    """Tryb regex w /search; błędny wzorzec to 400, a nie błąd serwera."""
+    server = SearchServer(corpus, executor=None)
+
+    def get(**query):
+        return asyncio.run(server.dispatch(Request(method="GET", path="/search", query=query)))
+
+    status, payload = get(q=r"\d{3}-\d{4}", mode="regex")
+    assert status == 200
+    assert payload["total"] == 2 and payload["truncated"] is False
+    assert get(q="Jeff(rey", mode="regex")[0] == 400
+    server.executor.shutdown()
@@ -0,0 +1,90 @@
+"""
+Testy silnika wyszukiwania (bez Streamlit).
+
+Uruchom: pytest tests/ -v
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus, extract_metadata, get_docs, search  # noqa: E402
+from search_engine.cli import main  # noqa: E402
+
+DOCUMENTS = [
+    {"filename": "notes.txt", "text": "Flight log mentions Epstein twice: Epstein."},
+    {
+        "filename": "mail.txt",
+        "text": "From: jeffrey@example.com\nTo: ghislaine@example.com\nSubject: Travel\n\nepstein",
+    },
+    {"filename": "other.txt", "text": "Nothing relevant in this document at all."},
+    {"filename": "empty.txt", "text": None},
+]
+
+
+@pytest.fixture
+def corpus():
+    return Corpus.from_records(DOCUMENTS, name="test")
+
+
+def test_search_counts_and_orders_by_content_type(corpus):
+    """Test wyszukiwania: liczba trafień, maile na początku, liczba wystąpień."""
+    result = search(corpus, "Epstein")
+
+    assert result.total == 2
+    assert [hit.doc_id for hit in result.hits] == [1, 0]
+    assert result.hits[0].content_type == "email"
+    assert result.hits[1].occurrences == 2
+
+
+def test_search_case_sensitive_and_limit(corpus):
+    """Test rozróżniania wielkości liter i limitu wyników."""
+    assert search(corpus, "epstein", case_sensitive=True).total == 1
+
+    limited = search(corpus, "epstein", limit=1)
+    assert limited.total == 2
+    assert len(limited.hits) == 1
+
+    assert search(corpus, "   ").total == 0
+
+
+def test_get_docs_and_metadata(corpus):
+    """Test pobierania dokumentów i metadanych."""
+    docs = get_docs(corpus, [1, 3])
+    assert docs[0]["filename"] == "mail.txt"
+    assert docs[1]["text"] == ""
+
+    metadata = extract_metadata(corpus, [1])[0]
+    assert metadata["from"] == "jeffrey@example.com"
+    assert metadata["subject"] == "Travel"
+
+
+def test_missing_columns():
+    """Test walidacji wymaganych kolumn."""
+    import pandas as pd
+
+    with pytest.raises(ValueError):
+        Corpus(pd.DataFrame({"text": ["a"]}))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cli_writes_jsonl(tmp_path, workers):
+    """Test wsadowego CLI: zapytania z pliku, wyniki w JSONL w tej samej kolejności."""
+    corpus_path = tmp_path / "corpus.jsonl"
+    corpus_path.write_text("\n".join(json.dumps(doc) for doc in DOCUMENTS[:3]), encoding="utf-8")
+    queries_path = tmp_path / "queries.txt"
+    queries_path.write_text("epstein\n\nnothing\nmissing\n", encoding="utf-8")
+    output_path = tmp_path / "out.jsonl"
+
+    exit_code = main(
+        [str(queries_path), "-o", str(output_path), "--source", str(corpus_path), "--workers", str(workers)]
+    )
+
+    records = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+    assert exit_code == 0
+    assert [record["query"] for record in records] == ["epstein", "nothing", "missing"]
+    assert [record["total"] for record in records] == [2, 1, 0]
@@ -0,0 +1,123 @@
+"""
+Testy wyszukiwania semantycznego (TF-IDF + SVD + IVF).
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import semantic  # noqa: E402
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.protocol import Request  # noqa: E402
+from search_engine.semantic import (  # noqa: E402
+    SemanticIndex,
+    get_semantic_index,
+    semantic_match,
+    similar_documents,
+)
+from search_engine.server import SearchServer  # noqa: E402
+from search_engine.vocabulary import Vocabulary  # noqa: E402
+
+TOPICS = {
+    "aviation": "pilot flight plane runway hangar fuel aircraft airport landing cockpit".split(),
+    "legal": "court judge lawyer deposition subpoena motion trial attorney verdict filing".split(),
+    "finance": "bank wire transfer account payment invoice deposit balance funds ledger".split(),
+}
+
+
+def topic_records(count=90, seed=7):
+    rng = random.Random(seed)
+    records = []
+    for doc_id in range(count):
+        topic = list(TOPICS)[doc_id % len(TOPICS)]
+        words = rng.sample(TOPICS[topic], 5) + ["please", "confirm", "tomorrow"]
+        rng.shuffle(words)
+        records.append({"filename": f"{topic}_{doc_id}.txt", "text": "Note: " + " ".join(words) + "."})
+    return records
+
+
+@pytest.fixture
+def corpus():
+    corpus = Corpus.from_records(topic_records())
+    # Trzy wymiary na trzy tematy - w pełnym wymiarze SVD nie łączyłoby słów w tematy
+    corpus.get_index("semantic", lambda corpus: SemanticIndex.build(Vocabulary.build(corpus.texts), 90, dimensions=3))
+    return corpus
+
+
+def test_semantic_search_finds_topic_without_query_word(corpus):
+    """Zapytanie trafia w dokumenty tego samego tematu, także te bez słowa z zapytania."""
+    result = search(corpus, "aircraft", mode="semantic", limit=30)
+
+    assert result.total > 0
+    assert result.terms == ["aircraft"]
+    assert all(hit.filename.startswith("aviation_") for hit in result.hits)
+    texts = [corpus.texts.iat[hit.doc_id] for hit in result.hits]
+    assert any("aircraft" not in text for text in texts)
+    assert search(corpus, "zzzz unknown", mode="semantic").total == 0
+
+
+def test_semantic_hits_follow_similarity_order():
+    """Domyślne sortowanie "type" nie przestawia wyników semantycznych - maile nie idą na początek."""
+    records = topic_records()
+    for doc_id in range(0, len(records), 2):
+        records[doc_id]["text"] = "From: a@x.com\nTo: b@y.com\nSubject: Note\n\n" + records[doc_id]["text"]
+    corpus = Corpus.from_records(records)
+    corpus.get_index("semantic", lambda corpus: SemanticIndex.build(Vocabulary.build(corpus.texts), 90, dimensions=3))
+
+    result = search(corpus, "aircraft runway", mode="semantic", limit=20)
+    ranking, _ = semantic_match(corpus, "aircraft runway")
+
+    assert {hit.content_type for hit in result.hits} == {"email", "other"}
+    assert [hit.doc_id for hit in result.hits] == ranking[:20].tolist()
+
+
+def test_similar_documents(corpus):
+    """Tryb "więcej takich": dokumenty tego samego tematu, malejąco po podobieństwie, bez samego dokumentu."""
+    similar = similar_documents(corpus, 1, limit=10)
+
+    assert len(similar) == 10
+    assert 1 not in [doc_id for doc_id, _ in similar]
+    assert all(corpus.filenames.iat[doc_id].startswith("legal_") for doc_id, _ in similar)
+    scores = [score for _, score in similar]
+    assert scores == sorted(scores, reverse=True) and scores[0] <= 1.0001
+
+
+def test_ivf_probing_all_lists_matches_exact_search(monkeypatch):
+    """Przy przeszukaniu wszystkich list IVF wynik jest taki sam jak przy porównaniu z każdym dokumentem."""
+    monkeypatch.setattr(semantic, "MIN_IVF_DOCUMENTS", 100)
+    records = topic_records(count=600, seed=3)
+    index = SemanticIndex.build(Vocabulary.build(record["text"] for record in records), len(records), dimensions=8)
+
+    assert index.list_count == int(np.sqrt(600))
+    assert sorted(index.doc_ids.tolist()) == list(range(600))
+    vector = index.embed("runway cockpit")
+    doc_ids, scores = index.nearest(vector, 20, probes=index.list_count)
+    exact = np.argsort(-(index.vectors @ vector), kind="stable")[:20]
+    np.testing.assert_allclose(scores, (index.vectors @ vector)[exact], rtol=1e-5)
+    assert set(doc_ids.tolist()) <= {i for i, record in enumerate(records) if record["filename"].startswith("aviation")}
+
+
+def test_server_similar_and_semantic_mode(corpus):
+    """Endpoint /similar/<id> i tryb semantic w /search."""
+    server = SearchServer(corpus, executor=None)
+
+    def get(path, **query):
+        return asyncio.run(server.dispatch(Request(method="GET", path=path, query=query)))
+
+    status, payload = get("/similar/2", limit="3")
+    assert status == 200
+    assert payload["doc_id"] == 2
+    assert len(payload["similar"]) == 3
+    assert all(item["filename"].startswith("finance_") for item in payload["similar"])
+    assert get("/similar/999")[0] == 404
+    assert get("/search", q="wire funds", mode="semantic")[1]["total"] > 0
+    assert get_semantic_index(corpus) is get_semantic_index(corpus)
+    server.executor.shutdown()
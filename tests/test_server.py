@@ -0,0 +1,144 @@
+"""
+Testy serwera JSON API i testu obciążeniowego.
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus  # noqa: E402
+from search_engine.loadtest import percentile, run_load_test  # noqa: E402
+from search_engine.protocol import fetch_json  # noqa: E402
+from search_engine.server import SearchServer, prepare_corpus  # noqa: E402
+
+
+@pytest.fixture
+def corpus():
+    return Corpus.from_records(
+        [
+            {"filename": "a.txt", "text": "From: jeffrey@example.com\nSubject: Island trip\n\nEpstein flight log"},
+            {"filename": "b.txt", "text": "Court filing about Maxwell."},
+        ],
+        name="test",
+    )
+
+
+def run_with_server(corpus, scenario):
+    """Uruchamia serwer na wolnym porcie i wykonuje na nim scenariusz testowy."""
+
+    async def _run():
+        server = SearchServer(corpus, port=0)
+        await server.start()
+        try:
+            return await scenario(server.port)
+        finally:
+            await server.close()
+
+    return asyncio.run(_run())
+
+
+def test_search_docs_and_metadata(corpus):
+    """Test endpointów wyszukiwania, dokumentów i metadanych."""
+
+    async def scenario(port):
+        search = await fetch_json("127.0.0.1", port, "GET", "/search?q=epstein")
+        doc = await fetch_json("127.0.0.1", port, "GET", "/docs/1")
+        metadata = await fetch_json("127.0.0.1", port, "GET", "/metadata/0")
+        missing = await fetch_json("127.0.0.1", port, "GET", "/docs/99")
+        no_query = await fetch_json("127.0.0.1", port, "GET", "/search")
+        wrong_method = await fetch_json("127.0.0.1", port, "POST", "/search", {})
+        return search, doc, metadata, missing, no_query, wrong_method
+
+    search, doc, metadata, missing, no_query, wrong_method = run_with_server(corpus, scenario)
+
+    assert search[0] == 200
+    assert search[1]["total"] == 1
+    assert search[1]["hits"][0]["filename"] == "a.txt"
+    assert doc[1]["filename"] == "b.txt"
+    assert metadata[1]["subject"] == "Island trip"
+    assert missing[0] == 404
+    assert no_query[0] == 400
+    assert wrong_method[0] == 405
+
+
+def test_translate_endpoint(corpus, monkeypatch):
+    """Test endpointu tłumaczenia (tłumacz zastąpiony atrapą)."""
+    import translation_utils
+
+    monkeypatch.setattr(translation_utils, "translate_text", lambda text, translator=None: f"PL:{text}")
+    monkeypatch.setattr(translation_utils, "translate_texts", lambda texts: [f"PL:{text}" for text in texts])
+
+    async def scenario(port):
+        ok = await fetch_json("127.0.0.1", port, "POST", "/translate", {"text": "Hello"})
+        bad = await fetch_json("127.0.0.1", port, "POST", "/translate", {"text": "Hello", "direction": "xx"})
+        batch = await fetch_json("127.0.0.1", port, "POST", "/translate", {"texts": ["Hi", "Bye"]})
+        bad_batch = await fetch_json("127.0.0.1", port, "POST", "/translate", {"texts": "Hi"})
+        return ok, bad, batch, bad_batch
+
+    ok, bad, batch, bad_batch = run_with_server(corpus, scenario)
+    assert ok == (200, {"text": "Hello", "translated": "PL:Hello", "direction": "en-pl"})
+    assert bad[0] == 400
+    assert batch == (200, {"texts": ["Hi", "Bye"], "translated": ["PL:Hi", "PL:Bye"], "direction": "en-pl"})
+    assert bad_batch[0] == 400
+
+
+def test_prepare_corpus_builds_lazy_indexes(corpus):
+    """Indeksy nagłówków (daty, wątki, encje) i podpowiedzi są gotowe przed pierwszym zapytaniem."""
+    prepare_corpus(corpus)
+
+    assert {"headers", "autocomplete", "vocabulary"} <= set(corpus._indexes)
+
+
+def test_lazy_index_builds_off_event_loop(corpus, monkeypatch):
+    """Korpus bez przygotowania buduje indeksy dat i podpowiedzi w puli wątków, nie w pętli zdarzeń."""
+    from search_engine import autocomplete, headers
+
+    threads = []
+
+    def recording(build):
+        def _build(*args):
+            threads.append(threading.current_thread())
+            return build(*args)
+
+        return _build
+
+    monkeypatch.setattr(headers, "build_header_indexes", recording(headers.build_header_indexes))
+    monkeypatch.setattr(autocomplete.CompletionIndex, "build", recording(autocomplete.CompletionIndex.build))
+
+    async def scenario(port):
+        search = await fetch_json("127.0.0.1", port, "GET", "/search?q=court&sort=date_desc")
+        completions = await fetch_json("127.0.0.1", port, "GET", "/complete?q=isl")
+        return search, completions
+
+    search, completions = run_with_server(corpus, scenario)
+
+    assert search[0] == completions[0] == 200
+    assert search[1]["hits"][0]["date"] is None
+    assert completions[1]["completions"][0]["text"] == "island"
+    assert len(threads) == 2 and threading.main_thread() not in threads
+
+
+def test_load_test_report(corpus):
+    """Test raportu obciążeniowego przy wielu równoczesnych klientach."""
+    report = run_with_server(
+        corpus, lambda port: run_load_test("127.0.0.1", port, ["epstein", "court"], clients=50, requests_per_client=3)
+    )
+
+    assert report["requests"] == 150
+    assert report["errors"] == 0
+    assert 0 < report["p50_ms"] <= report["p95_ms"] <= report["p99_ms"]
+
+
+def test_percentile():
+    """Test percentyla metodą najbliższej rangi."""
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 95) == 0.0
@@ -0,0 +1,132 @@
+"""
+Testy łączenia identycznych żądań tłumaczenia wykonywanych w tym samym czasie.
+
+Uruchom: pytest tests/ -v
+"""
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import instrumentation  # noqa: E402
+import translation_utils  # noqa: E402
+from translation_utils import SingleFlight  # noqa: E402
+
+CALLERS = 8
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+class SlowTranslator:
+    """Atrapa GoogleTranslator: każde żądanie trwa 0,2 s i jest liczone."""
+
+    calls = []
+    lock = threading.Lock()
+
+    def __init__(self, source, target):
+        self.target = target
+
+    def translate(self, text):
+        with self.lock:
+            self.calls.append((self.target, text))
+        time.sleep(0.2)
+        return f"[{self.target}] {text}"
+
+
+@pytest.fixture
+def translator(monkeypatch):
+    SlowTranslator.calls = []
+    monkeypatch.setitem(sys.modules, "deep_translator", types.SimpleNamespace(GoogleTranslator=SlowTranslator))
+    monkeypatch.setattr(translation_utils, "_TRANSLATION_CACHE", {})
+    monkeypatch.setattr(translation_utils, "_THREAD_TRANSLATORS", threading.local())
+    return SlowTranslator
+
+
+def run_concurrently(function, *args):
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        return list(executor.map(lambda _: function(*args), range(CALLERS)))
+
+
+def coalesced(kind):
+    return instrumentation.snapshot()["counters"].get(f"translation.coalesced.{kind}", 0)
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return "wynik"
+
+    assert run_concurrently(flight.do, ("text", "a"), compute) == ["wynik"] * CALLERS
+    assert len(calls) == 1
+    assert coalesced("text") == CALLERS - 1
+    assert len(flight) == 0
+    # Zakończone wywołanie nie jest pamiętane - kolejne wykonuje żądanie od nowa
+    flight.do(("text", "a"), compute)
+    assert len(calls) == 2
+
+
+def test_error_is_shared_and_not_remembered():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise ConnectionError("usługa niedostępna")
+
+    def call():
+        try:
+            return flight.do(("chunk", "a"), fail)
+        except ConnectionError as e:
+            return str(e)
+
+    assert run_concurrently(call) == ["usługa niedostępna"] * CALLERS
+    assert flight.do(("chunk", "a"), lambda: "ok") == "ok"
+
+
+def test_translate_text_single_flight(translator):
+    """Kilka sesji tłumaczy naraz ten sam dokument - do usługi trafia jedno żądanie."""
+    results = run_concurrently(translation_utils.translate_text, "Popular email")
+
+    assert results == ["[pl] Popular email"] * CALLERS
+    assert len(translator.calls) == 1
+    assert coalesced("text") == CALLERS - 1
+
+
+def test_query_and_chunk_single_flight(translator):
+    assert (
+        run_concurrently(translation_utils.translate_query_to_english, "żółty samolot")
+        == ["[en] żółty samolot"] * CALLERS
+    )
+    assert run_concurrently(translation_utils.translate_chunk, "Chunk text") == ["[pl] Chunk text"] * CALLERS
+    assert translator.calls == [("en", "żółty samolot"), ("pl", "Chunk text")]
+    assert coalesced("query") == coalesced("chunk") == CALLERS - 1
+
+
+def test_language_pair_is_part_of_key(translator):
+    def both(index):
+        if index % 2:
+            return translation_utils.translate_chunk("Tekst", source="pl", target="en")
+        return translation_utils.translate_chunk("Tekst")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(both, range(4)))
+
+    assert sorted(set(results)) == ["[en] Tekst", "[pl] Tekst"]
+    assert len(translator.calls) == 2
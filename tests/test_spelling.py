@@ -0,0 +1,77 @@
+"""
+Testy podpowiedzi "Czy chodziło o..." dla zapytań bez wyników.
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.protocol import Request  # noqa: E402
+from search_engine.server import SearchServer  # noqa: E402
+from search_engine.spelling import suggest_corrections  # noqa: E402
+
+TEXTS = [
+    "Jeffrey Epstein flew to the island with Ghislaine Maxwell.",
+    "Epstein deposition, CONFIDENTIAL.",
+    "Maxwell flight log, island visit.",
+    "Epstein and Maxwell on the flight manifest.",
+    "OCR copy: Maxwel1 flight manifest.",
+    "Weather report for the island.",
+]
+
+
+@pytest.fixture
+def corpus():
+    return Corpus.from_records([{"filename": f"{i}.txt", "text": text} for i, text in enumerate(TEXTS)])
+
+
+def test_suggests_frequent_term_with_case(corpus):
+    """Literówka poprawiana na term ze słownika z zachowaniem wielkości liter i liczbą trafień."""
+    assert suggest_corrections(corpus, "Epstien")[0] == {"query": "Epstein", "hits": 3, "distance": 1}
+    assert suggest_corrections(corpus, "CONFIDENTAIL")[0]["query"] == "CONFIDENTIAL"
+
+
+def test_multiword_suggestions_are_ranked_by_hits():
+    """Kombinacje poprawek są oceniane łącznymi trafieniami; częsty term wygrywa z rzadkim wariantem OCR."""
+    texts = [f"Maxwell flight log {i}" for i in range(20)] + ["OCR copy: Maxwel1 flight log"]
+    corpus = Corpus.from_records([{"filename": f"{i}.txt", "text": text} for i, text in enumerate(texts)])
+    suggestions = suggest_corrections(corpus, "Maxwel1 flihgt")
+
+    assert suggestions[0] == {"query": "Maxwell flight", "hits": 20, "distance": 2}
+    assert {"query": "Maxwel1 flight", "hits": 1, "distance": 1} in suggestions
+    # Kombinacje bez wspólnego dokumentu nie są podpowiadane
+    assert all(suggestion["hits"] > 0 for suggestion in suggestions)
+
+
+def test_no_suggestion_for_unknown_words(corpus):
+    assert suggest_corrections(corpus, "qzxjv") == []
+    assert suggest_corrections(corpus, "") == []
+    # Zapytanie ze słowami z korpusu nie wymaga poprawek
+    assert suggest_corrections(corpus, "Epstein") == []
+
+
+def test_search_suggests_only_without_matches(corpus):
+    """Podpowiedzi liczone tylko na żądanie i tylko gdy samo zapytanie nic nie znalazło."""
+    result = search(corpus, "Epstien", suggest=True)
+    assert result.total == 0
+    assert result.to_dict()["suggestions"][0]["query"] == "Epstein"
+
+    assert search(corpus, "Epstien").suggestions == []
+    assert search(corpus, "Epstein", suggest=True).suggestions == []
+
+
+def test_server_returns_suggestions(corpus):
+    server = SearchServer(corpus, executor=None)
+    status, payload = asyncio.run(server.dispatch(Request(method="GET", path="/search", query={"q": "islnd"})))
+
+    assert status == 200
+    assert payload["total"] == 0
+    assert payload["suggestions"][0]["query"] == "island"
+    server.executor.shutdown()
@@ -0,0 +1,101 @@
+"""
+Testy rekonstrukcji wątków mailowych.
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_engine import Corpus  # noqa: E402
+from search_engine.protocol import Request  # noqa: E402
+from search_engine.server import SearchServer  # noqa: E402
+from search_engine.threads import (  # noqa: E402
+    get_thread_index,
+    normalize_subject,
+    quoted_keys,
+    split_message,
+    text_key,
+)
+
+BODY = "Please confirm the flight schedule for next week and send the final manifest to the office."
+
+
+def email(sender, recipient, date, subject, body):
+    return f"From: {sender}\nTo: {recipient}\nDate: {date}\nSubject: {subject}\n\n{body}"
+
+
+@pytest.fixture
+def corpus():
+    return Corpus.from_records(
+        [
+            {
+                "filename": "reply.txt",
+                "text": email("gm@aol.com", "je@gmail.com", "Tue, 03 Mar 2009 10:00:00", "RE: Flight", "Confirmed."),
+            },
+            {
+                "filename": "original.txt",
+                "text": email("je@gmail.com", "gm@aol.com", "Mon, 02 Mar 2009 09:00:00", "Flight", BODY),
+            },
+            {
+                "filename": "forward.txt",
+                "text": email(
+                    "staff@office.com",
+                    "pilot@air.com",
+                    "Wed, 04 Mar 2009 08:00:00",
+                    "Manifest",
+                    "See below.\n\n-----Original Message-----\nFrom: je@gmail.com\nSent: Monday\n\n" + BODY,
+                ),
+            },
+            {
+                "filename": "other_people.txt",
+                "text": email("a@b.com", "c@d.com", "Tue, 03 Mar 2009 10:00:00", "Fw: Flight", "Different trip."),
+            },
+            {
+                "filename": "years_later.txt",
+                "text": email("je@gmail.com", "gm@aol.com", "Mon, 01 Mar 2011 09:00:00", "Re: Flight", "New season."),
+            },
+            {"filename": "note.txt", "text": "Court filing without any headers."},
+        ]
+    )
+
+
+def test_subject_and_quote_parsing():
+    """Przedrostki odpowiedzi są usuwane, a cytowane wiadomości rozpoznawane."""
+    assert normalize_subject("RE: Fw: FWD[2]: Flight  Plans") == "flight plans"
+    assert normalize_subject("Re: (no subject)") == ""
+
+    own, quoted = split_message("From: a@b.com\nSubject: x\n\nThanks!\n\nOn Monday John wrote:\n> " + BODY)
+    assert own.strip() == "Thanks!"
+    assert quoted_keys(quoted) == [text_key(BODY)]
+    assert text_key("Too short to link.") is None
+
+
+def test_threads_link_replies_and_quotes(corpus):
+    """Odpowiedź (temat + uczestnik) i przekazanie (cytat) trafiają do wątku oryginału."""
+    threads = get_thread_index(corpus)
+
+    assert threads.members(0).tolist() == [1, 0, 2]
+    assert threads.members(2).tolist() == [1, 0, 2]
+    assert threads.thread_id(1) == 0 and threads.size(1) == 3
+    # Ten sam temat, ale inni uczestnicy albo dwa lata później - osobne wątki
+    assert threads.size(3) == 1 and threads.size(4) == 1
+    assert threads.members(5).tolist() == [5]
+    assert threads.thread_count == 4
+
+
+def test_server_thread_endpoint(corpus):
+    """Endpoint /threads/<id> zwraca członków wątku z metadanymi."""
+    server = SearchServer(corpus, executor=None)
+    status, payload = asyncio.run(server.dispatch(Request(method="GET", path="/threads/2", query={})))
+    server.executor.shutdown()
+
+    assert status == 200
+    assert payload["thread_id"] == 0
+    assert [member["filename"] for member in payload["members"]] == ["original.txt", "reply.txt", "forward.txt"]
+    assert payload["members"][1]["subject"] == "RE: Flight"
@@ -0,0 +1,86 @@
+"""
+Testy tłumaczenia strumieniowego: fragmenty oddawane po kolei, zaraz po odpowiedzi usługi.
+
+Uruchom: pytest tests/ -v
+"""
+import sys
+import threading
+import types
+from pathlib import Path
+
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import translation_utils  # noqa: E402
+from translation_utils import CircuitBreaker, split_text_into_chunks, translate_text_stream  # noqa: E402
+
+PARAGRAPH = "Flight log entry. " * 100
+LONG_TEXT = "\n\n".join([PARAGRAPH] * 8) + "\n"
+
+
+class FakeTranslator:
+    """Atrapa GoogleTranslator: tłumaczy słowo "Flight"; tekst z "FAIL" kończy się błędem."""
+
+    requests = []
+
+    def __init__(self, source, target):
+        pass
+
+    def translate(self, text):
+        self.requests.append(text)
+        if "FAIL" in text:
+            raise ValueError("nieprawidłowy tekst")
+        return text.replace("Flight", "Lot")
+
+
+@pytest.fixture(autouse=True)
+def translator(monkeypatch):
+    FakeTranslator.requests = []
+    monkeypatch.setitem(sys.modules, "deep_translator", types.SimpleNamespace(GoogleTranslator=FakeTranslator))
+    monkeypatch.setattr(translation_utils, "_TRANSLATION_CACHE", {})
+    monkeypatch.setattr(translation_utils, "_THREAD_TRANSLATORS", threading.local())
+    monkeypatch.setattr(translation_utils, "_BREAKER", CircuitBreaker())
+    return FakeTranslator
+
+
+def test_chunks_arrive_one_request_at_a_time(translator):
+    stream = translate_text_stream(LONG_TEXT)
+
+    first = next(stream)
+    # Pierwszy fragment jest gotowy po jednym żądaniu, zanim wysłane zostaną kolejne
+    assert len(translator.requests) == 1
+    assert first.index == 0 and first.count == len(split_text_into_chunks(LONG_TEXT)) > 2
+    chunks = [first, *stream]
+
+    assert [chunk.index for chunk in chunks] == list(range(first.count))
+    assert all(chunk.translated for chunk in chunks)
+    # Odstępy między akapitami zostają na miejscu
+    assert "".join(chunk.text for chunk in chunks) == LONG_TEXT.replace("Flight", "Lot")
+    assert len(translator.requests) == first.count
+
+
+def test_full_translation_is_cached(translator):
+    list(translate_text_stream(LONG_TEXT))
+    requests = len(translator.requests)
+
+    assert list(translate_text_stream(LONG_TEXT)) == [(0, 1, LONG_TEXT.replace("Flight", "Lot"), True)]
+    assert translation_utils.translate_text(LONG_TEXT) == LONG_TEXT.replace("Flight", "Lot")
+    assert len(translator.requests) == requests
+
+
+def test_failed_chunk_keeps_original(translator):
+    text = PARAGRAPH + "\n\n" + "FAIL " + PARAGRAPH + "\n\n" + PARAGRAPH
+
+    chunks = list(translate_text_stream(text, max_length=len(PARAGRAPH) + 10))
+
+    assert [chunk.translated for chunk in chunks] == [True, False, True]
+    assert chunks[1].text == "FAIL " + PARAGRAPH + "\n\n"
+    assert "".join(chunk.text for chunk in chunks).count("Lot") == 2 * PARAGRAPH.count("Flight")
+    # Niepełne tłumaczenie nie trafia do cache - kolejna próba tłumaczy tekst od nowa
+    assert translation_utils._TRANSLATION_CACHE == {}
+
+
+def test_empty_text():
+    assert list(translate_text_stream("  \n")) == [(0, 1, "  \n", False)]
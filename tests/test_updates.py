@@ -0,0 +1,179 @@
+"""
+Testy przyrostowej aktualizacji korpusu: porównanie wersji zbioru i scalanie indeksów.
+
+Uruchom: pytest tests/ -v
+"""
+import asyncio
+import json
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Dodaj ścieżkę do modułów
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic_corpus import generate_records  # noqa: E402
+from search_engine import Corpus, search  # noqa: E402
+from search_engine.cooccurrence import get_cooccurrence_graph  # noqa: E402
+from search_engine.dedup import get_duplicate_index  # noqa: E402
+from search_engine.facets import FACET_FIELDS  # noqa: E402
+from search_engine.federation import CorpusRegistry  # noqa: E402
+from search_engine.fuzzy import get_deletion_index  # noqa: E402
+from search_engine.headers import get_header_indexes  # noqa: E402
+from search_engine.protocol import Request  # noqa: E402
+from search_engine.server import SearchServer  # noqa: E402
+from search_engine.updates import diff_corpora, source_revision, update_corpus, warm_indexes  # noqa: E402
+from search_engine.vocabulary import get_vocabulary  # noqa: E402
+
+
+def next_release(records, removed=10, changed=5, added=None, seed=1):
+    """Nowa wersja zbioru: część dokumentów usunięta, część zmieniona, nowe wstawione w losowe miejsca."""
+    rng = random.Random(seed)
+    result = list(records)
+    for position in sorted(rng.sample(range(len(result)), removed), reverse=True):
+        del result[position]
+    for position in rng.sample(range(len(result)), changed):
+        result[position] = {**result[position], "text": result[position]["text"] + " Epstein updated"}
+    for record in added or []:
+        result.insert(rng.randrange(len(result) + 1), record)
+    return result
+
+
+def build_indexes(corpus):
+    get_header_indexes(corpus)
+    get_duplicate_index(corpus)
+    get_deletion_index(corpus)
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    return str(path)
+
+
+RECORDS = list(generate_records(330))
+OLD, FRESH = RECORDS[:300], RECORDS[300:]
+
+
+def test_diff_counts():
+    """Zmieniony dokument to para usunięty + dodany, liczona osobno jako zmiana."""
+    new_records = next_release(OLD, added=FRESH)
+    changes = diff_corpora(Corpus.from_records(OLD), Corpus.from_records(new_records))
+
+    assert changes.to_dict() == {"documents": 320, "kept": 285, "added": 30, "changed": 5, "removed": 10}
+    assert len(changes.added) == 35
+    # Niezmienione dokumenty wskazują swoje id w starym korpusie
+    kept_texts = [new_records[doc_id]["text"] for doc_id in changes.kept]
+    assert kept_texts == [OLD[doc_id]["text"] for doc_id in changes.sources[changes.kept]]
+    assert len(changes.removed) == 15 and (changes.targets[changes.removed] == -1).all()
+    assert diff_corpora(Corpus.from_records(OLD), Corpus.from_records(OLD)).unchanged
+
+
+def test_incremental_indexes_match_full_build():
+    """Indeksy scalone przyrostowo dają te same wyniki co zbudowane od zera."""
+    old = Corpus.from_records(OLD)
+    build_indexes(old)
+    new_records = next_release(OLD, added=FRESH)
+    new, reference = Corpus.from_records(new_records), Corpus.from_records(new_records)
+
+    update_corpus(old, new)
+    assert {"headers", "duplicates", "vocabulary", "deletion_index"} <= set(new.built_indexes())
+    build_indexes(reference)
+
+    updated, expected = get_header_indexes(new), get_header_indexes(reference)
+    assert np.array_equal(updated.dates.order, expected.dates.order)
+    assert np.array_equal(updated.threads.thread_ids, expected.threads.thread_ids)
+    all_ids = np.arange(len(new))
+    for field in FACET_FIELDS:
+        facet, expected_facet = updated.facets.facets[field], expected.facets.facets[field]
+        counts = dict(zip(facet.values, facet.counts(all_ids)))
+        assert counts == dict(zip(expected_facet.values, expected_facet.counts(all_ids)))
+    assert sorted(map(str, updated.entities.top(limit=20))) == sorted(map(str, expected.entities.top(limit=20)))
+    assert np.array_equal(get_duplicate_index(new).cluster_ids, get_duplicate_index(reference).cluster_ids)
+
+    vocabulary, expected_vocabulary = get_vocabulary(new), get_vocabulary(reference)
+    assert sorted(vocabulary.terms) == sorted(expected_vocabulary.terms)
+    for term in expected_vocabulary.terms[:300]:
+        assert np.array_equal(vocabulary.postings(term), expected_vocabulary.postings(term))
+    assert get_deletion_index(new).lookup("epstien") == get_deletion_index(reference).lookup("epstien")
+
+    for query in ("epstein", "from:*", "flight AND island"):
+        result, expected_result = search(new, query, facets=True), search(reference, query, facets=True)
+        assert [hit.doc_id for hit in result.hits] == [hit.doc_id for hit in expected_result.hits]
+        assert result.facets == expected_result.facets
+
+
+def test_warm_rebuilds_remaining_indexes():
+    """Indeksy bez ścieżki przyrostowej są budowane w nowym korpusie osobno."""
+    old = Corpus.from_records(OLD)
+    get_header_indexes(old)
+    get_cooccurrence_graph(old)
+    new = Corpus.from_records(next_release(OLD))
+
+    update_corpus(old, new)
+    built = warm_indexes(new, old)
+
+    assert "headers" not in built and built
+    assert set(old.built_indexes()) <= set(new.built_indexes())
+    assert warm_indexes(new, old) == []
+
+
+def test_refresh_if_changed(tmp_path):
+    """Rejestr przeładowuje korpus tylko po zmianie rewizji źródła, domyślnie przyrostowo."""
+    path = tmp_path / "release.jsonl"
+    write_jsonl(path, OLD)
+    registry = CorpusRegistry(prepare=build_indexes)
+
+    entry = registry.load("release", str(path))
+    assert entry.revision == source_revision(str(path)) and entry.changes is None
+    assert registry.refresh_if_changed("release") is None
+
+    write_jsonl(path, next_release(OLD, added=FRESH))
+    refreshed = registry.refresh_if_changed("release")
+    assert refreshed.generation == 2 and refreshed.revision != entry.revision
+    assert refreshed.changes["added"] == 30 and refreshed.changes["removed"] == 10
+    assert registry.refresh_if_changed("release") is None
+
+    assert registry.refresh("release", incremental=False).changes is None
+    registry.close()
+
+
+def test_source_revision_unknown(tmp_path):
+    assert source_revision(str(tmp_path / "missing.jsonl")) is None
+
+
+def test_server_refresh_parameters(tmp_path):
+    path = tmp_path / "release.jsonl"
+    write_jsonl(path, OLD)
+    server = SearchServer(Corpus.from_records(FRESH, name="fresh"), executor=None, manage_corpora=True)
+
+    def call(method, path, query=None, body=None):
+        request = Request(method=method, path=path, query=query or {}, body=json.dumps(body).encode() if body else b"")
+        return asyncio.run(server.dispatch(request))
+
+    assert call("POST", "/corpora", body={"name": "release", "source": str(path)})[0] == 200
+    status, payload = call("POST", "/corpora/release/refresh", {"if_changed": "1"})
+    assert status == 200 and payload["reloaded"] is False and payload["generation"] == 1
+
+    write_jsonl(path, next_release(OLD))
+    status, payload = call("POST", "/corpora/release/refresh", {"if_changed": "1"})
+    assert payload["reloaded"] is True and payload["changes"]["removed"] == 10
+    status, payload = call("POST", "/corpora/release/refresh", {"full": "1"})
+    assert payload["generation"] == 3 and payload["changes"] is None
+    assert call("POST", "/corpora/fresh/refresh", {"if_changed": "1"})[0] == 400
+    server.executor.shutdown()
+    server.registry.close()
+
+
+@pytest.mark.parametrize("records", [[], OLD[:1]])
+def test_small_corpora(records):
+    old = Corpus.from_records(OLD[:5])
+    build_indexes(old)
+    new = Corpus.from_records(records)
+
+    changes = update_corpus(old, new)
+
+    assert changes.size == len(records)
+    assert len(get_header_indexes(new).dates.order) == len(records)
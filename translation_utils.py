@@ -2,13 +2,301 @@
 Prosty moduł do tłumaczenia tekstu z angielskiego na polski.
 
 Używa tylko deep-translator (Google Translator) - prosty i niezawodny.
+Identyczne żądania wykonywane w tym samym czasie (kilka sesji, wątki serwera) trafiają
+do usługi raz - pozostali wywołujący czekają na wynik pierwszego (`SingleFlight`).
+Każde żądanie przechodzi przez bezpiecznik (`CircuitBreaker`): po limicie żądań (429) albo
+serii błędów połączenia usługa jest wstrzymywana na rosnący czas i żądania kończą się od razu.
 """
 
 import hashlib
+import random
 import re
-from typing import Dict, Optional
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Sequence, Union
 
-import streamlit as st
+from instrumentation import increment, timed
+
+# Cache tłumaczeń poza Streamlit (CLI, serwer, testy)
+_TRANSLATION_CACHE: Dict[str, str] = {}
+
+# Limit długości jednego żądania do usługi tłumaczenia (Google Translate przyjmuje do 5000 znaków)
+MAX_CHUNK_LENGTH = 4500
+
+# Granice fragmentów tekstu od najlepszej: akapit, linia, koniec zdania, odstęp
+CHUNK_BREAKS = (("\n\n",), ("\n",), (". ", "! ", "? "), (" ", "\t"))
+
+# Teksty pakowane w jedno żądanie są rozdzielone linią ze znacznikiem, którego usługa nie tłumaczy
+PACK_MARKER = "###"
+PACK_SEPARATOR = f"\n\n{PACK_MARKER}\n\n"
+_PACK_SPLIT = re.compile(rf"\s*{PACK_MARKER}\s*")
+
+# Translator per wątek (kierunek -> GoogleTranslator) dla tłumaczenia wsadowego
+_THREAD_TRANSLATORS = threading.local()
+
+# Bezpiecznik usługi tłumaczenia: liczba kolejnych błędów połączenia, po której usługa jest wstrzymywana
+# (limit żądań - 429 - wstrzymuje ją od razu), bazowy czas wstrzymania dla rodzaju błędu i górny limit [s]
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BACKOFF = {"rate_limited": 30.0, "connection": 5.0}
+BREAKER_MAX_BACKOFF = 300.0
+
+
+class SingleFlight:
+    """
+    Jedno wykonanie identycznych żądań trwających w tym samym czasie (w obrębie procesu).
+
+    Cache tłumaczeń jest zapisywany dopiero po odpowiedzi usługi, więc kilku użytkowników
+    tłumaczących naraz ten sam popularny dokument wysłałoby to samo żądanie kilka razy.
+    Pierwszy wywołujący wykonuje żądanie, a pozostali czekają na jego wynik (albo wyjątek).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[tuple, Future] = {}
+
+    def do(self, key: tuple, compute: Callable[[], str]) -> str:
+        """
+        Wykonuje `compute` albo czeka na wynik trwającego wywołania o tym samym kluczu.
+
+        Args:
+            key: Klucz żądania; pierwszy element (rodzaj żądania) nazywa licznik połączonych wywołań
+            compute: Żądanie do usługi
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            increment(f"translation.coalesced.{key[0]}")
+            return future.result()
+
+        try:
+            result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+# Żądania do usługi tłumaczenia w toku - wspólne dla wszystkich sesji i wątków procesu
+_IN_FLIGHT = SingleFlight()
+
+
+class CircuitOpenError(RuntimeError):
+    """Żądanie odrzucone bez wysyłania - usługa tłumaczenia jest wstrzymana po błędach."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Usługa tłumaczenia wstrzymana po błędach (ponowna próba za {retry_after:.0f} s)")
+        self.retry_after = retry_after
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Rodzaj błędu usługi tłumaczenia: "rate_limited" (429, limit), "connection" (sieć, timeout) albo "other".
+
+    deep-translator nie ma wspólnej hierarchii wyjątków, więc rozpoznajemy nazwę klasy i treść komunikatu.
+    """
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    message = f"{type(error).__name__} {error}".lower()
+    if any(marker in message for marker in ("429", "too many requests", "toomanyrequests", "rate limit", "quota")):
+        return "rate_limited"
+    if isinstance(error, (ConnectionError, TimeoutError)) or any(
+        marker in message for marker in ("timeout", "timed out", "connection")
+    ):
+        return "connection"
+    return "other"
+
+
+def backoff_delay(attempt: int, base: float, cap: float = BREAKER_MAX_BACKOFF) -> float:
+    """
+    Opóźnienie `attempt`-tej ponownej próby (od 0): wykładnicze, z losowym rozrzutem w górnej połowie.
+
+    Rozrzut sprawia, że wątki i procesy wstrzymane tym samym błędem nie wracają do usługi jednocześnie.
+    """
+    delay = min(cap, base * 2**attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """
+    Bezpiecznik usługi tłumaczenia (stany: zamknięty, otwarty, półotwarty).
+
+    Zamknięty przepuszcza żądania. Limit żądań (429) albo `failure_threshold` kolejnych błędów
+    połączenia otwiera go na `backoff_delay` zależne od rodzaju błędu i liczby kolejnych otwarć -
+    w tym czasie żądania kończą się od razu `CircuitOpenError`, bez obciążania usługi. Po tym czasie
+    bezpiecznik jest półotwarty: przepuszcza jedno żądanie próbne, którego sukces go zamyka, a błąd
+    otwiera ponownie na dłużej. Inne błędy (np. niepoprawny tekst) dotyczą żądania, nie usługi,
+    i nie zmieniają stanu.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        backoff: Optional[Dict[str, float]] = None,
+        max_backoff: float = BREAKER_MAX_BACKOFF,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.backoff = dict(BREAKER_BACKOFF if backoff is None else backoff)
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._trips = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._last_error: Optional[str] = None
+        self._stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def call(self, compute: Callable[[], str]) -> str:
+        """
+        Wykonuje żądanie do usługi, jeśli bezpiecznik je przepuszcza.
+
+        Raises:
+            CircuitOpenError: Usługa wstrzymana (albo trwa żądanie próbne)
+            Exception: Błąd żądania - zapisany w stanie bezpiecznika
+        """
+        probe = self._admit()
+        try:
+            result = compute()
+        except BaseException as e:
+            self._record(classify_error(e) if isinstance(e, Exception) else "other", e, probe)
+            raise
+        self._record(None, probe=probe)
+        return result
+
+    def _admit(self) -> bool:
+        # Przepuszcza żądanie albo zgłasza CircuitOpenError; True - żądanie jest próbą po wstrzymaniu
+        with self._lock:
+            if self._state == self.OPEN:
+                remaining = self._open_until - self._clock()
+                if remaining > 0:
+                    self._reject(remaining)
+                self._state = self.HALF_OPEN
+                self._probing = False
+            probe = self._state == self.HALF_OPEN
+            if probe:
+                if self._probing:
+                    self._reject(0.0)
+                self._probing = True
+            self._stats["calls"] += 1
+            return probe
+
+    def _reject(self, retry_after: float) -> None:
+        self._stats["rejected"] += 1
+        increment("translation.breaker.rejected")
+        raise CircuitOpenError(retry_after)
+
+    def _record(self, kind: Optional[str], error: Optional[BaseException] = None, probe: bool = False) -> None:
+        with self._lock:
+            # Stan zmienia tylko żądanie próbne albo żądanie przy zamkniętym bezpieczniku. Odpowiedź
+            # żądania wysłanego przed otwarciem (stan otwarty lub półotwarty) jest tylko liczona
+            probe = probe and self._state == self.HALF_OPEN
+            if probe:
+                self._probing = False
+            if kind is None:
+                if probe:
+                    increment("translation.breaker.closed")
+                    self._state = self.CLOSED
+                if self._state == self.CLOSED:
+                    self._failures = self._trips = 0
+                return
+            if kind not in self.backoff:
+                return
+
+            self._stats["failures"] += 1
+            self._last_error = f"{kind}: {error}"[:200]
+            increment("translation.rate_limited" if kind == "rate_limited" else "translation.connection_errors")
+            if not probe and self._state != self.CLOSED:
+                return
+            self._failures += 1
+            if probe or kind == "rate_limited" or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._open_until = self._clock() + backoff_delay(self._trips, self.backoff[kind], self.max_backoff)
+                self._trips += 1
+                self._stats["opened"] += 1
+                increment("translation.breaker.opened")
+
+    def retry_after(self) -> float:
+        """Sekundy do końca wstrzymania usługi (0 - żądania są przepuszczane)."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self._open_until - self._clock())
+
+    def snapshot(self) -> dict:
+        """Stan bezpiecznika i liczniki żądań (panel aplikacji, /health serwera)."""
+        with self._lock:
+            retry_after = max(0.0, self._open_until - self._clock()) if self._state == self.OPEN else 0.0
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_after_s": round(retry_after, 1),
+                "last_error": self._last_error,
+                **self._stats,
+            }
+
+    def reset(self) -> None:
+        """Zamyka bezpiecznik i zeruje jego liczniki."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = self._trips = 0
+            self._open_until = 0.0
+            self._probing = False
+            self._last_error = None
+            self._stats = dict.fromkeys(self._stats, 0)
+
+
+# Bezpiecznik usługi tłumaczenia - wspólny dla wszystkich sesji i wątków procesu
+_BREAKER = CircuitBreaker()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Bezpiecznik, przez który przechodzą wszystkie żądania do usługi tłumaczenia."""
+    return _BREAKER
+
+
+def translation_pause_message() -> Optional[str]:
+    """Komunikat dla użytkownika, gdy bezpiecznik wstrzymał usługę tłumaczenia (None - usługa działa)."""
+    retry_after = _BREAKER.retry_after()
+    if retry_after <= 0:
+        return None
+    return (
+        f"⏸️ Usługa tłumaczenia jest chwilowo wstrzymana po błędach (limit żądań lub brak połączenia)."
+        f" Ponowna próba możliwa za {retry_after:.0f} s."
+    )
+
+
+def _backend_call(translator, text: str) -> str:
+    # Jedno żądanie do usługi tłumaczenia - przez bezpiecznik
+    return _BREAKER.call(lambda: translator.translate(text))
+
+
+def _flight_key(kind: str, text: str, source: str, target: str) -> tuple:
+    # Rodzaj żądania w kluczu - tłumaczenie tekstu czeka na swoje fragmenty, nigdy na siebie
+    return (kind, source, target, get_cache_key(text))
 
 
 def get_cache_key(text: str) -> str:
@@ -26,35 +314,208 @@ def get_cache_key(text: str) -> str:
     return hashlib.md5(text.encode("utf-8")).hexdigest()
 
 
-def split_text_into_chunks(text: str, max_length: int = 4500) -> list[str]:
-    """Dzieli tekst na mniejsze fragmenty dla tłumaczenia."""
-    if len(text) <= max_length:
-        return [text]
+def _get_translation_cache() -> Dict[str, str]:
+    """
+    Zwraca słownik cache tłumaczeń.
 
-    # Dzielimy na zdania
-    sentences = re.split(r"(?<=[.!?])\s+", text)
-    chunks = []
-    current_chunk = ""
+    W aplikacji Streamlit cache jest trzymany w session state, a poza nią
+    (CLI, serwer, testy) w słowniku na poziomie modułu.
+    """
+    try:
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return _TRANSLATION_CACHE
 
-    for sentence in sentences:
-        if len(current_chunk) + len(sentence) < max_length:
-            current_chunk += sentence + " "
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return _TRANSLATION_CACHE
+
+    if "translation_cache" not in st.session_state:
+        st.session_state["translation_cache"] = {}
+    return st.session_state["translation_cache"]
+
+
+def iter_text_chunks(text: str, max_length: int = MAX_CHUNK_LENGTH) -> Iterator[str]:
+    """
+    Dzieli tekst na kolejne fragmenty o długości najwyżej `max_length`, bez gubienia znaków.
+
+    Fragment kończy się na najlepszej granicy w drugiej połowie okna: pustej linii (akapit),
+    końcu linii, końcu zdania, odstępie, a gdy ich brak (bardzo długie "zdanie" z OCR) -
+    dokładnie na limicie. Każdy fragment poza ostatnim ma co najmniej połowę limitu, a okno
+    jest przeszukiwane raz, więc czas jest liniowy względem długości tekstu.
+    `"".join(iter_text_chunks(text)) == text`.
+    """
+    start, size = 0, len(text)
+    while size - start > max_length:
+        cut = _break_position(text, start + max_length // 2, start + max_length)
+        yield text[start:cut]
+        start = cut
+    if start < size or not size:
+        yield text[start:]
+
+
+def _break_position(text: str, low: int, end: int) -> int:
+    # Koniec separatora najlepszego poziomu leżącego w całości w text[low:end]
+    for separators in CHUNK_BREAKS:
+        best = -1
+        for separator in separators:
+            found = text.rfind(separator, low, end)
+            if found >= 0:
+                best = max(best, found + len(separator))
+        if best >= 0:
+            return best
+    return end
+
+
+def split_text_into_chunks(text: str, max_length: int = MAX_CHUNK_LENGTH) -> list[str]:
+    """Dzieli tekst na fragmenty dla tłumaczenia (`iter_text_chunks`); złączone dają oryginał."""
+    return list(iter_text_chunks(text, max_length))
+
+
+def pack_segments(segments: Sequence[str], max_length: int = MAX_CHUNK_LENGTH) -> list[list[int]]:
+    """
+    Grupuje krótkie teksty w żądania: teksty grupy złączone `PACK_SEPARATOR` mają najwyżej `max_length` znaków.
+
+    Tekst zawierający znacznik separatora trafia do osobnego żądania - jego odpowiedzi nie dałoby się rozdzielić.
+
+    Returns:
+        Numery tekstów każdego żądania, w kolejności tekstów
+    """
+    groups: list[list[int]] = []
+    length = 0
+    packable = False
+    for index, segment in enumerate(segments):
+        fits = PACK_MARKER not in segment
+        if groups and packable and fits and length + len(PACK_SEPARATOR) + len(segment) <= max_length:
+            groups[-1].append(index)
+            length += len(PACK_SEPARATOR) + len(segment)
         else:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = sentence + " "
+            groups.append([index])
+            length, packable = len(segment), fits
+    return groups
+
+
+def translate_segments(
+    segments: Sequence[str], translate: Callable[[str], str], max_length: int = MAX_CHUNK_LENGTH
+) -> list[str]:
+    """
+    Tłumaczy teksty (każdy najwyżej `max_length` znaków), pakując krótkie w jedno żądanie.
+
+    Odpowiedź żądania zbiorczego jest dzielona z powrotem po znaczniku separatora; gdy liczba
+    części się nie zgadza (usługa zmieniła separator), teksty grupy są tłumaczone pojedynczo.
 
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    Args:
+        segments: Teksty do przetłumaczenia
+        translate: Tłumaczenie jednego żądania (błąd jest przekazywany dalej)
+        max_length: Limit długości żądania usługi tłumaczenia
+    """
+    translated = [""] * len(segments)
+    for group in pack_segments(segments, max_length):
+        increment("translation.requests")
+        if len(group) == 1:
+            translated[group[0]] = translate(segments[group[0]])
+            continue
+        response = translate(PACK_SEPARATOR.join(segments[index] for index in group))
+        parts = _PACK_SPLIT.split(response.strip())
+        if len(parts) != len(group):
+            increment("translation.pack_mismatch")
+            increment("translation.requests", len(group))
+            parts = [translate(segments[index]) for index in group]
+        for index, part in zip(group, parts):
+            translated[index] = part
+    return translated
+
+
+def translate_documents(
+    texts: Sequence[str], translate: Callable[[str], str], max_length: int = MAX_CHUNK_LENGTH
+) -> list[str]:
+    """
+    Tłumaczy dokumenty dowolnej długości najmniejszą liczbą żądań.
+
+    Długie dokumenty są dzielone (`iter_text_chunks`), a fragmenty wszystkich dokumentów -
+    bez odstępów na brzegach, które wracają na miejsce po tłumaczeniu - pakowane w żądania
+    (`translate_segments`). Strona wyników albo porcja krótkich maili to zwykle jedno żądanie.
+    """
+    layouts = []
+    segments: list[str] = []
+    for text in texts:
+        layout: list[Union[str, tuple[str, int, str]]] = []
+        for chunk in iter_text_chunks(text, max_length):
+            core = chunk.strip()
+            if not core:
+                layout.append(chunk)
+                continue
+            lead = chunk[: len(chunk) - len(chunk.lstrip())]
+            trail = chunk[len(chunk.rstrip()) :]
+            layout.append((lead, len(segments), trail))
+            segments.append(core)
+        layouts.append(layout)
+
+    translated = translate_segments(segments, translate, max_length)
+    return [
+        "".join(part if isinstance(part, str) else part[0] + translated[part[1]] + part[2] for part in layout)
+        for layout in layouts
+    ]
 
-    return chunks if chunks else [text]
+
+def _translate_long_texts(translator, texts: Sequence[str]) -> list[str]:
+    """
+    Tłumaczy teksty fragmentami pakowanymi w żądania (błąd żądania = oryginalne fragmenty).
+
+    Zamiast stałej przerwy między żądaniami tempo wyznacza bezpiecznik: po limicie żądań
+    pozostałe fragmenty kończą się od razu, bez czekania na kolejne odmowy usługi.
+    """
+
+    def translate_or_keep(request: str) -> str:
+        try:
+            translated = _IN_FLIGHT.do(
+                _flight_key("chunk", request, "en", "pl"), lambda: _backend_call(translator, request)
+            )
+            return translated if translated and translated.strip() else request
+        except Exception:
+            # W przypadku błędu użyj oryginału
+            increment("translation.chunk_errors")
+            return request
+
+    return translate_documents(texts, translate_or_keep)
+
+
+def _translate_long_text(translator, text: str) -> str:
+    """Tłumaczy długi tekst fragmentami (błąd fragmentu = oryginalny fragment)."""
+    return _translate_long_texts(translator, [text])[0]
+
+
+def translate_chunk(text: str, source: str = "en", target: str = "pl") -> str:
+    """
+    Tłumaczy jeden fragment tekstu (do 4500 znaków) bez cache i bez ukrywania błędów.
+
+    Przeznaczona dla zadań wsadowych: błąd sieci lub limitu jest zgłaszany wyjątkiem,
+    żeby nieprzetłumaczony fragment nie został zapisany jako tłumaczenie. Każdy wątek
+    ma własny translator.
+
+    Raises:
+        ImportError: Brak pakietu deep-translator
+        CircuitOpenError: Usługa wstrzymana po błędach (`retry_after` - sekundy do ponownej próby)
+        Exception: Błąd usługi tłumaczenia
+    """
+    from deep_translator import GoogleTranslator
+
+    translators = _THREAD_TRANSLATORS.__dict__
+    translator = translators.get((source, target))
+    if translator is None:
+        translator = translators[(source, target)] = GoogleTranslator(source=source, target=target)
+    with timed("translation.chunk"):
+        translated = _IN_FLIGHT.do(_flight_key("chunk", text, source, target), lambda: _backend_call(translator, text))
+    if not translated or not translated.strip():
+        raise ValueError("Usługa tłumaczenia zwróciła pusty tekst")
+    return translated
 
 
 def translate_text(text: str, translator=None) -> str:
     """
     Tłumaczy tekst z angielskiego na polski używając Google Translator.
 
-    Używa cache w session state, aby nie tłumaczyć tego samego tekstu dwa razy.
+    Używa cache (session state w Streamlit), aby nie tłumaczyć tego samego tekstu dwa razy.
 
     Args:
         text: Tekst do przetłumaczenia
@@ -66,75 +527,154 @@ def translate_text(text: str, translator=None) -> str:
     if not text or not text.strip():
         return text
 
-    # Inicjalizuj cache tłumaczeń jeśli nie istnieje
-    if "translation_cache" not in st.session_state:
-        st.session_state["translation_cache"] = {}
-
     # Sprawdź cache
+    translation_cache = _get_translation_cache()
     cache_key = get_cache_key(text)
-    if cache_key in st.session_state["translation_cache"]:
-        return st.session_state["translation_cache"][cache_key]
+    if cache_key in translation_cache:
+        increment("translation.cache_hit")
+        return translation_cache[cache_key]
+    increment("translation.cache_miss")
+
+    # Ten sam tekst tłumaczony właśnie w innej sesji - czekamy na tamto żądanie zamiast wysyłać kolejne
+    translated = _IN_FLIGHT.do(_flight_key("text", text, "en", "pl"), lambda: _translate_uncached(text))
+
+    # Sprawdź czy tłumaczenie jest sensowne
+    if translated and translated.strip() and translated != text:
+        # Zapisz w cache
+        translation_cache[cache_key] = translated
+        return translated
+    return text
+
+
+class TranslatedChunk(NamedTuple):
+    """Kolejny fragment tłumaczenia strumieniowego (`translate_text_stream`)."""
+
+    index: int  # numer fragmentu (od 0)
+    count: int  # liczba fragmentów tekstu
+    text: str  # tłumaczenie fragmentu z odstępami oryginału (oryginał, gdy się nie udało)
+    translated: bool  # czy usługa przetłumaczyła fragment
 
-    # Spróbuj przetłumaczyć
-    try:
-        import time
 
+def translate_text_stream(text: str, max_length: int = MAX_CHUNK_LENGTH) -> Iterator[TranslatedChunk]:
+    """
+    Tłumaczy tekst z angielskiego na polski fragmentami, oddając każdy zaraz po odpowiedzi usługi.
+
+    Fragmenty (`iter_text_chunks`) są tłumaczone po kolei, więc pierwszy akapit jest gotowy po
+    jednym żądaniu, a `index` i `count` dają rzeczywisty postęp. Złączone fragmenty są tłumaczeniem
+    całego tekstu - gdy wszystkie się udały, trafia ono do cache `translate_text`. Fragment, którego
+    nie udało się przetłumaczyć (błąd usługi, wstrzymanie przez bezpiecznik), jest oddawany w oryginale.
+    """
+    if not text or not text.strip():
+        yield TranslatedChunk(0, 1, text, False)
+        return
+
+    translation_cache = _get_translation_cache()
+    cache_key = get_cache_key(text)
+    if cache_key in translation_cache:
+        increment("translation.cache_hit")
+        yield TranslatedChunk(0, 1, translation_cache[cache_key], True)
+        return
+    increment("translation.cache_miss")
+
+    try:
+        from deep_translator import GoogleTranslator
+    except ImportError:
+        yield TranslatedChunk(0, 1, text, False)
+        return
+
+    translator = GoogleTranslator(source="en", target="pl")
+    chunks = split_text_into_chunks(text, max_length)
+    parts = []
+    for index, chunk in enumerate(chunks):
+        core = chunk.strip()
+        translated = core
+        if core:
+            try:
+                with timed("translation.chunk"):
+                    translated = _IN_FLIGHT.do(
+                        _flight_key("chunk", core, "en", "pl"), lambda: _backend_call(translator, core)
+                    )
+            except Exception:
+                increment("translation.chunk_errors")
+                translated = ""
+        # Fragment z samych odstępów zostaje bez zmian
+        ok = not core or bool(translated and translated.strip())
+        lead = chunk[: len(chunk) - len(chunk.lstrip())]
+        trail = chunk[len(chunk.rstrip()) :] if core else ""
+        part = lead + (translated if ok else core) + trail
+        parts.append((part, ok))
+        yield TranslatedChunk(index, len(chunks), part, ok)
+
+    translated_text = "".join(part for part, _ in parts)
+    if all(ok for _, ok in parts) and translated_text != text:
+        translation_cache[cache_key] = translated_text
+
+
+def _translate_uncached(text: str) -> str:
+    """Tłumaczy tekst bez cache (oryginał w przypadku błędu)."""
+    try:
         from deep_translator import GoogleTranslator
 
         translator = GoogleTranslator(source="en", target="pl")
 
         # Dla długich tekstów dzielimy na fragmenty
-        if len(text) > 4500:
-            chunks = split_text_into_chunks(text, max_length=4500)
-            translated_chunks = []
-
-            for i, chunk in enumerate(chunks):
-                if chunk.strip():
-                    try:
-                        # Dodaj małe opóźnienie między requestami, żeby uniknąć rate limiting
-                        if i > 0:
-                            time.sleep(0.5)
-
-                        translated_chunk = translator.translate(chunk)
-                        if translated_chunk and translated_chunk.strip():
-                            translated_chunks.append(translated_chunk)
-                        else:
-                            translated_chunks.append(chunk)
-                    except Exception:
-                        # W przypadku błędu użyj oryginału
-                        translated_chunks.append(chunk)
-
-            translated = " ".join(translated_chunks)
-        else:
-            # Krótki tekst - tłumacz całość
-            translated = translator.translate(text)
-
-        # Sprawdź czy tłumaczenie jest sensowne
-        if translated and translated.strip() and translated != text:
-            # Zapisz w cache
-            st.session_state["translation_cache"][cache_key] = translated
-            return translated
+        with timed("translation.text"):
+            return _translate_long_text(translator, text) if len(text) > 4500 else _backend_call(translator, text)
 
     except ImportError:
         # deep-translator nie jest zainstalowany
         pass
-    except Exception as e:
-        # W przypadku błędu zwróć oryginał (cicho, bez pokazywania błędów użytkownikowi)
-        # Aplikacja powinna działać nawet jeśli tłumaczenie nie działa
-        error_msg = str(e).lower()
-        if "429" in str(e) or "rate limit" in error_msg or "quota" in error_msg:
-            # Rate limiting - nie pokazuj błędu, tylko zwróć oryginał
-            pass
-        elif "timeout" in error_msg or "connection" in error_msg:
-            # Problem z połączeniem - nie pokazuj błędu, tylko zwróć oryginał
-            pass
-        # Dla innych błędów też zwróć oryginał cicho
+    except CircuitOpenError:
+        # Usługa wstrzymana - żądanie nie zostało wysłane (licznik translation.breaker.rejected)
         pass
+    except Exception:
+        # W przypadku błędu zwróć oryginał (cicho, bez pokazywania błędów użytkownikowi)
+        # Aplikacja powinna działać nawet jeśli tłumaczenie nie działa; limit żądań i błędy
+        # połączenia liczy bezpiecznik (translation.rate_limited, translation.connection_errors)
+        increment("translation.errors")
 
     # Jeśli wszystko zawiedzie, zwróć oryginał
     return text
 
 
+def translate_texts(texts: Sequence[str]) -> list[str]:
+    """
+    Tłumaczy kilka tekstów naraz (np. stronę wyników) - krótkie teksty idą w jednym żądaniu.
+
+    Teksty z cache nie są wysyłane. Jak `translate_text`: tekst, którego nie udało się
+    przetłumaczyć, jest zwracany bez zmian.
+    """
+    translation_cache = _get_translation_cache()
+    results = list(texts)
+    missing = []
+    for index, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        cached = translation_cache.get(get_cache_key(text))
+        if cached is not None:
+            increment("translation.cache_hit")
+            results[index] = cached
+        else:
+            increment("translation.cache_miss")
+            missing.append(index)
+    if not missing:
+        return results
+
+    try:
+        from deep_translator import GoogleTranslator
+    except ImportError:
+        return results
+
+    translator = GoogleTranslator(source="en", target="pl")
+    with timed("translation.texts"):
+        translated = _translate_long_texts(translator, [texts[index] for index in missing])
+    for index, text in zip(missing, translated):
+        if text and text.strip() and text != texts[index]:
+            translation_cache[get_cache_key(texts[index])] = text
+            results[index] = text
+    return results
+
+
 def translate_with_fallback(text: str) -> str:
     """
     Alternatywna metoda tłumaczenia (alias dla translate_text).
@@ -170,7 +710,10 @@ def translate_query_to_english(query: str) -> str:
         from deep_translator import GoogleTranslator
 
         translator = GoogleTranslator(source="pl", target="en")
-        translated = translator.translate(query)
+        with timed("translation.query"):
+            translated = _IN_FLIGHT.do(
+                _flight_key("query", query, "pl", "en"), lambda: _backend_call(translator, query)
+            )
 
         # Sprawdź czy tłumaczenie jest sensowne
         if translated and translated.strip() and translated != query: